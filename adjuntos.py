@@ -0,0 +1,111 @@
+import collections # Importa collections, que ofrece OrderedDict para la caché LRU de miniaturas.
+import hashlib # Importa hashlib para identificar cada imagen por el hash SHA-256 de su contenido.
+import os # Importa el módulo os, que proporciona funciones para interactuar con el sistema operativo, como la gestión de rutas de archivos y directorios.
+import shutil # Importa shutil para copiar archivos en bloques.
+import threading # Importa threading para dar nombres de temporal distintos a cada hilo.
+from concurrent.futures import ThreadPoolExecutor # Importa el grupo de hilos que genera las miniaturas fuera del hilo de Tk.
+
+ADJUNTOS_DIR = "data/adjuntos" # Carpeta de blobs direccionados por contenido: data/adjuntos/ab/abcdef...
+MINIATURAS_DIR = "data/miniaturas" # Carpeta de miniaturas ya generadas (caché en disco).
+TAMANO_MINIATURA = 96 # Lado máximo en píxeles de las miniaturas.
+CAPACIDAD_LRU = 64 # Número máximo de PhotoImage de miniaturas retenidas en memoria.
+_BLOQUE = 1024 * 1024 # Tamaño de bloque para leer archivos grandes sin cargarlos enteros.
+
+
+def ruta_blob(hash_hex):
+    """Devuelve la ruta del blob con el hash indicado.""" # Docstring que describe la función.
+    return os.path.join(ADJUNTOS_DIR, hash_hex[:2], hash_hex) # Subcarpeta por los dos primeros caracteres para no llenar un solo directorio.
+
+
+def guardar_blob(ruta_origen):
+    """
+    Copia una imagen al almacén de adjuntos y devuelve su hash.
+    Si ya existe un blob con el mismo contenido no se vuelve a copiar (deduplicación).
+    """ # Docstring que describe la función.
+    h = hashlib.sha256() # Crea el acumulador del hash.
+    with open(ruta_origen, 'rb') as f: # Abre la imagen original en modo binario.
+        for bloque in iter(lambda: f.read(_BLOQUE), b""): # Lee el archivo en bloques.
+            h.update(bloque) # Acumula cada bloque en el hash.
+    hash_hex = h.hexdigest() # Obtiene el hash en hexadecimal.
+    destino = ruta_blob(hash_hex) # Ruta donde debe quedar el blob.
+    if not os.path.exists(destino): # Solo copia si el contenido es nuevo.
+        os.makedirs(os.path.dirname(destino), exist_ok=True) # Crea la subcarpeta si no existe.
+        temporal = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp" # Copia primero a un temporal propio del proceso y del hilo (otra instancia u otro hilo pueden estar copiando el mismo blob).
+        shutil.copyfile(ruta_origen, temporal) # Copia el archivo en bloques.
+        os.replace(temporal, destino) # Lo publica de golpe: nunca queda un blob a medio copiar.
+    return hash_hex # Devuelve el hash que identifica el adjunto.
+
+
+def ruta_miniatura(hash_hex, tamano=TAMANO_MINIATURA):
+    """Devuelve la ruta de la miniatura en disco de un blob.""" # Docstring que describe la función.
+    return os.path.join(MINIATURAS_DIR, f"{hash_hex}_{tamano}.png") # PNG, formato que Tk carga sin necesidad de PIL.
+
+
+def generar_miniatura(hash_hex, tamano=TAMANO_MINIATURA):
+    """
+    Genera (si no existe ya) la miniatura PNG de un blob y devuelve su ruta.
+    Se ejecuta en un hilo del grupo, nunca en el hilo de Tk.
+    """ # Docstring que describe la función.
+    destino = ruta_miniatura(hash_hex, tamano) # Ruta de la miniatura en la caché de disco.
+    if os.path.exists(destino): # Si ya se generó en una sesión anterior.
+        return destino # No hace falta decodificar la imagen.
+    from PIL import Image # Importa PIL aquí, solo cuando hay que generar una miniatura.
+    with Image.open(ruta_blob(hash_hex)) as img: # Abre la imagen original (solo lee la cabecera).
+        img.draft("RGB", (tamano, tamano)) # Pide al decodificador JPEG que decodifique ya reducida, sin pasar por el tamaño completo.
+        img.thumbnail((tamano, tamano)) # Reduce la imagen manteniendo la proporción.
+        os.makedirs(MINIATURAS_DIR, exist_ok=True) # Crea la carpeta de miniaturas si no existe.
+        temporal = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp" # Temporal propio del proceso y del hilo.
+        img.convert("RGBA").save(temporal, format="PNG") # Escribe la miniatura en PNG.
+    os.replace(temporal, destino) # La publica de golpe.
+    return destino # Devuelve la ruta de la miniatura.
+
+
+class CargadorMiniaturas: # Genera miniaturas en segundo plano y las entrega como PhotoImage en el hilo de Tk.
+    def __init__(self, max_hilos=2, capacidad=CAPACIDAD_LRU):
+        """
+        Inicializa el cargador.
+
+        Args:
+            max_hilos (int): Número de hilos que decodifican imágenes en paralelo.
+            capacidad (int): Número máximo de PhotoImage retenidas en la caché LRU.
+        """ # Docstring que describe el método y sus argumentos.
+        self._grupo = ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix="miniaturas") # Grupo de hilos de trabajo.
+        self._cache = collections.OrderedDict() # Caché LRU (hash, tamaño) -> PhotoImage.
+        self._capacidad = capacidad # Capacidad máxima de la caché.
+
+    def enviar(self, funcion, *args):
+        """Ejecuta una función en el grupo de hilos y devuelve su Future.""" # Docstring que describe el método.
+        return self._grupo.submit(funcion, *args) # Encola el trabajo.
+
+    def pedir(self, widget, hash_hex, callback, tamano=TAMANO_MINIATURA):
+        """
+        Pide la miniatura de un blob. callback(photo) se llama en el hilo de Tk;
+        photo es None si la imagen no se pudo decodificar.
+        """ # Docstring que describe el método.
+        clave = (hash_hex, tamano) # Clave de la caché.
+        photo = self._cache.get(clave) # Busca la miniatura ya cargada.
+        if photo is not None: # Acierto en la caché.
+            self._cache.move_to_end(clave) # La marca como usada recientemente.
+            callback(photo) # La entrega sin esperar.
+            return # Sale de la función.
+        futuro = self.enviar(generar_miniatura, hash_hex, tamano) # Genera la miniatura fuera del hilo de Tk.
+
+        def _al_terminar(ruta_png): # Se ejecuta en el hilo de Tk cuando la miniatura está en disco.
+            import tkinter as tk # tkinter ya está cargado en la aplicación gráfica; se importa aquí para no exigirlo al importar el módulo.
+            photo = self._cache.get(clave) # Otra petición pudo cargarla mientras tanto.
+            if photo is None: # Si sigue sin estar en la caché.
+                photo = tk.PhotoImage(master=widget, file=ruta_png) # Carga el PNG pequeño (Tk lo lee de forma nativa).
+                self._guardar_en_cache(clave, photo) # La añade a la caché LRU.
+            callback(photo) # Entrega la miniatura.
+
+        from estilos import esperar_futuro # Kit de interfaz (carga tkinter y PIL): se importa aquí por la misma razón.
+        esperar_futuro(widget, futuro, _al_terminar, lambda e: callback(None)) # Espera el resultado sin bloquear el bucle de eventos.
+
+    def _guardar_en_cache(self, clave, photo):
+        """Añade una miniatura a la caché LRU, descartando la menos usada si se supera la capacidad.""" # Docstring que describe el método.
+        self._cache[clave] = photo # Añade la miniatura.
+        while len(self._cache) > self._capacidad: # Si se superó la capacidad.
+            self._cache.popitem(last=False) # Descarta la menos usada recientemente (los Label que la muestran conservan su propia referencia).
+
+
+cargador = CargadorMiniaturas() # Cargador único compartido por todas las ventanas de notas.
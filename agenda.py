@@ -0,0 +1,74 @@
+import datetime # Importa el módulo datetime para calcular los límites de cada grupo de la agenda.
+import tkinter as tk # Importa el módulo tkinter, que es la biblioteca estándar de Python para crear interfaces gráficas de usuario (GUI).
+from tkinter import messagebox # Importa el submódulo messagebox de tkinter, utilizado para mostrar cuadros de diálogo de mensajes.
+
+from almacenamiento import almacen_tareas, vaciar_al_cerrar # Importa la colección de tareas de la capa de almacenamiento.
+from eventos import EVENTOS_TAREAS, suscribir_widget # Importa los tipos de evento de tareas y el ayudante para suscribir ventanas al bus de cambios.
+from indices import indice_fechas, indice_estado # Importa el índice de tareas ordenado por fecha de entrega y el de completadas.
+from tareas import editar_tarea # Importa el editor de tareas compartido con la lista de tareas.
+from estilos import crear_ventana_modal, crear_boton_estilizado, crear_lista, AZUL, COLOR_ENCABEZADO # Importa el kit de interfaz compartido.
+
+DIAS_PROXIMOS = 7 # Número de días, a partir de mañana, que abarca el grupo "Próximos días".
+
+
+def grupos_agenda(usuario, hoy=None):
+    """
+    Devuelve los grupos de la agenda como una lista de (nombre, [ids de tarea ordenados por fecha]).
+    Cada grupo es una porción del índice por fecha localizada con búsqueda binaria: no se ordena ni se recorre la lista completa.
+    Las tareas completadas no aparecen en la agenda.
+    """ # Docstring que describe la función.
+    indice = indice_fechas(almacen_tareas, usuario) # Índice por fecha del usuario (se construye una sola vez por sesión).
+    estado = indice_estado(almacen_tareas, usuario) # Índice de completadas del usuario.
+    abiertas = lambda ids: [i for i in ids if not estado.esta_completada(i)] # Quita de un grupo las tareas completadas.
+    hoy = hoy or datetime.date.today() # Fecha de referencia (hoy, salvo que se indique otra).
+    manana = (hoy + datetime.timedelta(days=1)).isoformat() # Primer día después de hoy.
+    limite = (hoy + datetime.timedelta(days=DIAS_PROXIMOS + 1)).isoformat() # Primer día que ya no es "próximo".
+    hoy = hoy.isoformat() # Fecha de hoy como texto "aaaa-mm-dd", comparable con las fechas guardadas.
+    return [ # Lista de grupos en el orden en que se muestran.
+        ("Vencidas", abiertas(indice.rango("0", hoy))), # Desde "0" para dejar fuera las tareas sin fecha (cadena vacía).
+        ("Hoy", abiertas(indice.rango(hoy, manana))), # Solo las de hoy.
+        (f"Próximos {DIAS_PROXIMOS} días", abiertas(indice.rango(manana, limite))), # De mañana a dentro de DIAS_PROXIMOS días.
+        ("Más adelante", abiertas(indice.rango(limite))), # El resto, sin límite superior.
+    ]
+
+
+def mostrar_agenda(usuario):
+    """Muestra las tareas del usuario agrupadas en vencidas, hoy, próximos días y más adelante.""" # Docstring que describe la función.
+    win, content_frame = crear_ventana_modal("Agenda", "🗓️ Agenda", 550, 600) # Crea la ventana modal centrada con su encabezado.
+    lista = crear_lista(content_frame, "Tareas por fecha de entrega:", height=18) # Lista de la agenda.
+    ids_por_fila = [] # Id de la tarea de cada fila (None en las filas de encabezado de grupo).
+    pendiente = [None] # Identificador del after_idle() programado para repintar, si hay uno pendiente.
+
+    def poblar():
+        """Rellena la Listbox con los grupos de la agenda.""" # Docstring que describe la función interna.
+        pendiente[0] = None # Ya no hay un repintado pendiente.
+        lista.delete(0, tk.END) # Vacía la Listbox.
+        ids_por_fila.clear() # Vacía la correspondencia fila -> tarea.
+        for nombre, ids in grupos_agenda(usuario): # Recorre los grupos.
+            lista.insert(tk.END, f"— {nombre} ({len(ids)}) —") # Fila de encabezado del grupo.
+            lista.itemconfig(tk.END, bg=COLOR_ENCABEZADO) # Encabezado con el fondo de los encabezados de la aplicación.
+            ids_por_fila.append(None) # El encabezado no corresponde a ninguna tarea.
+            for tarea_id in ids: # Recorre las tareas del grupo, ya ordenadas por fecha.
+                tarea = almacen_tareas.obtener(usuario, tarea_id) # Busca la tarea por id.
+                lista.insert(tk.END, f"   {tarea['fecha']}  {tarea['titulo']}") # Fila de la tarea.
+                ids_por_fila.append(tarea_id) # Recuerda qué tarea muestra la fila.
+
+    def on_cambio_tarea(evento):
+        """Programa un repintado de la agenda cuando cambia una tarea del usuario.""" # Docstring que describe la función interna.
+        if pendiente[0] is None: # Varios cambios seguidos se agrupan en un único repintado.
+            pendiente[0] = win.after_idle(poblar) # Repinta cuando Tk quede libre (el índice ya está actualizado).
+
+    def ver_tarea(event=None):
+        """Abre el editor de la tarea seleccionada.""" # Docstring que describe la función interna.
+        index = lista.curselection() # Obtiene la fila seleccionada.
+        tarea_id = ids_por_fila[index[0]] if index else None # Tarea de la fila (None si es un encabezado o no hay selección).
+        if tarea_id is None: # Si no hay una tarea seleccionada.
+            messagebox.showwarning("Advertencia", "Por favor, selecciona una tarea para ver.") # Muestra una advertencia.
+            return # Sale de la función.
+        editar_tarea(usuario, almacen_tareas.obtener(usuario, tarea_id), win) # Muestra la tarea en el editor reutilizable de la agenda.
+
+    poblar() # Muestra la agenda inicial.
+    suscribir_widget(win, on_cambio_tarea, tipos=EVENTOS_TAREAS, usuario=usuario) # Escucha los cambios de tareas del usuario mientras la ventana esté abierta.
+    vaciar_al_cerrar(win) # Al cerrar la ventana se escriben de una vez los cambios hechos desde ella.
+    lista.bind("<Double-Button-1>", ver_tarea) # Doble clic abre la tarea.
+    crear_boton_estilizado(content_frame, "Ver tarea seleccionada", ver_tarea, AZUL, "white", icon_char="👁️") # Botón "Ver tarea seleccionada" con estilo.
@@ -0,0 +1,688 @@
+import atexit # Importa atexit para escribir los cambios pendientes al terminar el programa.
+import contextlib # Importa contextlib para escribir las transacciones como gestor de contexto (with).
+import datetime # Importa datetime para fechar el momento en que se completa una tarea.
+import json # Importa el módulo json, que permite trabajar con datos en formato JSON (serializar y deserializar).
+import os # Importa el módulo os, que proporciona funciones para interactuar con el sistema operativo, como la gestión de rutas de archivos y directorios.
+import threading # Importa threading para el temporizador de guardado diferido y el cerrojo que lo protege.
+import time # Importa time para medir cuánto lleva pendiente el primer cambio sin guardar.
+import zlib # Importa el módulo zlib, compresor rápido usado por defecto para los cuerpos de nota grandes.
+
+from archivos import escribir_atomico, bloqueo_archivo # Importa la escritura atómica y el bloqueo entre procesos.
+from eventos import bus, Evento # Importa el bus de cambios y el tipo Evento para notificar cada modificación.
+
+TAREAS_FILE = "data/tareas.json" # Define una constante con la ruta al archivo JSON donde se almacenarán las tareas.
+NOTAS_FILE = "data/notas.json" # Define una constante con la ruta al archivo JSON donde se almacenarán las notas.
+NOTAS_CONTENIDO_DIR = "data/notas_contenido" # Carpeta donde se guarda el cuerpo de cada nota, separado de sus metadatos.
+
+PRIORIDADES = ("alta", "media", "baja") # Prioridades posibles de una tarea, de mayor a menor.
+PRIORIDAD_POR_DEFECTO = "media" # Prioridad de las tareas nuevas y de las antiguas que no tienen el campo.
+
+UMBRAL_COMPRESION = 4096 # Tamaño en bytes a partir del cual el cuerpo de una nota se guarda comprimido.
+COMPRESOR = "zlib" # Algoritmo usado por encima del umbral: "zlib" (rápido) o "lzma" (comprime más, es más lento).
+
+# Durabilidad de los guardados:
+#   "inmediata": cada cambio se escribe y se sincroniza con el disco (fsync) antes de continuar.
+#   "agrupada":  los cambios seguidos se agrupan en una sola escritura, sincronizada con fsync (por defecto).
+#   "rapida":    como "agrupada", pero sin fsync; el sistema operativo decide cuándo llega al disco.
+DURABILIDAD = "agrupada" # Modo de durabilidad de las colecciones.
+RETARDO_GUARDADO = 0.5 # Segundos sin cambios tras los que se escriben los cambios pendientes.
+ESPERA_MAXIMA = 3.0 # Segundos máximos que un cambio puede quedar sin escribir aunque sigan llegando otros.
+
+# Cada archivo de cuerpo empieza con un byte que indica cómo está guardado el resto.
+_FORMATO_TEXTO = b"T" # Texto UTF-8 sin comprimir.
+_FORMATO_ZLIB = b"Z" # Texto UTF-8 comprimido con zlib.
+_FORMATO_LZMA = b"X" # Texto UTF-8 comprimido con lzma.
+
+
+def _firma_archivo(ruta):
+    """Devuelve una firma (inodo, fecha de modificación, tamaño) del archivo, o None si no existe.""" # Docstring que describe la función.
+    try: # Intenta consultar los metadatos del archivo.
+        st = os.stat(ruta) # Obtiene los metadatos del archivo sin leer su contenido.
+    except FileNotFoundError: # Si el archivo no existe.
+        return None # Devuelve None como firma de "archivo ausente".
+    return (st.st_ino, st.st_mtime_ns, st.st_size) # Cada escritura atómica crea un archivo nuevo (otro inodo), así que la firma cambia siempre.
+
+
+class ColeccionJSON: # Define una colección de registros por usuario guardada en un archivo JSON ({usuario: [registro, ...]}).
+    def __init__(self, ruta, nombre):
+        """
+        Inicializa la colección.
+
+        Args:
+            ruta (str): Ruta al archivo JSON.
+            nombre (str): Nombre del tipo de registro ("tarea" o "nota"), usado para los tipos de evento.
+        """ # Docstring que describe el método y sus argumentos.
+        self.ruta = ruta # Almacena la ruta del archivo.
+        self.nombre = nombre # Almacena el nombre del tipo de registro.
+        self.evento_agregado = f"{nombre}_agregada" # Tipo de evento publicado al añadir un registro.
+        self.evento_actualizado = f"{nombre}_actualizada" # Tipo de evento publicado al modificar un registro.
+        self.evento_eliminado = f"{nombre}_eliminada" # Tipo de evento publicado al eliminar un registro.
+        self._datos = None # Caché en memoria de los datos; None significa "todavía no cargados".
+        self._firma = None # Firma del archivo la última vez que se leyó o escribió.
+        self._por_id = {} # Caché usuario -> {id: registro}, construida al primer uso para buscar registros sin recorrer la lista.
+        self._contadores = {} # Siguiente id de cada usuario: solo crece, así que un id eliminado o archivado nunca se reutiliza.
+        self._comprobados = set() # Usuarios cuyo contador ya se contrastó con los ids de los datos cargados.
+        self._cerrojo = threading.RLock() # Protege los datos entre el hilo de Tk y el temporizador de guardado.
+        self._sucios = set() # Pares (usuario, id) modificados en memoria y aún no escritos en disco.
+        self._nuevos = set() # Pares (usuario, id) de los registros añadidos desde la última escritura (su id puede chocar con el de otra instancia).
+        self._eliminados = set() # Pares (usuario, id) de los registros del disco eliminados desde la última escritura, aparte de las altas.
+        self._eventos_diferidos = [] # Eventos de cambios externos descubiertos por el temporizador, a publicar desde el hilo de Tk.
+        self._transacciones = 0 # Profundidad de transacciones abiertas (pueden anidarse).
+        self._eventos_transaccion = [] # Eventos retenidos hasta que termina la transacción.
+        self._temporizador = None # Temporizador del próximo guardado agrupado, si hay uno programado.
+        self._primer_cambio = None # Momento (time.monotonic) del cambio pendiente más antiguo.
+        _colecciones.append(self) # Registra la colección para vaciar_todo().
+
+    # --- Lectura ---
+    def _leer_disco(self):
+        """Lee el archivo completo y asigna ids a los registros que no lo tengan.""" # Docstring que describe el método.
+        if not os.path.exists(self.ruta): # Comprueba si el archivo no existe.
+            return {} # Si no existe, devuelve un diccionario vacío.
+        with open(self.ruta, 'r') as f: # Abre el archivo en modo lectura.
+            datos = json.load(f) # Carga el contenido JSON del archivo.
+        for registros in datos.values(): # Recorre las listas de registros de cada usuario.
+            _asignar_ids(registros) # Da un id estable a los registros antiguos que no lo tienen.
+        return datos # Devuelve los datos ya normalizados.
+
+    def datos(self):
+        """Devuelve todos los datos en memoria, leyendo el archivo solo la primera vez.""" # Docstring que describe el método.
+        if self._datos is None: # Si aún no se han cargado los datos.
+            with self._cerrojo: # Evita que dos hilos carguen el archivo a la vez.
+                if self._datos is None: # Comprueba de nuevo, ya con el cerrojo.
+                    self._firma = _firma_archivo(self.ruta) # Toma la firma antes de leer para no perder escrituras concurrentes.
+                    self._datos = self._leer_disco() # Carga los datos desde el disco.
+                    self._por_id = {} # Los mapas por id anteriores ya no corresponden a estos datos.
+                    self._cargar_contadores() # Contadores de ids guardados junto a los datos.
+        return self._datos # Devuelve la caché.
+
+    def del_usuario(self, usuario):
+        """Devuelve la lista de registros del usuario (de solo lectura: usar agregar/actualizar/eliminar para modificarla).""" # Docstring que describe el método.
+        return self.datos().get(usuario, []) # Devuelve la lista del usuario o una lista vacía.
+
+    def obtener(self, usuario, registro_id):
+        """Devuelve el registro con el id indicado, o None si no existe.""" # Docstring que describe el método.
+        return self._mapa_ids(usuario).get(registro_id) # Búsqueda directa por id, sin recorrer los registros.
+
+    def _mapa_ids(self, usuario):
+        """Devuelve el diccionario id -> registro del usuario, construyéndolo la primera vez.""" # Docstring que describe el método.
+        mapa = self._por_id.get(usuario) # Busca el mapa ya construido.
+        if mapa is None: # Si es la primera consulta de este usuario desde la última carga.
+            mapa = {r["id"]: r for r in self.del_usuario(usuario)} # Indexa los registros del usuario por id.
+            self._por_id[usuario] = mapa # Lo guarda para las siguientes consultas.
+        return mapa # Devuelve el mapa.
+
+    # --- Ids ---
+    @property
+    def ruta_contadores(self):
+        """Archivo con el siguiente id de cada usuario, junto al de la colección.""" # Docstring que describe el método.
+        return os.path.splitext(self.ruta)[0] + ".ids.json" # p. ej. data/tareas.ids.json.
+
+    def _leer_contadores(self):
+        """Devuelve los contadores guardados {usuario: siguiente id} ({} si aún no hay archivo).""" # Docstring que describe el método.
+        try: # Puede no existir (datos anteriores a los contadores).
+            with open(self.ruta_contadores, 'r', encoding="utf-8") as f: # Abre los contadores.
+                return json.load(f) # Los devuelve.
+        except FileNotFoundError: # Nunca se guardaron.
+            return {} # Se deducirán de los ids existentes.
+
+    def _fundir_contadores(self, contadores):
+        """Sube los contadores en memoria hasta los indicados (nunca los baja).""" # Docstring que describe el método.
+        for usuario, siguiente in contadores.items(): # Contadores de otra instancia.
+            if siguiente > self._contadores.get(usuario, 0): # Reservó ids más altos.
+                self._contadores[usuario] = siguiente # Se respetan.
+
+    def _cargar_contadores(self):
+        """Incorpora los contadores del disco tras leer los datos.""" # Docstring que describe el método.
+        self._fundir_contadores(self._leer_contadores()) # Nunca por debajo de lo reservado por otras instancias.
+        self._comprobados.clear() # Los datos recién leídos pueden traer ids que los contadores no conocen (archivos antiguos).
+
+    def _reservar_ids(self, usuario, cantidad=1):
+        """
+        Reserva ids nuevos para el usuario y devuelve el primero. Los ids solo crecen: el de un registro eliminado
+        o archivado no se vuelve a dar, y el estado que otros módulos guardan por id (recordatorios, índices) no se hereda.
+        """ # Docstring que describe el método.
+        siguiente = self._contadores.get(usuario, 1) # Siguiente id conocido.
+        if usuario not in self._comprobados: # Primera reserva desde que se cargaron los datos.
+            siguiente = max(siguiente, _siguiente_id(self.del_usuario(usuario))) # Nunca por debajo de los ids existentes.
+            self._comprobados.add(usuario) # Las siguientes reservas no recorren la lista.
+        self._contadores[usuario] = siguiente + cantidad # Avanza el contador.
+        return siguiente # Primer id reservado.
+
+    def _guardar_contadores(self):
+        """Fusiona los contadores con los del disco y los escribe si cambiaron. Debe llamarse con el bloqueo entre procesos tomado.""" # Docstring que describe el método.
+        disco = self._leer_contadores() # Contadores de otras instancias.
+        self._fundir_contadores(disco) # Se queda con el mayor de cada usuario.
+        if self._contadores != disco: # Algún id nuevo.
+            escribir_atomico(self.ruta_contadores, json.dumps(self._contadores).encode("utf-8"), sincronizar=DURABILIDAD != "rapida") # Antes que los datos: un id guardado nunca supera su contador.
+
+    # --- Escritura ---
+    def guardar(self):
+        """
+        Escribe la caché en el archivo JSON ahora mismo (normalmente se usa vaciar()).
+        Con el bloqueo entre procesos tomado, primero incorpora lo que otra instancia haya escrito desde
+        nuestra última lectura y después sustituye el archivo de forma atómica: nadie pierde cambios.
+        """ # Docstring que describe el método.
+        with self._cerrojo: # Nadie de este proceso modifica los datos mientras se escriben.
+            with bloqueo_archivo(self.ruta): # Sección crítica entre procesos: leer, fusionar y escribir.
+                eventos = self._fusionar_disco() # Incorpora los cambios de otras instancias.
+                self._preparar_escritura() # Trabajo previo de las subclases (p. ej. escribir cuerpos de nota).
+                self._guardar_contadores() # Los contadores de ids llegan al disco antes que los registros que los usan.
+                contenido = json.dumps(self.datos(), indent=4).encode("utf-8") # Serializa con una indentación de 4 espacios para legibilidad.
+                escribir_atomico(self.ruta, contenido, sincronizar=DURABILIDAD != "rapida") # Temporal + fsync + os.replace.
+                self._firma = _firma_archivo(self.ruta) # Recuerda la firma de nuestra propia escritura para no confundirla con un cambio externo.
+                self._despues_de_escribir() # Limpieza de las subclases que solo es segura con el JSON ya escrito.
+        self._entregar(eventos) # Avisa de los cambios externos que se acaban de incorporar.
+
+    def _preparar_escritura(self):
+        """Punto de extensión que se ejecuta con el bloqueo tomado, justo antes de escribir el JSON.""" # Docstring que describe el método.
+
+    def _despues_de_escribir(self):
+        """Punto de extensión que se ejecuta con el bloqueo tomado, justo después de escribir el JSON.""" # Docstring que describe el método.
+
+    def _fusionar_disco(self):
+        """
+        Si otra instancia escribió el archivo desde nuestra última lectura, parte de su versión y aplica
+        encima nuestros registros pendientes. Devuelve los eventos de los cambios ajenos incorporados.
+        Debe llamarse con el cerrojo y el bloqueo entre procesos tomados.
+        """ # Docstring que describe el método.
+        if self._datos is None or _firma_archivo(self.ruta) == self._firma: # Si nadie más escribió.
+            return [] # Nuestra caché ya es la versión más reciente.
+        disco = self._leer_disco() # Versión escrita por la otra instancia (completa: las escrituras son atómicas).
+        self._cargar_contadores() # Y sus contadores, escritos antes que los datos.
+        anteriores = {u: list(rs) for u, rs in self._datos.items()} # Copia superficial de nuestra versión, para calcular las diferencias.
+        eventos = [] # Eventos de ids reasignados; van antes que las diferencias.
+        sucios = set() # Pares pendientes tras la fusión (un id reasignado cambia de par).
+        nuevos = set() # Pares añadidos por nosotros tras la fusión, con sus ids definitivos.
+        for usuario, registro_id in self._eliminados: # Primero las bajas de registros que ya estaban en el disco.
+            registros = disco.get(usuario, []) # Lista del usuario en la versión del disco.
+            registros[:] = [r for r in registros if r["id"] != registro_id] # Lo elimina también del disco.
+        for usuario, registro_id in sorted(self._sucios): # Recorre nuestros registros pendientes en un orden estable.
+            registros = disco.setdefault(usuario, []) # Lista del usuario en la versión del disco (ya sin nuestras bajas).
+            propio = self._mapa_ids(usuario).get(registro_id) # Nuestra versión del registro (None si lo eliminamos).
+            if propio is None: # Lo eliminamos nosotros: ya se quitó del disco arriba, o nunca llegó a él.
+                continue # Pasa al siguiente.
+            posicion = next((i for i, r in enumerate(registros) if r["id"] == registro_id), None) # Posición del mismo id en el disco.
+            nuevo = (usuario, registro_id) in self._nuevos # Si lo añadimos nosotros desde la última escritura (aunque antes se eliminara otro con ese id).
+            if nuevo and posicion is not None: # Otra instancia añadió otro registro con el mismo id.
+                self._comprobados.discard(usuario) # La reserva debe tener en cuenta los ids de ambas versiones.
+                propio["id"] = max(self._reservar_ids(usuario), _siguiente_id(registros)) # Nuestro registro se queda con un id libre en ambas versiones.
+                self._contadores[usuario] = max(self._contadores[usuario], propio["id"] + 1) # El contador lo cubre.
+                eventos.append(Evento(self.evento_eliminado, usuario, registro_id, propio)) # Las ventanas olvidan el id antiguo...
+                eventos.append(Evento(self.evento_agregado, usuario, propio["id"], propio)) # ...y muestran el registro con el nuevo.
+                posicion = None # El registro se añade como nuevo.
+            if posicion is None: # El registro no está en el disco.
+                registros.append(propio) # Lo añade.
+            else: # El registro está en el disco.
+                registros[posicion] = propio # Nuestra modificación prevalece sobre la ajena.
+            sucios.add((usuario, propio["id"])) # Sigue pendiente hasta que la escritura termine bien.
+            if nuevo: # Si lo añadimos nosotros.
+                nuevos.add((usuario, propio["id"])) # Sigue siendo nuevo hasta que llegue al disco.
+        self._sucios = sucios # Pares pendientes con los ids definitivos.
+        self._nuevos = nuevos # Registros nuevos con los ids definitivos.
+        self._datos = disco # La versión fusionada pasa a ser la caché.
+        self._por_id = {} # Los mapas por id se reconstruirán a partir de ella.
+        return eventos + list(_diferencias(self, anteriores, disco)) # Reasignaciones primero, luego los cambios ajenos.
+
+    def _entregar(self, eventos):
+        """Publica los eventos si estamos en el hilo principal (el de Tk); si no, los deja para recargar_si_cambio().""" # Docstring que describe el método.
+        with self._cerrojo: # Protege la lista de eventos diferidos.
+            self._eventos_diferidos.extend(eventos) # Los pone a la cola, detrás de los que ya esperaban.
+            if threading.current_thread() is not threading.main_thread(): # Las ventanas solo pueden tocarse desde el hilo de Tk.
+                return # Se publicarán en la próxima comprobación del vigilante.
+            eventos, self._eventos_diferidos = self._eventos_diferidos, [] # Toma todos los eventos en espera.
+        for evento in eventos: # Recorre los eventos en orden.
+            bus.publicar(evento) # Los publica.
+
+    # --- Guardado agrupado ---
+    def _marcar_sucio(self, usuario, registro_id):
+        """Anota un registro modificado y programa su escritura según DURABILIDAD.""" # Docstring que describe el método.
+        with self._cerrojo: # Protege el conjunto de cambios pendientes y el temporizador.
+            self._sucios.add((usuario, registro_id)) # Anota el registro como pendiente de escribir.
+            if self._transacciones: # Dentro de una transacción no se programa nada.
+                return # La transacción escribe todo de una vez al terminar.
+            if DURABILIDAD == "inmediata": # En modo inmediato no se agrupa nada.
+                self.vaciar() # Escribe ya.
+                return # Sale del método.
+            ahora = time.monotonic() # Momento actual.
+            if self._primer_cambio is None: # Si es el primer cambio pendiente.
+                self._primer_cambio = ahora # Recuerda cuándo empezó a esperar.
+            elif ahora - self._primer_cambio >= ESPERA_MAXIMA and self._temporizador is not None: # Si los cambios llevan demasiado esperando.
+                return # No se pospone más: el temporizador programado escribirá pronto.
+            if self._temporizador is not None: # Si ya había un guardado programado.
+                self._temporizador.cancel() # Lo pospone: el usuario sigue editando.
+            retardo = min(RETARDO_GUARDADO, max(0.0, self._primer_cambio + ESPERA_MAXIMA - ahora)) # Nunca más allá de la espera máxima.
+            self._temporizador = threading.Timer(retardo, self.vaciar) # Programa el guardado agrupado.
+            self._temporizador.daemon = True # No impide que el programa termine (atexit vacía lo pendiente).
+            self._temporizador.start() # Arranca el temporizador.
+
+    def pendientes(self):
+        """Devuelve cuántos registros modificados quedan sin escribir.""" # Docstring que describe el método.
+        return len(self._sucios) # Número de registros pendientes.
+
+    def vaciar(self):
+        """Escribe en una sola operación todos los cambios pendientes. Devuelve True si escribió algo.""" # Docstring que describe el método.
+        with self._cerrojo: # Nadie modifica los datos mientras se escriben.
+            if self._temporizador is not None: # Si había un guardado programado.
+                self._temporizador.cancel() # Ya no hace falta: se escribe ahora.
+                self._temporizador = None # Olvida el temporizador.
+            if not self._sucios: # Si no hay nada pendiente.
+                return False # No escribe.
+            try: # Intenta escribir.
+                self.guardar() # Escribe todos los cambios de una vez.
+            except OSError as e: # Si falla la escritura (disco lleno, permisos...).
+                print(f"Error al guardar {self.ruta}: {e}") # Imprime el error; los cambios siguen pendientes para el próximo intento.
+                return False # Indica que no se pudo escribir.
+            self._sucios.clear() # Ya no queda nada pendiente.
+            self._nuevos.clear() # Los registros añadidos ya tienen su id definitivo en el disco.
+            self._eliminados.clear() # Las bajas ya están en el disco.
+            self._primer_cambio = None # Reinicia la cuenta de la espera máxima.
+            return True # Indica que hubo escritura.
+
+    @contextlib.contextmanager
+    def transaccion(self):
+        """
+        Agrupa varias operaciones: dentro del bloque with no se escribe nada ni se publica ningún evento;
+        al salir se hace una sola escritura y después se publican todos los eventos seguidos.
+        """ # Docstring que describe el método.
+        with self._cerrojo: # Protege el contador de transacciones.
+            self._transacciones += 1 # Abre (o anida) la transacción.
+            if self._temporizador is not None: # Si había un guardado agrupado programado.
+                self._temporizador.cancel() # Se hará junto con el de la transacción.
+                self._temporizador = None # Olvida el temporizador.
+        try: # Ejecuta el bloque with.
+            yield self # Permite "with coleccion.transaccion() as c".
+        finally: # Tanto si el bloque termina bien como si falla (lo ya aplicado en memoria se guarda igualmente).
+            with self._cerrojo: # Protege el contador y los eventos retenidos.
+                self._transacciones -= 1 # Cierra este nivel.
+                if self._transacciones: # Si aún queda una transacción exterior abierta.
+                    return # Ella escribirá y publicará al terminar.
+                eventos, self._eventos_transaccion = self._eventos_transaccion, [] # Toma los eventos retenidos.
+            self.vaciar() # Una única escritura para toda la transacción.
+            for evento in eventos: # Publica los eventos en el orden en que ocurrieron.
+                bus.publicar(evento) # Los suscriptores los reciben ya con los datos guardados.
+
+    def _publicar(self, evento):
+        """Publica un evento de un cambio propio, o lo retiene si hay una transacción abierta.""" # Docstring que describe el método.
+        if self._transacciones: # Dentro de una transacción.
+            self._eventos_transaccion.append(evento) # Se publicará al terminarla.
+        else: # Fuera de transacción.
+            bus.publicar(evento) # Se publica ya.
+
+    def agregar(self, usuario, registro):
+        """Añade un registro al usuario, lo guarda y publica el evento. Devuelve el registro con su id.""" # Docstring que describe el método.
+        registros = self.datos().setdefault(usuario, []) # Obtiene (o crea) la lista de registros del usuario.
+        registro = dict(registro) # Copia el registro para no compartir el diccionario del llamador.
+        with self._cerrojo: # Evita que el guardado agrupado escriba una lista a medio modificar.
+            registro["id"] = self._reservar_ids(usuario) # Asigna un id nuevo que nunca tuvo otro registro del usuario.
+            registros.append(registro) # Añade el registro a la lista.
+            self._mapa_ids(usuario)[registro["id"]] = registro # Lo añade también al mapa por id.
+            self._nuevos.add((usuario, registro["id"])) # Recuerda que el id aún no está reservado en el disco.
+            self._marcar_sucio(usuario, registro["id"]) # Programa el guardado del cambio.
+        self._publicar(Evento(self.evento_agregado, usuario, registro["id"], registro)) # Notifica el alta a los suscriptores.
+        return registro # Devuelve el registro creado.
+
+    def agregar_varios(self, usuario, registros):
+        """
+        Añade de una vez muchos registros al usuario (importaciones): los ids se reservan todos de una vez.
+        Publica un evento por registro y devuelve los registros creados.
+        """ # Docstring que describe el método.
+        lista = self.datos().setdefault(usuario, []) # Obtiene (o crea) la lista de registros del usuario.
+        creados = [] # Registros añadidos, con su id.
+        with self._cerrojo: # Evita que el guardado agrupado escriba una lista a medio modificar.
+            registros = list(registros) # Se necesita saber cuántos son para reservar sus ids.
+            siguiente = self._reservar_ids(usuario, len(registros)) # Primer id de la reserva.
+            mapa = self._mapa_ids(usuario) # Mapa por id del usuario.
+            for registro in registros: # Recorre los registros a añadir.
+                registro = dict(registro, id=siguiente) # Copia el registro con su id nuevo.
+                siguiente += 1 # Avanza el contador.
+                lista.append(registro) # Lo añade a la lista.
+                mapa[registro["id"]] = registro # Y al mapa por id.
+                self._nuevos.add((usuario, registro["id"])) # El id aún no está reservado en el disco.
+                self._sucios.add((usuario, registro["id"])) # Pendiente de escribir.
+                creados.append(registro) # Lo recuerda para publicar su evento.
+            if creados: # Si se añadió algo.
+                self._marcar_sucio(usuario, creados[-1]["id"]) # Programa un único guardado para todos.
+        for registro in creados: # Recorre los registros añadidos.
+            self._publicar(Evento(self.evento_agregado, usuario, registro["id"], registro)) # Notifica cada alta.
+        return creados # Devuelve los registros creados.
+
+    def actualizar(self, usuario, registro_id, **cambios):
+        """Modifica los campos indicados de un registro, lo guarda y publica el evento. Devuelve el registro o None.""" # Docstring que describe el método.
+        registro = self.obtener(usuario, registro_id) # Busca el registro a modificar.
+        if registro is None: # Si el registro ya no existe (por ejemplo, lo borró otra ventana).
+            return None # No hay nada que actualizar.
+        with self._cerrojo: # Evita que el guardado agrupado escriba un registro a medio modificar.
+            registro.update(cambios) # Aplica los cambios sobre el registro en memoria.
+            self._marcar_sucio(usuario, registro_id) # Programa el guardado del cambio.
+        self._publicar(Evento(self.evento_actualizado, usuario, registro_id, registro)) # Notifica la modificación a los suscriptores.
+        return registro # Devuelve el registro actualizado.
+
+    def eliminar(self, usuario, registro_id):
+        """Elimina un registro, guarda y publica el evento. Devuelve el registro eliminado o None.""" # Docstring que describe el método.
+        registros = self.del_usuario(usuario) # Obtiene la lista de registros del usuario.
+        for i, registro in enumerate(registros): # Recorre los registros con su posición.
+            if registro.get("id") == registro_id: # Comprueba si es el registro buscado.
+                with self._cerrojo: # Evita que el guardado agrupado escriba una lista a medio modificar.
+                    registros.pop(i) # Elimina el registro de la lista.
+                    self._mapa_ids(usuario).pop(registro_id, None) # Lo quita también del mapa por id.
+                    self._anotar_baja(usuario, registro_id) # La baja se fusiona aparte de las altas.
+                    self._marcar_sucio(usuario, registro_id) # Programa el guardado del cambio.
+                self._al_eliminar(usuario, registro) # Limpieza propia de la colección (p. ej. el cuerpo de una nota).
+                self._publicar(Evento(self.evento_eliminado, usuario, registro_id, registro)) # Notifica la baja a los suscriptores.
+                return registro # Devuelve el registro eliminado.
+        return None # No se encontró el registro.
+
+    def eliminar_varios(self, usuario, ids):
+        """Elimina varios registros recorriendo la lista una sola vez, en una transacción. Devuelve los eliminados.""" # Docstring que describe el método.
+        ids = set(ids) # Conjunto para comprobar la pertenencia en tiempo constante.
+        with self.transaccion(): # Una sola escritura y los eventos al final.
+            with self._cerrojo: # Evita que el guardado agrupado escriba una lista a medio modificar.
+                registros = self.del_usuario(usuario) # Lista de registros del usuario.
+                eliminados = [r for r in registros if r["id"] in ids] # Registros que se eliminan.
+                registros[:] = [r for r in registros if r["id"] not in ids] # Conserva el resto, en el mismo orden.
+                mapa = self._mapa_ids(usuario) # Mapa por id del usuario.
+                for registro in eliminados: # Recorre los eliminados.
+                    mapa.pop(registro["id"], None) # Los quita del mapa por id.
+                    self._anotar_baja(usuario, registro["id"]) # La baja se fusiona aparte de las altas.
+                    self._marcar_sucio(usuario, registro["id"]) # Anota la baja como pendiente.
+            for registro in eliminados: # Recorre los eliminados.
+                self._al_eliminar(usuario, registro) # Limpieza propia de la colección.
+                self._publicar(Evento(self.evento_eliminado, usuario, registro["id"], registro)) # Evento de baja (retenido hasta el final).
+        return eliminados # Devuelve los registros eliminados.
+
+    def _anotar_baja(self, usuario, registro_id):
+        """Anota la baja de un registro: si nunca llegó al disco basta con olvidar su alta; si no, se quitará del disco al fusionar.""" # Docstring que describe el método.
+        par = (usuario, registro_id) # Par del registro.
+        if par in self._nuevos: # Alta aún sin escribir.
+            self._nuevos.discard(par) # No hay nada que quitar del disco (un registro ajeno con ese id se respeta).
+        else: # El registro estaba en el disco.
+            self._eliminados.add(par) # Se quitará del disco aunque después se añada otro registro con el mismo id.
+
+    def _al_eliminar(self, usuario, registro):
+        """Punto de extensión que se ejecuta tras eliminar un registro.""" # Docstring que describe el método.
+
+    # --- Cambios externos ---
+    def recargar_si_cambio(self):
+        """
+        Relee el archivo si otro proceso lo modificó y publica un evento por cada registro que cambió.
+        Devuelve True si hubo recarga.
+        """ # Docstring que describe el método.
+        if self._datos is None: # Si nunca se cargaron los datos, nadie depende de ellos todavía.
+            return False # No hay nada que comparar.
+        self._entregar([]) # Publica los cambios externos que el guardado agrupado incorporó en segundo plano.
+        if self._sucios: # Si hay cambios propios sin escribir, el próximo guardado los fusionará con el disco.
+            return False # Se comprobará de nuevo cuando se hayan escrito.
+        firma = _firma_archivo(self.ruta) # Consulta la firma actual del archivo (solo metadatos, sin leerlo).
+        if firma == self._firma: # Si el archivo sigue como lo dejamos.
+            return False # No hay cambios externos.
+        with self._cerrojo: # Sustituye los datos sin que el guardado agrupado intervenga.
+            anteriores = self._datos # Conserva los datos anteriores para calcular las diferencias.
+            self._firma = firma # Actualiza la firma conocida.
+            self._datos = self._leer_disco() # Carga la nueva versión del archivo.
+            self._por_id = {} # Los mapas por id se reconstruirán a partir de la nueva versión.
+            self._cargar_contadores() # Ids reservados por la otra instancia.
+        for evento in _diferencias(self, anteriores, self._datos): # Calcula los cambios registro a registro.
+            bus.publicar(evento) # Publica cada cambio una sola vez para todos los suscriptores.
+        return True # Indica que hubo recarga.
+
+
+_colecciones = [] # Todas las colecciones creadas, para vaciarlas juntas.
+
+
+def vaciar_todo():
+    """Escribe los cambios pendientes de todas las colecciones (al cerrar ventanas, al cerrar sesión y al salir).""" # Docstring que describe la función.
+    for coleccion in _colecciones: # Recorre las colecciones.
+        coleccion.vaciar() # Escribe sus cambios pendientes, si los hay.
+
+
+def vaciar_al_cerrar(widget):
+    """Escribe los cambios pendientes cuando se destruye la ventana indicada.""" # Docstring que describe la función.
+    def _al_destruir(event): # Se ejecuta al destruirse la ventana o cualquiera de sus hijos.
+        if event.widget is widget: # Solo cuando se destruye la propia ventana.
+            vaciar_todo() # Escribe lo pendiente.
+    widget.bind("<Destroy>", _al_destruir, add="+") # Se suma a otros manejadores de <Destroy>.
+
+
+atexit.register(vaciar_todo) # Red de seguridad: lo pendiente se escribe también al terminar el intérprete.
+
+
+def separar_etiquetas(texto):
+    """Convierte "Matemáticas, examen" en ["Matemáticas", "examen"]: sin espacios sobrantes, vacíos ni repetidas.""" # Docstring que describe la función.
+    etiquetas = [] # Etiquetas en el orden en que se escribieron.
+    for etiqueta in texto.replace(";", ",").split(","): # Acepta comas y puntos y coma como separadores.
+        etiqueta = " ".join(etiqueta.split()) # Colapsa los espacios.
+        if etiqueta and etiqueta.casefold() not in (e.casefold() for e in etiquetas): # Descarta vacías y repetidas.
+            etiquetas.append(etiqueta) # La añade.
+    return etiquetas # Devuelve la lista.
+
+
+def cambios_completada(tarea, completada):
+    """Devuelve los campos a actualizar para marcar (o reabrir) una tarea; {} si ya está en ese estado.""" # Docstring que describe la función.
+    if bool(tarea.get("completada")) == completada: # Sin cambio de estado.
+        return {} # No hay nada que actualizar (se conserva la fecha de compleción original).
+    momento = datetime.datetime.now().isoformat(timespec="seconds") if completada else None # Momento de la compleción.
+    return {"completada": completada, "completada_en": momento} # Campos a actualizar.
+
+
+def completar_tareas(usuario, ids, completada=True):
+    """Marca (o reabre) varias tareas con una sola escritura. Devuelve cuántas cambiaron de estado.""" # Docstring que describe la función.
+    cambiadas = 0 # Tareas que cambiaron de estado.
+    with almacen_tareas.transaccion(): # Una escritura y un lote de eventos.
+        for tarea_id in ids: # Recorre las tareas.
+            tarea = almacen_tareas.obtener(usuario, tarea_id) # Busca la tarea por id.
+            cambios = cambios_completada(tarea, completada) if tarea is not None else {} # Campos a cambiar.
+            if cambios: # Si cambia de estado.
+                almacen_tareas.actualizar(usuario, tarea_id, **cambios) # La actualiza.
+                cambiadas += 1 # La cuenta.
+    return cambiadas # Devuelve el número de tareas cambiadas.
+
+
+def _asignar_ids(registros):
+    """Asigna un id entero a los registros que no lo tengan, continuando desde el mayor existente.""" # Docstring que describe la función.
+    siguiente = _siguiente_id(registros) # Calcula el primer id libre.
+    for registro in registros: # Recorre los registros.
+        if "id" not in registro: # Si el registro es antiguo y no tiene id.
+            registro["id"] = siguiente # Le asigna el siguiente id libre.
+            siguiente += 1 # Avanza el contador.
+
+
+def _siguiente_id(registros):
+    """Devuelve el primer id libre de una lista de registros.""" # Docstring que describe la función.
+    return max((r["id"] for r in registros if "id" in r), default=0) + 1 # El mayor id existente más uno (1 si la lista está vacía).
+
+
+def _diferencias(coleccion, anteriores, nuevos):
+    """Genera los eventos que transforman los datos anteriores en los nuevos.""" # Docstring que describe la función.
+    for usuario in set(anteriores) | set(nuevos): # Recorre todos los usuarios presentes en alguna de las dos versiones.
+        viejos = {r["id"]: r for r in anteriores.get(usuario, [])} # Indexa por id los registros anteriores del usuario.
+        actuales = {r["id"]: r for r in nuevos.get(usuario, [])} # Indexa por id los registros nuevos del usuario.
+        for registro_id, registro in actuales.items(): # Recorre los registros nuevos.
+            if registro_id not in viejos: # Si el registro no existía antes.
+                yield Evento(coleccion.evento_agregado, usuario, registro_id, registro) # Es un alta.
+            elif viejos[registro_id] != registro: # Si existía pero su contenido cambió.
+                yield Evento(coleccion.evento_actualizado, usuario, registro_id, registro) # Es una modificación.
+        for registro_id, registro in viejos.items(): # Recorre los registros anteriores.
+            if registro_id not in actuales: # Si el registro ya no está.
+                yield Evento(coleccion.evento_eliminado, usuario, registro_id, registro) # Es una baja.
+
+
+class ColeccionNotas(ColeccionJSON): # Colección de notas cuyo contenido vive fuera del JSON, uno por archivo.
+    """
+    El JSON de notas solo guarda metadatos (id, título, tamaño y CRC del cuerpo), así que listar notas
+    no lee ni retiene en memoria el contenido. El cuerpo se lee y descomprime al abrir una nota concreta.
+    """ # Docstring que describe la clase.
+    def __init__(self, ruta, nombre, carpeta_contenido):
+        """Inicializa la colección indicando además la carpeta de los cuerpos.""" # Docstring que describe el método.
+        super().__init__(ruta, nombre) # Inicializa la parte común de la colección.
+        self.carpeta_contenido = carpeta_contenido # Almacena la carpeta de los cuerpos de nota.
+        self._cuerpos_sobrantes = set() # Cuerpos de notas eliminadas o vaciadas, que se borran cuando el JSON ya no los nombra.
+
+    def _ruta_cuerpo(self, usuario, registro_id):
+        """Devuelve la ruta del archivo que guarda el cuerpo de una nota.""" # Docstring que describe el método.
+        from urllib.parse import quote # Se importa aquí para no retrasar el arranque de la línea de comandos.
+        carpeta = "u_" + quote(usuario, safe="") # Nombre de carpeta válido para cualquier nombre de usuario (incluido el vacío).
+        return os.path.join(self.carpeta_contenido, carpeta, f"{registro_id}.bin") # Un archivo por nota.
+
+    def contenido(self, usuario, registro_id):
+        """Devuelve el contenido de una nota, leyéndolo y descomprimiéndolo solo ahora.""" # Docstring que describe el método.
+        with self._cerrojo: # El guardado agrupado podría estar sacando ahora mismo el contenido a su archivo.
+            registro = self.obtener(usuario, registro_id) # Busca los metadatos de la nota.
+            if registro is not None and "contenido" in registro: # Notas con cambios aún sin escribir, o antiguas con el contenido dentro del JSON.
+                return registro["contenido"] # Lo devuelve directamente.
+        try: # Intenta leer el archivo del cuerpo.
+            with open(self._ruta_cuerpo(usuario, registro_id), 'rb') as f: # Abre el cuerpo en modo binario.
+                datos = f.read() # Lee el archivo completo (solo el de esta nota).
+        except FileNotFoundError: # Las notas vacías no tienen archivo de cuerpo.
+            return "" # Devuelve un contenido vacío.
+        return _decodificar_cuerpo(datos) # Descomprime (si hace falta) y decodifica el texto.
+
+    def _preparar_escritura(self):
+        """Saca a su propio archivo el contenido de las notas que lo lleven dentro, antes de guardar los metadatos.""" # Docstring que describe el método.
+        for usuario, registros in self.datos().items(): # Recorre las notas de todos los usuarios (ya fusionadas, con sus ids definitivos).
+            for registro in registros: # Recorre cada nota.
+                if "contenido" in registro: # Nota nueva, editada o antigua con el cuerpo dentro del JSON.
+                    self._escribir_cuerpo(usuario, registro) # Escribe el cuerpo aparte y deja solo los metadatos.
+
+    def _escribir_cuerpo(self, usuario, registro):
+        """Escribe el cuerpo de una nota en su archivo y lo sustituye por tamaño y CRC en los metadatos.""" # Docstring que describe el método.
+        texto = registro.pop("contenido") or "" # Quita el contenido del registro.
+        datos = texto.encode("utf-8") # Codifica el texto a bytes.
+        ruta = self._ruta_cuerpo(usuario, registro["id"]) # Ruta del archivo del cuerpo.
+        registro["tamano"] = len(datos) # Tamaño sin comprimir, útil para mostrar y para decidir sin leer el cuerpo.
+        registro["crc"] = zlib.crc32(datos) # Suma de control: si el cuerpo cambia, cambian los metadatos y el vigilante lo detecta.
+        if not datos: # Una nota vacía no necesita archivo.
+            self._cuerpos_sobrantes.add(ruta) # El cuerpo anterior, si lo había, se borra tras escribir los metadatos.
+            return # No hay nada más que escribir.
+        self._cuerpos_sobrantes.discard(ruta) # Vuelve a tener contenido: ya no sobra.
+        escribir_atomico(ruta, _codificar_cuerpo(datos), sincronizar=DURABILIDAD != "rapida") # Escribe el cuerpo (comprimido si supera el umbral) sin dejarlo nunca a medias.
+
+    def _al_eliminar(self, usuario, registro):
+        """
+        Apunta el cuerpo de una nota eliminada para borrarlo después de escribir los metadatos: si el programa
+        se interrumpe antes, la nota sigue en el JSON con su cuerpo intacto, nunca sin él.
+        """ # Docstring que describe el método.
+        with self._cerrojo: # El guardado agrupado puede estar recorriendo los cuerpos sobrantes.
+            self._cuerpos_sobrantes.add(self._ruta_cuerpo(usuario, registro["id"])) # Se borrará en el próximo guardado.
+
+    def _despues_de_escribir(self):
+        """Borra los cuerpos que el JSON recién escrito ya no nombra.""" # Docstring que describe el método.
+        for ruta in self._cuerpos_sobrantes: # Cuerpos de notas eliminadas o vaciadas.
+            try: # Puede no existir (nota vacía o ya borrado por otra instancia).
+                os.remove(ruta) # Lo elimina.
+            except FileNotFoundError: # No había cuerpo.
+                pass # Nada que borrar.
+        self._cuerpos_sobrantes.clear() # Ya no queda ninguno pendiente.
+
+
+def _codificar_cuerpo(datos):
+    """Antepone el byte de formato y comprime el cuerpo si supera el umbral.""" # Docstring que describe la función.
+    if len(datos) < UMBRAL_COMPRESION: # Los cuerpos pequeños no compensan el coste de comprimir.
+        return _FORMATO_TEXTO + datos # Se guardan tal cual.
+    if COMPRESOR == "lzma": # Si se configuró el compresor de alta razón.
+        import lzma # Se importa solo cuando se usa: cargarlo retrasa el arranque.
+        return _FORMATO_LZMA + lzma.compress(datos) # Comprime con lzma.
+    return _FORMATO_ZLIB + zlib.compress(datos) # Comprime con zlib (por defecto).
+
+
+def _decodificar_cuerpo(datos):
+    """Interpreta el byte de formato, descomprime si hace falta y devuelve el texto.""" # Docstring que describe la función.
+    formato, cuerpo = datos[:1], datos[1:] # Separa el byte de formato del resto.
+    if formato == _FORMATO_ZLIB: # Cuerpo comprimido con zlib.
+        cuerpo = zlib.decompress(cuerpo) # Lo descomprime.
+    elif formato == _FORMATO_LZMA: # Cuerpo comprimido con lzma.
+        import lzma # Se importa solo cuando hace falta.
+        cuerpo = lzma.decompress(cuerpo) # Lo descomprime.
+    return cuerpo.decode("utf-8") # Decodifica el texto.
+
+
+almacen_tareas = ColeccionJSON(TAREAS_FILE, "tarea") # Colección compartida de tareas de todos los usuarios.
+almacen_notas = ColeccionNotas(NOTAS_FILE, "nota", NOTAS_CONTENIDO_DIR) # Colección compartida de notas de todos los usuarios, con el contenido guardado aparte.
+
+
+def usar_carpeta_datos(carpeta):
+    """Hace que las colecciones lean y escriban en otra carpeta de datos (antes de cargarlas por primera vez).""" # Docstring que describe la función.
+    vaciar_todo() # Lo pendiente se escribe en la carpeta anterior.
+    for coleccion, archivo in ((almacen_tareas, "tareas.json"), (almacen_notas, "notas.json")): # Recorre las colecciones compartidas.
+        coleccion.ruta = os.path.join(carpeta, archivo) # Nueva ruta del archivo.
+        coleccion._datos = None # Se leerá de la nueva carpeta en el primer uso.
+        coleccion._firma = None # Aún no se conoce la firma del nuevo archivo.
+        coleccion._por_id = {} # Los mapas por id eran de la carpeta anterior.
+        coleccion._contadores = {} # Y los contadores de ids.
+        coleccion._comprobados = set() # Se contrastarán con los datos nuevos.
+    almacen_notas.carpeta_contenido = os.path.join(carpeta, "notas_contenido") # Carpeta de los cuerpos de nota.
+
+
+# --- Funciones de compatibilidad con el formato completo {usuario: [registros]} ---
+def cargar_tareas():
+    """Devuelve todas las tareas de todos los usuarios (desde la caché en memoria).""" # Docstring que describe la función.
+    return almacen_tareas.datos() # Devuelve los datos cacheados; se leen del disco solo la primera vez.
+
+def cargar_notas():
+    """Devuelve los metadatos de todas las notas de todos los usuarios (el contenido se pide con almacen_notas.contenido).""" # Docstring que describe la función.
+    return almacen_notas.datos() # Devuelve los datos cacheados; se leen del disco solo la primera vez.
+
+
+# --- Prueba de estrés con varios procesos: python almacenamiento.py [procesos] [altas] ---
+def _escritor_estres(ruta, numero, altas):
+    """Proceso escritor: añade registros propios y edita uno compartido, guardando a menudo.""" # Docstring que describe la función.
+    coleccion = ColeccionJSON(ruta, "tarea") # Colección propia del proceso sobre el archivo compartido.
+    for i in range(altas): # Repite las altas pedidas.
+        coleccion.agregar("estres", {"titulo": f"p{numero}-{i}", "fecha": "", "contenido": ""}) # Añade un registro cuyo id chocará a menudo con el de otro proceso.
+        if i % 3 == 0: # Cada pocas altas.
+            coleccion.vaciar() # Fuerza una escritura para que los procesos se crucen.
+    coleccion.vaciar() # Escribe lo que quede pendiente.
+
+
+def _lector_estres(ruta, parar, resultado):
+    """Proceso lector: lee el archivo sin bloqueo una y otra vez y cuenta las lecturas fallidas.""" # Docstring que describe la función.
+    lecturas = errores = 0 # Contadores.
+    while not parar.is_set(): # Hasta que terminen los escritores.
+        try: # Intenta leer el archivo completo.
+            with open(ruta, 'r') as f: # Abre el archivo sin tomar el bloqueo.
+                json.load(f) # Un archivo a medio escribir fallaría aquí.
+            lecturas += 1 # Lectura correcta.
+        except FileNotFoundError: # Aún no se ha escrito la primera vez.
+            pass # No cuenta como error.
+        except ValueError: # JSON incompleto.
+            errores += 1 # Lectura de un archivo a medias.
+    resultado.put((lecturas, errores)) # Devuelve los contadores al proceso principal.
+
+
+def prueba_estres(procesos=4, altas=60):
+    """
+    Lanza varios procesos que guardan a la vez sobre el mismo archivo y comprueba que no se pierde
+    ningún alta, que los ids no se repiten y que un lector nunca ve un archivo a medio escribir.
+    Devuelve True si todo es correcto.
+    """ # Docstring que describe la función.
+    import multiprocessing # Se importa aquí: solo lo necesita la prueba.
+    import tempfile # Carpeta temporal para no tocar los datos reales.
+    with tempfile.TemporaryDirectory() as carpeta: # Carpeta que se borra al terminar.
+        ruta = os.path.join(carpeta, "estres.json") # Archivo compartido por todos los procesos.
+        parar = multiprocessing.Event() # Señal para detener al lector.
+        resultado = multiprocessing.Queue() # Canal para recibir los contadores del lector.
+        lector = multiprocessing.Process(target=_lector_estres, args=(ruta, parar, resultado)) # Proceso lector.
+        lector.start() # Arranca el lector.
+        escritores = [multiprocessing.Process(target=_escritor_estres, args=(ruta, n, altas)) for n in range(procesos)] # Procesos escritores.
+        for p in escritores: # Arranca los escritores.
+            p.start() # Empiezan a la vez.
+        for p in escritores: # Espera a que terminen.
+            p.join() # Espera a cada escritor.
+        parar.set() # Detiene al lector.
+        lecturas, errores = resultado.get() # Recoge sus contadores.
+        lector.join() # Espera al lector.
+        with open(ruta, 'r') as f: # Lee el resultado final.
+            registros = json.load(f).get("estres", []) # Registros de todos los procesos.
+    titulos = {r["titulo"] for r in registros} # Títulos escritos.
+    esperados = {f"p{n}-{i}" for n in range(procesos) for i in range(altas)} # Títulos que deberían estar.
+    ids = [r["id"] for r in registros] # Ids asignados.
+    print(f"Registros: {len(registros)} de {len(esperados)} esperados") # Informe de altas.
+    print(f"Altas perdidas: {len(esperados - titulos)}") # Informe de pérdidas.
+    print(f"Ids repetidos: {len(ids) - len(set(ids))}") # Informe de choques de id sin resolver.
+    print(f"Lecturas sin bloqueo: {lecturas}, de ellas a medio escribir: {errores}") # Informe del lector.
+    return titulos == esperados and len(ids) == len(set(ids)) == len(registros) and errores == 0 # Resultado global.
+
+
+if __name__ == "__main__": # Solo al ejecutar el módulo directamente.
+    import sys # Importa sys para leer los argumentos y devolver el código de salida.
+    argumentos = [int(a) for a in sys.argv[1:3]] # Número de procesos y de altas por proceso (opcionales).
+    sys.exit(0 if prueba_estres(*argumentos) else 1) # Código 0 si la prueba pasa.
@@ -0,0 +1,74 @@
+import contextlib # Importa contextlib para escribir el bloqueo de archivo como gestor de contexto (with).
+import itertools # Importa itertools para numerar los archivos temporales.
+import os # Importa el módulo os, que proporciona funciones para interactuar con el sistema operativo, como la gestión de rutas de archivos y directorios.
+import threading # Importa threading para que los temporales de hilos distintos no coincidan.
+
+try: # Bloqueo consultivo de POSIX (Linux, macOS).
+    import fcntl # Importa fcntl, que ofrece flock().
+except ImportError: # En Windows no existe fcntl.
+    fcntl = None # Se usará msvcrt en su lugar.
+    try: # Bloqueo de Windows.
+        import msvcrt # Importa msvcrt, que ofrece locking().
+    except ImportError: # Plataforma sin ningún mecanismo de bloqueo conocido.
+        msvcrt = None # Los bloqueos no harán nada.
+
+_contador = itertools.count() # Numerador de temporales dentro del proceso (next() es atómico en CPython).
+
+
+def escribir_atomico(ruta, datos, sincronizar=True):
+    """
+    Escribe bytes en un archivo de forma atómica: temporal en la misma carpeta, fsync y os.replace.
+    Un lector ve siempre la versión anterior completa o la nueva completa, nunca un archivo a medias,
+    y un cierre inesperado a mitad de escritura no trunca los datos.
+
+    Args:
+        ruta (str): Archivo de destino.
+        datos (bytes): Contenido completo del archivo.
+        sincronizar (bool): Si es True, espera a que los datos y el cambio de nombre lleguen al disco.
+    """ # Docstring que describe la función y sus argumentos.
+    carpeta = os.path.dirname(ruta) or "." # Carpeta del destino (el temporal debe estar en el mismo sistema de archivos).
+    os.makedirs(carpeta, exist_ok=True) # Crea la carpeta si no existe.
+    temporal = os.path.join(carpeta, f".{os.path.basename(ruta)}.{os.getpid()}.{threading.get_ident()}.{next(_contador)}.tmp") # Nombre único por proceso, hilo y escritura.
+    descriptor = os.open(temporal, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o644) # Lo crea en exclusiva (falla si ya existiera).
+    try: # Si algo falla, el temporal no debe quedarse en la carpeta.
+        with os.fdopen(descriptor, 'wb') as f: # Abre el temporal en modo escritura binaria.
+            f.write(datos) # Escribe el contenido completo.
+            if sincronizar: # Si se pide durabilidad.
+                f.flush() # Vacía el búfer de Python.
+                os.fsync(f.fileno()) # Espera a que el contenido llegue al disco antes de publicarlo.
+        os.replace(temporal, ruta) # Sustituye el destino de golpe (operación atómica).
+    except BaseException: # Cualquier error, incluida una interrupción.
+        with contextlib.suppress(OSError): # El temporal puede no existir ya.
+            os.remove(temporal) # Limpia el temporal.
+        raise # Propaga el error al llamador.
+    if sincronizar and hasattr(os, "O_DIRECTORY"): # En POSIX, el cambio de nombre vive en la carpeta.
+        descriptor_carpeta = os.open(carpeta, os.O_RDONLY | os.O_DIRECTORY) # Abre la carpeta.
+        try: # Asegura que se cierra.
+            os.fsync(descriptor_carpeta) # Lleva al disco la nueva entrada de la carpeta.
+        finally: # Siempre.
+            os.close(descriptor_carpeta) # Cierra la carpeta.
+
+
+@contextlib.contextmanager
+def bloqueo_archivo(ruta):
+    """
+    Bloqueo exclusivo entre procesos sobre "ruta.lock" mientras dura el bloque with.
+    Es consultivo: solo excluye a quien también lo pide, y está pensado para secciones críticas cortas
+    (leer-fusionar-escribir); los lectores no lo necesitan porque las escrituras son atómicas.
+    """ # Docstring que describe la función.
+    ruta_bloqueo = ruta + ".lock" # Archivo auxiliar que se bloquea (el de datos se sustituye con cada escritura).
+    os.makedirs(os.path.dirname(ruta_bloqueo) or ".", exist_ok=True) # Crea la carpeta si no existe.
+    with open(ruta_bloqueo, 'a+b') as f: # Abre (o crea) el archivo de bloqueo sin truncarlo.
+        if fcntl is not None: # POSIX.
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX) # Espera hasta obtener el bloqueo exclusivo.
+        elif msvcrt is not None: # Windows.
+            f.seek(0) # locking() bloquea a partir de la posición actual.
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1) # Bloquea el primer byte (reintenta durante unos segundos).
+        try: # Sección crítica.
+            yield # Ejecuta el bloque with.
+        finally: # Siempre se libera.
+            if fcntl is not None: # POSIX.
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN) # Libera el bloqueo.
+            elif msvcrt is not None: # Windows.
+                f.seek(0) # Vuelve al byte bloqueado.
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1) # Libera el bloqueo.
@@ -0,0 +1,278 @@
+"""
+Consultas componibles sobre las tareas y las notas de un usuario.
+
+    Consulta(almacen_tareas, "jhon").donde(fecha__between=("2025-06-01", "2025-06-07"), titulo__contains="ensayo") \
+        .ordenar_por("fecha").limite(10).registros()
+
+Cada condición se escribe como campo__operador=valor (sin operador, igualdad) y se compila una sola vez:
+las que tienen índice (fecha, etiquetas, prioridad, completada, prefijo del título, id) se resuelven como
+mapas de bits y se intersecan sin recorrer los registros; el resto se convierte en un predicado que solo
+se evalúa sobre los candidatos que dejan pasar los índices. explicar() muestra el plan elegido.
+"""
+import heapq # Importa heapq para quedarse con los primeros resultados de un orden sin ordenar todos los registros.
+
+from almacenamiento import PRIORIDAD_POR_DEFECTO # Importa la prioridad de las tareas que no la tienen.
+from indices import indice_titulos, indice_fechas, indice_etiquetas, indice_estado, mascara, ids_de_mascara, normalizar # Importa los índices que resuelven las condiciones.
+
+OPERADORES = ("eq", "ne", "lt", "lte", "gt", "gte", "between", "in", "contains", "prefix", "has") # Operadores admitidos tras el doble guion bajo.
+INDICES_DE_COLECCION = { # Índices que se pueden usar en cada colección (por su nombre).
+    "tarea": ("titulos", "fechas", "etiquetas", "estado"), # Las tareas tienen todos.
+    "nota": ("titulos",), # Las notas solo se buscan por título.
+}
+_SIGUIENTE = "\x00" # Carácter menor que cualquier otro: "fecha" + este carácter es el límite exclusivo justo después de esa fecha.
+
+
+class Consulta: # Consulta componible: condiciones, orden y límite sobre los registros de un usuario en una colección.
+    def __init__(self, coleccion, usuario):
+        """Prepara una consulta vacía (devuelve todos los registros del usuario).""" # Docstring que describe el método.
+        self.coleccion = coleccion # Colección consultada.
+        self.usuario = usuario # Usuario dueño de los registros.
+        self._condiciones = [] # Lista de tuplas (campo, operador, valor).
+        self._orden = None # Tupla (campo, descendente), o None para el orden natural.
+        self._limite = None # Número máximo de resultados, o None.
+        self._plan = None # Plan compilado; se descarta al cambiar la consulta.
+
+    # --- Construcción ---
+    def donde(self, **condiciones):
+        """Añade condiciones campo__operador=valor; todas deben cumplirse. Devuelve la propia consulta para encadenar.""" # Docstring que describe el método.
+        for clave, valor in condiciones.items(): # Recorre las condiciones.
+            campo, _, operador = clave.partition("__") # Separa el campo del operador.
+            operador = operador or "eq" # Sin operador, igualdad.
+            if operador not in OPERADORES: # Operador desconocido.
+                raise ValueError(f"Operador desconocido en '{clave}': usa uno de {', '.join(OPERADORES)}") # Error descriptivo.
+            if operador == "between" and len(valor) != 2: # El rango necesita dos extremos.
+                raise ValueError(f"'{clave}' necesita un par (desde, hasta)") # Error descriptivo.
+            self._condiciones.append((campo, operador, valor)) # Guarda la condición.
+        self._plan = None # El plan anterior ya no vale.
+        return self # Permite encadenar.
+
+    def ordenar_por(self, campo, descendente=False):
+        """Ordena los resultados por un campo (por fecha se usa el índice, sin ordenar los registros).""" # Docstring que describe el método.
+        self._orden = (campo, descendente) # Guarda el orden.
+        self._plan = None # El plan anterior ya no vale.
+        return self # Permite encadenar.
+
+    def limite(self, numero):
+        """Devuelve como mucho "numero" resultados; la ejecución se detiene en cuanto los tiene, si el orden lo permite.""" # Docstring que describe el método.
+        self._limite = numero # Guarda el límite.
+        self._plan = None # El plan anterior ya no vale.
+        return self # Permite encadenar.
+
+    # --- Compilación ---
+    def _compilar(self):
+        """Divide las condiciones en pasos de índice y predicados; se hace una sola vez por consulta.""" # Docstring que describe el método.
+        if self._plan is not None: # Ya compilada.
+            return self._plan # Se reutiliza.
+        disponibles = INDICES_DE_COLECCION.get(self.coleccion.nombre, ()) # Índices de esta colección.
+        pasos = [] # Lista de tuplas (descripción, función índices -> bits, negado).
+        filtros = [] # Lista de tuplas (descripción, predicado registro -> bool).
+        for campo, operador, valor in self._condiciones: # Recorre las condiciones.
+            paso = _paso_de_indice(campo, operador, valor, disponibles) # Intenta resolverla con un índice.
+            if paso is not None: # Hay índice.
+                pasos.append(paso) # Se resuelve como mapa de bits.
+            else: # Sin índice.
+                filtros.append((_describir(campo, operador, valor), _predicado(campo, operador, valor))) # Se evalúa registro a registro.
+        predicados = [p for _, p in filtros] # Predicados sueltos.
+        cumple = lambda registro: all(p(registro) for p in predicados) # Un solo predicado que los combina todos.
+        campo_orden, descendente = self._orden or (None, False) # Orden pedido.
+        por_indice = campo_orden == "fecha" and "fechas" in disponibles # El orden por fecha sale del índice.
+        self._plan = (pasos, filtros, cumple if filtros else None, campo_orden, descendente, por_indice) # Plan compilado.
+        return self._plan # Devuelve el plan.
+
+    def _indices(self):
+        """Devuelve el diccionario nombre -> índice de la colección para el usuario (construidos la primera vez, después al día).""" # Docstring que describe el método.
+        fabricas = {"titulos": indice_titulos, "fechas": indice_fechas, "etiquetas": indice_etiquetas, "estado": indice_estado} # Funciones que devuelven cada índice.
+        return {nombre: fabricas[nombre](self.coleccion, self.usuario) for nombre in INDICES_DE_COLECCION.get(self.coleccion.nombre, ())} # Solo los de la colección.
+
+    def _bits(self, pasos, indices):
+        """Interseca los mapas de bits de los pasos de índice; None si no hay ninguno (hay que recorrer la colección).""" # Docstring que describe el método.
+        positivos = [funcion(indices) for _, funcion, negado in pasos if not negado] # Mapas de bits que deben cumplirse.
+        negativos = [funcion(indices) for _, funcion, negado in pasos if negado] # Mapas de bits que se restan.
+        if not positivos and not negativos: # Ninguna condición con índice.
+            return None # Recorrido completo.
+        if positivos: # Hay alguna condición positiva.
+            bits = positivos[0] # Parte de la primera.
+            for otros in positivos[1:]: # Recorre el resto.
+                bits &= otros # Intersección.
+        else: # Solo restas: se parte de todos los registros.
+            bits = _todos(indices, self.coleccion, self.usuario) # Mapa de bits de todos los ids.
+        for otros in negativos: # Recorre las restas.
+            bits &= ~otros # Resta.
+        return bits # Devuelve el mapa de bits.
+
+    # --- Ejecución ---
+    def _candidatos(self, plan, indices):
+        """Devuelve los ids candidatos (en el orden del índice de fechas si se ordena por fecha), o None si hay que recorrer la colección.""" # Docstring que describe el método.
+        pasos, _, _, _, descendente, por_indice = plan # Partes del plan que se usan aquí.
+        bits = self._bits(pasos, indices) # Intersección de los índices.
+        if bits is None and not por_indice: # Sin índices ni orden por fecha.
+            return None # Recorrido de la colección en su orden.
+        if bits is None: # Sin índices, pero con orden por fecha.
+            ids = indices["fechas"].rango() # Todos los ids, ya ordenados por fecha.
+        elif por_indice: # Con índices y orden por fecha.
+            ids = indices["fechas"].ordenar(ids_de_mascara(bits)) # Solo se ordenan los candidatos.
+        else: # Con índices, sin orden por fecha.
+            ids = ids_de_mascara(bits) # Candidatos por id creciente.
+        return ids[::-1] if por_indice and descendente else ids # Orden descendente si se pide.
+
+    def registros(self):
+        """Ejecuta la consulta y devuelve la lista de registros que la cumplen.""" # Docstring que describe el método.
+        plan = self._compilar() # Plan compilado (una sola vez).
+        _, _, cumple, campo_orden, descendente, por_indice = plan # Partes del plan.
+        ids = self._candidatos(plan, self._indices()) # Candidatos de los índices.
+        if ids is None: # Sin índices: recorre los registros del usuario.
+            fuente = self.coleccion.del_usuario(self.usuario) # Registros en el orden de la colección.
+        else: # Con índices: solo se leen los candidatos.
+            obtener = self.coleccion.obtener # Búsqueda directa por id.
+            fuente = (obtener(self.usuario, i) for i in ids) # Registros candidatos.
+        resultado = (r for r in fuente if r is not None and (cumple is None or cumple(r))) # Aplica los predicados que no tienen índice.
+        if campo_orden is not None and not por_indice: # Orden por un campo sin índice.
+            leer = _leer_campo(campo_orden) # Lectura del campo, compilada una vez.
+            clave = lambda r: _clave_orden(r, leer(r)) # Valor por el que se ordena.
+            if self._limite is not None: # Con límite: solo hace falta conservar los primeros.
+                return (heapq.nlargest if descendente else heapq.nsmallest)(self._limite, resultado, key=clave) # Sin ordenar todos los registros.
+            return sorted(resultado, key=clave, reverse=descendente) # Orden completo.
+        lista = [] # Resultados en orden.
+        for registro in resultado: # Recorre los registros que cumplen la consulta.
+            if self._limite is not None and len(lista) >= self._limite: # Límite alcanzado.
+                break # Deja de leer registros.
+            lista.append(registro) # Lo añade.
+        return lista # Devuelve los registros.
+
+    def __iter__(self):
+        """Recorre los registros que cumplen la consulta.""" # Docstring que describe el método.
+        return iter(self.registros()) # Ejecuta la consulta.
+
+    def ids(self):
+        """Devuelve los ids de los registros que cumplen la consulta.""" # Docstring que describe el método.
+        return [r["id"] for r in self.registros()] # Ids de los resultados.
+
+    def contar(self):
+        """Cuenta los resultados; si todas las condiciones tienen índice basta con contar los bits, sin leer registros.""" # Docstring que describe el método.
+        pasos, filtros, _, _, _, _ = self._compilar() # Plan compilado.
+        if pasos and not filtros: # Todo resuelto por los índices.
+            total = self._bits(pasos, self._indices()).bit_count() # Bits encendidos.
+            return total if self._limite is None else min(total, self._limite) # Respeta el límite.
+        return len(self.registros()) # Ejecución completa.
+
+    def explicar(self):
+        """Devuelve las líneas del plan: qué condiciones resuelve cada índice, qué queda como filtro y cuántos candidatos quedan.""" # Docstring que describe el método.
+        plan = self._compilar() # Plan compilado.
+        pasos, filtros, _, campo_orden, descendente, por_indice = plan # Partes del plan.
+        indices = self._indices() # Índices del usuario.
+        lineas = [f"Consulta sobre {self.coleccion.nombre} de '{self.usuario}'"] # Encabezado.
+        for descripcion, _, negado in pasos: # Condiciones con índice.
+            lineas.append(f"  índice: {descripcion}" + (" (se resta)" if negado else "")) # Una línea por índice.
+        bits = self._bits(pasos, indices) # Intersección de los índices.
+        total = len(self.coleccion.del_usuario(self.usuario)) # Registros del usuario.
+        if bits is None: # Sin índices.
+            lineas.append(f"  recorrido completo: {total} registros") # Se leen todos.
+        else: # Con índices.
+            lineas.append(f"  candidatos tras los índices: {bits.bit_count()} de {total}") # Registros que se llegan a leer.
+        for descripcion, _ in filtros: # Condiciones sin índice.
+            lineas.append(f"  filtro: {descripcion}") # Una línea por predicado.
+        if campo_orden is not None: # Si hay orden.
+            como = "índice de fechas" if por_indice else ("montículo" if self._limite is not None else "ordenación") # Cómo se ordena.
+            lineas.append(f"  orden: {campo_orden}{' descendente' if descendente else ''} ({como})") # Línea del orden.
+        if self._limite is not None: # Si hay límite.
+            lineas.append(f"  límite: {self._limite}") # Línea del límite.
+        return lineas # Devuelve el plan.
+
+
+# --- Compilación de las condiciones ---
+def _paso_de_indice(campo, operador, valor, disponibles):
+    """Devuelve (descripción, función índices -> bits, negado) si la condición se resuelve con un índice, o None.""" # Docstring que describe la función.
+    descripcion = _describir(campo, operador, valor) # Texto para explicar().
+    if campo == "id" and operador in ("eq", "in"): # Ids concretos: el mapa de bits se construye directamente.
+        bits = mascara([valor] if operador == "eq" else valor) # Se calcula una sola vez, al compilar.
+        return descripcion, lambda indices: bits, False # Paso constante.
+    if campo == "fecha" and "fechas" in disponibles: # Fechas: rangos del índice ordenado.
+        rangos = _rangos_de_fecha(operador, valor) # Lista de (desde, hasta) semiabiertos.
+        if rangos is not None: # Operador con rango.
+            return descripcion, lambda indices: _union(mascara(indices["fechas"].rango(d, h)) for d, h in rangos), False # Unión de los rangos.
+    if campo == "etiquetas" and operador == "has" and "etiquetas" in disponibles: # Etiquetas: intersección de sus mapas de bits.
+        etiquetas = (valor,) if isinstance(valor, str) else tuple(valor) # Una o varias etiquetas.
+        return descripcion, lambda indices: indices["etiquetas"].mascara(etiquetas), False # Mapa de bits de las etiquetas.
+    if campo == "prioridad" and operador in ("eq", "in", "ne") and "etiquetas" in disponibles: # Prioridad: mapas de bits del mismo índice.
+        prioridades = [valor] if operador in ("eq", "ne") else list(valor) # Prioridades pedidas.
+        return descripcion, lambda indices: _union(indices["etiquetas"].mascara((), p) for p in prioridades), operador == "ne" # Unión (o resta).
+    if campo == "completada" and operador in ("eq", "ne") and "estado" in disponibles: # Estado: mapa de bits de completadas.
+        negado = bool(valor) != (operador == "eq") # "completada=False" es restar las completadas.
+        return descripcion, lambda indices: indices["estado"].mascara(), negado # Mapa de bits de completadas.
+    if campo == "titulo" and operador == "prefix" and "titulos" in disponibles: # Inicio de alguna palabra del título.
+        return descripcion, lambda indices: mascara(indices["titulos"].buscar(valor)), False # Búsqueda por bisección.
+    return None # Sin índice.
+
+
+def _rangos_de_fecha(operador, valor):
+    """Traduce una condición sobre la fecha a rangos semiabiertos [desde, hasta) del índice de fechas.""" # Docstring que describe la función.
+    if operador == "eq": # Un día.
+        return [(valor, valor + _SIGUIENTE)] # Solo ese día.
+    if operador == "in": # Varios días.
+        return [(v, v + _SIGUIENTE) for v in valor] # Un rango por día.
+    if operador == "between": # Rango con los dos extremos incluidos.
+        return [(valor[0], valor[1] + _SIGUIENTE)] # Hasta el final del último día.
+    return {"lt": [(None, valor)], "lte": [(None, valor + _SIGUIENTE)], # Antes de la fecha (con o sin ella).
+            "gt": [(valor + _SIGUIENTE, None)], "gte": [(valor, None)]}.get(operador) # Después de la fecha (con o sin ella); None para el resto.
+
+
+def _union(mapas):
+    """Une varios mapas de bits.""" # Docstring que describe la función.
+    resultado = 0 # Conjunto vacío.
+    for bits in mapas: # Recorre los mapas.
+        resultado |= bits # Los une.
+    return resultado # Devuelve la unión.
+
+
+def _todos(indices, coleccion, usuario):
+    """Mapa de bits de todos los registros del usuario, del índice más barato disponible.""" # Docstring que describe la función.
+    if "etiquetas" in indices: # Unión de las prioridades: unas pocas operaciones sobre enteros.
+        return indices["etiquetas"].mascara() # Todos los registros indexados.
+    return mascara(r["id"] for r in coleccion.del_usuario(usuario)) # Sin índice adecuado, se construye una vez.
+
+
+def _leer_campo(campo):
+    """Devuelve la función que lee un campo de un registro, con los valores por defecto de los registros antiguos.""" # Docstring que describe la función.
+    if campo == "prioridad": # Las tareas antiguas no tienen prioridad.
+        return lambda r: r.get("prioridad") or PRIORIDAD_POR_DEFECTO # Prioridad por defecto.
+    if campo == "completada": # Las tareas antiguas no tienen estado.
+        return lambda r: bool(r.get("completada")) # Abierta por defecto.
+    return lambda r: r.get(campo) # Cualquier otro campo.
+
+
+def _predicado(campo, operador, valor):
+    """Compila una condición sin índice en un predicado registro -> bool (los textos se comparan normalizados).""" # Docstring que describe la función.
+    leer = _leer_campo(campo) # Lectura del campo.
+    if operador == "contains": # Subcadena, sin tildes ni mayúsculas.
+        buscado = normalizar(valor) # Se normaliza una sola vez.
+        return lambda r: buscado in normalizar(leer(r) or "") # Compara con el campo normalizado.
+    if operador == "prefix": # Inicio de alguna palabra.
+        buscado = normalizar(valor) # Se normaliza una sola vez.
+        return lambda r: (" " + buscado) in " " + normalizar(leer(r) or "") # Tras un espacio inicial, coincidir al inicio de una palabra es contener " " + texto.
+    if operador == "has": # Lista que contiene todos los valores.
+        buscadas = {normalizar(v) for v in ((valor,) if isinstance(valor, str) else valor)} # Conjunto normalizado.
+        return lambda r: buscadas <= {normalizar(v) for v in (leer(r) or ())} # Todos presentes.
+    if operador == "in": # Pertenencia a un conjunto.
+        valores = set(valor) # Conjunto para búsquedas directas.
+        return lambda r: leer(r) in valores # Pertenece.
+    if operador == "between": # Rango con los dos extremos incluidos.
+        desde, hasta = valor # Extremos.
+        return lambda r: leer(r) is not None and desde <= leer(r) <= hasta # Dentro del rango.
+    comparar = {"eq": lambda a: a == valor, "ne": lambda a: a != valor, # Igualdad y desigualdad.
+                "lt": lambda a: a < valor, "lte": lambda a: a <= valor, # Menor (o igual).
+                "gt": lambda a: a > valor, "gte": lambda a: a >= valor}[operador] # Mayor (o igual).
+    if operador in ("eq", "ne"): # Admiten valores ausentes.
+        return lambda r: comparar(leer(r)) # Compara directamente.
+    return lambda r: leer(r) is not None and comparar(leer(r)) # Los registros sin el campo no cumplen las comparaciones de orden.
+
+
+def _describir(campo, operador, valor):
+    """Texto de una condición para explicar().""" # Docstring que describe la función.
+    simbolos = {"eq": "=", "ne": "!=", "lt": "<", "lte": "<=", "gt": ">", "gte": ">=", "in": "en", # Operadores con símbolo.
+                "between": "entre", "contains": "contiene", "prefix": "empieza por", "has": "incluye"} # Operadores con palabra.
+    return f"{campo} {simbolos[operador]} {valor!r}" # Campo, operador y valor.
+
+
+def _clave_orden(registro, valor):
+    """Clave de orden de un registro según el valor de su campo; los que no lo tienen van al final (o al principio en descendente).""" # Docstring que describe la función.
+    return (valor is None, valor if valor is not None else "", registro.get("id", 0)) # Ausentes al final; empate por id.
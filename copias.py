@@ -0,0 +1,238 @@
+"""
+Copias de seguridad incrementales de la carpeta de datos, con trozos direccionados por contenido.
+
+Las tareas y las notas se parten por usuario en trozos de REGISTROS_POR_TROZO ids consecutivos; el resto de
+archivos (cuerpos de nota, adjuntos, histórico, credenciales...) se parte en trozos de TAMANO_TROZO bytes.
+Cada trozo se guarda una sola vez en copias/trozos/ con el SHA-256 de su contenido como nombre, así que una
+copia nueva solo escribe los trozos que cambiaron. Cada copia es un manifiesto en copias/instantaneas/ que dice
+qué trozos forman cada usuario y cada archivo. Los archivos que no cambiaron desde la copia anterior (misma firma)
+ni siquiera se leen: el tiempo y el espacio de cada copia crecen con los cambios, no con el tamaño de los datos.
+
+Se puede restaurar una copia completa o solo las tareas y notas de un usuario.
+"""
+import datetime # Importa datetime para nombrar y fechar las copias.
+import hashlib # Importa hashlib para identificar cada trozo por su SHA-256.
+import json # Importa el módulo json, que permite trabajar con datos en formato JSON (serializar y deserializar).
+import os # Importa el módulo os, que proporciona funciones para interactuar con el sistema operativo, como la gestión de rutas de archivos y directorios.
+import shutil # Importa shutil para borrar carpetas enteras de cuerpos de nota al restaurar.
+import zlib # Importa zlib para comprimir los trozos.
+from urllib.parse import quote # Importa quote para localizar los archivos de un usuario.
+
+from almacenamiento import _firma_archivo # Importa la firma de archivos usada para detectar cambios sin leerlos.
+from archivos import escribir_atomico, bloqueo_archivo # Importa la escritura atómica y el bloqueo entre procesos.
+from migraciones import LectorJSON, EscritorJSON # Importa la lectura y escritura en flujo de los archivos {usuario: [registros]}.
+
+COPIAS_DIR = "copias" # Carpeta de las copias (fuera de la carpeta de datos).
+COLECCIONES = ("tareas.json", "notas.json") # Archivos que se parten por usuario y por registros.
+REGISTROS_POR_TROZO = 256 # Ids consecutivos por trozo: editar una tarea solo cambia el trozo de su tramo de ids.
+TAMANO_TROZO = 1024 * 1024 # Bytes por trozo del resto de archivos.
+CARPETAS_EXCLUIDAS = {"miniaturas"} # Cachés que se regeneran solas.
+
+
+class Copias: # Repositorio de copias de una carpeta de datos.
+    def __init__(self, carpeta=COPIAS_DIR):
+        """Inicializa el repositorio en la carpeta indicada (se crea con la primera copia).""" # Docstring que describe el método.
+        self.carpeta = carpeta # Carpeta del repositorio.
+
+    # --- Trozos ---
+    def _ruta_trozo(self, resumen):
+        """Devuelve la ruta del trozo con el resumen indicado.""" # Docstring que describe el método.
+        return os.path.join(self.carpeta, "trozos", resumen[:2], resumen) # Subcarpeta por los dos primeros caracteres, como los adjuntos.
+
+    def _guardar_trozo(self, datos, estadisticas):
+        """Guarda un trozo si aún no existe y devuelve su resumen.""" # Docstring que describe el método.
+        resumen = hashlib.sha256(datos).hexdigest() # Identificador por contenido.
+        ruta = self._ruta_trozo(resumen) # Ruta del trozo.
+        if not os.path.exists(ruta): # Trozo nuevo.
+            comprimido = zlib.compress(datos) # Lo comprime.
+            escribir_atomico(ruta, comprimido, sincronizar=False) # Se sincroniza todo de una vez al cerrar la copia.
+            estadisticas["trozos_nuevos"] += 1 # Lo cuenta.
+            estadisticas["bytes_nuevos"] += len(comprimido) # Espacio que ocupa.
+        return resumen # Resumen del trozo.
+
+    def _leer_trozo(self, resumen):
+        """Devuelve el contenido de un trozo, comprobando que no está dañado.""" # Docstring que describe el método.
+        with open(self._ruta_trozo(resumen), 'rb') as f: # Abre el trozo.
+            datos = zlib.decompress(f.read()) # Lo descomprime.
+        if hashlib.sha256(datos).hexdigest() != resumen: # El contenido no coincide con su nombre.
+            raise ValueError(f"Trozo dañado: {resumen}") # No se restaura nada a partir de él.
+        return datos # Contenido.
+
+    def _registros(self, resumenes):
+        """Genera los registros guardados en una lista de trozos de colección.""" # Docstring que describe el método.
+        for resumen in resumenes: # Recorre los trozos.
+            yield from json.loads(self._leer_trozo(resumen)) # Registros del trozo.
+
+    # --- Crear copias ---
+    def _trozos_coleccion(self, ruta, estadisticas):
+        """Parte un archivo {usuario: [registros]} en trozos por usuario y tramo de ids. Devuelve {usuario: [resúmenes]}.""" # Docstring que describe el método.
+        usuarios = {} # Trozos de cada usuario.
+
+        def _cerrar(usuario, tramos): # Guarda los tramos de un usuario en cuanto termina su lista.
+            usuarios[usuario] = [self._guardar_trozo(json.dumps(tramos[t], sort_keys=True, ensure_ascii=False).encode("utf-8"), estadisticas)
+                                 for t in sorted(tramos)] # Un trozo por tramo, en orden de ids.
+
+        usuario, tramos = None, {} # Usuario en curso y sus tramos.
+        with open(ruta, 'rb') as f: # Lectura en flujo: solo se retiene la lista de un usuario.
+            for clave, registro, _ in LectorJSON(f): # Recorre los registros.
+                if clave != usuario: # Empieza otro usuario.
+                    if usuario is not None: # Si había uno en curso.
+                        _cerrar(usuario, tramos) # Lo guarda.
+                    usuario, tramos = clave, {} # Nuevo usuario.
+                tramo = registro.get("id", 0) // REGISTROS_POR_TROZO if isinstance(registro, dict) else -1 # Tramo de ids (los registros raros van juntos).
+                tramos.setdefault(tramo, []).append(registro) # Lo añade a su tramo.
+        if usuario is not None: # Último usuario.
+            _cerrar(usuario, tramos) # Lo guarda.
+        return usuarios # Trozos por usuario.
+
+    def _trozos_archivo(self, ruta, estadisticas):
+        """Parte un archivo en trozos de TAMANO_TROZO bytes. Devuelve la lista de resúmenes.""" # Docstring que describe el método.
+        with open(ruta, 'rb') as f: # Abre el archivo.
+            return [self._guardar_trozo(bloque, estadisticas) for bloque in iter(lambda: f.read(TAMANO_TROZO), b"")] # Un trozo por bloque.
+
+    def _archivos(self, carpeta_datos):
+        """Genera las rutas relativas de los archivos de datos que entran en la copia.""" # Docstring que describe el método.
+        propia = os.path.abspath(self.carpeta) # El repositorio podría estar dentro de la carpeta de datos.
+        for raiz, carpetas, archivos in os.walk(carpeta_datos): # Recorre la carpeta de datos.
+            carpetas[:] = sorted(c for c in carpetas if c not in CARPETAS_EXCLUIDAS and os.path.abspath(os.path.join(raiz, c)) != propia) # Sin cachés ni el propio repositorio.
+            for nombre in sorted(archivos): # Recorre los archivos.
+                if nombre.startswith(".") or nombre.endswith((".lock", ".tmp")) or ".migrando" in nombre: # Bloqueos, temporales y migraciones a medias.
+                    continue # No se copian.
+                relativa = os.path.relpath(os.path.join(raiz, nombre), carpeta_datos) # Ruta dentro de la carpeta de datos.
+                if relativa not in COLECCIONES: # Las colecciones se parten aparte.
+                    yield relativa.replace(os.sep, "/") # Misma forma en todos los sistemas.
+
+    def crear(self, carpeta_datos):
+        """
+        Crea una copia de la carpeta de datos y devuelve sus estadísticas.
+        Los archivos con la misma firma que en la copia anterior reutilizan sus trozos sin leerse.
+        """ # Docstring que describe el método.
+        estadisticas = {"trozos_nuevos": 0, "bytes_nuevos": 0, "archivos_leidos": 0, "archivos_reutilizados": 0} # Contadores.
+        ruta_cache = os.path.join(self.carpeta, "cache.json") # Firmas y trozos de la copia anterior.
+        try: # Puede no existir.
+            with open(ruta_cache, 'r', encoding="utf-8") as f: # Abre la caché.
+                cache = json.load(f) # Caché anterior.
+        except FileNotFoundError: # Primera copia.
+            cache = {} # Vacía.
+        nueva_cache = {} # Caché de esta copia.
+        manifiesto = {"fecha": datetime.datetime.now().isoformat(timespec="seconds"), "colecciones": {}, "archivos": {}} # Manifiesto.
+
+        def _trozos(relativa, partir): # Reutiliza los trozos si el archivo no cambió; si cambió, lo parte.
+            firma = list(_firma_archivo(os.path.join(carpeta_datos, relativa)) or ()) # Firma actual.
+            anterior = cache.get(relativa) # Entrada de la copia anterior.
+            if anterior and anterior["firma"] == firma and all(os.path.exists(self._ruta_trozo(r)) for r in _resumenes(anterior["trozos"])): # Sin cambios.
+                estadisticas["archivos_reutilizados"] += 1 # No se lee.
+                trozos = anterior["trozos"] # Mismos trozos.
+            else: # Archivo nuevo o cambiado.
+                estadisticas["archivos_leidos"] += 1 # Se lee.
+                trozos = partir(os.path.join(carpeta_datos, relativa), estadisticas) # Lo parte.
+            nueva_cache[relativa] = {"firma": firma, "trozos": trozos} # Para la próxima copia.
+            return trozos # Trozos del archivo.
+
+        for coleccion in COLECCIONES: # Tareas y notas.
+            if os.path.exists(os.path.join(carpeta_datos, coleccion)): # Si la colección existe.
+                with bloqueo_archivo(os.path.join(carpeta_datos, coleccion)): # Nadie la reescribe mientras se lee.
+                    manifiesto["colecciones"][coleccion] = _trozos(coleccion, self._trozos_coleccion) # Trozos por usuario.
+        for relativa in self._archivos(carpeta_datos): # El resto de archivos.
+            manifiesto["archivos"][relativa] = _trozos(relativa, self._trozos_archivo) # Trozos del archivo.
+
+        if estadisticas["trozos_nuevos"] and hasattr(os, "sync"): # Trozos nuevos, en POSIX.
+            os.sync() # Llegan al disco antes que el manifiesto que los nombra (una llamada en lugar de un fsync por trozo).
+        nombre = datetime.datetime.now().strftime("%Y%m%dT%H%M%S") # Nombre de la copia.
+        carpeta_instantaneas = os.path.join(self.carpeta, "instantaneas") # Carpeta de manifiestos.
+        sufijo = 0 # Para dos copias en el mismo segundo.
+        while os.path.exists(os.path.join(carpeta_instantaneas, f"{nombre}{'-' + str(sufijo) if sufijo else ''}.json")): # Nombre ocupado.
+            sufijo += 1 # Prueba el siguiente.
+        nombre = f"{nombre}{'-' + str(sufijo) if sufijo else ''}" # Nombre definitivo.
+        escribir_atomico(os.path.join(carpeta_instantaneas, nombre + ".json"), json.dumps(manifiesto, ensure_ascii=False).encode("utf-8")) # Manifiesto.
+        escribir_atomico(ruta_cache, json.dumps(nueva_cache).encode("utf-8")) # Caché para la próxima copia.
+        estadisticas["instantanea"] = nombre # Nombre de la copia.
+        return estadisticas # Estadísticas.
+
+    # --- Consultar ---
+    def instantaneas(self):
+        """Devuelve los nombres de las copias, de la más antigua a la más reciente.""" # Docstring que describe el método.
+        carpeta = os.path.join(self.carpeta, "instantaneas") # Carpeta de manifiestos.
+        if not os.path.isdir(carpeta): # Sin copias.
+            return [] # Ninguna.
+        return sorted(n[:-5] for n in os.listdir(carpeta) if n.endswith(".json")) # Los nombres ordenan por fecha.
+
+    def manifiesto(self, nombre=None):
+        """Devuelve el manifiesto de una copia (por defecto, la más reciente).""" # Docstring que describe el método.
+        nombre = nombre or (self.instantaneas() or [None])[-1] # Copia pedida o la última.
+        if nombre is None: # Sin copias.
+            raise FileNotFoundError("No hay copias de seguridad") # Nada que restaurar.
+        with open(os.path.join(self.carpeta, "instantaneas", nombre + ".json"), 'r', encoding="utf-8") as f: # Abre el manifiesto.
+            return json.load(f) # Manifiesto.
+
+    # --- Restaurar ---
+    def _restaurar_archivo(self, ruta, resumenes):
+        """Reconstruye un archivo a partir de sus trozos, sustituyéndolo de forma atómica.""" # Docstring que describe el método.
+        with open(_temporal(ruta), 'wb') as f: # Temporal en la misma carpeta.
+            for resumen in resumenes: # Recorre los trozos.
+                f.write(self._leer_trozo(resumen)) # Escribe su contenido.
+            f.flush() # Vacía el búfer.
+            os.fsync(f.fileno()) # Espera al disco.
+        os.replace(_temporal(ruta), ruta) # Sustituye el archivo de golpe.
+
+    def _restaurar_coleccion(self, ruta, usuarios, solo=None):
+        """
+        Reescribe una colección con los registros de la copia. Con "solo", únicamente se sustituye la lista
+        de ese usuario; la de los demás se copia en flujo del archivo actual.
+        """ # Docstring que describe el método.
+        with bloqueo_archivo(ruta): # La aplicación no escribe la colección mientras tanto.
+            with open(_temporal(ruta), 'wb') as salida: # Temporal en la misma carpeta.
+                escritor = EscritorJSON(salida) # Escritura en flujo.
+                if solo is not None and os.path.exists(ruta): # Restauración de un usuario.
+                    with open(ruta, 'rb') as f: # Archivo actual.
+                        for clave, registro, es_elemento in LectorJSON(f): # Recorre sus registros.
+                            if clave != solo: # Los de los demás usuarios se conservan.
+                                escritor.escribir(clave, registro, es_elemento) # Los copia.
+                for usuario, resumenes in usuarios.items(): # Usuarios de la copia.
+                    if solo is None or usuario == solo: # Todos, o solo el pedido.
+                        for registro in self._registros(resumenes): # Sus registros.
+                            escritor.escribir(usuario, registro, True) # Los escribe.
+                escritor.cerrar() # Cierra el objeto.
+                salida.flush() # Vacía el búfer.
+                os.fsync(salida.fileno()) # Espera al disco.
+            os.replace(_temporal(ruta), ruta) # Sustituye la colección de golpe.
+
+    def restaurar(self, carpeta_datos, nombre=None):
+        """
+        Devuelve la carpeta de datos al estado de una copia (por defecto, la más reciente): reescribe las colecciones
+        y los archivos de la copia y elimina los que se crearon después.
+        """ # Docstring que describe el método.
+        manifiesto = self.manifiesto(nombre) # Copia a restaurar.
+        for coleccion in COLECCIONES: # Tareas y notas.
+            self._restaurar_coleccion(os.path.join(carpeta_datos, coleccion), manifiesto["colecciones"].get(coleccion, {})) # Colección completa.
+        for relativa in set(self._archivos(carpeta_datos)) - set(manifiesto["archivos"]): # Archivos posteriores a la copia.
+            os.remove(os.path.join(carpeta_datos, relativa)) # Se eliminan.
+        for relativa, resumenes in manifiesto["archivos"].items(): # Archivos de la copia.
+            ruta = os.path.join(carpeta_datos, relativa) # Ruta de destino.
+            os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True) # Crea su carpeta.
+            self._restaurar_archivo(ruta, resumenes) # Lo reconstruye.
+
+    def restaurar_usuario(self, carpeta_datos, usuario, nombre=None):
+        """Devuelve las tareas y las notas de un usuario (con sus cuerpos y su histórico) al estado de una copia.""" # Docstring que describe el método.
+        manifiesto = self.manifiesto(nombre) # Copia a restaurar.
+        for coleccion in COLECCIONES: # Tareas y notas.
+            self._restaurar_coleccion(os.path.join(carpeta_datos, coleccion), manifiesto["colecciones"].get(coleccion, {}), solo=usuario) # Solo su lista.
+        prefijos = (f"notas_contenido/u_{quote(usuario, safe='')}/", f"historico/{quote(usuario, safe='')}.seg") # Cuerpos de nota e histórico del usuario.
+        shutil.rmtree(os.path.join(carpeta_datos, prefijos[0]), ignore_errors=True) # Los cuerpos actuales se sustituyen por los de la copia.
+        if os.path.exists(os.path.join(carpeta_datos, prefijos[1])): # Histórico actual.
+            os.remove(os.path.join(carpeta_datos, prefijos[1])) # Se sustituye por el de la copia (si lo tenía).
+        for relativa, resumenes in manifiesto["archivos"].items(): # Archivos de la copia.
+            if relativa.startswith(prefijos[0]) or relativa == prefijos[1]: # Del usuario.
+                ruta = os.path.join(carpeta_datos, relativa) # Ruta de destino.
+                os.makedirs(os.path.dirname(ruta), exist_ok=True) # Crea su carpeta.
+                self._restaurar_archivo(ruta, resumenes) # Lo reconstruye.
+
+
+def _resumenes(trozos):
+    """Devuelve los resúmenes de un archivo ([...]) o de una colección ({usuario: [...]}).""" # Docstring que describe la función.
+    return [r for lista in trozos.values() for r in lista] if isinstance(trozos, dict) else trozos # Lista plana.
+
+
+def _temporal(ruta):
+    """Devuelve el temporal de restauración de un archivo, en su misma carpeta.""" # Docstring que describe la función.
+    return f"{ruta}.{os.getpid()}.restaurando.tmp" # Único por proceso.
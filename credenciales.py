@@ -0,0 +1,189 @@
+"""
+Directorio de usuarios con contraseñas derivadas con sal (scrypt, o PBKDF2 si el Python no trae scrypt).
+
+Cada usuario es un registro propio en data/credenciales/<usuario>.cred: el nombre del archivo hace de índice,
+así que un inicio de sesión lee un único registro pequeño en lugar de todo el archivo de usuarios.
+Las entradas en texto plano del antiguo data/usuarios.json se migran en su primer inicio de sesión correcto.
+
+El coste de la derivación se guarda en data/credenciales/coste_kdf.json y se ajusta midiendo cuánto tarda
+en esta máquina (calibrar). Los registros con un coste distinto del actual se vuelven a derivar al iniciar sesión.
+"""
+import hashlib # Importa hashlib, que ofrece scrypt y pbkdf2_hmac.
+import hmac # Importa hmac para comparar resúmenes en tiempo constante.
+import json # Importa el módulo json, que permite trabajar con datos en formato JSON (serializar y deserializar).
+import os # Importa el módulo os, que proporciona funciones para interactuar con el sistema operativo, como la gestión de rutas de archivos y directorios.
+import time # Importa time para medir el coste de la derivación.
+from concurrent.futures import ThreadPoolExecutor # Importa el grupo de hilos que deriva las contraseñas fuera del hilo de Tk.
+from urllib.parse import quote # Importa quote para convertir el nombre de usuario en un nombre de archivo seguro.
+
+from archivos import escribir_atomico, bloqueo_archivo # Importa la escritura atómica y el bloqueo entre procesos.
+
+HAY_SCRYPT = hasattr(hashlib, "scrypt") # scrypt solo existe si Python se compiló con un OpenSSL que lo incluya.
+COSTE_POR_DEFECTO = ({"kdf": "scrypt", "n": 2 ** 14, "r": 8, "p": 1} if HAY_SCRYPT # Unos 16 MiB de memoria por derivación.
+                     else {"kdf": "pbkdf2_sha256", "iteraciones": 600000}) # Alternativa sin scrypt.
+OBJETIVO_MS = 250 # Tiempo de derivación buscado por defecto al calibrar.
+LONGITUD_SAL = 16 # Bytes de sal aleatoria por usuario.
+LONGITUD_CLAVE = 32 # Bytes de la clave derivada.
+
+
+def derivar(contrasena, sal, coste):
+    """Deriva la clave de una contraseña con la sal y los parámetros de coste indicados.""" # Docstring que describe la función.
+    datos = contrasena.encode("utf-8") # La contraseña en bytes.
+    if coste["kdf"] == "scrypt": # Derivación con memoria dura.
+        n, r, p = coste["n"], coste["r"], coste["p"] # Parámetros de scrypt.
+        return hashlib.scrypt(datos, salt=sal, n=n, r=r, p=p, maxmem=2 * 128 * n * r * p, dklen=LONGITUD_CLAVE) # Deja memoria de sobra para el n elegido.
+    if coste["kdf"] == "pbkdf2_sha256": # Derivación por iteraciones.
+        return hashlib.pbkdf2_hmac("sha256", datos, sal, coste["iteraciones"], dklen=LONGITUD_CLAVE) # PBKDF2-HMAC-SHA256.
+    raise ValueError(f"Función de derivación desconocida: {coste['kdf']}") # Registro de un formato que no se conoce.
+
+
+def medir_coste(coste, repeticiones=3):
+    """Devuelve la mediana, en milisegundos, de derivar una contraseña con el coste indicado.""" # Docstring que describe la función.
+    tiempos = [] # Duración de cada repetición.
+    for _ in range(repeticiones): # Varias mediciones para descartar ruido.
+        inicio = time.perf_counter() # Marca de inicio.
+        derivar("contraseña de prueba", b"\x00" * LONGITUD_SAL, coste) # Una derivación completa.
+        tiempos.append((time.perf_counter() - inicio) * 1000) # Duración en milisegundos.
+    return sorted(tiempos)[len(tiempos) // 2] # Mediana.
+
+
+def calibrar(objetivo_ms=OBJETIVO_MS, al_medir=None):
+    """
+    Busca el coste más bajo cuya derivación tarda al menos objetivo_ms en esta máquina.
+    Con scrypt se duplica n; con PBKDF2 se escalan las iteraciones en proporción al tiempo medido.
+    al_medir(coste, ms) se llama con cada medición. Devuelve (coste, ms).
+    """ # Docstring que describe la función.
+    if HAY_SCRYPT: # Se duplica n hasta alcanzar el objetivo.
+        coste = {"kdf": "scrypt", "n": 2 ** 12, "r": 8, "p": 1} # Punto de partida barato.
+        while True: # Hasta alcanzar el objetivo o el límite.
+            ms = medir_coste(coste) # Tiempo con este coste.
+            if al_medir: # Si se quiere informar de cada paso.
+                al_medir(coste, ms) # Informa.
+            if ms >= objetivo_ms or coste["n"] >= 2 ** 20: # Objetivo alcanzado, o 1 GiB de memoria: no se sube más.
+                return coste, ms # Coste elegido.
+            coste = dict(coste, n=coste["n"] * 2) # El siguiente coste tarda aproximadamente el doble.
+    coste = {"kdf": "pbkdf2_sha256", "iteraciones": 100000} # Punto de partida para estimar la velocidad.
+    ms = medir_coste(coste) # Tiempo con este coste.
+    if al_medir: # Si se quiere informar de cada paso.
+        al_medir(coste, ms) # Informa.
+    coste = {"kdf": "pbkdf2_sha256", "iteraciones": max(100000, int(coste["iteraciones"] * objetivo_ms / max(ms, 0.001)))} # El tiempo crece linealmente con las iteraciones.
+    ms = medir_coste(coste) # Comprueba el resultado.
+    if al_medir: # Si se quiere informar de cada paso.
+        al_medir(coste, ms) # Informa.
+    return coste, ms # Coste elegido.
+
+
+class DirectorioUsuarios: # Usuarios registrados, un registro con la clave derivada por archivo.
+    def __init__(self, carpeta_datos="data"):
+        """Inicializa el directorio sobre una carpeta de datos; los registros viven en su subcarpeta "credenciales".""" # Docstring que describe el método.
+        self.carpeta_datos = carpeta_datos # Carpeta de datos (la línea de comandos puede cambiarla).
+        self._grupo = ThreadPoolExecutor(max_workers=1, thread_name_prefix="credenciales") # Un hilo basta: los inicios de sesión van de uno en uno.
+        self._coste = None # Último coste leído: (firma, parámetros).
+
+    @property
+    def carpeta(self):
+        """Carpeta de los registros de usuario.""" # Docstring que describe el método.
+        return os.path.join(self.carpeta_datos, "credenciales") # Subcarpeta de la carpeta de datos.
+
+    @property
+    def ruta_legado(self):
+        """Archivo de usuarios antiguo, con contraseñas en texto plano pendientes de migrar.""" # Docstring que describe el método.
+        return os.path.join(self.carpeta_datos, "usuarios.json") # Formato anterior {usuario: contraseña}.
+
+    def _ruta(self, usuario):
+        """Devuelve la ruta del registro del usuario.""" # Docstring que describe el método.
+        return os.path.join(self.carpeta, quote(usuario, safe="") + ".cred") # Un registro por usuario.
+
+    def enviar(self, funcion, *args):
+        """Ejecuta una función del directorio en su hilo de trabajo y devuelve su Future.""" # Docstring que describe el método.
+        return self._grupo.submit(funcion, *args) # Encola el trabajo.
+
+    # --- Coste de la derivación ---
+    def coste(self):
+        """Devuelve los parámetros de coste actuales (los guardados o, si no hay, los de por defecto).""" # Docstring que describe el método.
+        ruta = os.path.join(self.carpeta, "coste_kdf.json") # Archivo de configuración del coste.
+        try: # Puede no existir.
+            firma = os.stat(ruta).st_mtime_ns # Marca de modificación, para no releerlo en cada inicio de sesión.
+        except FileNotFoundError: # Nunca se calibró.
+            return COSTE_POR_DEFECTO # Coste por defecto.
+        if self._coste is None or self._coste[0] != firma: # Primera lectura, o cambió.
+            with open(ruta, 'r', encoding="utf-8") as f: # Abre la configuración.
+                self._coste = (firma, json.load(f)) # La recuerda.
+        return self._coste[1] # Parámetros guardados.
+
+    def fijar_coste(self, coste):
+        """Guarda el coste con el que se derivarán las contraseñas nuevas o migradas.""" # Docstring que describe el método.
+        derivar("", b"\x00" * LONGITUD_SAL, coste) # Comprueba que los parámetros son válidos antes de guardarlos.
+        escribir_atomico(os.path.join(self.carpeta, "coste_kdf.json"), json.dumps(coste).encode("utf-8")) # Escritura atómica.
+
+    # --- Registros ---
+    def _leer(self, usuario):
+        """Devuelve el registro del usuario, o None si no tiene.""" # Docstring que describe el método.
+        try: # Lectura de un único archivo pequeño.
+            with open(self._ruta(usuario), 'r', encoding="utf-8") as f: # Abre el registro.
+                return json.load(f) # Lo devuelve.
+        except FileNotFoundError: # Usuario sin registro.
+            return None # No existe (o aún está en el archivo antiguo).
+
+    def _escribir(self, usuario, contrasena):
+        """Deriva la contraseña con una sal nueva y el coste actual, y guarda el registro del usuario.""" # Docstring que describe el método.
+        coste = self.coste() # Coste actual.
+        sal = os.urandom(LONGITUD_SAL) # Sal aleatoria.
+        registro = {"usuario": usuario, "coste": coste, "sal": sal.hex(), "clave": derivar(contrasena, sal, coste).hex()} # Nunca se guarda la contraseña.
+        escribir_atomico(self._ruta(usuario), json.dumps(registro).encode("utf-8")) # Escritura atómica.
+
+    def _legado(self):
+        """Devuelve el archivo de usuarios antiguo {usuario: contraseña} ({} si no existe).""" # Docstring que describe el método.
+        try: # Puede no existir.
+            with open(self.ruta_legado, 'r', encoding="utf-8") as f: # Abre el archivo antiguo.
+                return json.load(f) # Lo devuelve.
+        except FileNotFoundError: # Instalación nueva o migración terminada.
+            return {} # Nada que migrar.
+
+    def existe(self, usuario):
+        """Indica si el usuario está registrado, en el directorio o pendiente de migrar.""" # Docstring que describe el método.
+        return os.path.exists(self._ruta(usuario)) or usuario in self._legado() # El archivo antiguo solo se lee si no hay registro.
+
+    def registrar(self, usuario, contrasena):
+        """Registra un usuario nuevo. Devuelve False si ya existía. Es lento a propósito: llámese desde el hilo de trabajo.""" # Docstring que describe el método.
+        with bloqueo_archivo(self._ruta(usuario)): # Otra instancia no puede registrar el mismo nombre a la vez.
+            if self.existe(usuario): # Nombre ocupado.
+                return False # No se registra.
+            self._escribir(usuario, contrasena) # Guarda el registro.
+        return True # Registrado.
+
+    def verificar(self, usuario, contrasena):
+        """
+        Comprueba la contraseña de un usuario leyendo solo su registro. Es lento a propósito: llámese desde el hilo de trabajo.
+        Si el usuario aún está en el archivo antiguo y la contraseña es correcta, se migra a un registro derivado;
+        si su registro tiene un coste distinto del actual, se vuelve a derivar con el actual.
+        """ # Docstring que describe el método.
+        registro = self._leer(usuario) # Un único registro.
+        if registro is None: # Sin registro: usuario inexistente o pendiente de migrar.
+            return self._migrar(usuario, contrasena) # Lo busca en el archivo antiguo.
+        clave = derivar(contrasena, bytes.fromhex(registro["sal"]), registro["coste"]) # Deriva con los parámetros del registro.
+        if not hmac.compare_digest(clave, bytes.fromhex(registro["clave"])): # Comparación en tiempo constante.
+            return False # Contraseña incorrecta.
+        if registro["coste"] != self.coste(): # El coste se cambió después de derivarla.
+            with bloqueo_archivo(self._ruta(usuario)): # Sin carreras con otra instancia.
+                self._escribir(usuario, contrasena) # La deriva de nuevo con el coste actual.
+        return True # Contraseña correcta.
+
+    def _migrar(self, usuario, contrasena):
+        """Comprueba una entrada en texto plano del archivo antiguo y, si es correcta, la pasa a un registro derivado.""" # Docstring que describe el método.
+        guardada = self._legado().get(usuario) # Contraseña en texto plano, si el usuario está pendiente de migrar.
+        if guardada is None: # Usuario inexistente.
+            derivar(contrasena, b"\x00" * LONGITUD_SAL, self.coste()) # Tarda lo mismo que una contraseña incorrecta: no revela qué usuarios existen.
+            return False # No existe.
+        if not hmac.compare_digest(guardada.encode("utf-8"), contrasena.encode("utf-8")): # Comparación en tiempo constante.
+            return False # Contraseña incorrecta.
+        with bloqueo_archivo(self._ruta(usuario)): # Sin carreras con otra instancia que migre al mismo usuario.
+            self._escribir(usuario, contrasena) # Primero el registro nuevo: si se interrumpe aquí, el usuario sigue pudiendo entrar.
+        with bloqueo_archivo(self.ruta_legado): # Reescritura del archivo antiguo.
+            usuarios = self._legado() # Versión más reciente, ya con el bloqueo tomado.
+            if usuarios.pop(usuario, None) is not None: # Quita la contraseña en texto plano.
+                escribir_atomico(self.ruta_legado, json.dumps(usuarios, indent=4).encode("utf-8")) # Escritura atómica.
+        return True # Contraseña correcta, usuario migrado.
+
+
+directorio_usuarios = DirectorioUsuarios() # Directorio compartido por el login y la línea de comandos.
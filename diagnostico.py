@@ -0,0 +1,187 @@
+"""
+Diagnóstico de memoria con tracemalloc.
+
+Con la variable de entorno EDUPLANNER_MEMORIA definida (su valor es el número de marcos de pila que se
+guardan por asignación; "1" basta para ver la línea), la aplicación toma una instantánea en cada cambio
+de pantalla (inicio de sesión, menú, apertura y cierre de cada ventana), la compara con la anterior e
+imprime las líneas que más memoria han ganado, el número de widgets vivos, los objetos de widget que
+siguen en memoria aunque su ventana ya se destruyó (fugas) y las imágenes de Tk.
+
+prueba_fugas() hace lo mismo sin interfaz: repite miles de veces las operaciones de las pantallas sobre
+la capa de servicio y falla si la memoria sigue creciendo después del calentamiento.
+"""
+import gc # Importa gc para recoger la basura antes de medir y para buscar los widgets huérfanos.
+import os # Importa el módulo os, que proporciona funciones para interactuar con el sistema operativo, como la gestión de rutas de archivos y directorios.
+import sys # Importa sys para localizar tkinter solo si ya está cargado (la línea de comandos nunca lo carga).
+import tracemalloc # Importa tracemalloc, que registra dónde se asigna cada bloque de memoria.
+from collections import Counter # Importa Counter para contar widgets por clase.
+
+TOP_POR_DEFECTO = 10 # Líneas de asignación que se muestran en cada informe.
+_EXCLUIR = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>"), # Las asignaciones del propio tracemalloc y de las importaciones no interesan.
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"), tracemalloc.Filter(False, "<unknown>"))
+
+
+class DiagnosticoMemoria: # Instantáneas de tracemalloc en los cambios de pantalla, comparadas con la anterior.
+    def __init__(self, marcos=None, top=TOP_POR_DEFECTO):
+        """Prepara el diagnóstico; solo está activo si se indica el número de marcos o la variable EDUPLANNER_MEMORIA.""" # Docstring que describe el método.
+        if marcos is None: # Sin indicación expresa.
+            marcos = int(os.environ.get("EDUPLANNER_MEMORIA") or 0) # Lo decide la variable de entorno.
+        self.marcos = marcos # Marcos de pila por asignación (0 = desactivado).
+        self.top = top # Líneas por informe.
+        self.informes = [] # Informes generados, en orden.
+        self._anterior = None # Instantánea anterior.
+        self._widgets_anteriores = 0 # Widgets vivos en la instantánea anterior.
+
+    @property
+    def activo(self):
+        """Indica si el diagnóstico está activado.""" # Docstring que describe el método.
+        return self.marcos > 0 # Activo con al menos un marco.
+
+    def iniciar(self):
+        """Empieza a registrar las asignaciones (cuanto antes, más completo es el informe).""" # Docstring que describe el método.
+        if self.activo and not tracemalloc.is_tracing(): # Activo y aún sin registrar.
+            tracemalloc.start(self.marcos) # Registra las asignaciones con sus marcos de pila.
+
+    def marcar(self, etiqueta, widget=None):
+        """
+        Toma una instantánea al llegar a una pantalla, la compara con la anterior e imprime el informe.
+        Con un widget cuenta además los widgets de toda la aplicación. No hace nada si el diagnóstico no está activo.
+        """ # Docstring que describe el método.
+        if not self.activo: # Desactivado: coste nulo.
+            return None # Sin informe.
+        self.iniciar() # Por si nadie lo inició antes.
+        gc.collect() # Lo que ya es basura no cuenta como fuga.
+        instantanea = tracemalloc.take_snapshot().filter_traces(_EXCLUIR) # Asignaciones vivas.
+        actual, pico = tracemalloc.get_traced_memory() # Memoria registrada y pico.
+        informe = {"etiqueta": etiqueta, "actual": actual, "pico": pico, "lineas": []} # Informe de esta pantalla.
+        if self._anterior is not None: # Hay con qué comparar.
+            diferencias = instantanea.compare_to(self._anterior, "lineno") # Diferencias por línea de código.
+            informe["diferencia"] = sum(d.size_diff for d in diferencias) # Crecimiento total.
+            informe["lineas"] = [(str(d.traceback), d.size_diff, d.count_diff) for d in diferencias[:self.top] if d.size_diff] # Líneas que más han cambiado.
+        if widget is not None: # Recuento de widgets.
+            informe.update(contar_widgets(widget)) # Vivos, huérfanos e imágenes.
+            informe["widgets_diferencia"] = informe["widgets"] - self._widgets_anteriores # Widgets ganados.
+            self._widgets_anteriores = informe["widgets"] # Para la siguiente comparación.
+        self._anterior = instantanea # Referencia para la siguiente pantalla.
+        self.informes.append(informe) # Lo guarda.
+        print(formatear_informe(informe)) # Lo muestra en la consola.
+        return informe # Devuelve el informe.
+
+    def marcar_al_cerrar(self, ventana, etiqueta):
+        """Marca la pantalla anterior cuando se destruye la ventana (en cuanto Tk termina de destruirla).""" # Docstring que describe el método.
+        if not self.activo: # Desactivado: ni siquiera se vincula el evento.
+            return # Nada que hacer.
+        raiz = ventana.nametowidget(".") # Ventana principal, que sigue viva después.
+
+        def _al_destruir(event): # Se ejecuta al destruirse la ventana o cualquiera de sus hijos.
+            if event.widget is ventana: # Solo la propia ventana.
+                raiz.after_idle(lambda: self.marcar(etiqueta, raiz)) # Mide cuando ya no queda nada de ella.
+
+        ventana.bind("<Destroy>", _al_destruir, add="+") # Sin reemplazar otros bindings.
+
+
+def contar_widgets(widget):
+    """
+    Cuenta los widgets vivos de toda la aplicación, los objetos de widget de Python cuya ventana ya se destruyó
+    (siguen referenciados por algún cierre o atributo: son fugas) y las imágenes de Tk existentes.
+    """ # Docstring que describe la función.
+    raiz = widget.nametowidget(".") # Ventana principal.
+    vivos = Counter() # Widgets vivos por clase de Tk.
+    pendientes = [raiz] # Recorrido del árbol de widgets.
+    while pendientes: # Mientras queden widgets por visitar.
+        actual = pendientes.pop() # Siguiente widget.
+        vivos[actual.winfo_class()] += 1 # Lo cuenta.
+        pendientes.extend(actual.winfo_children()) # Visita sus hijos.
+    huerfanos = Counter() # Objetos de widget sin ventana, por clase de Python.
+    tk = sys.modules.get("tkinter") # tkinter ya está cargado si hay widgets.
+    for objeto in gc.get_objects(): # Recorre los objetos que sigue el recolector.
+        if isinstance(objeto, tk.Misc) and not isinstance(objeto, tk.Tk) and not objeto.winfo_exists(): # Widget de Python cuya ventana ya no existe.
+            huerfanos[type(objeto).__name__] += 1 # Lo cuenta.
+    return {"widgets": sum(vivos.values()), "por_clase": dict(vivos.most_common(5)), # Widgets vivos y las clases más numerosas.
+            "huerfanos": dict(huerfanos), "imagenes": len(raiz.tk.call("image", "names"))} # Fugas e imágenes de Tk.
+
+
+def formatear_informe(informe):
+    """Devuelve el texto de un informe de memoria.""" # Docstring que describe la función.
+    mib = lambda n: f"{n / 1048576:.2f} MiB" # Bytes a MiB.
+    linea = f"[memoria] {informe['etiqueta']}: {mib(informe['actual'])}" # Pantalla y memoria registrada.
+    if "diferencia" in informe: # Hay comparación.
+        linea += f" ({'+' if informe['diferencia'] >= 0 else '-'}{mib(abs(informe['diferencia']))})" # Crecimiento.
+    linea += f", pico {mib(informe['pico'])}" # Pico.
+    if "widgets" in informe: # Hay recuento de widgets.
+        linea += f"; widgets {informe['widgets']} ({informe['widgets_diferencia']:+d}), huérfanos {sum(informe['huerfanos'].values())}, imágenes {informe['imagenes']}" # Widgets, fugas e imágenes.
+        if informe["huerfanos"]: # Hay fugas.
+            linea += "\n    huérfanos: " + ", ".join(f"{clase} x{n}" for clase, n in sorted(informe["huerfanos"].items())) # Detalle por clase.
+    for sitio, tamano, cuenta in informe["lineas"]: # Líneas que más han cambiado.
+        linea += f"\n    {tamano / 1024:+10.1f} KiB {cuenta:+7d}  {sitio}" # Una por línea de código.
+    return linea # Devuelve el texto.
+
+
+diagnostico_memoria = DiagnosticoMemoria() # Instancia compartida por las pantallas de la aplicación.
+
+
+# --- Prueba de fugas sin interfaz ---
+def _ciclo_de_pantallas(usuario, vuelta):
+    """Repite sobre la capa de servicio lo que hacen las pantallas: alta, listado, calendario, edición, notas y baja.""" # Docstring que describe la función.
+    from almacenamiento import almacen_tareas, almacen_notas, completar_tareas, vaciar_todo # Colecciones compartidas.
+    from consultas import Consulta # Consultas de las ventanas.
+    from indices import indice_titulos, indice_estado # Índices de las ventanas.
+    from eventos import bus, EVENTOS_TAREAS # Bus al que se suscriben las ventanas.
+    cancelar = bus.suscribir(lambda evento: None, tipos=EVENTOS_TAREAS, usuario=usuario) # Una ventana abierta escucha los cambios.
+    fecha = f"2025-{vuelta % 12 + 1:02d}-{vuelta % 28 + 1:02d}" # Fecha que va cambiando.
+    tarea = almacen_tareas.agregar(usuario, {"titulo": f"Tarea {vuelta}", "contenido": "x" * 200, "fecha": fecha, "etiquetas": ["prueba"], "prioridad": "media"}) # Agregar tarea.
+    Consulta(almacen_tareas, usuario).donde(completada=False).ordenar_por("fecha").limite(50).registros() # Ver tareas.
+    indice_titulos(almacen_tareas, usuario).buscar("tarea", limite=20) # Filtro por título.
+    Consulta(almacen_tareas, usuario).donde(fecha=fecha).registros() # Calendario.
+    almacen_tareas.actualizar(usuario, tarea["id"], titulo=f"Tarea {vuelta} editada") # Editar tarea.
+    completar_tareas(usuario, [tarea["id"]]) # Completarla.
+    indice_estado(almacen_tareas, usuario).abiertas # Contadores del menú.
+    nota = almacen_notas.agregar(usuario, {"titulo": f"Nota {vuelta}", "contenido": "y" * 500}) # Nueva nota.
+    if vuelta % 20 == 0: # De vez en cuando se escribe, como el guardado agrupado.
+        vaciar_todo() # Escribe los cambios (y saca los cuerpos de nota a su archivo).
+    almacen_notas.contenido(usuario, nota["id"]) # Ver nota.
+    almacen_notas.eliminar(usuario, nota["id"]) # Eliminar nota.
+    almacen_tareas.eliminar(usuario, tarea["id"]) # Eliminar tarea.
+    cancelar() # La ventana se cierra.
+
+
+def prueba_fugas(iteraciones=2000, tolerancia_kb=64, top=TOP_POR_DEFECTO):
+    """
+    Repite el ciclo de pantallas sobre una carpeta temporal y compara la memoria tras el calentamiento
+    (la primera décima parte de las vueltas, que llena cachés e índices) con la del final.
+    Devuelve True si el crecimiento no supera tolerancia_kb.
+    """ # Docstring que describe la función.
+    import tempfile # Carpeta temporal para no tocar los datos reales.
+    import almacenamiento # Capa de almacenamiento compartida.
+    calentamiento = max(1, iteraciones // 10) # Vueltas que no se miden.
+    ruta_anterior = os.path.dirname(almacenamiento.almacen_tareas.ruta) # Carpeta de datos en uso.
+    with tempfile.TemporaryDirectory() as carpeta: # Carpeta que se borra al terminar.
+        almacenamiento.usar_carpeta_datos(carpeta) # Las colecciones trabajan en la carpeta temporal.
+        usuario = f"fugas-{os.getpid()}" # Usuario propio: sus índices empiezan vacíos.
+        tracemalloc.start(1) # Basta la línea de cada asignación.
+        try: # Siempre se detiene tracemalloc y se restaura la carpeta.
+            for vuelta in range(calentamiento): # Calentamiento.
+                _ciclo_de_pantallas(usuario, vuelta) # Una vuelta.
+            gc.collect() # Descarta la basura del calentamiento.
+            inicio = tracemalloc.take_snapshot().filter_traces(_EXCLUIR) # Referencia.
+            for vuelta in range(calentamiento, iteraciones): # Vueltas medidas.
+                _ciclo_de_pantallas(usuario, vuelta) # Una vuelta.
+            almacenamiento.vaciar_todo() # Escribe lo pendiente.
+            gc.collect() # Descarta la basura.
+            final = tracemalloc.take_snapshot().filter_traces(_EXCLUIR) # Estado final.
+        finally: # Limpieza.
+            tracemalloc.stop() # Deja de registrar.
+            almacenamiento.usar_carpeta_datos(ruta_anterior) # Vuelve a la carpeta de datos anterior.
+    diferencias = final.compare_to(inicio, "lineno") # Diferencias por línea.
+    crecimiento = sum(d.size_diff for d in diferencias) # Crecimiento total.
+    print(f"Vueltas: {iteraciones} ({calentamiento} de calentamiento)") # Informe de vueltas.
+    print(f"Crecimiento tras el calentamiento: {crecimiento / 1024:.1f} KiB ({crecimiento / max(1, iteraciones - calentamiento):.1f} bytes por vuelta; tolerancia {tolerancia_kb} KiB)") # Informe del crecimiento.
+    for d in diferencias[:top]: # Líneas que más han crecido.
+        if d.size_diff: # Solo las que cambiaron.
+            print(f"    {d.size_diff / 1024:+10.1f} KiB {d.count_diff:+7d}  {d.traceback}") # Una por línea de código.
+    return crecimiento <= tolerancia_kb * 1024 # Resultado global.
+
+
+if __name__ == "__main__": # Solo al ejecutar el módulo directamente.
+    argumentos = [int(a) for a in sys.argv[1:3]] # Vueltas y tolerancia en KiB (opcionales).
+    sys.exit(0 if prueba_fugas(*argumentos) else 1) # Código 0 si la prueba pasa.
@@ -0,0 +1,528 @@
+"""
+Línea de comandos de EduPlanner: trabaja con las mismas tareas y notas que la aplicación gráfica,
+sin importar tkinter, PIL ni tkcalendar, para poder llamarla miles de veces desde scripts.
+
+Ejemplos:
+    python eduplanner.py -u jhon tasks list --due tomorrow
+    python eduplanner.py -u jhon tasks add --title "Ensayo" --date 2025-06-01
+    python eduplanner.py -u jhon tasks query --where fecha__between=2025-06-01,2025-06-07 --where titulo__contains=ensayo --explain
+    python eduplanner.py -u jhon tasks add --title "Entrega" --date tomorrow
+    python eduplanner.py -u jhon tasks import semestre.csv
+    python eduplanner.py -u jhon tasks export -o tareas.ics
+    python eduplanner.py -u jhon notes add --title "Ideas" --file ideas.txt
+    python eduplanner.py -u jhon report --week 2025-06-02 --pdf
+    python eduplanner.py diag perf --update
+    python eduplanner.py import-time --runs 7
+"""
+import argparse # Importa argparse para interpretar los argumentos de la línea de comandos.
+import datetime # Importa el módulo datetime para calcular los rangos de fechas (hoy, mañana, esta semana).
+import json # Importa el módulo json, que permite trabajar con datos en formato JSON (serializar y deserializar).
+import os # Importa el módulo os, que proporciona funciones para interactuar con el sistema operativo, como la gestión de rutas de archivos y directorios.
+import sys # Importa sys para leer la entrada estándar y devolver códigos de salida.
+
+import almacenamiento # Importa la capa de almacenamiento compartida con la aplicación gráfica (no depende de tkinter).
+
+CARPETA_DATOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data") # Carpeta de datos por defecto: la de la aplicación, sea cual sea el directorio actual.
+PRESUPUESTO_IMPORTACION_MS = 60 # Mediana máxima (ms) de importar este módulo y sus dependencias bajo -X importtime (unos 30-43 ms medidos; argparse es la mayor parte).
+MODULOS_PROHIBIDOS = ("tkinter", "_tkinter", "PIL", "tkcalendar") # Módulos gráficos que la línea de comandos nunca debe cargar.
+
+
+# --- Utilidades ---
+def _interpretar_fecha(texto, hoy=None):
+    """Convierte "today", "tomorrow" o una fecha aaaa-mm-dd en un datetime.date (lanza ValueError si no es válida).""" # Docstring que describe la función.
+    hoy = hoy or datetime.date.today() # Fecha de referencia.
+    relativas = {"today": hoy, "tomorrow": hoy + datetime.timedelta(days=1)} # Fechas con nombre.
+    return relativas[texto] if texto in relativas else datetime.date.fromisoformat(texto) # La fecha con nombre o la escrita.
+
+
+def _rango_vencimiento(vencimiento, hoy=None):
+    """Convierte el filtro --due en un par (desde, hasta) de fechas "aaaa-mm-dd" (hasta excluida).""" # Docstring que describe la función.
+    hoy = hoy or datetime.date.today() # Fecha de referencia.
+    dia = datetime.timedelta(days=1) # Un día.
+    rangos = { # Filtros con nombre.
+        "all": (None, None), # Todas, ordenadas por fecha.
+        "overdue": ("0", hoy), # Vencidas (desde "0" para excluir las tareas sin fecha).
+        "week": (hoy, hoy + 7 * dia), # Hoy y los seis días siguientes.
+    }
+    if vencimiento in rangos: # Si es un filtro con nombre.
+        desde, hasta = rangos[vencimiento] # Obtiene sus límites.
+    else: # Si es un único día: today, tomorrow o una fecha concreta.
+        fecha = _interpretar_fecha(vencimiento, hoy) # La interpreta, como --date (lanza ValueError si no es válida).
+        desde, hasta = fecha, fecha + dia # Solo ese día.
+    a_texto = lambda f: f if f is None or isinstance(f, str) else f.isoformat() # Convierte las fechas a texto comparable.
+    return a_texto(desde), a_texto(hasta) # Devuelve los límites como texto.
+
+
+def _imprimir(registros, formato, campos):
+    """Escribe los registros en la salida estándar, como texto tabulado o como JSON (uno por línea).""" # Docstring que describe la función.
+    salida = sys.stdout # Salida estándar.
+    for registro in registros: # Recorre los registros.
+        if formato == "json": # Formato para otros programas.
+            salida.write(json.dumps(registro, ensure_ascii=False) + "\n") # Un objeto JSON por línea.
+        else: # Formato para personas.
+            salida.write("\t".join(str(registro.get(c, "")) for c in campos) + "\n") # Campos separados por tabuladores.
+
+
+# --- Comandos de tareas ---
+def tareas_listar(args):
+    """tasks list: lista las tareas del usuario ordenadas por fecha, filtradas por --due, --tag y --priority; las completadas solo con --all.""" # Docstring que describe la función.
+    from consultas import Consulta # Consultas compiladas sobre los índices (solo las necesita este comando).
+    desde, hasta = _rango_vencimiento(args.due) # Límites del filtro.
+    consulta = Consulta(almacenamiento.almacen_tareas, args.user).ordenar_por("fecha") # Tareas del usuario ordenadas por fecha.
+    if desde is not None: # Límite inferior.
+        consulta.donde(fecha__gte=desde) # Desde esa fecha.
+    if hasta is not None: # Límite superior (excluido).
+        consulta.donde(fecha__lt=hasta) # Antes de esa fecha.
+    if args.tag: # Etiquetas.
+        consulta.donde(etiquetas__has=args.tag) # Todas las pedidas.
+    if args.priority: # Prioridad.
+        consulta.donde(prioridad=args.priority) # Solo esa.
+    if not args.all: # Por defecto las completadas no se muestran.
+        consulta.donde(completada=False) # Resta las completadas.
+    if args.archived: # Si se piden también las tareas archivadas (son anteriores a todas las activas con fecha).
+        from historico import historico_tareas # Histórico de tareas antiguas.
+        _imprimir(historico_tareas.tareas_de_rango(args.user, desde or "0", hasta or "9999"), args.format, ("id", "fecha", "prioridad", "titulo")) # Solo se descomprime si el rango toca meses archivados.
+    _imprimir(consulta.registros(), args.format, ("id", "fecha", "prioridad", "titulo")) # Los escribe.
+    return 0 # Éxito.
+
+
+def _valor_condicion(clave, texto):
+    """Convierte el texto de una condición --where al tipo que espera su operador (listas, booleanos, ids).""" # Docstring que describe la función.
+    campo, _, operador = clave.partition("__") # Campo y operador.
+    convertir = {"id": int, "completada": lambda t: t.lower() in ("1", "true", "si", "sí", "yes")}.get(campo, str) # Tipo del campo.
+    if operador in ("between", "in", "has"): # Operadores con varios valores separados por comas.
+        return [convertir(v.strip()) for v in texto.split(",")] # Lista de valores.
+    return convertir(texto) # Un solo valor.
+
+
+def tareas_consultar(args):
+    """tasks query: consulta tareas o notas con condiciones campo__operador=valor; --explain muestra el plan en vez de ejecutarla.""" # Docstring que describe la función.
+    from consultas import Consulta # Consultas compiladas sobre los índices.
+    coleccion = almacenamiento.almacen_notas if args.notes else almacenamiento.almacen_tareas # Colección consultada.
+    consulta = Consulta(coleccion, args.user) # Consulta vacía.
+    try: # Las condiciones mal escritas se informan sin traza.
+        for condicion in args.where: # Recorre las condiciones.
+            clave, separador, texto = condicion.partition("=") # Separa la clave del valor.
+            if not separador: # Falta el "=".
+                raise ValueError(f"Condición sin '=': {condicion}") # Error descriptivo.
+            consulta.donde(**{clave: _valor_condicion(clave, texto)}) # Añade la condición.
+    except ValueError as e: # Operador desconocido, rango incompleto o id no numérico.
+        print(f"Error: {e}", file=sys.stderr) # Informa.
+        return 2 # Error de uso.
+    if args.order: # Orden pedido.
+        consulta.ordenar_por(args.order, descendente=args.desc) # Campo y sentido.
+    if args.limit is not None: # Límite pedido.
+        consulta.limite(args.limit) # Como mucho esos resultados.
+    if args.explain: # Solo el plan.
+        print("\n".join(consulta.explicar())) # Escribe el plan.
+        return 0 # Éxito.
+    _imprimir(consulta.registros(), args.format, ("id", "fecha", "titulo")) # Escribe los resultados.
+    return 0 # Éxito.
+
+
+def tareas_buscar(args):
+    """tasks search: busca tareas por el inicio de cualquier palabra del título; con --archived busca también en el histórico.""" # Docstring que describe la función.
+    from indices import indice_titulos # Índice de títulos.
+    ids = indice_titulos(almacenamiento.almacen_tareas, args.user).buscar(args.texto) # Coincidencias entre las tareas activas.
+    if args.archived: # Solo si se pide expresamente.
+        from historico import historico_tareas # Histórico de tareas antiguas.
+        _imprimir(historico_tareas.buscar(args.user, args.texto), args.format, ("id", "fecha", "titulo")) # Coincidencias archivadas.
+    _imprimir((almacenamiento.almacen_tareas.obtener(args.user, i) for i in ids), args.format, ("id", "fecha", "titulo")) # Coincidencias activas.
+    return 0 # Éxito.
+
+
+def tareas_archivar(args):
+    """tasks archive: mueve al histórico las tareas vencidas hace más de --days días.""" # Docstring que describe la función.
+    from historico import historico_tareas # Histórico de tareas antiguas.
+    print(f"Archivadas: {historico_tareas.archivar(args.user, dias=args.days)}", file=sys.stderr) # Archiva e informa.
+    return 0 # Éxito.
+
+
+def tareas_agregar(args):
+    """tasks add: añade una tarea.""" # Docstring que describe la función.
+    from intercambio import validar_tarea # Misma validación que las importaciones.
+    try: # La fecha se interpreta igual que en --due.
+        fecha = _interpretar_fecha(args.date).isoformat() if args.date else "" # today, tomorrow o aaaa-mm-dd.
+    except ValueError: # Fecha mal escrita.
+        print(f"Error: fecha no válida: {args.date!r} (usa today, tomorrow o aaaa-mm-dd)", file=sys.stderr) # Informa del error.
+        return 2 # Código de error de uso.
+    tarea, error = validar_tarea({"titulo": args.title, "fecha": fecha, "contenido": args.content, # Valida los datos.
+                                  "etiquetas": args.tag, "prioridad": args.priority})
+    if error: # Si no son válidos.
+        print(f"Error: {error}", file=sys.stderr) # Informa del error.
+        return 2 # Código de error de uso.
+    registro = almacenamiento.almacen_tareas.agregar(args.user, tarea) # Añade la tarea.
+    print(registro["id"]) # Escribe el id asignado, útil en scripts.
+    return 0 # Éxito.
+
+
+def tareas_completar(args):
+    """tasks done / tasks reopen: marca tareas como completadas o las vuelve a abrir.""" # Docstring que describe la función.
+    desconocidos = [i for i in args.ids if almacenamiento.almacen_tareas.obtener(args.user, i) is None] # Ids que no existen.
+    if desconocidos: # Si alguno no existe.
+        print(f"Error: no existen las tareas {', '.join(map(str, desconocidos))}", file=sys.stderr) # Informa del error.
+        return 1 # Código de error.
+    cambiadas = almacenamiento.completar_tareas(args.user, args.ids, args.completada) # Cambia el estado en una transacción.
+    print(f"Tareas cambiadas: {cambiadas}", file=sys.stderr) # Informa (las que ya estaban en ese estado no cuentan).
+    return 0 # Éxito.
+
+
+def tareas_estadisticas(args):
+    """tasks stats: escribe el número de tareas abiertas y completadas, leído de los contadores del índice de estado.""" # Docstring que describe la función.
+    from indices import indice_estado # Índice de completadas.
+    estado = indice_estado(almacenamiento.almacen_tareas, args.user) # Contadores del usuario.
+    _imprimir([{"abiertas": estado.abiertas, "completadas": estado.completadas}], args.format, ("abiertas", "completadas")) # Los escribe.
+    return 0 # Éxito.
+
+
+def tareas_recordar(args):
+    """tasks remind: escribe los recordatorios pendientes (con --catch-up, también los perdidos desde el último barrido) y los anota como entregados.""" # Docstring que describe la función.
+    from recordatorios import registro_recordatorios, barrer, texto_recordatorio # Registro de recordatorios (solo lo necesita este comando).
+    hoy = _interpretar_fecha(args.today) if args.today else None # Fecha de referencia (útil en pruebas).
+    entregas = barrer(registro_recordatorios, args.user, hoy, recuperar=args.catch_up, anotar=not args.peek) # Barrido de la ventana de avisos.
+    _imprimir([{"id": t["id"], "fecha": t["fecha"], "aviso": texto_recordatorio(t, a)[0]} for t, a in entregas], args.format, ("id", "fecha", "aviso")) # Los escribe.
+    return 0 # Éxito.
+
+
+def tareas_importar(args):
+    """tasks import: importa tareas de un archivo CSV, iCalendar o JSON Lines, en flujo y en escrituras por tandas.""" # Docstring que describe la función.
+    import intercambio # Importación y exportación (solo la necesitan estos comandos).
+    formato = intercambio.detectar_formato(args.archivo, args.format) # Formato indicado o deducido de la extensión.
+    entrada = sys.stdin if args.archivo == "-" else open(args.archivo, 'r', encoding="utf-8-sig", newline="") # Archivo o entrada estándar (sin BOM).
+    al_error = lambda numero, motivo: print(f"Línea {numero}: {motivo}", file=sys.stderr) # Informa de cada registro rechazado y sigue.
+    with entrada: # Cierra el archivo al terminar.
+        try: # La cabecera CSV puede no ser válida.
+            importadas, errores = intercambio.importar_tareas(almacenamiento.almacen_tareas, args.user, entrada, formato, # Importa en flujo.
+                                                              procesos=args.workers, tamano_bloque=args.batch, al_error=al_error)
+        except ValueError as e: # Archivo sin el formato esperado.
+            print(f"Error: {e}", file=sys.stderr) # Informa del error.
+            return 2 # Código de error de uso.
+    print(f"Importadas: {importadas}, con errores: {errores}", file=sys.stderr) # Resumen.
+    return 1 if errores else 0 # Código 1 si algún registro se rechazó.
+
+
+def tareas_exportar(args):
+    """tasks export: escribe las tareas (filtradas por --due) en CSV, iCalendar o JSON Lines.""" # Docstring que describe la función.
+    import intercambio # Importación y exportación.
+    from indices import indice_fechas # Índice por fecha.
+    formato = intercambio.detectar_formato(args.output or "", args.format) # Formato indicado o deducido de la extensión.
+    desde, hasta = _rango_vencimiento(args.due) # Límites del filtro.
+    ids = indice_fechas(almacenamiento.almacen_tareas, args.user).rango(desde, hasta) # Ids en el rango, ordenados por fecha.
+    tareas = (almacenamiento.almacen_tareas.obtener(args.user, i) for i in ids) # Tareas, una a una.
+    salida = open(args.output, 'w', encoding="utf-8", newline="") if args.output else sys.stdout # Archivo o salida estándar.
+    try: # Cierra el archivo al terminar.
+        total = intercambio.exportar_tareas(args.user, tareas, salida, formato) # Escribe las tareas en flujo.
+    finally: # Siempre.
+        if salida is not sys.stdout: # Solo los archivos abiertos aquí.
+            salida.close() # Cierra el archivo.
+    print(f"Exportadas: {total}", file=sys.stderr) # Resumen.
+    return 0 # Éxito.
+
+
+# --- Comandos de notas ---
+def notas_listar(args):
+    """notes list: lista las notas del usuario (solo metadatos, sin leer los cuerpos).""" # Docstring que describe la función.
+    _imprimir(almacenamiento.almacen_notas.del_usuario(args.user), args.format, ("id", "titulo")) # Las escribe.
+    return 0 # Éxito.
+
+
+def notas_agregar(args):
+    """notes add: añade una nota con el contenido de --content, de --file o de la entrada estándar (--file -).""" # Docstring que describe la función.
+    contenido = args.content or "" # Contenido indicado en la línea de comandos.
+    if args.file: # Si se indicó un archivo.
+        with (sys.stdin if args.file == "-" else open(args.file, 'r', encoding="utf-8")) as f: # Archivo o entrada estándar.
+            contenido = f.read() # Lee el contenido completo.
+    if not args.title.strip(): # El título es obligatorio, como en la aplicación gráfica.
+        print("Error: el título no puede estar vacío", file=sys.stderr) # Informa del error.
+        return 2 # Código de error de uso.
+    registro = almacenamiento.almacen_notas.agregar(args.user, {"titulo": args.title.strip(), "contenido": contenido}) # Añade la nota.
+    print(registro["id"]) # Escribe el id asignado.
+    return 0 # Éxito.
+
+
+def notas_mostrar(args):
+    """notes show: escribe el contenido de una nota.""" # Docstring que describe la función.
+    if almacenamiento.almacen_notas.obtener(args.user, args.id) is None: # Si la nota no existe.
+        print(f"Error: no existe la nota {args.id}", file=sys.stderr) # Informa del error.
+        return 1 # Código de error.
+    sys.stdout.write(almacenamiento.almacen_notas.contenido(args.user, args.id)) # Escribe el cuerpo.
+    return 0 # Éxito.
+
+
+# --- Credenciales ---
+def calibrar_credenciales(args):
+    """auth benchmark: mide el coste de derivar contraseñas en esta máquina y, con --save, guarda el que alcanza --target-ms.""" # Docstring que describe la función.
+    import credenciales # Solo lo necesita este comando.
+    directorio = credenciales.directorio_usuarios # Directorio de usuarios.
+    directorio.carpeta_datos = args.data # Carpeta de datos indicada.
+    print(f"Coste actual: {json.dumps(directorio.coste())} ({credenciales.medir_coste(directorio.coste()):.0f} ms)") # Latencia de inicio de sesión actual.
+    coste, ms = credenciales.calibrar(args.target_ms, lambda c, t: print(f"  {json.dumps(c)}: {t:.0f} ms")) # Mide costes crecientes.
+    print(f"Coste elegido: {json.dumps(coste)} ({ms:.0f} ms)") # Resultado.
+    if args.save: # Si se pide guardarlo.
+        directorio.fijar_coste(coste) # Las contraseñas se vuelven a derivar con él en el siguiente inicio de sesión de cada usuario.
+        print("Guardado.", file=sys.stderr) # Confirmación.
+    return 0 # Éxito.
+
+
+# --- Migraciones ---
+def migrar_datos(args):
+    """migrate: aplica las migraciones pendientes de los archivos de datos (con --status, solo las lista).""" # Docstring que describe la función.
+    import migraciones # Solo lo necesita este comando.
+    pendientes = migraciones.pendientes(args.data) # Archivos con pasos pendientes.
+    if args.status: # Solo informar.
+        for archivo, version in migraciones.versiones(args.data).items(): # Todos los archivos conocidos.
+            final = migraciones.MIGRACIONES[archivo][-1]["version"] # Versión final.
+            print(f"{archivo}\tv{version}\t{'pendiente: v' + str(final) if archivo in pendientes else 'al día'}") # Estado.
+        return 1 if pendientes else 0 # Útil en scripts.
+
+    def al_progreso(archivo, fase, leidos, total, registros, apartados): # Progreso en la salida de errores.
+        porcentaje = 100 * leidos / total if total else 100 # Porcentaje del archivo.
+        print(f"\r{archivo}: {fase} {porcentaje:5.1f}% ({registros} registros, {apartados} en cuarentena)", end="\n" if fase == "terminado" else "", file=sys.stderr, flush=True) # Una línea que se reescribe.
+
+    for archivo, resumen in migraciones.migrar_todo(args.data, al_progreso, args.batch).items(): # Migra uno tras otro.
+        if resumen["apartados"]: # Si se apartó algún registro.
+            print(f"{archivo}: {resumen['apartados']} registros en {os.path.join(args.data, 'cuarentena')}", file=sys.stderr) # Dónde revisarlos.
+    return 0 # Éxito.
+
+
+# --- Copias de seguridad ---
+def copia_crear(args):
+    """backup create: copia incremental de la carpeta de datos (solo se guardan los trozos nuevos).""" # Docstring que describe la función.
+    from copias import Copias # Solo lo necesitan estos comandos.
+    e = Copias(args.repo).crear(args.data) # Crea la copia.
+    print(e["instantanea"]) # Nombre de la copia, útil en scripts.
+    print(f"{e['trozos_nuevos']} trozos nuevos ({e['bytes_nuevos'] / 1024:.1f} KiB); {e['archivos_leidos']} archivos leídos, {e['archivos_reutilizados']} sin cambios", file=sys.stderr) # Resumen.
+    return 0 # Éxito.
+
+
+def copia_listar(args):
+    """backup list: lista las copias, de la más antigua a la más reciente.""" # Docstring que describe la función.
+    from copias import Copias # Solo lo necesitan estos comandos.
+    for nombre in Copias(args.repo).instantaneas(): # Recorre las copias.
+        print(nombre) # Una por línea.
+    return 0 # Éxito.
+
+
+def copia_restaurar(args):
+    """backup restore: devuelve la carpeta de datos (o, con --only-user, las tareas y notas de un usuario) al estado de una copia.""" # Docstring que describe la función.
+    from copias import Copias # Solo lo necesitan estos comandos.
+    copias = Copias(args.repo) # Repositorio.
+    if args.only_user is not None: # Solo un usuario.
+        copias.restaurar_usuario(args.data, args.only_user, args.snapshot) # Sus tareas, notas, cuerpos e histórico.
+    else: # Todo.
+        copias.restaurar(args.data, args.snapshot) # Carpeta completa.
+    return 0 # Éxito.
+
+
+# --- Informes ---
+def informe_generar(args):
+    """report: genera el informe HTML (y, con --pdf, el PDF si hay conversor) de la semana de --week.""" # Docstring que describe la función.
+    import informes # Solo lo necesita este comando.
+    try: # La fecha puede no ser válida.
+        desde, hasta = informes.semana(_interpretar_fecha(args.week) if args.week else None) # Lunes a lunes siguiente.
+    except ValueError: # Fecha mal escrita.
+        print(f"Fecha no válida: {args.week} (usa today, tomorrow o aaaa-mm-dd)", file=sys.stderr) # Error.
+        return 2 # Código de error de uso.
+    ruta, ruta_pdf = informes.generar_informe(args.user, desde, hasta, args.output, not args.no_notes, args.pdf) # Genera el informe.
+    print(ruta) # Ruta del HTML, útil en scripts.
+    if ruta_pdf: # Si se generó el PDF.
+        print(ruta_pdf) # Su ruta.
+    elif args.pdf: # Se pidió pero no se pudo.
+        print("No se generó el PDF: no hay wkhtmltopdf, WeasyPrint ni Chromium instalados, o la conversión falló.", file=sys.stderr) # Aviso.
+        return 1 # El HTML sí está.
+    return 0 # Éxito.
+
+
+# --- Presupuesto de arranque ---
+def diagnosticar_memoria(args):
+    """diag memory: repite las operaciones de las pantallas sobre una carpeta temporal y falla si la memoria no deja de crecer.""" # Docstring que describe la función.
+    from diagnostico import prueba_fugas # Prueba de fugas con tracemalloc (solo la necesita este comando).
+    return 0 if prueba_fugas(args.iterations, args.tolerance_kb, args.top) else 1 # Código 0 si la memoria se estabiliza.
+
+
+def diagnosticar_rendimiento(args):
+    """diag perf: repite sesiones completas sobre una carpeta temporal y falla si algún paso o la memoria empeoran respecto a la base dos veces seguidas.""" # Docstring que describe la función.
+    import rendimiento # Puerta de rendimiento (solo la necesita este comando).
+    correcto = rendimiento.puerta_rendimiento(args.baseline or rendimiento.RUTA_BASE, args.update, args.threshold, args.memory_threshold, args.slack_ms, # Base y umbrales.
+                                              sesiones=args.sessions, tareas=args.tasks, notas=args.notes, semilla=args.seed) # Carga.
+    return 0 if correcto else 1 # Código 0 si no hay regresiones.
+
+
+def medir_importacion(args):
+    """import-time: importa la línea de comandos en varios procesos nuevos y compara la mediana con el presupuesto.""" # Docstring que describe la función.
+    import statistics # Solo lo necesita este comando.
+    import subprocess # Solo lo necesita este comando.
+    carpeta = os.path.dirname(os.path.abspath(__file__)) # Carpeta de este módulo.
+    codigo = f"import sys, eduplanner; print(','.join(m for m in {MODULOS_PROHIBIDOS!r} if m in sys.modules))" # Importa y lista los módulos prohibidos cargados.
+    tiempos, prohibidos = [], set() # Milisegundos de cada ejecución y módulos gráficos vistos en alguna.
+    for _ in range(max(1, args.runs)): # Una medida suelta depende demasiado de la carga de la máquina.
+        proceso = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo], cwd=carpeta, capture_output=True, text=True) # Proceso limpio.
+        if proceso.returncode != 0: # Si la importación falló.
+            print(proceso.stderr.strip().splitlines()[-1] if proceso.stderr.strip() else "La importación falló.", file=sys.stderr) # Último renglón del error.
+            return 1 # Sin tiempo que comparar.
+        for linea in proceso.stderr.splitlines(): # Informe de -X importtime: "import time: propio | acumulado | módulo".
+            partes = linea.split("|") # Separa las columnas.
+            if len(partes) == 3 and partes[2].strip() == "eduplanner": # Línea del propio módulo (su acumulado incluye todas sus dependencias).
+                tiempos.append(int(partes[1]) / 1000) # Tiempo acumulado, en milisegundos.
+        prohibidos.update(m for m in proceso.stdout.strip().split(",") if m) # Módulos gráficos que se llegaron a cargar.
+    if not tiempos: # Si -X importtime no informó del módulo.
+        print("No se pudo medir la importación de eduplanner.", file=sys.stderr) # Aviso.
+        return 1 # Sin tiempo que comparar.
+    mediana = statistics.median(tiempos) # Valor típico, insensible a una ejecución lenta aislada.
+    print(f"Importar eduplanner: mediana {mediana:.1f} ms en {len(tiempos)} procesos (mín. {min(tiempos):.1f}, máx. {max(tiempos):.1f}; presupuesto {args.budget_ms} ms)") # Informe del tiempo.
+    if prohibidos: # Si se cargó algún módulo gráfico.
+        print(f"Módulos gráficos cargados: {', '.join(sorted(prohibidos))}") # Informe de la infracción.
+    return 0 if mediana <= args.budget_ms and not prohibidos else 1 # Falla si la mediana se excede.
+
+
+def crear_parser():
+    """Construye el intérprete de argumentos con sus subcomandos.""" # Docstring que describe la función.
+    parser = argparse.ArgumentParser(prog="eduplanner", description="Tareas y notas de EduPlanner desde la línea de comandos.") # Intérprete principal.
+    parser.add_argument("-u", "--user", default=os.environ.get("EDUPLANNER_USER"), help="usuario (por defecto, $EDUPLANNER_USER)") # Usuario.
+    parser.add_argument("--data", default=os.environ.get("EDUPLANNER_DATA", CARPETA_DATOS), help="carpeta de datos (por defecto, la de la aplicación)") # Carpeta de datos.
+    grupos = parser.add_subparsers(dest="grupo", required=True) # Grupos de comandos.
+
+    tareas = grupos.add_parser("tasks", help="tareas").add_subparsers(dest="accion", required=True) # Comandos de tareas.
+    p = tareas.add_parser("list", help="lista tareas por fecha") # tasks list.
+    p.add_argument("--due", default="all", help="all, overdue, today, tomorrow, week o una fecha aaaa-mm-dd") # Filtro por vencimiento.
+    p.add_argument("--format", choices=("text", "json"), default="text") # Formato de salida.
+    p.add_argument("--tag", action="append", default=[], help="solo las tareas con esta etiqueta (se puede repetir)") # Etiquetas.
+    p.add_argument("--priority", choices=almacenamiento.PRIORIDADES, help="solo las tareas con esta prioridad") # Prioridad.
+    p.add_argument("--archived", action="store_true", help="incluye las tareas archivadas del rango (sin filtrar por etiqueta ni prioridad)") # Histórico.
+    p.add_argument("--all", action="store_true", help="incluye las tareas completadas") # Completadas.
+    p.set_defaults(funcion=tareas_listar) # Función que lo ejecuta.
+    p = tareas.add_parser("query", help="consulta con condiciones campo__operador=valor") # tasks query.
+    p.add_argument("--where", action="append", default=[], metavar="CAMPO__OP=VALOR", help="condición (se puede repetir); operadores: eq, ne, lt, lte, gt, gte, between, in, contains, prefix, has; varios valores separados por comas") # Condiciones.
+    p.add_argument("--order", metavar="CAMPO", help="campo por el que ordenar") # Orden.
+    p.add_argument("--desc", action="store_true", help="orden descendente") # Sentido.
+    p.add_argument("--limit", type=int, help="número máximo de resultados") # Límite.
+    p.add_argument("--notes", action="store_true", help="consulta las notas en lugar de las tareas") # Colección.
+    p.add_argument("--explain", action="store_true", help="muestra el plan (índices, filtros, candidatos) sin ejecutar la consulta") # Plan.
+    p.add_argument("--format", choices=("text", "json"), default="text") # Formato de salida.
+    p.set_defaults(funcion=tareas_consultar) # Función que lo ejecuta.
+    p = tareas.add_parser("search", help="busca tareas por título") # tasks search.
+    p.add_argument("texto", help="inicio de alguna palabra del título") # Texto buscado.
+    p.add_argument("--format", choices=("text", "json"), default="text") # Formato de salida.
+    p.add_argument("--archived", action="store_true", help="busca también en las tareas archivadas") # Histórico.
+    p.set_defaults(funcion=tareas_buscar) # Función que lo ejecuta.
+    p = tareas.add_parser("archive", help="archiva las tareas vencidas hace tiempo") # tasks archive.
+    p.add_argument("--days", type=int, default=180, help="días desde la fecha de entrega (por defecto, 180)") # Antigüedad.
+    p.set_defaults(funcion=tareas_archivar) # Función que lo ejecuta.
+    p = tareas.add_parser("add", help="añade una tarea") # tasks add.
+    p.add_argument("--title", required=True) # Título.
+    p.add_argument("--date", default="", help="fecha de entrega: today, tomorrow o aaaa-mm-dd") # Fecha.
+    p.add_argument("--content", default="") # Contenido.
+    p.add_argument("--tag", action="append", default=[], help="etiqueta (se puede repetir)") # Etiquetas.
+    p.add_argument("--priority", choices=almacenamiento.PRIORIDADES, default=almacenamiento.PRIORIDAD_POR_DEFECTO) # Prioridad.
+    p.set_defaults(funcion=tareas_agregar) # Función que lo ejecuta.
+    p = tareas.add_parser("done", help="marca tareas como completadas") # tasks done.
+    p.add_argument("ids", type=int, nargs="+", help="ids de las tareas") # Tareas.
+    p.set_defaults(funcion=tareas_completar, completada=True) # Función que lo ejecuta.
+    p = tareas.add_parser("reopen", help="vuelve a abrir tareas completadas") # tasks reopen.
+    p.add_argument("ids", type=int, nargs="+", help="ids de las tareas") # Tareas.
+    p.set_defaults(funcion=tareas_completar, completada=False) # Función que lo ejecuta.
+    p = tareas.add_parser("stats", help="número de tareas abiertas y completadas") # tasks stats.
+    p.add_argument("--format", choices=("text", "json"), default="text") # Formato de salida.
+    p.set_defaults(funcion=tareas_estadisticas) # Función que lo ejecuta.
+    p = tareas.add_parser("remind", help="recordatorios pendientes de entregar") # tasks remind.
+    p.add_argument("--catch-up", action="store_true", help="recupera también los perdidos desde el último barrido") # Recuperación.
+    p.add_argument("--peek", action="store_true", help="solo los muestra, sin anotarlos como entregados") # Sin anotar.
+    p.add_argument("--today", default=None, help="fecha de referencia aaaa-mm-dd (por defecto, hoy)") # Fecha de referencia.
+    p.add_argument("--format", choices=("text", "json"), default="text") # Formato de salida.
+    p.set_defaults(funcion=tareas_recordar) # Función que lo ejecuta.
+    p = tareas.add_parser("import", help="importa tareas de un archivo CSV, iCalendar o JSON Lines") # tasks import.
+    p.add_argument("archivo", help="archivo a importar, o - para la entrada estándar") # Archivo.
+    p.add_argument("--format", choices=("csv", "ics", "jsonl"), help="formato (por defecto, según la extensión)") # Formato.
+    p.add_argument("--workers", type=int, default=1, help="procesos que interpretan el archivo; solo compensa con varios núcleos y archivos enormes de formato costoso, porque la escritura de tareas.json no se reparte (por defecto, 1)") # Procesos.
+    p.add_argument("--batch", type=int, default=2000, help="registros por bloque") # Tamaño de bloque.
+    p.set_defaults(funcion=tareas_importar) # Función que lo ejecuta.
+    p = tareas.add_parser("export", help="exporta tareas a CSV, iCalendar o JSON Lines") # tasks export.
+    p.add_argument("-o", "--output", help="archivo de destino (por defecto, la salida estándar)") # Destino.
+    p.add_argument("--format", choices=("csv", "ics", "jsonl"), help="formato (por defecto, según la extensión)") # Formato.
+    p.add_argument("--due", default="all", help="all, overdue, today, tomorrow, week o una fecha aaaa-mm-dd") # Filtro por vencimiento.
+    p.set_defaults(funcion=tareas_exportar) # Función que lo ejecuta.
+
+    notas = grupos.add_parser("notes", help="notas").add_subparsers(dest="accion", required=True) # Comandos de notas.
+    p = notas.add_parser("list", help="lista las notas") # notes list.
+    p.add_argument("--format", choices=("text", "json"), default="text") # Formato de salida.
+    p.set_defaults(funcion=notas_listar) # Función que lo ejecuta.
+    p = notas.add_parser("add", help="añade una nota") # notes add.
+    p.add_argument("--title", required=True) # Título.
+    p.add_argument("--content", default="") # Contenido en línea.
+    p.add_argument("--file", help="archivo con el contenido, o - para la entrada estándar") # Contenido desde archivo.
+    p.set_defaults(funcion=notas_agregar) # Función que lo ejecuta.
+    p = notas.add_parser("show", help="muestra el contenido de una nota") # notes show.
+    p.add_argument("id", type=int) # Id de la nota.
+    p.set_defaults(funcion=notas_mostrar) # Función que lo ejecuta.
+
+    auth = grupos.add_parser("auth", help="credenciales").add_subparsers(dest="accion", required=True) # Comandos de credenciales.
+    p = auth.add_parser("benchmark", help="mide y ajusta el coste de derivar contraseñas") # auth benchmark.
+    p.add_argument("--target-ms", type=int, default=250, help="tiempo de derivación buscado (por defecto, 250 ms)") # Objetivo.
+    p.add_argument("--save", action="store_true", help="guarda el coste elegido para las contraseñas nuevas y migradas") # Guardar.
+    p.set_defaults(funcion=calibrar_credenciales, sin_usuario=True) # No necesita usuario.
+
+    copia = grupos.add_parser("backup", help="copias de seguridad").add_subparsers(dest="accion", required=True) # Comandos de copias.
+    for nombre, ayuda, funcion in (("create", "crea una copia incremental", copia_crear), ("list", "lista las copias", copia_listar), # Subcomandos.
+                                   ("restore", "restaura una copia", copia_restaurar)):
+        p = copia.add_parser(nombre, help=ayuda) # backup <nombre>.
+        p.add_argument("--repo", default=os.environ.get("EDUPLANNER_BACKUPS", "copias"), help="carpeta de las copias (por defecto, $EDUPLANNER_BACKUPS o copias)") # Repositorio.
+        p.set_defaults(funcion=funcion, sin_usuario=True) # No necesita usuario.
+    p.add_argument("snapshot", nargs="?", help="copia a restaurar (por defecto, la más reciente)") # Copia.
+    p.add_argument("--only-user", help="restaura solo las tareas y notas de este usuario") # Un usuario.
+
+    p = grupos.add_parser("report", help="informe imprimible de una semana de tareas y notas") # report.
+    p.add_argument("--week", default=None, help="cualquier día de la semana, aaaa-mm-dd (por defecto, la actual)") # Semana.
+    p.add_argument("-o", "--output", default=None, help="archivo HTML (por defecto, informes/informe_<usuario>_<lunes>.html)") # Destino.
+    p.add_argument("--pdf", action="store_true", help="genera también el PDF con el conversor instalado") # PDF.
+    p.add_argument("--no-notes", action="store_true", help="no incluye las notas") # Sin notas.
+    p.set_defaults(funcion=informe_generar) # Función que lo ejecuta.
+
+    p = grupos.add_parser("migrate", help="actualiza el formato de los archivos de datos") # migrate.
+    p.add_argument("--status", action="store_true", help="solo muestra la versión de cada archivo") # Solo informar.
+    p.add_argument("--batch", type=int, default=5000, help="registros entre dos puntos de control") # Tamaño de tanda.
+    p.set_defaults(funcion=migrar_datos, sin_usuario=True) # No necesita usuario.
+
+    diag = grupos.add_parser("diag", help="diagnósticos").add_subparsers(dest="accion", required=True) # Comandos de diagnóstico.
+    p = diag.add_parser("memory", help="prueba de fugas de memoria sobre la capa de servicio") # diag memory.
+    p.add_argument("--iterations", type=int, default=2000, help="vueltas de alta, consulta, edición y baja (por defecto, 2000)") # Vueltas.
+    p.add_argument("--tolerance-kb", type=int, default=64, help="crecimiento máximo tras el calentamiento (por defecto, 64 KiB)") # Tolerancia.
+    p.add_argument("--top", type=int, default=10, help="líneas de código que más crecen a mostrar") # Informe.
+    p.set_defaults(funcion=diagnosticar_memoria, sin_usuario=True) # Usa su propia carpeta temporal.
+    p = diag.add_parser("perf", help="puerta de rendimiento: sesiones completas comparadas con una base") # diag perf.
+    p.add_argument("--baseline", help="archivo JSON de la base (por defecto, rendimiento_base.json junto al programa)") # Base.
+    p.add_argument("--update", action="store_true", help="guarda esta ejecución como nueva base") # Actualizar la base.
+    p.add_argument("--sessions", type=int, default=30, help="sesiones medidas (por defecto, 30)") # Sesiones.
+    p.add_argument("--tasks", type=int, default=5000, help="tareas sembradas por usuario (por defecto, 5000)") # Tareas.
+    p.add_argument("--notes", type=int, default=200, help="notas sembradas por usuario (por defecto, 200)") # Notas.
+    p.add_argument("--seed", type=int, default=1, help="semilla de los datos y operaciones") # Semilla.
+    p.add_argument("--threshold", type=float, default=0.25, help="empeoramiento máximo de la mediana de cada paso (por defecto, 0.25 = 25%%)") # Umbral de tiempo.
+    p.add_argument("--memory-threshold", type=float, default=0.2, help="empeoramiento máximo del pico de memoria (por defecto, 0.2)") # Umbral de memoria.
+    p.add_argument("--slack-ms", type=float, default=1.0, help="margen absoluto mínimo por paso, en ms (por defecto, 1; si el ruido del paso en la base es mayor, se usa ese)") # Holgura.
+    p.set_defaults(funcion=diagnosticar_rendimiento, sin_usuario=True) # Usa su propia carpeta temporal.
+
+    p = grupos.add_parser("import-time", help="comprueba el tiempo de arranque de la línea de comandos") # import-time.
+    p.add_argument("--budget-ms", type=float, default=PRESUPUESTO_IMPORTACION_MS) # Presupuesto en milisegundos.
+    p.add_argument("--runs", type=int, default=7, help="procesos nuevos que se miden; se compara la mediana (por defecto, 7)") # Repeticiones.
+    p.set_defaults(funcion=medir_importacion, sin_usuario=True) # No necesita usuario ni datos.
+    return parser # Devuelve el intérprete.
+
+
+def main(argv=None):
+    """Punto de entrada: interpreta los argumentos, ejecuta el comando y escribe los cambios pendientes.""" # Docstring que describe la función.
+    parser = crear_parser() # Intérprete de argumentos.
+    args = parser.parse_args(argv) # Interpreta los argumentos.
+    if not getattr(args, "sin_usuario", False): # Los comandos de datos necesitan usuario.
+        if args.user is None: # Si no se indicó.
+            parser.error("indica el usuario con -u/--user o $EDUPLANNER_USER") # Termina con un error de uso.
+        almacenamiento.usar_carpeta_datos(args.data) # Apunta las colecciones a la carpeta de datos.
+    try: # Ejecuta el comando.
+        return args.funcion(args) # Código de salida del comando.
+    except BrokenPipeError: # El programa que leía la salida terminó antes (p. ej. "| head").
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno()) # Lo que quede por escribir va a /dev/null, sin otro error al cerrar.
+        return 1 # Salida interrumpida, sin traza.
+    finally: # Siempre.
+        almacenamiento.vaciar_todo() # Escribe los cambios antes de salir, sin esperar al guardado agrupado.
+
+
+if __name__ == "__main__": # Solo al ejecutar el módulo directamente.
+    sys.exit(main()) # Devuelve el código de salida al sistema.
@@ -0,0 +1,325 @@
+import tkinter as tk # Importa el módulo tkinter, que es la biblioteca estándar de Python para crear interfaces gráficas de usuario (GUI).
+from tkinter import font as tkfont # Importa el submódulo font de tkinter, que permite crear fuentes con nombre compartidas entre widgets.
+from PIL import Image, ImageTk # Importa Pillow para abrir, redimensionar y convertir las imágenes de fondo e iconos.
+
+from diagnostico import diagnostico_memoria # Importa el diagnóstico de memoria, que mide al abrir y cerrar cada ventana (si está activado).
+
+# --- Colores comunes de la aplicación ---
+COLOR_FONDO = "#F8F8F8" # Fondo gris muy claro de ventanas y tarjetas.
+COLOR_ENCABEZADO = "#E0E0E0" # Fondo gris claro de los encabezados.
+COLOR_TITULO = "#333333" # Color del texto de los encabezados.
+COLOR_ETIQUETA = "#555555" # Color del texto de las etiquetas de los campos.
+COLOR_BORDE = "#CCCCCC" # Color del borde sutil de campos y listas.
+COLOR_SELECCION = "#B0E0E6" # Fondo de la fila seleccionada en las listas.
+
+# --- Colores de los botones ---
+AZUL = "#3498DB" # Botones de acción principal (ver, guardar cambios, iniciar sesión).
+VERDE = "#4CAF50" # Botones de guardar un registro nuevo.
+VERDE_REGISTRO = "#2ECC71" # Botón de registrar usuario.
+ROJO = "#E74C3C" # Botones de eliminar y salir.
+
+# --- Fuentes con nombre: (familia, tamaño, peso) ---
+FUENTES = {
+    "titulo_app": ("Helvetica", 56, "bold"), # Título grande de las pantallas completas.
+    "encabezado": ("Helvetica", 16, "bold"), # Encabezado de ventanas y tarjetas.
+    "boton": ("Helvetica", 12, "bold"), # Texto de los botones estilizados.
+    "etiqueta": ("Helvetica", 12, "bold"), # Etiquetas de los campos.
+    "campo": ("Helvetica", 12, "normal"), # Texto de los campos de entrada.
+    "lista": ("Helvetica", 11, "normal"), # Filas de las listas.
+    "ayuda": ("Helvetica", 9, "normal"), # Mensajes de ayuda pequeños.
+    "boton_barra": ("Helvetica", 14, "bold"), # Botones de la barra superior (Salir, Cerrar Sesión).
+    "boton_pequeno": ("Helvetica", 10, "normal"), # Botones pequeños.
+    "icono": ("Helvetica", 28, "normal"), # Emoji usado como icono de respaldo.
+}
+
+
+def _oscurecer(hex_color, amount):
+    """Oscurece un color hexadecimal restando una cantidad a cada componente RGB.""" # Docstring que describe la función.
+    hex_color = hex_color.lstrip('#') # Elimina el carácter '#' del inicio del string hexadecimal.
+    rgb = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4)) # Convierte el color hexadecimal a una tupla RGB.
+    r, g, b = (max(0, c - amount) for c in rgb) # Resta la cantidad a cada componente sin bajar de 0.
+    return f'#{r:02x}{g:02x}{b:02x}' # Devuelve el color oscurecido en formato hexadecimal.
+
+
+class Tema: # Define el tema visual compartido: paletas precalculadas y fuentes con nombre.
+    def __init__(self, colores_botones=(AZUL, VERDE, VERDE_REGISTRO, ROJO)):
+        """
+        Inicializa el tema precalculando las paletas de los colores de botón conocidos.
+
+        Args:
+            colores_botones (iterable): Colores base cuyas variantes hover/pulsado se calculan de antemano.
+        """ # Docstring que describe el método y sus argumentos.
+        self._paletas = {} # Diccionario color -> (normal, hover, pulsado).
+        for color in colores_botones: # Recorre los colores de botón conocidos.
+            self.paleta(color) # Precalcula su paleta una sola vez.
+        self._fuentes = {} # Diccionario nombre -> tkfont.Font, creado al construir la primera ventana.
+
+    def paleta(self, color):
+        """Devuelve la tupla (normal, hover, pulsado) de un color, calculándola solo la primera vez.""" # Docstring que describe el método.
+        paleta = self._paletas.get(color) # Busca la paleta en la caché.
+        if paleta is None: # Si el color es nuevo.
+            paleta = (color, _oscurecer(color, 20), _oscurecer(color, 40)) # Calcula las variantes hover y pulsado.
+            self._paletas[color] = paleta # Guarda la paleta para los siguientes botones.
+        return paleta # Devuelve la paleta.
+
+    def fuente(self, nombre):
+        """
+        Devuelve la fuente con nombre indicada.
+        Todas las ventanas comparten el mismo objeto Font, así Tcl resuelve cada fuente una sola vez.
+        """ # Docstring que describe el método.
+        fuente = self._fuentes.get(nombre) # Busca la fuente ya creada.
+        if fuente is None: # Si es la primera vez que se pide (ya existe una ventana raíz en este punto).
+            familia, tamano, peso = FUENTES[nombre] # Obtiene la descripción de la fuente.
+            fuente = tkfont.Font(family=familia, size=tamano, weight=peso) # Crea el objeto Font de Tk.
+            self._fuentes[nombre] = fuente # Lo guarda para reutilizarlo en todos los widgets.
+        return fuente # Devuelve la fuente compartida.
+
+
+tema = Tema() # Instancia única del tema compartida por toda la aplicación.
+
+
+def centrar_ventana(win, width, height, redimensionable=False):
+    """Centra una ventana Toplevel o Tk en la pantalla.""" # Docstring que describe la función.
+    win.update_idletasks() # Procesa los eventos pendientes para que la geometría de la pantalla esté disponible.
+    x = (win.winfo_screenwidth() // 2) - (width // 2) # Calcula la coordenada X para centrar horizontalmente.
+    y = (win.winfo_screenheight() // 2) - (height // 2) # Calcula la coordenada Y para centrar verticalmente.
+    win.geometry(f'{width}x{height}+{x}+{y}') # Establece el tamaño y la posición de la ventana.
+    if not redimensionable: # Si la ventana debe tener tamaño fijo.
+        win.resizable(False, False) # Deshabilita el redimensionado.
+
+
+def crear_boton_estilizado(parent_frame, texto, comando, bg_color, fg_color, icon_char=None):
+    """
+    Crea un botón con un estilo plano y moderno, y un posible ícono de texto.
+    Los colores hover y pulsado salen de la paleta precalculada del tema.
+    """ # Docstring que describe la función.
+    normal, hover, pulsado = tema.paleta(bg_color) # Obtiene los tres colores del botón sin recalcularlos.
+    button_frame = tk.Frame(parent_frame, bg=normal, relief="flat", bd=0, cursor="hand2") # Contenedor del botón; el cursor de mano se fija una vez al crearlo.
+    button_frame.pack(pady=5, padx=5) # Empaqueta el Frame del botón con un pequeño margen.
+
+    label_text = f"{icon_char} {texto}" if icon_char else texto # Antepone el ícono al texto si se indicó.
+    button_label = tk.Label(button_frame, text=label_text, font=tema.fuente("boton"), bg=normal, fg=fg_color, padx=15, pady=8) # Label con el texto del botón y la fuente compartida.
+    button_label.pack(expand=True, fill="both") # El Label rellena todo el Frame.
+
+    def _pintar(color): # Cambia el fondo del botón completo.
+        button_frame.configure(bg=color) # Fondo del Frame.
+        button_label.configure(bg=color) # Fondo del Label.
+
+    for widget in (button_frame, button_label): # El Frame y el Label responden igual al ratón.
+        widget.bind("<Enter>", lambda e: _pintar(hover)) # Efecto hover al entrar el cursor.
+        widget.bind("<Leave>", lambda e: _pintar(normal)) # Restaura el color al salir el cursor.
+        widget.bind("<ButtonPress-1>", lambda e: _pintar(pulsado)) # Color de pulsado mientras se mantiene el clic.
+        widget.bind("<ButtonRelease-1>", lambda e: [_pintar(hover), comando()]) # Ejecuta el comando al soltar el clic.
+
+    return button_frame # Devuelve el Frame que contiene el botón estilizado.
+
+
+_imagenes = {} # Diccionario (ruta, ancho, alto) -> PhotoImage ya convertida, compartida por todas las pantallas.
+
+
+def cargar_imagen(ruta, tamano):
+    """
+    Devuelve la imagen de la ruta redimensionada a tamano (ancho, alto) como PhotoImage, convirtiéndola solo la primera vez.
+    Volver al menú o al login reutiliza la misma imagen de Tk en lugar de decodificar y crear otra en cada visita.
+    Lanza la excepción de Pillow si la imagen no se puede abrir.
+    """ # Docstring que describe la función.
+    clave = (ruta, *tamano) # Clave de la caché.
+    imagen = _imagenes.get(clave) # Busca la imagen ya convertida.
+    if imagen is None: # Primera vez.
+        with Image.open(ruta) as original: # Abre la imagen y cierra el archivo al terminar.
+            imagen = ImageTk.PhotoImage(original.resize(tamano, Image.Resampling.LANCZOS)) # Redimensiona con alta calidad y convierte para Tkinter.
+        _imagenes[clave] = imagen # La caché mantiene la referencia: ya no hace falta colgarla del Label.
+    return imagen # Devuelve la imagen.
+
+
+def crear_ventana_modal(titulo, encabezado, width, height, master=None):
+    """
+    Crea una ventana Toplevel modal, centrada y con el encabezado destacado de la aplicación.
+
+    Returns:
+        tuple: (ventana, frame de contenido) donde se colocan los campos y botones.
+    """ # Docstring que describe la función.
+    win = tk.Toplevel(master) # Crea la ventana de nivel superior.
+    win.title(titulo) # Establece el título de la ventana.
+    win.configure(bg=COLOR_FONDO) # Fondo gris muy claro.
+    win.transient(master or win.master) # La ventana se minimiza y cierra con su ventana maestra.
+    win.grab_set() # Hace la ventana modal.
+    centrar_ventana(win, width, height) # Centra la ventana en la pantalla.
+
+    crear_encabezado(win, encabezado).pack(fill="x", pady=(0, 15)) # Encabezado destacado con el título.
+
+    content_frame = tk.Frame(win, bg=COLOR_FONDO, padx=20, pady=10) # Frame para el contenido principal.
+    content_frame.pack(expand=True, fill="both") # El contenido ocupa el resto de la ventana.
+
+    win.protocol("WM_DELETE_WINDOW", lambda: [win.grab_release(), win.destroy()]) # Libera el grab al cerrar con la "X".
+    diagnostico_memoria.marcar(f"abrir {titulo}", win) # Instantánea de memoria al abrir la ventana (solo con el diagnóstico activado).
+    diagnostico_memoria.marcar_al_cerrar(win, f"cerrar {titulo}") # Y otra cuando se destruye, para ver qué quedó vivo.
+    return win, content_frame # Devuelve la ventana y su frame de contenido.
+
+
+def crear_encabezado(parent, texto, bg=COLOR_ENCABEZADO):
+    """Crea (sin empaquetar) el Frame de encabezado con su título.""" # Docstring que describe la función.
+    header_frame = tk.Frame(parent, bg=bg, padx=15, pady=10) # Frame del encabezado con fondo gris claro.
+    tk.Label(header_frame, text=texto, font=tema.fuente("encabezado"), fg=COLOR_TITULO, bg=bg).pack(anchor="w") # Título del encabezado.
+    return header_frame # Devuelve el encabezado para que el llamador elija cómo colocarlo.
+
+
+def crear_etiqueta(parent, texto, pady=(5, 2)):
+    """Crea y empaqueta la etiqueta de un campo.""" # Docstring que describe la función.
+    label = tk.Label(parent, text=texto, font=tema.fuente("etiqueta"), bg=parent["bg"], fg=COLOR_ETIQUETA) # Etiqueta con la fuente compartida.
+    label.pack(anchor="w", pady=pady) # Alineada a la izquierda.
+    return label # Devuelve la etiqueta.
+
+
+def crear_campo(parent, texto, valor="", **opciones):
+    """Crea una etiqueta y un campo de entrada (Entry) empaquetados; devuelve el Entry.""" # Docstring que describe la función.
+    crear_etiqueta(parent, texto) # Etiqueta del campo.
+    entry = tk.Entry(parent, font=tema.fuente("campo"), bd=1, relief="solid", # Campo de entrada con borde sólido.
+                     highlightbackground=COLOR_BORDE, highlightthickness=1, width=40, **opciones) # Borde sutil y ancho fijo.
+    if valor: # Si hay un valor inicial.
+        entry.insert(0, valor) # Lo inserta en el campo.
+    entry.pack(fill="x", padx=5, pady=(0, 10)) # Se expande horizontalmente.
+    return entry # Devuelve el Entry.
+
+
+def crear_area_texto(parent, texto, valor="", height=10):
+    """Crea una etiqueta y un área de texto multilínea empaquetadas; devuelve el Text.""" # Docstring que describe la función.
+    crear_etiqueta(parent, texto) # Etiqueta del área de texto.
+    text = tk.Text(parent, height=height, width=40, bd=1, relief="solid", # Campo de texto multilínea.
+                   highlightbackground=COLOR_BORDE, highlightthickness=1) # Borde sutil.
+    if valor: # Si hay un valor inicial.
+        text.insert("1.0", valor) # Lo inserta en el área de texto.
+    text.pack(fill="both", expand=True, padx=5, pady=(0, 15)) # Se expande en ambas direcciones.
+    return text # Devuelve el Text.
+
+
+def crear_selector(parent, texto, opciones, valor=None, al_cambiar=None):
+    """
+    Crea una etiqueta y un menú desplegable (OptionMenu) empaquetados; devuelve la StringVar con la opción elegida.
+    Si se indica al_cambiar, se llama con la nueva opción cada vez que el usuario elige una.
+    """ # Docstring que describe la función.
+    crear_etiqueta(parent, texto) # Etiqueta del selector.
+    variable = tk.StringVar(parent, value=valor or opciones[0]) # Opción elegida (la primera si no se indica otra).
+    menu = tk.OptionMenu(parent, variable, *opciones, command=al_cambiar) # Menú desplegable con las opciones.
+    menu.config(font=tema.fuente("campo"), bg=COLOR_FONDO, relief="solid", bd=1, highlightthickness=0) # Estilo de los campos de la aplicación.
+    menu.pack(anchor="w", padx=5, pady=(0, 10)) # Alineado a la izquierda, como el texto de los campos.
+    return variable # Devuelve la variable (su get() devuelve la opción, como el de un Entry).
+
+
+def crear_casilla(parent, texto, valor=False, al_cambiar=None):
+    """Crea una casilla de verificación empaquetada; devuelve su BooleanVar. al_cambiar() se llama al marcarla o desmarcarla.""" # Docstring que describe la función.
+    variable = tk.BooleanVar(parent, value=valor) # Estado de la casilla.
+    tk.Checkbutton(parent, text=texto, variable=variable, command=al_cambiar, font=tema.fuente("etiqueta"), # Casilla con la fuente de las etiquetas.
+                   bg=parent["bg"], fg=COLOR_ETIQUETA, activebackground=parent["bg"]).pack(anchor="w", padx=5, pady=(0, 10)) # Alineada a la izquierda.
+    return variable # Devuelve la variable.
+
+
+def crear_filtro(parent, texto, al_cambiar, retardo_ms=150):
+    """
+    Crea un campo de filtro que llama a al_cambiar(texto) cuando el usuario deja de escribir.
+    Las pulsaciones seguidas se agrupan con after(): solo se filtra una vez pasados retardo_ms sin teclear.
+    """ # Docstring que describe la función.
+    entry = crear_campo(parent, texto) # Campo de entrada con el estilo de la aplicación.
+    pendiente = [None] # Identificador del after() programado, si hay uno pendiente.
+
+    def _disparar(): # Se ejecuta cuando el usuario lleva retardo_ms sin escribir.
+        pendiente[0] = None # Ya no hay nada pendiente.
+        al_cambiar(entry.get()) # Aplica el filtro con el texto actual.
+
+    def _al_teclear(event): # Se ejecuta en cada pulsación.
+        if pendiente[0] is not None: # Si había un filtrado programado.
+            entry.after_cancel(pendiente[0]) # Lo cancela: el usuario sigue escribiendo.
+        pendiente[0] = entry.after(retardo_ms, _disparar) # Programa el filtrado para más tarde.
+
+    entry.bind("<KeyRelease>", _al_teclear) # Vigila las pulsaciones de teclado.
+    return entry # Devuelve el Entry.
+
+
+def crear_lista(parent, texto, height=15, **opciones):
+    """Crea una etiqueta y una Listbox con el estilo de la aplicación; devuelve la Listbox.""" # Docstring que describe la función.
+    crear_etiqueta(parent, texto) # Etiqueta de la lista.
+    lista = tk.Listbox(parent, width=60, height=height, font=tema.fuente("lista"), bd=1, relief="solid", # Listbox con la fuente compartida.
+                       highlightbackground=COLOR_BORDE, highlightthickness=1, selectbackground=COLOR_SELECCION, selectforeground="black", **opciones) # Estilo de selección.
+    lista.pack(fill="both", expand=True, padx=5, pady=(0, 10)) # Se expande en ambas direcciones.
+    return lista # Devuelve la Listbox.
+
+
+def crear_barra_acciones(parent, acciones):
+    """
+    Crea una fila de botones estilizados.
+
+    Args:
+        parent (tk.Widget): Contenedor de la barra.
+        acciones (list): Tuplas (texto, comando, color, icono).
+    """ # Docstring que describe la función y sus argumentos.
+    barra = tk.Frame(parent, bg=COLOR_FONDO) # Frame que agrupa los botones en horizontal.
+    barra.pack(pady=(0, 5)) # Empaqueta la barra.
+    for texto, comando, color, icono in acciones: # Recorre las acciones.
+        crear_boton_estilizado(barra, texto, comando, color, "white", icon_char=icono).pack_configure(side="left") # Coloca cada botón a la derecha del anterior.
+    return barra # Devuelve la barra.
+
+
+def sincronizar_lista(lista, registros, eventos, fila, tipo_eliminado):
+    """
+    Aplica a una Listbox (y a la lista de registros que refleja, fila a fila) un lote de eventos del bus.
+    Solo toca las filas afectadas: actualiza en su sitio, borra de abajo arriba y añade al final.
+
+    Args:
+        lista (tk.Listbox): Listbox a actualizar.
+        registros (list): Registros mostrados, en el orden de las filas (se modifica en su sitio).
+        eventos (list): Eventos recibidos desde la última sincronización, en orden.
+        fila (callable): Función registro -> texto de la fila.
+        tipo_eliminado (str): Tipo de evento de baja de la colección.
+    """ # Docstring que describe la función y sus argumentos.
+    ultimo = {} # Último evento de cada id: solo importa el estado final de cada registro.
+    for evento in eventos: # Recorre los eventos en orden.
+        ultimo[evento.id] = evento # Los posteriores sustituyen a los anteriores.
+    posiciones = {r["id"]: p for p, r in enumerate(registros)} # Fila de cada registro visible (un único recorrido).
+    borrar = [] # Filas a borrar.
+    for registro_id, evento in ultimo.items(): # Recorre el estado final de cada id afectado.
+        posicion = posiciones.get(registro_id) # Fila que lo muestra, si la hay.
+        if evento.tipo == tipo_eliminado: # El registro ya no existe.
+            if posicion is not None: # Si estaba a la vista.
+                borrar.append(posicion) # Se borrará su fila.
+        elif posicion is not None: # Registro visible modificado.
+            registros[posicion] = evento.registro # Sustituye el registro.
+            lista.delete(posicion) # Borra la fila anterior.
+            lista.insert(posicion, fila(evento.registro)) # Inserta la fila actualizada en la misma posición.
+        else: # Registro nuevo.
+            registros.append(evento.registro) # Lo añade al final.
+            lista.insert("end", fila(evento.registro)) # Añade su fila.
+    for posicion in sorted(borrar, reverse=True): # De abajo arriba, para que las posiciones pendientes no se desplacen.
+        registros.pop(posicion) # Quita el registro.
+        lista.delete(posicion) # Borra su fila.
+
+
+def esperar_futuro(widget, futuro, al_terminar, al_fallar, intervalo_ms=40):
+    """Consulta periódicamente un Future con after() y llama al callback correspondiente en el hilo de Tk.""" # Docstring que describe la función.
+    def _comprobar(): # Comprobación periódica.
+        if not widget.winfo_exists(): # Si la ventana se cerró mientras tanto.
+            return # Abandona la espera (el trabajo terminará igualmente en segundo plano).
+        if not futuro.done(): # Si el trabajo aún no terminó.
+            widget.after(intervalo_ms, _comprobar) # Vuelve a comprobar más tarde.
+            return # Sale de la función.
+        error = futuro.exception() # Obtiene la excepción del trabajo, si la hubo.
+        if error is not None: # Si el trabajo falló.
+            print(f"Error en tarea en segundo plano: {error}") # Imprime el error en la consola.
+            al_fallar(error) # Avisa al llamador.
+        else: # Si el trabajo terminó bien.
+            al_terminar(futuro.result()) # Entrega el resultado.
+    _comprobar() # Primera comprobación.
+
+
+def crear_tarjeta(parent, encabezado, width, height):
+    """
+    Crea una "tarjeta" centrada (Frame con borde sutil y encabezado) colocada con place().
+
+    Returns:
+        tuple: (frame de la tarjeta, frame de contenido).
+    """ # Docstring que describe la función.
+    card = tk.Frame(parent, bg=COLOR_FONDO, bd=0, relief="flat", highlightbackground="#d9d9d9", highlightthickness=2) # Frame de la tarjeta con borde sutil.
+    card.place(relx=0.5, rely=0.5, anchor="center", width=width, height=height) # Centrada en su contenedor.
+    crear_encabezado(card, encabezado).pack(fill="x", pady=(0, 15)) # Encabezado de la tarjeta.
+    content_frame = tk.Frame(card, bg=COLOR_FONDO, padx=20, pady=10) # Frame para campos y botones.
+    content_frame.pack(expand=True, fill="both") # El contenido ocupa el resto de la tarjeta.
+    return card, content_frame # Devuelve la tarjeta y su contenido.
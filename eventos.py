@@ -0,0 +1,114 @@
+import collections # Importa el módulo collections, que ofrece namedtuple para definir eventos ligeros e inmutables.
+
+# Un evento de cambio describe qué pasó (tipo), a quién (usuario), sobre qué registro (id) y con qué datos (registro).
+Evento = collections.namedtuple("Evento", ["tipo", "usuario", "id", "registro"]) # Tupla con nombre que representa un cambio en los datos.
+
+# --- Tipos de evento emitidos por la capa de almacenamiento ---
+TAREA_AGREGADA = "tarea_agregada" # Se añadió una tarea nueva.
+TAREA_ACTUALIZADA = "tarea_actualizada" # Se modificó una tarea existente.
+TAREA_ELIMINADA = "tarea_eliminada" # Se eliminó una tarea.
+NOTA_AGREGADA = "nota_agregada" # Se añadió una nota nueva.
+NOTA_ACTUALIZADA = "nota_actualizada" # Se modificó una nota existente.
+NOTA_ELIMINADA = "nota_eliminada" # Se eliminó una nota.
+
+EVENTOS_TAREAS = (TAREA_AGREGADA, TAREA_ACTUALIZADA, TAREA_ELIMINADA) # Agrupa los eventos de tareas para suscribirse a todos a la vez.
+EVENTOS_NOTAS = (NOTA_AGREGADA, NOTA_ACTUALIZADA, NOTA_ELIMINADA) # Agrupa los eventos de notas para suscribirse a todos a la vez.
+
+
+class BusCambios: # Define el bus de publicación/suscripción que reparte los cambios de datos dentro del proceso.
+    def __init__(self):
+        """Inicializa el bus sin suscriptores.""" # Docstring que describe el método.
+        self._suscriptores = [] # Lista de tuplas (callback, tipos, usuario) registradas en el bus.
+
+    def suscribir(self, callback, tipos=None, usuario=None, primero=False):
+        """
+        Registra un callback que recibirá los eventos publicados.
+
+        Args:
+            callback (function): Función que recibe un Evento.
+            tipos (iterable): Tipos de evento que interesan; None para todos.
+            usuario (str): Si se indica, solo se reciben eventos de ese usuario.
+            primero (bool): Si es True, recibe los eventos antes que los suscriptores ya registrados
+                (los índices lo usan para estar al día cuando las ventanas vuelven a consultarlos).
+
+        Returns:
+            function: Función sin argumentos que cancela la suscripción.
+        """ # Docstring que describe el método y sus argumentos.
+        entrada = (callback, frozenset(tipos) if tipos else None, usuario) # Congela los tipos para poder compararlos rápidamente.
+        if primero: # Estado derivado que los demás suscriptores consultan.
+            self._suscriptores.insert(0, entrada) # Se coloca delante de todos.
+        else: # Suscriptor normal.
+            self._suscriptores.append(entrada) # Añade la suscripción a la lista.
+
+        def cancelar(): # Función interna que elimina esta suscripción concreta.
+            if entrada in self._suscriptores: # Comprueba que la suscripción siga activa (cancelar dos veces no es un error).
+                self._suscriptores.remove(entrada) # Elimina la suscripción del bus.
+        return cancelar # Devuelve la función de cancelación al suscriptor.
+
+    def publicar(self, evento):
+        """Entrega un evento a todos los suscriptores interesados.""" # Docstring que describe el método.
+        for callback, tipos, usuario in list(self._suscriptores): # Itera sobre una copia, porque un callback puede cancelar su propia suscripción.
+            if tipos is not None and evento.tipo not in tipos: # Descarta los suscriptores que no esperan este tipo de evento.
+                continue # Pasa al siguiente suscriptor.
+            if usuario is not None and evento.usuario != usuario: # Descarta los suscriptores de otros usuarios.
+                continue # Pasa al siguiente suscriptor.
+            try: # Un suscriptor defectuoso no debe impedir que los demás reciban el evento.
+                callback(evento) # Entrega el evento al suscriptor.
+            except Exception as e: # Captura cualquier excepción lanzada por el suscriptor.
+                print(f"Error en suscriptor de {evento.tipo}: {e}") # Imprime el error en la consola.
+
+
+bus = BusCambios() # Instancia única del bus compartida por toda la aplicación.
+
+
+def suscribir_widget(widget, callback, tipos=None, usuario=None):
+    """
+    Suscribe un callback mientras el widget exista.
+    La suscripción se cancela sola cuando la ventana se destruye, evitando callbacks sobre widgets muertos.
+    """ # Docstring que describe la función.
+    cancelar = bus.suscribir(callback, tipos=tipos, usuario=usuario) # Registra el callback en el bus.
+
+    def _on_destroy(event): # Función interna que se ejecuta al destruirse el widget (o alguno de sus hijos).
+        if event.widget is widget: # Solo reacciona a la destrucción del propio widget, no a la de sus hijos.
+            cancelar() # Cancela la suscripción.
+
+    widget.bind("<Destroy>", _on_destroy, add="+") # Vincula la cancelación al evento de destrucción sin reemplazar otros bindings.
+    return cancelar # Devuelve la función de cancelación por si se quiere cancelar antes.
+
+
+class VigilanteArchivos: # Define el vigilante único que detecta cambios externos en los archivos de datos.
+    def __init__(self, root_window, colecciones, intervalo_ms=2000):
+        """
+        Inicializa el vigilante.
+
+        Args:
+            root_window (tk.Tk): Ventana raíz usada para programar las comprobaciones con after().
+            colecciones (list): Colecciones de almacenamiento a vigilar.
+            intervalo_ms (int): Milisegundos entre comprobaciones.
+        """ # Docstring que describe el método y sus argumentos.
+        self.root = root_window # Almacena la ventana raíz.
+        self.colecciones = list(colecciones) # Almacena las colecciones vigiladas.
+        self.intervalo_ms = intervalo_ms # Almacena el intervalo entre comprobaciones.
+        self._activo = False # Bandera que indica si el ciclo de vigilancia está en marcha.
+
+    def iniciar(self):
+        """Arranca el ciclo de vigilancia si no estaba ya en marcha.""" # Docstring que describe el método.
+        if not self._activo: # Evita lanzar dos ciclos en paralelo (por ejemplo, tras cerrar y abrir sesión).
+            self._activo = True # Marca el vigilante como activo.
+            self._comprobar() # Ejecuta la primera comprobación.
+
+    def detener(self):
+        """Detiene el ciclo de vigilancia.""" # Docstring que describe el método.
+        self._activo = False # El próximo ciclo no se reprogramará.
+
+    def _comprobar(self):
+        """Comprueba una vez cada archivo y reprograma la siguiente comprobación.""" # Docstring que describe el método.
+        if not self._activo or not self.root.winfo_exists(): # Si se detuvo o la ventana principal ya no existe, termina el ciclo.
+            self._activo = False # Deja el vigilante inactivo.
+            return # Sale de la función.
+        for coleccion in self.colecciones: # Recorre cada colección vigilada.
+            try: # Un archivo dañado no debe detener la vigilancia del resto.
+                coleccion.recargar_si_cambio() # Recarga la colección si su archivo cambió fuera de este proceso; publica los eventos correspondientes.
+            except Exception as e: # Captura cualquier error de lectura.
+                print(f"Error al recargar {coleccion.ruta}: {e}") # Imprime el error en la consola.
+        self.root.after(self.intervalo_ms, self._comprobar) # Programa la siguiente comprobación.
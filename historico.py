@@ -0,0 +1,127 @@
+"""
+Histórico de tareas antiguas: un segmento comprimido de solo lectura por usuario.
+
+Las tareas cuya fecha de entrega pasó hace más de DIAS_ARCHIVO días salen de tareas.json y se guardan en
+data/historico/<usuario>.seg. Así la carga, el calendario, la agenda y los recordatorios trabajan solo con las
+tareas recientes. El segmento solo se lee cuando el calendario muestra un mes archivado o cuando una búsqueda
+lo pide expresamente.
+
+Formato del segmento: una primera línea JSON sin comprimir con el número de tareas de cada mes, y después
+las tareas en JSON comprimido con zlib, ordenadas por fecha. Para saber si un mes tiene tareas archivadas
+basta con leer la primera línea.
+"""
+import bisect # Importa bisect para localizar por búsqueda binaria las tareas de un mes o de un día.
+import datetime # Importa datetime para calcular la fecha límite del archivado.
+import json # Importa el módulo json, que permite trabajar con datos en formato JSON (serializar y deserializar).
+import os # Importa el módulo os, que proporciona funciones para interactuar con el sistema operativo, como la gestión de rutas de archivos y directorios.
+import zlib # Importa zlib para comprimir el segmento.
+from urllib.parse import quote # Importa quote para convertir el nombre de usuario en un nombre de archivo seguro.
+
+from almacenamiento import almacen_tareas, _firma_archivo # Importa la colección de tareas y la firma de archivos usada para detectar cambios.
+from archivos import escribir_atomico, bloqueo_archivo # Importa la escritura atómica y el bloqueo entre procesos.
+from indices import indice_fechas, normalizar # Importa el índice por fecha y la normalización de textos de búsqueda.
+
+DIAS_ARCHIVO = 180 # Días que deben pasar desde la fecha de entrega para que una tarea se archive.
+
+
+class Historico: # Segmentos archivados de una colección de tareas, uno por usuario.
+    def __init__(self, coleccion):
+        """Inicializa el histórico de una colección; su carpeta es "historico" junto al archivo de la colección.""" # Docstring que describe el método.
+        self.coleccion = coleccion # Colección de la que salen las tareas archivadas.
+        self._cabeceras = {} # Diccionario ruta -> (firma, {mes: número de tareas}).
+        self._cargado = None # Último segmento leído: (ruta, firma, fechas, tareas). Solo se retiene uno.
+
+    def _ruta(self, usuario):
+        """Devuelve la ruta del segmento del usuario (se calcula cada vez: la carpeta de datos puede cambiar).""" # Docstring que describe el método.
+        carpeta = os.path.join(os.path.dirname(self.coleccion.ruta) or ".", "historico") # Carpeta del histórico.
+        return os.path.join(carpeta, quote(usuario, safe="") + ".seg") # Un segmento por usuario.
+
+    # --- Lectura ---
+    def meses(self, usuario):
+        """Devuelve {"aaaa-mm": número de tareas} del segmento del usuario, leyendo solo su cabecera.""" # Docstring que describe el método.
+        ruta = self._ruta(usuario) # Segmento del usuario.
+        firma = _firma_archivo(ruta) # Firma actual (None si no existe).
+        if firma is None: # Usuario sin tareas archivadas.
+            return {} # Nada archivado.
+        guardada = self._cabeceras.get(ruta) # Cabecera leída antes.
+        if guardada is None or guardada[0] != firma: # Primera vez, o el segmento cambió.
+            with open(ruta, 'rb') as f: # Abre el segmento.
+                guardada = (firma, json.loads(f.readline())["meses"]) # Solo la primera línea.
+            self._cabeceras[ruta] = guardada # La recuerda.
+        return guardada[1] # Devuelve los meses.
+
+    def _leer(self, usuario):
+        """Devuelve (fechas, tareas) del segmento completo, ordenadas por fecha. Solo se retiene en memoria el último leído.""" # Docstring que describe el método.
+        ruta = self._ruta(usuario) # Segmento del usuario.
+        firma = _firma_archivo(ruta) # Firma actual.
+        if firma is None: # Usuario sin tareas archivadas.
+            return [], [] # Nada archivado.
+        if self._cargado is None or self._cargado[:2] != (ruta, firma): # Segmento distinto del retenido, o cambió.
+            with open(ruta, 'rb') as f: # Abre el segmento.
+                f.readline() # Salta la cabecera.
+                tareas = json.loads(zlib.decompress(f.read()).decode("utf-8")) # Descomprime las tareas.
+            self._cargado = (ruta, firma, [t["fecha"] for t in tareas], tareas) # Lo retiene, con las fechas para buscar por bisección.
+        return self._cargado[2], self._cargado[3] # Devuelve fechas y tareas.
+
+    def tareas_de_rango(self, usuario, desde, hasta):
+        """Devuelve las tareas archivadas con fecha en [desde, hasta). Solo abre el segmento si algún mes del rango está archivado.""" # Docstring que describe el método.
+        if not any(desde[:7] <= mes <= hasta[:7] for mes in self.meses(usuario)): # Ningún mes del rango tiene tareas archivadas.
+            return [] # No se descomprime nada.
+        fechas, tareas = self._leer(usuario) # Segmento completo.
+        return tareas[bisect.bisect_left(fechas, desde):bisect.bisect_left(fechas, hasta)] # Porción del rango.
+
+    def tareas_de_mes(self, usuario, anio, mes):
+        """Devuelve las tareas archivadas de un mes (para el calendario).""" # Docstring que describe el método.
+        desde = f"{anio:04d}-{mes:02d}" # Prefijo del mes.
+        hasta = f"{anio + mes // 12:04d}-{mes % 12 + 1:02d}" # Prefijo del mes siguiente.
+        return self.tareas_de_rango(usuario, desde, hasta) # Tareas entre ambos.
+
+    def tareas_de_fecha(self, usuario, fecha):
+        """Devuelve las tareas archivadas de un día "aaaa-mm-dd".""" # Docstring que describe el método.
+        return self.tareas_de_rango(usuario, fecha, fecha + "\x00") # Solo ese día.
+
+    def buscar(self, usuario, texto):
+        """Devuelve las tareas archivadas cuyo título contiene alguna palabra que empieza por el texto (como el filtro de tareas).""" # Docstring que describe el método.
+        if not self.meses(usuario): # Usuario sin tareas archivadas.
+            return [] # No se descomprime nada.
+        buscado = normalizar(texto) # Texto normalizado.
+        return [t for t in self._leer(usuario)[1] # Recorre el segmento (solo se hace si se pide buscar en el histórico).
+                if any(resto.startswith(buscado) for resto in _restos(normalizar(t.get("titulo", ""))))] # Coincidencia al inicio de alguna palabra.
+
+    # --- Archivado ---
+    def archivar(self, usuario, dias=DIAS_ARCHIVO, hoy=None):
+        """
+        Mueve al segmento las tareas del usuario cuya fecha de entrega pasó hace más de "dias" días.
+        Primero se reescribe el segmento y después se eliminan las tareas activas: si el proceso se
+        interrumpe entre ambos pasos, la tarea queda duplicada (y se unifica en el siguiente archivado), nunca perdida.
+        Las tareas archivadas son de solo lectura.
+        Devuelve el número de tareas archivadas.
+        """ # Docstring que describe el método.
+        limite = ((hoy or datetime.date.today()) - datetime.timedelta(days=dias)).isoformat() # Fecha a partir de la cual las tareas siguen activas.
+        ids = indice_fechas(self.coleccion, usuario).rango("0", limite) # Tareas con fecha anterior al límite (las que no tienen fecha nunca se archivan).
+        if not ids: # Nada que archivar.
+            return 0 # Sale sin tocar el disco.
+        nuevas = [dict(self.coleccion.obtener(usuario, i)) for i in ids] # Copias de las tareas a archivar.
+        ruta = self._ruta(usuario) # Segmento del usuario.
+        with bloqueo_archivo(ruta): # Otra instancia podría estar archivando a la vez.
+            self._cargado = None # Relee el segmento del disco dentro del bloqueo.
+            tareas = {json.dumps(t, sort_keys=True): t for t in self._leer(usuario)[1]} # Tareas ya archivadas, por contenido.
+            tareas.update((json.dumps(t, sort_keys=True), t) for t in nuevas) # Añade las nuevas (una copia idéntica se unifica; un id reutilizado no pisa a otra tarea).
+            tareas = sorted(tareas.values(), key=lambda t: (t["fecha"], t["id"])) # Ordenadas por fecha.
+            meses = {} # Número de tareas de cada mes.
+            for tarea in tareas: # Recorre las tareas.
+                meses[tarea["fecha"][:7]] = meses.get(tarea["fecha"][:7], 0) + 1 # Cuenta la tarea en su mes.
+            cabecera = json.dumps({"meses": meses}).encode("utf-8") + b"\n" # Cabecera legible sin descomprimir.
+            escribir_atomico(ruta, cabecera + zlib.compress(json.dumps(tareas, ensure_ascii=False).encode("utf-8"), 9)) # Segmento nuevo, de una vez.
+            self._cargado = None # El segmento retenido ya no es el actual.
+        self.coleccion.eliminar_varios(usuario, ids) # Las quita de las tareas activas (una escritura, un lote de eventos).
+        return len(ids) # Número de tareas archivadas.
+
+
+def _restos(titulo):
+    """Genera el título desde cada una de sus palabras ("tarea de ingles", "de ingles", "ingles").""" # Docstring que describe la función.
+    palabras = titulo.split() # Palabras del título normalizado.
+    return (" ".join(palabras[i:]) for i in range(len(palabras))) # Resto del título desde cada palabra.
+
+
+historico_tareas = Historico(almacen_tareas) # Histórico de la colección de tareas, compartido por toda la aplicación.
@@ -0,0 +1,344 @@
+import bisect # Importa bisect, que permite buscar e insertar en listas ordenadas mediante búsqueda binaria.
+import unicodedata # Importa unicodedata para quitar tildes al normalizar los títulos.
+
+from almacenamiento import PRIORIDAD_POR_DEFECTO # Importa la prioridad de las tareas que no la tienen.
+from eventos import bus # Importa el bus de cambios, que mantiene los índices al día sin releer los datos.
+
+_FIN_PREFIJO = "\U0010ffff" # Carácter mayor que cualquier otro: "prefijo" + este carácter acota el rango de claves que empiezan por el prefijo.
+
+
+def normalizar(texto):
+    """Normaliza un texto para búsquedas: minúsculas, sin tildes y con espacios simples.""" # Docstring que describe la función.
+    descompuesto = unicodedata.normalize("NFKD", texto.casefold()) # Separa las letras de sus tildes y pasa a minúsculas.
+    sin_tildes = "".join(c for c in descompuesto if not unicodedata.combining(c)) # Descarta las marcas de tilde.
+    return " ".join(sin_tildes.split()) # Colapsa los espacios repetidos y recorta los extremos.
+
+
+class IndiceTitulos: # Índice ordenado de títulos que responde búsquedas por prefijo en tiempo proporcional a los resultados.
+    """
+    Cada título se indexa una vez por cada palabra, con la clave "resto del título desde esa palabra",
+    así "ing" encuentra tanto "Inglés" como "Tarea de inglés". Las claves se guardan en una lista ordenada:
+    una búsqueda es una bisección (O(log n)) más el recorrido de las coincidencias.
+    """ # Docstring que describe la clase.
+    def __init__(self, registros=()):
+        """Construye el índice a partir de los registros iniciales.""" # Docstring que describe el método.
+        self._entradas = sorted( # Lista ordenada de tuplas (clave, id).
+            (clave, registro["id"]) for registro in registros for clave in _claves(registro.get("titulo", "")) # Todas las claves de todos los registros.
+        )
+        self._claves_de_id = {} # Diccionario id -> claves indexadas, necesario para retirar un registro.
+        for clave, registro_id in self._entradas: # Recorre las entradas iniciales.
+            self._claves_de_id.setdefault(registro_id, []).append(clave) # Recuerda qué claves pertenecen a cada id.
+
+    def agregar(self, registro):
+        """Indexa un registro (si ya estaba indexado, lo reindexa).""" # Docstring que describe el método.
+        self.quitar(registro["id"]) # Retira las claves antiguas del registro, si las había.
+        claves = _claves(registro.get("titulo", "")) # Calcula las claves del título actual.
+        for clave in claves: # Recorre las claves.
+            bisect.insort(self._entradas, (clave, registro["id"])) # Inserta cada clave en su sitio, manteniendo el orden.
+        self._claves_de_id[registro["id"]] = claves # Recuerda las claves del registro.
+
+    def quitar(self, registro_id):
+        """Retira un registro del índice.""" # Docstring que describe el método.
+        for clave in self._claves_de_id.pop(registro_id, ()): # Recorre las claves del registro.
+            posicion = bisect.bisect_left(self._entradas, (clave, registro_id)) # Localiza la entrada exacta por bisección.
+            if posicion < len(self._entradas) and self._entradas[posicion] == (clave, registro_id): # Comprueba que es la entrada buscada.
+                del self._entradas[posicion] # La elimina.
+
+    def buscar(self, texto, limite=None):
+        """
+        Devuelve los ids cuyos títulos tienen alguna palabra que empieza por el texto, en orden alfabético.
+        El coste depende del número de coincidencias, no del total de registros.
+        """ # Docstring que describe el método.
+        prefijo = normalizar(texto) # Normaliza el texto buscado igual que los títulos.
+        inicio = bisect.bisect_left(self._entradas, (prefijo,)) # Primera clave mayor o igual que el prefijo.
+        fin = bisect.bisect_left(self._entradas, (prefijo + _FIN_PREFIJO,)) # Primera clave que ya no empieza por el prefijo.
+        vistos = set() # Un título con varias palabras coincidentes aparece varias veces; se devuelve una sola.
+        resultado = [] # Ids encontrados, en orden.
+        for _, registro_id in self._entradas[inicio:fin]: # Recorre solo el rango de coincidencias.
+            if registro_id not in vistos: # Si el id no se había devuelto ya.
+                vistos.add(registro_id) # Lo marca como devuelto.
+                resultado.append(registro_id) # Lo añade al resultado.
+                if limite is not None and len(resultado) >= limite: # Si se alcanzó el límite pedido.
+                    break # Deja de recorrer.
+        return resultado # Devuelve los ids encontrados.
+
+
+def _claves(titulo):
+    """Devuelve las claves de un título: el título normalizado a partir de cada una de sus palabras.""" # Docstring que describe la función.
+    normalizado = normalizar(titulo) # Normaliza el título.
+    if not normalizado: # Los títulos vacíos no se indexan.
+        return [] # No hay claves.
+    claves = [normalizado] # La primera clave es el título completo.
+    for posicion, caracter in enumerate(normalizado): # Recorre el título buscando separadores de palabra.
+        if caracter == " ": # Cada espacio marca el comienzo de otra palabra.
+            claves.append(normalizado[posicion + 1:]) # Clave desde la palabra siguiente hasta el final.
+    return claves # Devuelve las claves.
+
+
+# --- Registro de índices por colección y usuario, mantenidos con los eventos del bus ---
+_indices = {} # Diccionario (tipo de índice, nombre de colección, usuario) -> índice.
+_suscritos = set() # Pares (tipo de índice, nombre de colección) que ya escuchan el bus.
+
+
+def _obtener_indice(tipo, fabrica, coleccion, usuario, al_cambiar):
+    """Devuelve el índice pedido, construyéndolo la primera vez y suscribiéndolo al bus una sola vez por colección.""" # Docstring que describe la función.
+    clave = (tipo, coleccion.nombre, usuario) # Clave del índice en el registro.
+    indice = _indices.get(clave) # Busca el índice ya construido.
+    if indice is None: # Si es la primera vez que se pide.
+        indice = fabrica(coleccion.del_usuario(usuario)) # Lo construye con los registros actuales del usuario.
+        _indices[clave] = indice # Lo guarda para las siguientes veces.
+    if (tipo, coleccion.nombre) not in _suscritos: # Si esta colección aún no mantiene este tipo de índice.
+        _suscritos.add((tipo, coleccion.nombre)) # La marca como suscrita.
+        eliminado = coleccion.evento_eliminado # Tipo de evento de baja de la colección.
+
+        def _on_cambio(evento): # Aplica cada evento al índice del usuario correspondiente, si existe.
+            existente = _indices.get((tipo, coleccion.nombre, evento.usuario)) # Busca el índice del usuario del evento.
+            if existente is not None: # Solo se mantienen los índices que alguien llegó a pedir.
+                al_cambiar(existente, evento, evento.tipo == eliminado) # Actualiza el índice.
+
+        bus.suscribir(_on_cambio, tipos=(coleccion.evento_agregado, coleccion.evento_actualizado, eliminado), primero=True) # Escucha los cambios antes que las ventanas que consultan el índice.
+    return indice # Devuelve el índice.
+
+
+def indices_de_usuario(usuario):
+    """Devuelve los índices ya construidos del usuario: {(tipo, colección): índice}.""" # Docstring que describe la función.
+    return {(tipo, nombre): indice for (tipo, nombre, dueno), indice in _indices.items() if dueno == usuario} # Solo los del usuario.
+
+
+def olvidar_usuario(usuario):
+    """Descarta los índices del usuario (al expulsar su sesión); se reconstruyen la próxima vez que se pidan.""" # Docstring que describe la función.
+    for clave in [clave for clave in _indices if clave[2] == usuario]: # Claves del usuario.
+        del _indices[clave] # Sin índice, los eventos de ese usuario se ignoran hasta que se vuelva a pedir.
+
+
+def _aplicar_a_titulos(indice, evento, eliminado):
+    """Aplica un evento de cambio a un índice de títulos.""" # Docstring que describe la función.
+    if eliminado: # Si el registro se eliminó.
+        indice.quitar(evento.id) # Lo retira del índice.
+    else: # Si el registro se añadió o modificó.
+        indice.agregar(evento.registro) # Lo (re)indexa.
+
+
+def indice_titulos(coleccion, usuario):
+    """Devuelve el índice de títulos de los registros del usuario en la colección, siempre al día.""" # Docstring que describe la función.
+    return _obtener_indice("titulos", IndiceTitulos, coleccion, usuario, _aplicar_a_titulos) # Construye o reutiliza el índice.
+
+
+class IndiceFechas: # Índice de registros ordenado por fecha que responde consultas por rango con búsqueda binaria.
+    """
+    Guarda tuplas (fecha, id) en una lista ordenada que se mantiene con bisect.insort.
+    Las fechas tienen el formato "aaaa-mm-dd", cuyo orden alfabético coincide con el cronológico.
+    """ # Docstring que describe la clase.
+    def __init__(self, registros=()):
+        """Construye el índice a partir de los registros iniciales (se ordenan una sola vez).""" # Docstring que describe el método.
+        self._fecha_de_id = {r["id"]: r.get("fecha", "") for r in registros} # Diccionario id -> fecha indexada, necesario para retirar un registro.
+        self._entradas = sorted((fecha, registro_id) for registro_id, fecha in self._fecha_de_id.items()) # Lista ordenada de tuplas (fecha, id).
+
+    def agregar(self, registro):
+        """Indexa un registro (si ya estaba indexado, lo recoloca según su fecha actual).""" # Docstring que describe el método.
+        self.quitar(registro["id"]) # Retira la entrada antigua del registro, si la había.
+        fecha = registro.get("fecha", "") # Fecha actual del registro.
+        bisect.insort(self._entradas, (fecha, registro["id"])) # La inserta en su sitio, manteniendo el orden.
+        self._fecha_de_id[registro["id"]] = fecha # Recuerda la fecha indexada.
+
+    def quitar(self, registro_id):
+        """Retira un registro del índice.""" # Docstring que describe el método.
+        fecha = self._fecha_de_id.pop(registro_id, None) # Fecha con la que se indexó el registro.
+        if fecha is None: # Si el registro no estaba indexado.
+            return # No hay nada que quitar.
+        posicion = bisect.bisect_left(self._entradas, (fecha, registro_id)) # Localiza la entrada exacta por bisección.
+        if posicion < len(self._entradas) and self._entradas[posicion] == (fecha, registro_id): # Comprueba que es la entrada buscada.
+            del self._entradas[posicion] # La elimina.
+
+    def rango(self, desde=None, hasta=None):
+        """
+        Devuelve, ordenados por fecha, los ids con desde <= fecha < hasta.
+        None en cualquiera de los extremos significa "sin límite".
+        """ # Docstring que describe el método.
+        inicio = 0 if desde is None else bisect.bisect_left(self._entradas, (desde,)) # Primera entrada con fecha >= desde.
+        fin = len(self._entradas) if hasta is None else bisect.bisect_left(self._entradas, (hasta,)) # Primera entrada con fecha >= hasta.
+        return [registro_id for _, registro_id in self._entradas[inicio:fin]] # Solo se recorre la porción pedida.
+
+    def ordenar(self, ids):
+        """Ordena por fecha (y por id dentro de cada fecha) un conjunto de ids indexados.""" # Docstring que describe el método.
+        return sorted(ids, key=lambda registro_id: (self._fecha_de_id.get(registro_id, ""), registro_id)) # Mismo orden que rango().
+
+
+def _aplicar_a_fechas(indice, evento, eliminado):
+    """Aplica un evento de cambio a un índice de fechas.""" # Docstring que describe la función.
+    if eliminado: # Si el registro se eliminó.
+        indice.quitar(evento.id) # Lo retira del índice.
+    else: # Si el registro se añadió o modificó.
+        indice.agregar(evento.registro) # Lo (re)coloca según su fecha.
+
+
+def indice_fechas(coleccion, usuario):
+    """Devuelve el índice por fecha de los registros del usuario en la colección, siempre al día.""" # Docstring que describe la función.
+    return _obtener_indice("fechas", IndiceFechas, coleccion, usuario, _aplicar_a_fechas) # Construye o reutiliza el índice.
+
+
+# --- Mapas de bits sobre los ids: bit n encendido = el registro con id n pertenece al conjunto ---
+def mascara(ids):
+    """Construye el mapa de bits (un int de Python) de un conjunto de ids, en un solo paso sobre un bytearray.""" # Docstring que describe la función.
+    ids = list(ids) # Los ids pueden venir de un generador.
+    if not ids: # Conjunto vacío.
+        return 0 # Ningún bit encendido.
+    octetos = bytearray(max(ids) // 8 + 1) # Un bit por id posible.
+    for registro_id in ids: # Recorre los ids.
+        octetos[registro_id >> 3] |= 1 << (registro_id & 7) # Enciende su bit.
+    return int.from_bytes(octetos, "little") # Convierte el bytearray en un entero (operaciones & y | en C).
+
+
+def ids_de_mascara(mascara_bits):
+    """Devuelve los ids cuyos bits están encendidos, en orden creciente (salta de golpe los octetos vacíos).""" # Docstring que describe la función.
+    octetos = mascara_bits.to_bytes((mascara_bits.bit_length() + 7) // 8, "little") # Bytes del mapa de bits.
+    return [posicion * 8 + bit for posicion, octeto in enumerate(octetos) if octeto # Solo los octetos con algún bit encendido.
+            for bit in range(8) if octeto >> bit & 1] # Bits encendidos del octeto.
+
+
+class IndiceEtiquetas: # Mapas de bits por etiqueta y por prioridad: los filtros combinados son intersecciones (&) de enteros.
+    """
+    Cada etiqueta (normalizada: sin tildes ni mayúsculas) y cada prioridad tiene un entero cuyo bit n indica
+    si la tarea con id n la lleva. "Alta prioridad de matemáticas esta semana" es etiqueta & prioridad & fechas,
+    sin recorrer las tareas.
+    """ # Docstring que describe la clase.
+    def __init__(self, registros=()):
+        """Construye los mapas de bits de una vez a partir de los registros iniciales.""" # Docstring que describe el método.
+        self._de_id = {r["id"]: _clasificacion(r) for r in registros} # Diccionario id -> (etiquetas normalizadas, prioridad) indexadas.
+        grupos = {} # Diccionario ("etiqueta"/"prioridad", valor) -> ids.
+        for registro_id, (etiquetas, prioridad) in self._de_id.items(): # Recorre las clasificaciones.
+            grupos.setdefault(("prioridad", prioridad), []).append(registro_id) # Grupo de su prioridad.
+            for etiqueta in etiquetas: # Recorre sus etiquetas.
+                grupos.setdefault(("etiqueta", etiqueta), []).append(registro_id) # Grupo de cada etiqueta.
+        self._por_etiqueta = {valor: mascara(ids) for (tipo, valor), ids in grupos.items() if tipo == "etiqueta"} # Mapa de bits de cada etiqueta.
+        self._por_prioridad = {valor: mascara(ids) for (tipo, valor), ids in grupos.items() if tipo == "prioridad"} # Mapa de bits de cada prioridad.
+
+    def agregar(self, registro):
+        """Indexa un registro (si ya estaba indexado, lo reclasifica).""" # Docstring que describe el método.
+        self.quitar(registro["id"]) # Apaga sus bits antiguos, si los había.
+        etiquetas, prioridad = self._de_id[registro["id"]] = _clasificacion(registro) # Clasificación actual.
+        bit = 1 << registro["id"] # Bit del registro.
+        self._por_prioridad[prioridad] = self._por_prioridad.get(prioridad, 0) | bit # Lo enciende en su prioridad.
+        for etiqueta in etiquetas: # Recorre sus etiquetas.
+            self._por_etiqueta[etiqueta] = self._por_etiqueta.get(etiqueta, 0) | bit # Lo enciende en cada etiqueta.
+
+    def quitar(self, registro_id):
+        """Retira un registro del índice.""" # Docstring que describe el método.
+        clasificacion = self._de_id.pop(registro_id, None) # Clasificación con la que se indexó.
+        if clasificacion is None: # Si no estaba indexado.
+            return # No hay nada que quitar.
+        etiquetas, prioridad = clasificacion # Etiquetas y prioridad indexadas.
+        bit = ~(1 << registro_id) # Máscara que apaga el bit del registro.
+        self._por_prioridad[prioridad] &= bit # Lo apaga en su prioridad.
+        for etiqueta in etiquetas: # Recorre sus etiquetas.
+            self._por_etiqueta[etiqueta] &= bit # Lo apaga en cada etiqueta.
+            if not self._por_etiqueta[etiqueta]: # Si la etiqueta se quedó sin tareas.
+                del self._por_etiqueta[etiqueta] # La olvida.
+
+    def etiquetas(self):
+        """Devuelve las etiquetas en uso (normalizadas), en orden alfabético.""" # Docstring que describe el método.
+        return sorted(self._por_etiqueta) # Claves de los mapas de bits.
+
+    def mascara(self, etiquetas=(), prioridad=None):
+        """
+        Devuelve el mapa de bits de los registros que llevan todas las etiquetas y la prioridad indicadas.
+        Sin condiciones devuelve todos los registros indexados.
+        """ # Docstring que describe el método.
+        if prioridad is not None: # Si se filtra por prioridad.
+            resultado = self._por_prioridad.get(prioridad, 0) # Parte de su mapa de bits.
+        else: # Sin prioridad.
+            resultado = 0 # Unión de todas las prioridades: todos los registros.
+            for bits in self._por_prioridad.values(): # Recorre las prioridades.
+                resultado |= bits # Las une.
+        for etiqueta in etiquetas: # Recorre las etiquetas pedidas.
+            resultado &= self._por_etiqueta.get(normalizar(etiqueta), 0) # Intersección con cada una.
+        return resultado # Devuelve el mapa de bits.
+
+
+def _clasificacion(registro):
+    """Devuelve (etiquetas normalizadas, prioridad) de un registro; las tareas antiguas tienen la prioridad por defecto.""" # Docstring que describe la función.
+    etiquetas = tuple(dict.fromkeys(normalizar(e) for e in registro.get("etiquetas", ()) if normalizar(e))) # Sin repetidas, en orden.
+    return etiquetas, registro.get("prioridad") or PRIORIDAD_POR_DEFECTO # Clasificación del registro.
+
+
+def _aplicar_a_etiquetas(indice, evento, eliminado):
+    """Aplica un evento de cambio a un índice de etiquetas.""" # Docstring que describe la función.
+    if eliminado: # Si el registro se eliminó.
+        indice.quitar(evento.id) # Lo retira del índice.
+    else: # Si el registro se añadió o modificó.
+        indice.agregar(evento.registro) # Lo (re)clasifica.
+
+
+def indice_etiquetas(coleccion, usuario):
+    """Devuelve el índice de etiquetas y prioridades de los registros del usuario en la colección, siempre al día.""" # Docstring que describe la función.
+    return _obtener_indice("etiquetas", IndiceEtiquetas, coleccion, usuario, _aplicar_a_etiquetas) # Construye o reutiliza el índice.
+
+
+class IndiceEstado: # Tareas completadas como mapa de bits, con los contadores de abiertas y completadas al día.
+    """
+    Los contadores se ajustan con cada evento (+1/-1), sin volver a contar; son los que muestran las
+    insignias del menú. El mapa de bits de completadas permite descartarlas de cualquier filtro con una resta.
+    """ # Docstring que describe la clase.
+    def __init__(self, registros=()):
+        """Construye el índice a partir de los registros iniciales.""" # Docstring que describe el método.
+        self._completada = {r["id"]: bool(r.get("completada")) for r in registros} # Diccionario id -> completada.
+        self._bits = mascara(i for i, hecha in self._completada.items() if hecha) # Mapa de bits de las completadas.
+        self.completadas = sum(self._completada.values()) # Número de tareas completadas.
+        self.abiertas = len(self._completada) - self.completadas # Número de tareas abiertas.
+
+    def agregar(self, registro):
+        """Indexa un registro (si ya estaba indexado, actualiza su estado).""" # Docstring que describe el método.
+        self.quitar(registro["id"]) # Descuenta su estado anterior, si lo había.
+        hecha = self._completada[registro["id"]] = bool(registro.get("completada")) # Estado actual.
+        if hecha: # Completada.
+            self._bits |= 1 << registro["id"] # Enciende su bit.
+            self.completadas += 1 # Una completada más.
+        else: # Abierta.
+            self.abiertas += 1 # Una abierta más.
+
+    def quitar(self, registro_id):
+        """Retira un registro del índice.""" # Docstring que describe el método.
+        hecha = self._completada.pop(registro_id, None) # Estado con el que se indexó.
+        if hecha is None: # Si no estaba indexado.
+            return # No hay nada que quitar.
+        if hecha: # Estaba completada.
+            self._bits &= ~(1 << registro_id) # Apaga su bit.
+            self.completadas -= 1 # Una completada menos.
+        else: # Estaba abierta.
+            self.abiertas -= 1 # Una abierta menos.
+
+    def esta_completada(self, registro_id):
+        """Indica si el registro está completado.""" # Docstring que describe el método.
+        return self._completada.get(registro_id, False) # Consulta en el diccionario.
+
+    def mascara(self):
+        """Devuelve el mapa de bits de los registros completados.""" # Docstring que describe el método.
+        return self._bits # Mapa de bits.
+
+
+def _aplicar_a_estado(indice, evento, eliminado):
+    """Aplica un evento de cambio a un índice de estado.""" # Docstring que describe la función.
+    if eliminado: # Si el registro se eliminó.
+        indice.quitar(evento.id) # Lo retira del índice.
+    else: # Si el registro se añadió o modificó.
+        indice.agregar(evento.registro) # Actualiza su estado.
+
+
+def indice_estado(coleccion, usuario):
+    """Devuelve el índice de tareas completadas del usuario en la colección, con sus contadores, siempre al día.""" # Docstring que describe la función.
+    return _obtener_indice("estado", IndiceEstado, coleccion, usuario, _aplicar_a_estado) # Construye o reutiliza el índice.
+
+
+def filtrar(coleccion, usuario, etiquetas=(), prioridad=None, desde=None, hasta=None, incluir_completadas=False):
+    """
+    Devuelve, ordenados por fecha, los ids que llevan todas las etiquetas, tienen la prioridad y caen en
+    [desde, hasta). El filtro es la intersección de los mapas de bits de etiquetas, prioridad y rango de fechas,
+    menos el de completadas salvo que se pidan.
+    """ # Docstring que describe la función.
+    fechas = indice_fechas(coleccion, usuario) # Índice por fecha.
+    bits = indice_etiquetas(coleccion, usuario).mascara(etiquetas, prioridad) # Etiquetas y prioridad.
+    if desde is not None or hasta is not None: # Si hay rango de fechas.
+        bits &= mascara(fechas.rango(desde, hasta)) # Intersección con el rango.
+    if not incluir_completadas: # Por defecto las completadas no se muestran.
+        bits &= ~indice_estado(coleccion, usuario).mascara() # Resta las completadas.
+    return fechas.ordenar(ids_de_mascara(bits)) # Coincidencias ordenadas por fecha.
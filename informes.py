@@ -0,0 +1,190 @@
+"""
+Informes imprimibles (HTML y, si hay un conversor instalado, PDF) de las tareas y notas de un usuario.
+
+El documento se genera como una cadena de generadores: las tareas del periodo salen del índice de fechas
+(solo la porción del rango, ya ordenada), se agrupan por día sobre la marcha, cada bloque se rellena con su
+plantilla y los trozos resultantes se escriben directamente en el archivo. En memoria solo está el trozo
+que se escribe (y el cuerpo de una nota cada vez), no el documento completo.
+"""
+import datetime # Importa el módulo datetime para calcular la semana del informe.
+import heapq # Importa heapq para mezclar por fecha las tareas activas y las archivadas sin ordenarlas de nuevo.
+import html # Importa html para escapar los textos del usuario.
+import itertools # Importa itertools para agrupar por día las tareas, ya ordenadas.
+import os # Importa el módulo os, que proporciona funciones para interactuar con el sistema operativo, como la gestión de rutas de archivos y directorios.
+import shutil # Importa shutil para buscar un conversor a PDF instalado.
+import subprocess # Importa subprocess para lanzar el conversor a PDF.
+from string import Template # Importa Template, las plantillas $campo de la biblioteca estándar.
+
+from almacenamiento import almacen_tareas, almacen_notas # Importa las colecciones de tareas y notas.
+from consultas import Consulta # Importa las consultas compiladas, que toman el periodo del índice de fechas.
+from historico import historico_tareas # Importa el histórico, para los informes de semanas ya archivadas.
+
+CARPETA_INFORMES = "informes" # Carpeta por defecto de los informes generados.
+TAMANO_BUFER = 64 * 1024 # Bytes que se acumulan antes de cada escritura en el disco.
+DIAS_SEMANA = ("lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo") # Nombres de los días.
+CONVERSORES_PDF = ( # Conversores de HTML a PDF que se buscan, en orden de preferencia, y sus argumentos.
+    ("wkhtmltopdf", lambda html_, pdf: ["--quiet", html_, pdf]), # wkhtmltopdf.
+    ("weasyprint", lambda html_, pdf: [html_, pdf]), # WeasyPrint.
+    ("chromium", lambda html_, pdf: ["--headless", "--disable-gpu", f"--print-to-pdf={pdf}", html_]), # Chromium en modo sin ventana.
+    ("chromium-browser", lambda html_, pdf: ["--headless", "--disable-gpu", f"--print-to-pdf={pdf}", html_]), # Chromium en algunas distribuciones.
+    ("google-chrome", lambda html_, pdf: ["--headless", "--disable-gpu", f"--print-to-pdf={pdf}", html_]), # Google Chrome.
+)
+
+# --- Plantillas: cada bloque se rellena y se escribe por separado ---
+PLANTILLA_CABECERA = Template("""<!DOCTYPE html>
+<html lang="es"><head><meta charset="utf-8"><title>Informe de $usuario: $periodo</title>
+<style>
+body { font-family: Helvetica, Arial, sans-serif; color: #333; margin: 2em; }
+h1 { margin-bottom: 0; } .periodo { color: #555; margin-top: 0.2em; }
+.resumen span { display: inline-block; margin-right: 1.5em; padding: 0.3em 0.7em; border-radius: 4px; color: white; }
+.abiertas { background: #E74C3C; } .completadas { background: #4CAF50; } .archivadas { background: #7F8C8D; }
+h2 { border-bottom: 2px solid #E0E0E0; padding-bottom: 0.2em; margin-top: 1.5em; }
+h3 { background: #E0E0E0; padding: 0.2em 0.5em; page-break-after: avoid; }
+.tarea { margin: 0.4em 0 0.8em 1em; page-break-inside: avoid; } .hecha .titulo { text-decoration: line-through; color: #777; }
+.alta .titulo::before { content: "❗ "; } .etiqueta { color: #3498DB; margin-left: 0.5em; }
+.contenido, .nota .cuerpo { white-space: pre-wrap; color: #555; margin: 0.2em 0 0 0; }
+.nota { margin: 0.6em 0 1em 0; page-break-inside: avoid; } .vacio { color: #777; font-style: italic; }
+@media print { body { margin: 0; } }
+</style></head><body>
+<h1>Informe de $usuario</h1>
+<p class="periodo">$periodo · generado el $generado</p>
+<p class="resumen"><span class="abiertas">$abiertas abiertas</span><span class="completadas">$completadas completadas</span><span class="archivadas">$archivadas archivadas</span></p>
+<h2>Tareas</h2>
+""")
+PLANTILLA_DIA = Template("<h3>$dia</h3>\n") # Encabezado de cada día con tareas.
+PLANTILLA_TAREA = Template('<div class="tarea $clases"><span class="titulo">$titulo</span><span class="prioridad"> · $prioridad</span>$etiquetas<p class="contenido">$contenido</p></div>\n') # Una tarea.
+PLANTILLA_ETIQUETA = Template('<span class="etiqueta">#$etiqueta</span>') # Una etiqueta de la tarea.
+PLANTILLA_SIN_TAREAS = Template('<p class="vacio">No hay tareas en este periodo.</p>\n') # Periodo vacío.
+PLANTILLA_NOTAS = Template("<h2>Notas</h2>\n") # Encabezado de las notas.
+PLANTILLA_NOTA = Template('<div class="nota"><h3>$titulo</h3><p class="cuerpo">$cuerpo</p></div>\n') # Una nota.
+PLANTILLA_PIE = Template("</body></html>\n") # Cierre del documento.
+
+
+def semana(fecha=None):
+    """Devuelve (lunes, lunes siguiente) de la semana de la fecha, como texto "aaaa-mm-dd" (el segundo excluido).""" # Docstring que describe la función.
+    fecha = fecha or datetime.date.today() # Semana actual por defecto.
+    if isinstance(fecha, str): # Fecha en texto.
+        fecha = datetime.date.fromisoformat(fecha) # La interpreta (lanza ValueError si no es válida).
+    lunes = fecha - datetime.timedelta(days=fecha.weekday()) # Primer día de la semana.
+    return lunes.isoformat(), (lunes + datetime.timedelta(days=7)).isoformat() # Límites de la semana.
+
+
+def _rellenar(plantilla, html_ya_escapado=None, **valores):
+    """Rellena una plantilla escapando los valores (vienen del usuario); html_ya_escapado son fragmentos HTML que se insertan tal cual.""" # Docstring que describe la función.
+    campos = {clave: html.escape(str(valor)) for clave, valor in valores.items()} # Textos escapados.
+    campos.update(html_ya_escapado or {}) # Fragmentos ya generados con sus propias plantillas.
+    return plantilla.substitute(campos) # Bloque HTML.
+
+
+def _nombre_dia(fecha):
+    """Devuelve "lunes 2 de junio de 2025" a partir de "2025-06-02".""" # Docstring que describe la función.
+    dia = datetime.date.fromisoformat(fecha) # Fecha.
+    meses = ("enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre") # Nombres de los meses.
+    return f"{DIAS_SEMANA[dia.weekday()]} {dia.day} de {meses[dia.month - 1]} de {dia.year}" # Texto del día.
+
+
+# --- Etapas de la cadena de generadores ---
+def _tareas_del_periodo(usuario, desde, hasta):
+    """Genera las tareas activas y archivadas del periodo, ordenadas por fecha (las archivadas marcadas).""" # Docstring que describe la función.
+    activas = Consulta(almacen_tareas, usuario).donde(fecha__gte=desde, fecha__lt=hasta).ordenar_por("fecha").registros() # Porción del índice de fechas.
+    archivadas = ({**t, "archivada": True} for t in historico_tareas.tareas_de_rango(usuario, desde, hasta)) # Solo se abre el histórico si el periodo lo toca.
+    return heapq.merge(activas, archivadas, key=lambda t: t["fecha"]) # Ambas ya ordenadas: mezcla perezosa.
+
+
+def _bloques_tareas(tareas):
+    """Convierte las tareas (ordenadas por fecha) en bloques HTML, con un encabezado por día.""" # Docstring que describe la función.
+    hay_tareas = False # Para avisar de un periodo vacío.
+    for fecha, del_dia in itertools.groupby(tareas, key=lambda t: t["fecha"]): # Grupos consecutivos del mismo día.
+        hay_tareas = True # El periodo tiene tareas.
+        yield _rellenar(PLANTILLA_DIA, dia=_nombre_dia(fecha)) # Encabezado del día.
+        for tarea in del_dia: # Recorre las tareas del día.
+            clases = " ".join(c for c, si in (("hecha", tarea.get("completada")), ("alta", tarea.get("prioridad") == "alta"), ("archivada", tarea.get("archivada"))) if si) # Clases CSS.
+            etiquetas = "".join(_rellenar(PLANTILLA_ETIQUETA, etiqueta=e) for e in tarea.get("etiquetas", [])) # Etiquetas, cada una escapada.
+            yield _rellenar(PLANTILLA_TAREA, {"etiquetas": etiquetas}, clases=clases, titulo=tarea.get("titulo", ""), # Bloque de la tarea.
+                            prioridad=tarea.get("prioridad") or "media", contenido=tarea.get("contenido", "")) # Prioridad y contenido.
+    if not hay_tareas: # Periodo sin tareas.
+        yield PLANTILLA_SIN_TAREAS.substitute() # Aviso.
+
+
+def _bloques_notas(usuario):
+    """Genera un bloque por nota, leyendo el cuerpo de cada una solo cuando le toca.""" # Docstring que describe la función.
+    yield PLANTILLA_NOTAS.substitute() # Encabezado de las notas.
+    for nota in list(almacen_notas.del_usuario(usuario)): # Copia de la lista: otra ventana podría cambiarla mientras tanto.
+        yield _rellenar(PLANTILLA_NOTA, titulo=nota.get("titulo", ""), cuerpo=almacen_notas.contenido(usuario, nota["id"])) # Cuerpo descomprimido solo ahora.
+
+
+def trozos_informe(usuario, desde, hasta, incluir_notas=True, ahora=None):
+    """Genera, trozo a trozo, el HTML del informe del usuario para las tareas con fecha en [desde, hasta).""" # Docstring que describe la función.
+    ahora = ahora or datetime.datetime.now() # Momento de generación.
+    periodo = Consulta(almacen_tareas, usuario).donde(fecha__gte=desde, fecha__lt=hasta) # Tareas activas del periodo.
+    total = periodo.contar() # Bits del rango de fechas: no se leen las tareas.
+    completadas = periodo.donde(completada=True).contar() # Intersección con las completadas.
+    archivadas = len(historico_tareas.tareas_de_rango(usuario, desde, hasta)) # Solo abre el histórico si el periodo lo toca.
+    ultimo = (datetime.date.fromisoformat(hasta) - datetime.timedelta(days=1)).isoformat() # Último día incluido.
+    yield _rellenar(PLANTILLA_CABECERA, usuario=usuario, periodo=f"del {_nombre_dia(desde)} al {_nombre_dia(ultimo)}", # Cabecera con el resumen.
+                    generado=ahora.strftime("%Y-%m-%d %H:%M"), abiertas=total - completadas, completadas=completadas, archivadas=archivadas) # Contadores.
+    yield from _bloques_tareas(_tareas_del_periodo(usuario, desde, hasta)) # Tareas, día a día.
+    if incluir_notas: # Notas del usuario.
+        yield from _bloques_notas(usuario) # Una a una.
+    yield PLANTILLA_PIE.substitute() # Cierre.
+
+
+def escribir_trozos(trozos, ruta, tamano_bufer=TAMANO_BUFER):
+    """
+    Escribe los trozos en el archivo según se generan, a través de un búfer de tamano_bufer bytes.
+    Se escribe en un temporal que sustituye al destino al terminar: un informe a medias nunca queda con el nombre final.
+    Devuelve el número de bytes escritos.
+    """ # Docstring que describe la función.
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True) # Crea la carpeta si no existe.
+    temporal = ruta + ".tmp" # Archivo temporal junto al destino.
+    escritos = 0 # Bytes escritos.
+    try: # Si algo falla, el temporal no debe quedarse.
+        with open(temporal, 'w', encoding='utf-8', buffering=tamano_bufer) as f: # Archivo con búfer propio.
+            for trozo in trozos: # Recorre los trozos según se generan.
+                f.write(trozo) # Lo pasa al búfer (que se vuelca al disco al llenarse).
+                escritos += len(trozo.encode('utf-8')) # Los cuenta.
+        os.replace(temporal, ruta) # Publica el informe completo.
+    except BaseException: # Cualquier error, incluida una interrupción.
+        if os.path.exists(temporal): # Si quedó el temporal.
+            os.remove(temporal) # Lo elimina.
+        raise # Propaga el error.
+    return escritos # Devuelve el tamaño.
+
+
+def conversor_pdf():
+    """Devuelve (ruta del ejecutable, función de argumentos) del primer conversor a PDF instalado, o None.""" # Docstring que describe la función.
+    for nombre, argumentos in CONVERSORES_PDF: # Recorre los conversores conocidos.
+        ejecutable = shutil.which(nombre) # Lo busca en el PATH.
+        if ejecutable: # Instalado.
+            return ejecutable, argumentos # Lo devuelve.
+    return None # Ninguno instalado.
+
+
+def convertir_pdf(ruta_html, ruta_pdf, espera_s=120):
+    """Convierte el HTML a PDF con el conversor local. Devuelve la ruta del PDF, o None si no hay conversor o falló.""" # Docstring que describe la función.
+    conversor = conversor_pdf() # Conversor instalado.
+    if conversor is None: # Ninguno.
+        return None # Solo habrá HTML.
+    ejecutable, argumentos = conversor # Ejecutable y argumentos.
+    try: # El conversor puede fallar o colgarse.
+        proceso = subprocess.run([ejecutable, *argumentos(os.path.abspath(ruta_html), os.path.abspath(ruta_pdf))], capture_output=True, timeout=espera_s) # Convierte.
+    except (OSError, subprocess.TimeoutExpired) as e: # No se pudo lanzar o tardó demasiado.
+        print(f"Error al convertir el informe a PDF: {e}") # Imprime el error en la consola.
+        return None # Solo habrá HTML.
+    if proceso.returncode != 0 or not os.path.exists(ruta_pdf): # Falló.
+        print(f"Error al convertir el informe a PDF: {proceso.stderr.decode('utf-8', 'replace').strip()[:500]}") # Imprime el error en la consola.
+        return None # Solo habrá HTML.
+    return ruta_pdf # Devuelve la ruta del PDF.
+
+
+def generar_informe(usuario, desde, hasta, ruta=None, incluir_notas=True, pdf=False):
+    """
+    Genera el informe HTML del periodo [desde, hasta) y, si se pide y hay conversor, también el PDF.
+    Devuelve (ruta del HTML, ruta del PDF o None).
+    """ # Docstring que describe la función.
+    if ruta is None: # Nombre por defecto: usuario y periodo.
+        from urllib.parse import quote # Nombre de archivo válido para cualquier usuario.
+        ruta = os.path.join(CARPETA_INFORMES, f"informe_{quote(usuario, safe='')}_{desde}.html") # Carpeta de informes.
+    escribir_trozos(trozos_informe(usuario, desde, hasta, incluir_notas), ruta) # HTML, trozo a trozo.
+    ruta_pdf = convertir_pdf(ruta, os.path.splitext(ruta)[0] + ".pdf") if pdf else None # PDF, si se pide.
+    return ruta, ruta_pdf # Devuelve las rutas.
@@ -0,0 +1,364 @@
+"""
+Importación y exportación de tareas en CSV, iCalendar (.ics) y JSON Lines.
+
+Todo se procesa en flujo: los archivos se leen por bloques de registros completos y se escriben registro a
+registro, de modo que la memoria usada no depende del tamaño del archivo. Cada bloque se interpreta y se valida
+de una vez (las fechas distintas del bloque se comprueban una sola vez), y los bloques pueden repartirse entre
+varios procesos. Las tareas válidas se guardan en escrituras de REGISTROS_POR_ESCRITURA.
+
+Repartir la interpretación entre procesos rara vez compensa: en un CSV normal interpretar es menos de un tercio
+del tiempo (el resto es añadir las tareas y reescribir tareas.json, que no se reparte), y cada bloque se copia
+de ida y vuelta entre procesos. Solo ayuda con varios núcleos libres y archivos enormes de formato costoso
+(iCalendar con líneas plegadas); nunca se usan más procesos que núcleos.
+"""
+import collections # Importa collections para la ventana acotada de bloques en proceso (deque).
+import csv # Importa csv para leer y escribir archivos separados por comas.
+import datetime # Importa datetime para validar las fechas y fechar la exportación iCalendar.
+import json # Importa el módulo json, que permite trabajar con datos en formato JSON (serializar y deserializar).
+import os # Importa os para deducir el formato a partir de la extensión del archivo.
+import re # Importa re para separar las categorías de iCalendar por comas no escapadas.
+
+from almacenamiento import separar_etiquetas, PRIORIDADES, PRIORIDAD_POR_DEFECTO # Importa las etiquetas y prioridades de las tareas.
+
+TAMANO_BLOQUE = 2000 # Registros que se interpretan y validan juntos (y que recibe cada proceso de una vez).
+REGISTROS_POR_ESCRITURA = 50000 # Tareas importadas por cada escritura de tareas.json (cada una reescribe el archivo completo).
+FORMATOS = ("csv", "ics", "jsonl") # Formatos admitidos.
+COLUMNAS = { # Nombres de columna CSV aceptados para cada campo (sin distinguir mayúsculas).
+    "titulo": ("titulo", "título", "title", "summary", "asunto"), # Título.
+    "fecha": ("fecha", "date", "due", "vencimiento"), # Fecha de entrega.
+    "contenido": ("contenido", "content", "description", "descripcion", "descripción"), # Contenido.
+    "etiquetas": ("etiquetas", "tags", "categories", "categorias", "categorías"), # Etiquetas (separadas por comas o puntos y coma).
+    "prioridad": ("prioridad", "priority"), # Prioridad: alta, media o baja.
+}
+PRIORIDAD_ICS = {"alta": 1, "media": 5, "baja": 9} # Valor de PRIORITY en iCalendar (1 = máxima, 9 = mínima).
+
+
+# --- Validación ---
+def _fecha_iso(texto):
+    """Devuelve la fecha en formato "aaaa-mm-dd" (acepta también "aaaammdd"), "" si está vacía o None si no es válida.""" # Docstring que describe la función.
+    if not texto: # Tarea sin fecha.
+        return "" # Se admite, como en la aplicación gráfica.
+    if len(texto) == 8 and texto.isdigit(): # Formato básico, el de iCalendar.
+        texto = f"{texto[:4]}-{texto[4:6]}-{texto[6:]}" # Lo pasa a formato extendido.
+    try: # Comprueba que es una fecha real.
+        return datetime.date.fromisoformat(texto).isoformat() # Fecha normalizada.
+    except ValueError: # Formato no válido o fecha imposible.
+        return None # Fecha no válida.
+
+
+def validar_lote(lote):
+    """
+    Normaliza un bloque de registros importados.
+
+    Args:
+        lote (list): Pares (número de línea, diccionario con "titulo", "fecha", "contenido" y,
+            opcionalmente, "etiquetas" (lista o texto separado por comas) y "prioridad").
+
+    Returns:
+        tuple: (tareas válidas, [(número de línea, motivo del error)]).
+    """ # Docstring que describe la función y sus argumentos.
+    fechas = {str(datos.get("fecha") or "").strip() for _, datos in lote} # Fechas distintas del bloque.
+    fechas = {texto: _fecha_iso(texto) for texto in fechas} # Cada fecha se valida una sola vez.
+    tareas, errores = [], [] # Resultado.
+    for numero, datos in lote: # Recorre el bloque.
+        titulo = str(datos.get("titulo") or "").strip() # Título sin espacios sobrantes.
+        fecha = str(datos.get("fecha") or "").strip() # Fecha tal y como venía.
+        prioridad = str(datos.get("prioridad") or PRIORIDAD_POR_DEFECTO).strip().lower() # Prioridad (la de por defecto si no viene).
+        etiquetas = datos.get("etiquetas") or [] # Etiquetas: lista (JSON) o texto (CSV).
+        if not titulo: # El título es obligatorio, como en la aplicación gráfica.
+            errores.append((numero, "el título no puede estar vacío")) # Error.
+        elif fechas[fecha] is None: # Fecha no válida.
+            errores.append((numero, f"fecha no válida: {fecha!r}")) # Error.
+        elif prioridad not in PRIORIDADES: # Prioridad desconocida.
+            errores.append((numero, f"prioridad no válida: {prioridad!r}")) # Error.
+        else: # Registro válido.
+            etiquetas = separar_etiquetas(etiquetas if isinstance(etiquetas, str) else ",".join(map(str, etiquetas))) # Etiquetas normalizadas.
+            tareas.append({"titulo": titulo, "contenido": str(datos.get("contenido") or ""), "fecha": fechas[fecha], # Tarea normalizada.
+                           "etiquetas": etiquetas, "prioridad": prioridad}) # Clasificación.
+    return tareas, errores # Devuelve las tareas y los errores.
+
+
+def validar_tarea(datos):
+    """Normaliza una sola tarea; devuelve (tarea, None) o (None, motivo del error).""" # Docstring que describe la función.
+    tareas, errores = validar_lote([(0, datos)]) # Un bloque de un registro.
+    return (tareas[0], None) if tareas else (None, errores[0][1]) # Tarea o motivo.
+
+
+# --- Lectura por bloques (proceso principal) ---
+def _bloques_csv(archivo, tamano):
+    """Genera bloques (líneas, primera línea) de registros CSV completos; un campo entre comillas puede ocupar varias líneas.""" # Docstring que describe la función.
+    bloque, comillas, numero, inicio = [], 0, 1, 2 # Bloque actual, comillas abiertas, línea actual y primera línea del bloque.
+    registros = 0 # Registros completos en el bloque actual.
+    for linea in archivo: # Lee el archivo línea a línea.
+        numero += 1 # Número de la línea (la 1 es la cabecera).
+        bloque.append(linea) # La añade al bloque.
+        comillas += linea.count('"') # Un número impar de comillas deja un campo abierto.
+        if comillas % 2 == 0: # El registro termina en esta línea.
+            comillas = 0 # Reinicia la cuenta.
+            registros += 1 # Un registro más.
+            if registros >= tamano: # Bloque lleno.
+                yield bloque, inicio # Lo entrega.
+                bloque, registros, inicio = [], 0, numero + 1 # Empieza otro.
+    if bloque: # Último bloque incompleto.
+        yield bloque, inicio # Lo entrega.
+
+
+def _bloques_lineas(archivo, tamano, primera=1):
+    """Genera bloques (líneas, primera línea) de un archivo con un registro por línea (JSON Lines).""" # Docstring que describe la función.
+    bloque, inicio = [], primera # Bloque actual y su primera línea.
+    for numero, linea in enumerate(archivo, start=primera): # Lee el archivo línea a línea.
+        bloque.append(linea) # La añade al bloque.
+        if len(bloque) >= tamano: # Bloque lleno.
+            yield bloque, inicio # Lo entrega.
+            bloque, inicio = [], numero + 1 # Empieza otro.
+    if bloque: # Último bloque incompleto.
+        yield bloque, inicio # Lo entrega.
+
+
+def _bloques_ics(archivo, tamano):
+    """Genera bloques (líneas, primera línea) que terminan siempre tras un END:VEVENT o END:VTODO.""" # Docstring que describe la función.
+    bloque, inicio, componentes = [], 1, 0 # Bloque actual, su primera línea y componentes completos que contiene.
+    for numero, linea in enumerate(archivo, start=1): # Lee el archivo línea a línea.
+        bloque.append(linea) # La añade al bloque.
+        if linea.rstrip("\r\n").upper() in ("END:VEVENT", "END:VTODO"): # Fin de un componente.
+            componentes += 1 # Un componente más.
+            if componentes >= tamano: # Bloque lleno.
+                yield bloque, inicio # Lo entrega (la línea siguiente nunca es la continuación de esta).
+                bloque, inicio, componentes = [], numero + 1, 0 # Empieza otro.
+    if bloque: # Último bloque.
+        yield bloque, inicio # Lo entrega.
+
+
+# --- Interpretación de bloques (proceso principal o procesos auxiliares) ---
+def _procesar_csv(campos, lineas, inicio):
+    """Interpreta y valida un bloque CSV; campos es la correspondencia columna -> campo obtenida de la cabecera.""" # Docstring que describe la función.
+    lector = csv.reader(lineas) # Lector sobre las líneas del bloque.
+    lote = [] # Pares (línea, datos).
+    numero = inicio # Línea donde empieza el registro actual.
+    for fila in lector: # Recorre los registros.
+        if any(celda.strip() for celda in fila): # Ignora las filas vacías.
+            lote.append((numero, {campo: fila[i] for i, campo in campos.items() if i < len(fila)})) # Campos reconocidos.
+        numero = inicio + lector.line_num # Primera línea del registro siguiente.
+    return validar_lote(lote) # Valida el bloque de una vez.
+
+
+def _procesar_jsonl(lineas, inicio):
+    """Interpreta y valida un bloque JSON Lines.""" # Docstring que describe la función.
+    lote, errores = [], [] # Registros leídos y errores de sintaxis.
+    for numero, linea in enumerate(lineas, start=inicio): # Recorre las líneas.
+        if not linea.strip(): # Líneas en blanco.
+            continue # Se ignoran.
+        try: # Interpreta la línea.
+            datos = json.loads(linea) # Objeto JSON.
+            lote.append((numero, {campo: datos.get(campo) for campo in COLUMNAS})) # Solo los campos conocidos.
+        except (ValueError, AttributeError) as e: # JSON no válido o que no es un objeto.
+            errores.append((numero, f"JSON no válido ({e})")) # Error.
+    tareas, errores_lote = validar_lote(lote) # Valida el bloque de una vez.
+    return tareas, sorted(errores + errores_lote) # Errores en orden de línea.
+
+
+def _desescapar_ics(valor):
+    """Deshace el escapado de texto de iCalendar (\\n, \\, \\; y \\\\).""" # Docstring que describe la función.
+    resultado, i = [], 0 # Caracteres del resultado y posición actual.
+    while i < len(valor): # Recorre el valor.
+        if valor[i] == "\\" and i + 1 < len(valor): # Secuencia de escape.
+            i += 1 # Carácter escapado.
+            resultado.append("\n" if valor[i] in "nN" else valor[i]) # \n es un salto de línea; el resto se copia.
+        else: # Carácter normal.
+            resultado.append(valor[i]) # Se copia.
+        i += 1 # Avanza.
+    return "".join(resultado) # Valor sin escapar.
+
+
+def _procesar_ics(lineas, inicio):
+    """Interpreta y valida un bloque iCalendar: cada VTODO (DUE) o VEVENT (DTSTART) es una tarea.""" # Docstring que describe la función.
+    desplegadas = [] # Líneas lógicas: (número de línea, texto) con las continuaciones ya unidas.
+    for numero, linea in enumerate(lineas, start=inicio): # Recorre las líneas físicas.
+        linea = linea.rstrip("\r\n") # Quita el fin de línea.
+        if linea[:1] in (" ", "\t") and desplegadas: # Continuación de la línea anterior (plegado de 75 octetos).
+            desplegadas[-1] = (desplegadas[-1][0], desplegadas[-1][1] + linea[1:]) # La une a la anterior.
+        elif linea: # Línea nueva.
+            desplegadas.append((numero, linea)) # La añade.
+    lote = [] # Pares (línea, datos).
+    actual = None # Propiedades del componente abierto, o None fuera de componentes.
+    for numero, linea in desplegadas: # Recorre las líneas lógicas.
+        nombre, _, valor = linea.partition(":") # "NOMBRE;PARAMETROS:valor" (los parámetros de estas propiedades no llevan ":").
+        nombre = nombre.split(";", 1)[0].upper() # Nombre de la propiedad sin parámetros.
+        if nombre == "BEGIN" and valor.upper() in ("VEVENT", "VTODO"): # Empieza una tarea.
+            actual = {"_linea": numero} # Propiedades del componente.
+        elif nombre == "END" and valor.upper() in ("VEVENT", "VTODO") and actual is not None: # Termina la tarea.
+            fecha = actual.get("DUE") or actual.get("DTSTART", "") # Fecha de entrega (o de inicio en los eventos).
+            lote.append((actual["_linea"], {"titulo": actual.get("SUMMARY", ""), "fecha": fecha[:8], # Solo la parte de fecha (aaaammdd).
+                                            "contenido": actual.get("DESCRIPTION", ""), # Descripción.
+                                            "etiquetas": actual.get("CATEGORIES", []), "prioridad": actual.get("PRIORITY")})) # Clasificación.
+            actual = None # Fuera de componente.
+        elif actual is not None and nombre in ("SUMMARY", "DESCRIPTION"): # Propiedades de texto.
+            actual[nombre] = _desescapar_ics(valor) # Texto sin escapar.
+        elif actual is not None and nombre in ("DUE", "DTSTART"): # Propiedades de fecha.
+            actual[nombre] = valor.strip() # Fecha "aaaammdd" o fecha y hora "aaaammddThhmmss[Z]".
+        elif actual is not None and nombre == "CATEGORIES": # Categorías (puede haber varias líneas).
+            actual.setdefault("CATEGORIES", []).extend(_desescapar_ics(c) for c in re.split(r"(?<!\\),", valor)) # Separadas por comas no escapadas.
+        elif actual is not None and nombre == "PRIORITY" and valor.strip().isdigit(): # Prioridad numérica.
+            numero_prioridad = int(valor) # 0 = sin definir, 1 = máxima, 9 = mínima.
+            actual["PRIORITY"] = None if numero_prioridad == 0 else "alta" if numero_prioridad <= 4 else "media" if numero_prioridad == 5 else "baja" # Rangos habituales de los clientes de calendario.
+    return validar_lote(lote) # Valida el bloque de una vez.
+
+
+def _campos_csv(cabecera):
+    """Relaciona cada posición de columna de la cabecera con el campo de tarea que contiene.""" # Docstring que describe la función.
+    nombres = {alias: campo for campo, alias_campo in COLUMNAS.items() for alias in alias_campo} # Alias -> campo.
+    fila = next(csv.reader([cabecera]), []) # Celdas de la cabecera.
+    campos = {i: nombres[celda.strip().lower()] for i, celda in enumerate(fila) if celda.strip().lower() in nombres} # Columnas reconocidas.
+    if "titulo" not in campos.values(): # Sin columna de título no se puede importar nada.
+        raise ValueError(f"la cabecera CSV no tiene columna de título ({', '.join(COLUMNAS['titulo'])})") # Error de formato.
+    return campos # Devuelve la correspondencia.
+
+
+def _tareas_de_bloques(archivo, formato, tamano, procesos):
+    """Genera (tareas, errores) por bloque, en orden, interpretando los bloques aquí o en varios procesos.""" # Docstring que describe la función.
+    if formato == "csv": # CSV: la cabecera se lee aquí y se pasa a cada bloque.
+        campos = _campos_csv(next(archivo, "")) # Columnas de la cabecera.
+        trabajos = ((_procesar_csv, campos, lineas, inicio) for lineas, inicio in _bloques_csv(archivo, tamano)) # Trabajos.
+    elif formato == "ics": # iCalendar.
+        trabajos = ((_procesar_ics, lineas, inicio) for lineas, inicio in _bloques_ics(archivo, tamano)) # Trabajos.
+    else: # JSON Lines.
+        trabajos = ((_procesar_jsonl, lineas, inicio) for lineas, inicio in _bloques_lineas(archivo, tamano)) # Trabajos.
+    procesos = min(procesos, os.cpu_count() or 1) # Más procesos que núcleos solo añaden copias entre procesos.
+    if procesos <= 1: # Sin procesos auxiliares (también con un solo núcleo).
+        for funcion, *argumentos in trabajos: # Recorre los bloques.
+            yield funcion(*argumentos) # Los interpreta aquí mismo.
+        return # Fin.
+    from concurrent.futures import ProcessPoolExecutor # Solo se carga si se piden varios procesos.
+    with ProcessPoolExecutor(max_workers=procesos) as grupo: # Procesos auxiliares.
+        en_curso = collections.deque() # Bloques enviados y aún no entregados, en orden.
+        for trabajo in trabajos: # Lee el archivo bloque a bloque.
+            en_curso.append(grupo.submit(*trabajo)) # Envía el bloque a un proceso.
+            if len(en_curso) >= 2 * procesos: # Ventana llena: nunca hay más de 2 bloques por proceso en memoria.
+                yield en_curso.popleft().result() # Espera al más antiguo y lo entrega.
+        while en_curso: # Bloques restantes.
+            yield en_curso.popleft().result() # Los entrega en orden.
+
+
+# --- Importación ---
+def detectar_formato(ruta, formato=None):
+    """Devuelve el formato indicado o, si es None, el que corresponde a la extensión del archivo.""" # Docstring que describe la función.
+    if formato: # Formato explícito.
+        return formato # Se respeta.
+    extension = os.path.splitext(ruta)[1].lower().lstrip(".") # Extensión sin el punto.
+    return {"ical": "ics", "ndjson": "jsonl", "json": "jsonl"}.get(extension, extension if extension in FORMATOS else "jsonl") # JSON Lines por defecto.
+
+
+def importar_tareas(coleccion, usuario, archivo, formato, procesos=1, tamano_bloque=TAMANO_BLOQUE,
+                    registros_por_escritura=REGISTROS_POR_ESCRITURA, al_error=None):
+    """
+    Importa tareas desde un archivo de texto abierto, en flujo.
+
+    Args:
+        coleccion (ColeccionJSON): Colección de tareas donde se añaden.
+        usuario (str): Usuario propietario de las tareas.
+        archivo: Archivo de texto abierto (con newline="" si es CSV).
+        formato (str): "csv", "ics" o "jsonl".
+        procesos (int): Procesos que interpretan los bloques (1, lo habitual y más rápido, para hacerlo en este proceso).
+        tamano_bloque (int): Registros por bloque.
+        registros_por_escritura (int): Tareas que se guardan en cada escritura.
+        al_error (callable): Función (número de línea, motivo) llamada por cada registro rechazado.
+
+    Returns:
+        tuple: (tareas importadas, registros rechazados).
+    """ # Docstring que describe la función y sus argumentos.
+    if formato not in FORMATOS: # Formato desconocido.
+        raise ValueError(f"formato no admitido: {formato!r}") # Error de uso.
+    resultados = _tareas_de_bloques(archivo, formato, tamano_bloque, procesos) # Bloques interpretados, en orden.
+    importadas = rechazadas = 0 # Contadores.
+    terminado = False # Si ya se consumieron todos los bloques.
+    while not terminado: # Una transacción (una escritura) por tanda.
+        with coleccion.transaccion(): # Nada se escribe hasta cerrar la tanda.
+            en_tanda = 0 # Tareas añadidas en esta tanda.
+            for tareas, errores in resultados: # Recorre los bloques.
+                coleccion.agregar_varios(usuario, tareas) # Añade el bloque de una vez.
+                en_tanda += len(tareas) # Cuenta las tareas.
+                rechazadas += len(errores) # Cuenta los rechazos.
+                for numero, motivo in errores: # Informa de cada rechazo.
+                    if al_error is not None: # Si hay a quién avisar.
+                        al_error(numero, motivo) # Le avisa.
+                if en_tanda >= registros_por_escritura: # Tanda completa.
+                    break # Cierra la transacción: se escribe.
+            else: # No quedan bloques.
+                terminado = True # Sale del bucle tras esta última escritura.
+            importadas += en_tanda # Acumula las tareas de la tanda.
+    return importadas, rechazadas # Devuelve los contadores.
+
+
+# --- Exportación ---
+def _escapar_ics(valor):
+    """Escapa texto para iCalendar.""" # Docstring que describe la función.
+    return valor.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n") # Escapa los caracteres especiales.
+
+
+def _plegar_ics(linea):
+    """Pliega una línea iCalendar en trozos de como mucho 75 octetos, sin partir caracteres UTF-8.""" # Docstring que describe la función.
+    trozos, actual, octetos, limite = [], [], 0, 75 # Trozos hechos, trozo actual, su tamaño y el límite del trozo.
+    for caracter in linea: # Recorre la línea.
+        tamano = len(caracter.encode("utf-8")) # Octetos del carácter.
+        if octetos + tamano > limite: # No cabe en el trozo actual.
+            trozos.append("".join(actual)) # Cierra el trozo.
+            actual, octetos, limite = [], 0, 74 # Las continuaciones empiezan con un espacio.
+        actual.append(caracter) # Añade el carácter.
+        octetos += tamano # Suma su tamaño.
+    trozos.append("".join(actual)) # Último trozo.
+    return "\r\n ".join(trozos) + "\r\n" # Continuaciones precedidas de un espacio y fin de línea CRLF.
+
+
+def _lineas_ics(usuario, tareas):
+    """Genera las líneas de un calendario con un VTODO por tarea.""" # Docstring que describe la función.
+    sello = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ") # Fecha de la exportación (DTSTAMP).
+    yield "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//EduPlanner//Tareas//ES\r\n" # Cabecera del calendario.
+    for tarea in tareas: # Recorre las tareas.
+        partes = ["BEGIN:VTODO\r\n", _plegar_ics(f"UID:tarea-{tarea['id']}-{usuario}@eduplanner"), f"DTSTAMP:{sello}\r\n", # Identificador y sello.
+                  _plegar_ics("SUMMARY:" + _escapar_ics(tarea.get("titulo", "")))] # Título.
+        if tarea.get("fecha"): # Si tiene fecha de entrega.
+            partes.append(f"DUE;VALUE=DATE:{tarea['fecha'].replace('-', '')}\r\n") # Fecha en formato básico.
+        if tarea.get("contenido"): # Si tiene contenido.
+            partes.append(_plegar_ics("DESCRIPTION:" + _escapar_ics(tarea["contenido"]))) # Descripción.
+        if tarea.get("etiquetas"): # Si tiene etiquetas.
+            partes.append(_plegar_ics("CATEGORIES:" + ",".join(_escapar_ics(e) for e in tarea["etiquetas"]))) # Categorías.
+        partes.append(f"PRIORITY:{PRIORIDAD_ICS[tarea.get('prioridad') or PRIORIDAD_POR_DEFECTO]}\r\n") # Prioridad numérica.
+        partes.append("END:VTODO\r\n") # Fin de la tarea.
+        yield "".join(partes) # Entrega la tarea completa.
+    yield "END:VCALENDAR\r\n" # Fin del calendario.
+
+
+def exportar_tareas(usuario, tareas, salida, formato):
+    """
+    Escribe las tareas en un archivo de texto abierto, una a una.
+
+    Args:
+        usuario (str): Usuario propietario (forma parte del UID en iCalendar).
+        tareas (iterable): Tareas a exportar (puede ser un generador).
+        salida: Archivo de texto abierto para escritura (con newline="" para CSV e iCalendar).
+        formato (str): "csv", "ics" o "jsonl".
+
+    Returns:
+        int: Número de tareas exportadas.
+    """ # Docstring que describe la función y sus argumentos.
+    contador = [0] # Tareas escritas (lista para poder modificarla desde el generador).
+
+    def contar(registros):
+        """Cuenta las tareas a medida que pasan.""" # Docstring que describe la función interna.
+        for registro in registros: # Recorre las tareas.
+            contador[0] += 1 # Cuenta la tarea.
+            yield registro # La entrega.
+
+    tareas = contar(tareas) # Tareas contadas.
+    if formato == "csv": # CSV con cabecera.
+        escritor = csv.writer(salida) # Escritor CSV.
+        escritor.writerow(("id", "titulo", "fecha", "contenido", "etiquetas", "prioridad")) # Cabecera.
+        escritor.writerows((t["id"], t.get("titulo", ""), t.get("fecha", ""), t.get("contenido", ""), # Filas, en flujo.
+                            "; ".join(t.get("etiquetas", [])), t.get("prioridad") or PRIORIDAD_POR_DEFECTO) for t in tareas)
+    elif formato == "ics": # iCalendar.
+        salida.writelines(_lineas_ics(usuario, tareas)) # Calendario, en flujo.
+    elif formato == "jsonl": # JSON Lines.
+        salida.writelines(json.dumps(t, ensure_ascii=False) + "\n" for t in tareas) # Un objeto por línea.
+    else: # Formato desconocido.
+        raise ValueError(f"formato no admitido: {formato!r}") # Error de uso.
+    return contador[0] # Devuelve el número de tareas escritas.
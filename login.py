@@ -1,10 +1,8 @@
 import tkinter as tk # Importa el módulo tkinter, que es la biblioteca estándar de Python para crear interfaces gráficas de usuario (GUI).
 from tkinter import messagebox # Importa el submódulo messagebox de tkinter, utilizado para mostrar cuadros de diálogo de mensajes (información, advertencia, error).
-import json # Importa el módulo json, que permite trabajar con datos en formato JSON (serializar y deserializar).
-import os # Importa el módulo os, que proporciona funciones para interactuar con el sistema operativo, como la gestión de rutas de archivos y directorios.
 from menu import MenuPrincipal # Importa la clase MenuPrincipal desde el archivo 'menu.py', que representa la ventana principal del menú de la aplicación.
-
-USUARIOS_FILE = "data/usuarios.json" # Define una constante con la ruta al archivo JSON donde se almacenarán los datos de los usuarios.
+from credenciales import directorio_usuarios # Importa el directorio de usuarios con contraseñas derivadas.
+from estilos import esperar_futuro # Importa la espera de trabajos en segundo plano sin bloquear el bucle de Tk, del kit de interfaz compartido.
 
 class LoginVentana: # Define la clase LoginVentana, que encapsula la lógica y la interfaz de usuario para el inicio de sesión y registro.
     def __init__(self, root): # Define el método constructor de la clase, que se ejecuta al crear una nueva instancia de LoginVentana.
@@ -23,23 +21,15 @@ class LoginVentana: # Define la clase LoginVentana, que encapsula la lógica y l
         tk.Button(root, text="Iniciar sesión", command=self.iniciar_sesion).pack(pady=5) # Crea un botón "Iniciar sesión" y lo empaqueta, vinculándolo al método iniciar_sesion.
         tk.Button(root, text="Registrarse", command=self.registrarse).pack() # Crea un botón "Registrarse" y lo empaqueta, vinculándolo al método registrarse.
 
-    def cargar_usuarios(self): # Define un método para cargar los usuarios desde el archivo JSON.
-        if not os.path.exists(USUARIOS_FILE): # Comprueba si el archivo de usuarios no existe.
-            return {} # Si no existe, devuelve un diccionario vacío.
-        with open(USUARIOS_FILE, 'r') as f: # Abre el archivo de usuarios en modo lectura.
-            return json.load(f) # Carga y devuelve el contenido JSON del archivo.
-
-    def guardar_usuario(self, usuario, contraseña): # Define un método para guardar un nuevo usuario o actualizar uno existente.
-        usuarios = self.cargar_usuarios() # Carga la lista actual de usuarios.
-        usuarios[usuario] = contraseña # Añade o actualiza la contraseña del usuario en el diccionario.
-        with open(USUARIOS_FILE, 'w') as f: # Abre el archivo de usuarios en modo escritura (sobrescribe).
-            json.dump(usuarios, f) # Guarda el diccionario actualizado de usuarios en el archivo JSON.
-
     def iniciar_sesion(self): # Define el método que maneja la lógica de inicio de sesión.
         usuario = self.usuario_entry.get() # Obtiene el texto ingresado en el campo de usuario.
         contraseña = self.password_entry.get() # Obtiene el texto ingresado en el campo de contraseña.
-        usuarios = self.cargar_usuarios() # Carga la lista de usuarios.
-        if usuario in usuarios and usuarios[usuario] == contraseña: # Comprueba si el usuario existe y la contraseña coincide.
+        futuro = directorio_usuarios.enviar(directorio_usuarios.verificar, usuario, contraseña) # Comprueba la contraseña en el hilo de trabajo, leyendo solo el registro del usuario.
+        esperar_futuro(self.root, futuro, lambda correcta: self._completar_inicio(usuario, correcta), # La ventana sigue respondiendo mientras tanto.
+                       lambda e: messagebox.showerror("Error", f"No se pudo acceder a los usuarios: {e}"))
+
+    def _completar_inicio(self, usuario, correcta): # Continúa el inicio de sesión en el hilo de Tk.
+        if correcta: # Comprueba si el usuario existe y la contraseña coincide.
             messagebox.showinfo("Éxito", "Inicio de sesión exitoso") # Muestra un mensaje de éxito.
             self.root.destroy() # Destruye la ventana de login actual.
             MenuPrincipal(usuario) # Crea una instancia de MenuPrincipal, pasando el nombre de usuario, y muestra la ventana del menú.
@@ -49,9 +39,12 @@ class LoginVentana: # Define la clase LoginVentana, que encapsula la lógica y l
     def registrarse(self): # Define el método que maneja la lógica de registro de un nuevo usuario.
         usuario = self.usuario_entry.get() # Obtiene el texto ingresado en el campo de usuario.
         contraseña = self.password_entry.get() # Obtiene el texto ingresado en el campo de contraseña.
-        usuarios = self.cargar_usuarios() # Carga la lista de usuarios.
-        if usuario in usuarios: # Comprueba si el usuario ya existe.
+        futuro = directorio_usuarios.enviar(directorio_usuarios.registrar, usuario, contraseña) # Deriva la contraseña y guarda el registro en el hilo de trabajo.
+        esperar_futuro(self.root, futuro, self._completar_registro, # La ventana sigue respondiendo mientras tanto.
+                       lambda e: messagebox.showerror("Error", f"No se pudo registrar el usuario: {e}"))
+
+    def _completar_registro(self, registrado): # Informa del resultado del registro en el hilo de Tk.
+        if not registrado: # Comprueba si el usuario ya existía.
             messagebox.showwarning("Advertencia", "El usuario ya existe") # Muestra una advertencia.
-        else: # Si el usuario no existe.
-            self.guardar_usuario(usuario, contraseña) # Guarda el nuevo usuario y su contraseña.
+        else: # Si el usuario se registró.
             messagebox.showinfo("Éxito", "Usuario registrado con éxito") # Muestra un mensaje de éxito.
@@ -1,13 +1,18 @@
 import tkinter as tk # Importa el módulo tkinter, que es la biblioteca estándar de Python para crear interfaces gráficas de usuario (GUI).
-from tkinter import PhotoImage # Importa la clase PhotoImage de tkinter, utilizada para trabajar con imágenes en formatos como GIF, PNG.
-from PIL import Image, ImageTk # Importa las clases Image y ImageTk del módulo PIL (Pillow), necesarias para trabajar con imágenes (abrir, redimensionar, convertir a formato compatible con Tkinter).
 # Asegúrate de que estas rutas sean correctas y que los módulos existan
 from notas import crear_nueva_nota, mostrar_notas # Importa las funciones crear_nueva_nota y mostrar_notas desde el módulo 'notas.py'.
 from tareas import agregar_tarea, ver_tareas # Importa las funciones agregar_tarea y ver_tareas desde el módulo 'tareas.py'.
 from calendario import mostrar_calendario # Importa la función mostrar_calendario desde el módulo 'calendario.py'.
+from agenda import mostrar_agenda # Importa la función mostrar_agenda desde el módulo 'agenda.py'.
+from ventana_informe import mostrar_informe # Importa la función mostrar_informe desde el módulo 'ventana_informe.py'.
+from almacenamiento import almacen_tareas, vaciar_todo # Importa la colección de tareas y la función que escribe los cambios pendientes de todas las colecciones.
+from eventos import EVENTOS_TAREAS, suscribir_widget # Importa los tipos de evento de tareas y el ayudante para suscribir widgets al bus de cambios.
+from indices import indice_estado # Importa el índice de completadas, que lleva los contadores de tareas abiertas y hechas.
+from estilos import tema, cargar_imagen, AZUL, ROJO, VERDE # Importa el tema compartido (fuentes con nombre y paletas precalculadas), la caché de imágenes y los colores de los botones.
+from diagnostico import diagnostico_memoria # Importa el diagnóstico de memoria (mide al llegar al menú, si está activado).
 
 class MenuPrincipal: # Define la clase MenuPrincipal, que representa la ventana principal del menú de la aplicación después del login.
-    def __init__(self, main_root, usuario, on_logout_callback=None): # Define el método constructor de la clase. Ahora recibe 'main_root' como la ventana raíz.
+    def __init__(self, main_root, usuario, on_logout_callback=None, marco=None): # Define el método constructor de la clase. Ahora recibe 'main_root' como la ventana raíz.
         """
         Inicializa la ventana principal del menú.
         
@@ -15,38 +20,38 @@ class MenuPrincipal: # Define la clase MenuPrincipal, que representa la ventana
             main_root (tk.Tk): La instancia de la ventana raíz principal de Tkinter.
             usuario (str): El nombre del usuario logueado.
             on_logout_callback (function): Función a llamar cuando el usuario cierra sesión.
+            marco (tk.Frame): Frame propio del menú, que el gestor de sesiones oculta y vuelve a mostrar; None para usar la ventana raíz.
         """ # Docstring que describe la función y sus argumentos.
         self.root = main_root # Almacena la ventana raíz *pasada* como argumento (la misma de main.py).
         self.usuario = usuario # Almacena el nombre de usuario.
         self.on_logout_callback = on_logout_callback # Almacena la función de callback para el cierre de sesión.
+        self.marco = marco or main_root # Contenedor de los widgets del menú.
 
-        # Limpiar widgets existentes en la ventana principal (si los hay del login)
-        for widget in self.root.winfo_children(): # Itera sobre todos los widgets hijos de la ventana principal (limpiando el login).
-            widget.destroy() # Destruye cada widget hijo.
+        # Limpiar widgets existentes en la ventana principal (si los hay del login); con marco propio, el login y los otros menús solo se ocultan
+        if marco is None: # Menú dibujado directamente en la ventana raíz.
+            for widget in self.root.winfo_children(): # Itera sobre todos los widgets hijos de la ventana principal (limpiando el login).
+                widget.destroy() # Destruye cada widget hijo.
 
         self.root.title("Administrador de Tareas") # Establece el título de la ventana del menú.
         self.root.attributes('-fullscreen', True) # Configura la ventana para que se abra en modo de pantalla completa.
 
         # Fondo de la ventana del menú
         try: # Intenta ejecutar el bloque de código para cargar la imagen de fondo.
-            fondo_img = Image.open("img/fondo_menu.jpg") # Abre la imagen de fondo desde la ruta especificada.
-            # Redimensionar la imagen para que se ajuste a la pantalla
-            fondo_img = fondo_img.resize((self.root.winfo_screenwidth(), self.root.winfo_screenheight()), Image.Resampling.LANCZOS) # Redimensiona la imagen para que coincida con el tamaño de la pantalla, usando un algoritmo de remuestreo de alta calidad.
-            fondo_photo = ImageTk.PhotoImage(fondo_img) # Convierte la imagen PIL a un formato compatible con Tkinter (PhotoImage).
-            fondo_label = tk.Label(self.root, image=fondo_photo) # Crea un Label para mostrar la imagen de fondo.
-            fondo_label.image = fondo_photo # Mantiene una referencia a la imagen para evitar que sea recolectada por el garbage collector.
+            # Imagen redimensionada al tamaño de la pantalla; se convierte una sola vez aunque se vuelva al menú muchas veces
+            fondo_photo = cargar_imagen("img/fondo_menu.jpg", (self.root.winfo_screenwidth(), self.root.winfo_screenheight())) # PhotoImage compartida (la caché mantiene la referencia).
+            fondo_label = tk.Label(self.marco, image=fondo_photo) # Crea un Label para mostrar la imagen de fondo.
             fondo_label.place(x=0, y=0, relwidth=1, relheight=1) # Coloca el Label de fondo para que ocupe toda la ventana.
         except Exception as e: # Captura cualquier excepción que ocurra durante la carga de la imagen.
             print(f"Error al cargar la imagen de fondo del menú: {e}") # Imprime el error en la consola.
-            self.root.configure(bg="#f0f4f7") # Si la imagen no carga, establece un color de fondo alternativo para la ventana.
+            self.marco.configure(bg="#f0f4f7") # Si la imagen no carga, establece un color de fondo alternativo para la ventana.
 
         # Título superior "Bienvenido, [Usuario]"
-        titulo = tk.Label(self.root, text=f"Bienvenido, {usuario}", font=("Helvetica", 56, "bold"), fg="black", bg="white") # Crea un Label para el título de bienvenida, con una fuente grande y en negrita.
+        titulo = tk.Label(self.marco, text=f"Bienvenido, {usuario}", font=tema.fuente("titulo_app"), fg="black", bg="white") # Crea un Label para el título de bienvenida, con una fuente grande y en negrita.
         titulo.pack(pady=50) # Empaqueta el título en la ventana, añadiendo un padding vertical para más espacio.
 
         # Contenedor con fondo blanco para las tarjetas de opciones
         # CAMBIO: Fondo de contenedor a azul pastel
-        contenedor = tk.Frame(self.root, bg="#E0F2F7", padx=20, pady=20) # Crea un Frame que servirá como contenedor principal para las tarjetas de opciones, con fondo azul pastel y padding interno.
+        contenedor = tk.Frame(self.marco, bg="#E0F2F7", padx=20, pady=20) # Crea un Frame que servirá como contenedor principal para las tarjetas de opciones, con fondo azul pastel y padding interno.
         contenedor.place(relx=0.5, rely=0.45, anchor="center") # Coloca el contenedor centrado en la pantalla (50% del ancho, 45% del alto).
 
         # Frame para las tarjetas dentro del contenedor (para organizar horizontalmente)
@@ -59,23 +64,27 @@ class MenuPrincipal: # Define la clase MenuPrincipal, que representa la ventana
             {"texto": "Nueva nota", "icono": "img/icono_nota.jpg", "accion": self.nueva_nota}, # Opción para crear una nueva nota, con su texto, ruta de icono y la función a ejecutar.
             {"texto": "Ver notas", "icono": "img/icono_ver_notas.png", "accion": self.ver_notas}, # Opción para ver notas existentes.
             {"texto": "Agregar tarea", "icono": "img/icono_tarea.png", "accion": self.nueva_tarea}, # Opción para agregar una nueva tarea.
-            {"texto": "Ver tareas", "icono": "img/icono_ver_tareas.png", "accion": self.ver_tareas}, # Opción para ver tareas existentes.
-            {"texto": "Calendario", "icono": "img/calendario.png", "accion": self.abrir_calendario} # Opción para abrir el calendario.
+            {"texto": "Ver tareas", "icono": "img/icono_ver_tareas.png", "accion": self.ver_tareas, "contadores": True}, # Opción para ver tareas existentes, con los contadores de abiertas y hechas.
+            {"texto": "Calendario", "icono": "img/calendario.png", "accion": self.abrir_calendario}, # Opción para abrir el calendario.
+            {"texto": "Agenda", "icono": "img/calendario.png", "accion": self.abrir_agenda}, # Opción para abrir la agenda de tareas agrupadas por fecha.
+            {"texto": "Informe", "icono": "img/icono_ver_tareas.png", "accion": self.abrir_informe} # Opción para generar el informe semanal imprimible.
         ]
 
         # Crear cada tarjeta de opción
         for opcion in opciones: # Itera sobre cada diccionario en la lista de opciones.
-            self.crear_tarjeta_opcion(frame_botones, opcion["texto"], opcion["icono"], opcion["accion"]) # Llama a la función crear_tarjeta_opcion para crear la interfaz visual de cada opción.
+            card = self.crear_tarjeta_opcion(frame_botones, opcion["texto"], opcion["icono"], opcion["accion"]) # Llama a la función crear_tarjeta_opcion para crear la interfaz visual de cada opción.
+            if opcion.get("contadores"): # Si la opción muestra los contadores de tareas.
+                self.crear_contadores(card) # Añade las insignias a la tarjeta.
 
         # Botón Salir (Esquina superior izquierda)
         tk.Button( # Crea el botón "Salir".
-            self.root, # Se coloca directamente en la ventana principal del menú.
+            self.marco, # Se coloca directamente en la ventana principal del menú.
             text="Salir", # Texto del botón.
-            font=("Helvetica", 14, "bold"), # Fuente del texto, ahora más grande.
+            font=tema.fuente("boton_barra"), # Fuente compartida de los botones de la barra superior.
             command=self.root.quit, # Comando que se ejecuta al hacer clic: cierra la aplicación por completo.
-            bg="#E74C3C", # Color de fondo del botón (rojo).
+            bg=ROJO, # Color de fondo del botón (rojo).
             fg="white", # Color del texto del botón.
-            activebackground="#C0392B", # Color de fondo cuando el botón está activo (presionado).
+            activebackground=tema.paleta(ROJO)[2], # Color de fondo cuando el botón está activo (presionado).
             relief="flat", # Estilo de relieve plano.
             padx=15, # Añadido padding horizontal.
             pady=8 # Añadido padding vertical.
@@ -83,17 +92,18 @@ class MenuPrincipal: # Define la clase MenuPrincipal, que representa la ventana
 
         # Botón Cerrar Sesión (Esquina superior derecha)
         tk.Button( # Crea el botón "Cerrar Sesión".
-            self.root, # Se coloca directamente en la ventana principal del menú.
+            self.marco, # Se coloca directamente en la ventana principal del menú.
             text="Cerrar Sesión", # Texto del botón.
-            font=("Helvetica", 14, "bold"), # Fuente del texto, consistente con el botón "Salir".
+            font=tema.fuente("boton_barra"), # Fuente compartida, consistente con el botón "Salir".
             command=self.logout, # Comando que se ejecuta al hacer clic: llama al método logout de la clase.
-            bg="#3498DB", # Color de fondo del botón (azul).
+            bg=AZUL, # Color de fondo del botón (azul).
             fg="white", # Color del texto del botón.
-            activebackground="#2980B9", # Color de fondo cuando el botón está activo.
+            activebackground=tema.paleta(AZUL)[2], # Color de fondo cuando el botón está activo.
             relief="flat", # Estilo de relieve plano.
             padx=15, # Añadido padding horizontal.
             pady=8 # Añadido padding vertical.
         ).place(relx=1.0, x=-10, y=10, anchor="ne") # Coloca el botón en la esquina superior derecha con un pequeño margen.
+        diagnostico_memoria.marcar("menú principal", self.marco) # Instantánea de memoria al llegar al menú (solo con el diagnóstico activado).
 
         # Eliminar el mainloop de aquí, ya que la ventana raíz lo tiene
         # self.root.mainloop() 
@@ -117,32 +127,51 @@ class MenuPrincipal: # Define la clase MenuPrincipal, que representa la ventana
 
         # Intenta cargar el icono, si falla, usa un emoji como fallback
         try: # Intenta cargar la imagen del icono.
-            icono_img = Image.open(icono_path) # Abre la imagen del icono desde la ruta especificada.
-            icono_img = icono_img.resize((60, 60), Image.Resampling.LANCZOS) # Redimensiona la imagen del icono a 60x60 píxeles.
-            icono = ImageTk.PhotoImage(icono_img) # Convierte la imagen PIL a un formato compatible con Tkinter.
+            icono = cargar_imagen(icono_path, (60, 60)) # Icono de 60x60 píxeles, convertido una sola vez (Calendario y Agenda comparten el mismo).
             # CAMBIO: Fondo del icono a azul pastel
             lbl_icono = tk.Label(card, image=icono, bg="#E0F2F7") # Crea un Label para mostrar el icono dentro de la tarjeta, con fondo azul pastel.
-            lbl_icono.image = icono # Mantiene una referencia a la imagen para evitar que sea eliminada por el recolector de basura de Python.
             lbl_icono.pack(pady=(15, 10)) # Empaqueta el Label del icono con padding vertical.
         except Exception as e: # Captura cualquier excepción si la imagen del icono no se puede cargar.
             print(f"Error al cargar icono {icono_path}: {e}") # Imprime el error en la consola.
             # CAMBIO: Fondo del emoji fallback a azul pastel
-            lbl_icono = tk.Label(card, text="📄", font=("Helvetica", 28), bg="#E0F2F7") # Si falla, usa un emoji de documento como icono de fallback, con fondo azul pastel.
+            lbl_icono = tk.Label(card, text="📄", font=tema.fuente("icono"), bg="#E0F2F7") # Si falla, usa un emoji de documento como icono de fallback, con fondo azul pastel.
             lbl_icono.pack(pady=(15, 10)) # Empaqueta el Label del emoji.
 
         # Etiqueta de texto para la opción
         # CAMBIO: Fondo de la etiqueta de texto a azul pastel
-        tk.Label(card, text=texto, font=("Helvetica", 12, "bold"), bg="#E0F2F7", fg="#333").pack() # Crea un Label para el texto de la opción y lo empaqueta, con fondo azul pastel.
+        tk.Label(card, text=texto, font=tema.fuente("boton"), bg="#E0F2F7", fg="#333").pack() # Crea un Label para el texto de la opción y lo empaqueta, con fondo azul pastel.
 
         # Asocia el comando a toda la tarjeta y a sus widgets internos para una mejor área de clic
         for widget in [card, lbl_icono] + list(card.winfo_children()): # Itera sobre la tarjeta misma, el Label del icono y todos los demás widgets hijos de la tarjeta.
             widget.bind("<Button-1>", lambda e: comando()) # Vincula el evento de clic izquierdo del ratón a cada uno de estos widgets para ejecutar el comando asociado a la opción.
+        return card # Devuelve la tarjeta para poder añadirle insignias.
+
+    def crear_contadores(self, card):
+        """
+        Añade a la tarjeta dos insignias con el número de tareas abiertas y completadas.
+        Los números salen de los contadores del índice de estado, que se mantienen con cada evento: no se recorren las tareas.
+        """ # Docstring que describe el método.
+        estado = indice_estado(almacen_tareas, self.usuario) # Se crea antes de suscribir la tarjeta, para que el índice se actualice primero.
+        abiertas = tk.Label(card, font=tema.fuente("boton"), bg=ROJO, fg="white", padx=6) # Insignia de tareas abiertas.
+        abiertas.place(relx=1.0, x=-6, y=6, anchor="ne") # Esquina superior derecha de la tarjeta.
+        hechas = tk.Label(card, font=tema.fuente("boton"), bg=VERDE, fg="white", padx=6) # Insignia de tareas completadas.
+        hechas.place(x=6, y=6, anchor="nw") # Esquina superior izquierda de la tarjeta.
+
+        def actualizar(evento=None):
+            """Muestra los contadores actuales.""" # Docstring que describe la función interna.
+            abiertas.config(text=str(estado.abiertas)) # Tareas pendientes.
+            hechas.config(text=f"✔ {estado.completadas}") # Tareas hechas.
+
+        actualizar() # Valores iniciales.
+        suscribir_widget(card, actualizar, tipos=EVENTOS_TAREAS, usuario=self.usuario) # Se actualizan con cada cambio de tareas del usuario.
 
     # Método para cerrar sesión
     def logout(self): # Define el método que se ejecuta al hacer clic en "Cerrar Sesión".
-        # Limpiar la ventana del menú antes de llamar al callback
-        for widget in self.root.winfo_children(): # Itera sobre todos los widgets hijos de la ventana principal (los del menú).
-            widget.destroy() # Destruye cada widget hijo.
+        vaciar_todo() # Escribe los cambios pendientes antes de salir de la sesión.
+        # Limpiar la ventana del menú antes de llamar al callback; con marco propio, el gestor de sesiones lo oculta para volver rápido
+        if self.marco is self.root: # Menú dibujado directamente en la ventana raíz.
+            for widget in self.root.winfo_children(): # Itera sobre todos los widgets hijos de la ventana principal (los del menú).
+                widget.destroy() # Destruye cada widget hijo.
             
         if self.on_logout_callback: # Comprueba si se proporcionó una función de callback para el cierre de sesión.
             self.on_logout_callback() # Llama a la función de callback, que debería volver a mostrar la ventana de login.
@@ -162,3 +191,9 @@ class MenuPrincipal: # Define la clase MenuPrincipal, que representa la ventana
 
     def abrir_calendario(self): # Define el método que se ejecuta al seleccionar "Calendario".
         mostrar_calendario(self.usuario) # Llama a la función mostrar_calendario del módulo 'calendario.py', pasándole el usuario actual.
+
+    def abrir_agenda(self): # Define el método que se ejecuta al seleccionar "Agenda".
+        mostrar_agenda(self.usuario) # Llama a la función mostrar_agenda del módulo 'agenda.py', pasándole el usuario actual.
+
+    def abrir_informe(self): # Define el método que se ejecuta al seleccionar "Informe".
+        mostrar_informe(self.usuario) # Llama a la función mostrar_informe del módulo 'ventana_informe.py', pasándole el usuario actual.
@@ -0,0 +1,384 @@
+"""
+Migraciones versionadas de los archivos de datos, en flujo y reanudables.
+
+Cada archivo ({usuario: [registros]} o {usuario: contraseña}) tiene una lista de pasos numerados. La versión
+aplicada de cada archivo se apunta en data/esquema.json. Todos los pasos pendientes de un archivo se aplican en
+una sola pasada que lee y escribe registro a registro: la memoria no depende del tamaño del archivo.
+
+Cada TAMANO_TANDA registros se sincroniza la salida y se guarda un punto de control (<archivo>.migrando.json)
+con la posición de lectura, la de escritura y el estado de los pasos. Si el proceso se interrumpe, la siguiente
+ejecución continúa desde el último punto de control. Los registros que no superan la validación no se pierden:
+se apartan a data/cuarentena/<archivo>.v<versión>.jsonl con el motivo.
+"""
+import codecs # Importa codecs para decodificar UTF-8 por bloques sin partir caracteres.
+import datetime # Importa datetime para validar las fechas de las tareas.
+import json # Importa el módulo json, que permite trabajar con datos en formato JSON (serializar y deserializar).
+import os # Importa el módulo os, que proporciona funciones para interactuar con el sistema operativo, como la gestión de rutas de archivos y directorios.
+
+from almacenamiento import PRIORIDADES, PRIORIDAD_POR_DEFECTO, separar_etiquetas, _firma_archivo # Importa las reglas de clasificación y la firma de archivos.
+from archivos import escribir_atomico, bloqueo_archivo # Importa la escritura atómica y el bloqueo entre procesos.
+
+TAMANO_TANDA = 5000 # Registros entre dos puntos de control.
+TAMANO_LECTURA = 1024 * 1024 # Bytes leídos del archivo de origen cada vez.
+ESQUEMA_FILE = "esquema.json" # Archivo, dentro de la carpeta de datos, con la versión aplicada de cada archivo.
+SENSIBLES = {"usuarios.json"} # Archivos cuyos valores apartados no se copian a la cuarentena (son contraseñas).
+
+
+class RegistroInvalido(Exception): # Un paso de migración rechaza un registro; el registro va a la cuarentena.
+    pass
+
+
+# --- Lectura y escritura en flujo ---
+class LectorJSON: # Lee en flujo un objeto {clave: [elementos] | valor} sin cargarlo entero.
+    def __init__(self, f, posicion=0, clave=None, primera_clave=True, primer_elemento=True):
+        """
+        Inicializa el lector sobre un archivo binario. Los argumentos con nombre restauran un estado
+        guardado con estado(), para reanudar la lectura en mitad del archivo.
+        """ # Docstring que describe el método.
+        f.seek(posicion) # Se coloca en la posición indicada.
+        self._f = f # Archivo de origen.
+        self.posicion = posicion # Bytes consumidos hasta el final del último valor leído.
+        self.clave = clave # Clave cuya lista está abierta (None si se está en el nivel superior).
+        self._primera_clave = primera_clave # True si aún no se leyó ninguna clave.
+        self._primer_elemento = primer_elemento # True si la lista abierta aún no tiene elementos leídos.
+        self._decodificador = codecs.getincrementaldecoder("utf-8")() # Decodificador por bloques.
+        self._json = json.JSONDecoder() # Decodificador de valores sueltos.
+        self._buf = "" # Texto leído y aún no consumido (desde self._i).
+        self._i = 0 # Posición del siguiente carácter por consumir.
+        self._agotado = False # True cuando ya no quedan bytes por leer.
+
+    def estado(self):
+        """Devuelve el estado del lector para poder reanudarlo (solo es válido entre dos valores).""" # Docstring que describe el método.
+        return {"posicion": self.posicion, "clave": self.clave, "primera_clave": self._primera_clave, "primer_elemento": self._primer_elemento} # Estado serializable.
+
+    def _llenar(self):
+        """Lee el siguiente bloque. Devuelve False si el archivo se terminó.""" # Docstring que describe el método.
+        if self._agotado: # Ya no hay más.
+            return False # Nada nuevo.
+        bloque = self._f.read(TAMANO_LECTURA) # Siguiente bloque.
+        self._agotado = not bloque # Fin del archivo.
+        self._buf = self._buf[self._i:] + self._decodificador.decode(bloque, final=self._agotado) # Descarta lo consumido y añade lo nuevo.
+        self._i = 0 # El texto pendiente empieza ahora al principio.
+        return bool(bloque) # Si se leyó algo.
+
+    def _siguiente(self):
+        """Salta los espacios y devuelve el siguiente carácter sin consumirlo ("" al final del archivo).""" # Docstring que describe el método.
+        while True: # Hasta encontrar un carácter significativo.
+            while self._i < len(self._buf) and self._buf[self._i] in " \t\r\n": # Espacios (un byte cada uno).
+                self._i += 1 # Lo consume.
+                self.posicion += 1 # Un byte.
+            if self._i < len(self._buf): # Hay un carácter significativo.
+                return self._buf[self._i] # Lo devuelve.
+            if not self._llenar(): # No queda más.
+                return "" # Fin del archivo.
+
+    def _esperar(self, caracter):
+        """Consume un carácter de estructura; si no es el esperado, el archivo está dañado.""" # Docstring que describe el método.
+        encontrado = self._siguiente() # Siguiente carácter significativo.
+        if encontrado != caracter: # No es el esperado.
+            raise ValueError(f"JSON no válido en el byte {self.posicion}: se esperaba {caracter!r} y hay {encontrado!r}") # Archivo dañado.
+        self._i += 1 # Lo consume.
+        self.posicion += 1 # Un byte (los caracteres de estructura son ASCII).
+
+    def _valor(self):
+        """Decodifica el siguiente valor JSON completo, leyendo más bloques si hace falta.""" # Docstring que describe el método.
+        self._siguiente() # Salta los espacios.
+        while True: # Hasta tener el valor completo en el búfer.
+            try: # Puede estar cortado por el final del bloque.
+                valor, fin = self._json.raw_decode(self._buf, self._i) # Decodifica un valor.
+                if fin < len(self._buf) or self._agotado: # Un número al final del búfer podría seguir en el próximo bloque.
+                    break # Valor completo.
+            except json.JSONDecodeError: # Valor incompleto (o dañado).
+                if self._agotado: # No hay más que leer: está dañado.
+                    raise # Propaga el error.
+            self._llenar() # Lee más y lo intenta de nuevo.
+        self.posicion += len(self._buf[self._i:fin].encode("utf-8")) # Bytes del valor en el archivo.
+        self._i = fin # Lo consume.
+        return valor # Devuelve el valor.
+
+    def __iter__(self):
+        """Genera (clave, valor, es_elemento): los elementos de las listas uno a uno, y los valores sueltos con es_elemento False.""" # Docstring que describe el método.
+        if self.posicion == 0: # Al principio del archivo.
+            self._esperar("{") # Abre el objeto.
+        while True: # Hasta cerrar el objeto.
+            if self.clave is None: # Nivel superior: toca una clave o el final.
+                if self._siguiente() == "}": # Fin del objeto.
+                    return # Terminado.
+                if not self._primera_clave: # Las claves se separan con comas.
+                    self._esperar(",") # Separador.
+                clave = self._valor() # Clave.
+                self._esperar(":") # Separador de clave y valor.
+                self._primera_clave = False # Ya se leyó una clave.
+                if self._siguiente() == "[": # Lista de registros.
+                    self._esperar("[") # La abre.
+                    self.clave, self._primer_elemento = clave, True # Lista abierta, aún sin elementos.
+                    continue # Pasa a leer sus elementos.
+                yield clave, self._valor(), False # Valor suelto (p. ej. una contraseña).
+            else: # Dentro de una lista.
+                if self._siguiente() == "]": # Fin de la lista.
+                    self._esperar("]") # La cierra.
+                    self.clave = None # De vuelta al nivel superior.
+                    continue # Siguiente clave.
+                if not self._primer_elemento: # Los elementos se separan con comas.
+                    self._esperar(",") # Separador.
+                valor = self._valor() # Elemento.
+                self._primer_elemento = False # La lista ya tiene elementos.
+                yield self.clave, valor, True # Lo entrega.
+
+
+class EscritorJSON: # Escribe en flujo un objeto {clave: [elementos] | valor}, simétrico de LectorJSON.
+    def __init__(self, f, clave=None, primera_clave=True, primer_elemento=True):
+        """Inicializa el escritor sobre un archivo binario colocado al final de lo ya escrito.""" # Docstring que describe el método.
+        self._f = f # Archivo de destino.
+        self.clave = clave # Clave cuya lista está abierta (None si ninguna).
+        self._primera_clave = primera_clave # True si aún no se escribió ninguna clave.
+        self._primer_elemento = primer_elemento # True si la lista abierta aún no tiene elementos.
+        if f.tell() == 0: # Archivo nuevo.
+            f.write(b"{") # Abre el objeto.
+
+    def estado(self):
+        """Devuelve el estado del escritor para poder reanudarlo.""" # Docstring que describe el método.
+        return {"clave": self.clave, "primera_clave": self._primera_clave, "primer_elemento": self._primer_elemento} # Estado serializable.
+
+    def _abrir_clave(self, clave, sufijo):
+        """Cierra la lista abierta, si la hay, y escribe la siguiente clave.""" # Docstring que describe el método.
+        if self.clave is not None: # Hay una lista abierta.
+            self._f.write(b"\n    ]") # La cierra.
+            self.clave = None # Ninguna abierta.
+        separador = "" if self._primera_clave else "," # Comas entre claves.
+        self._f.write(f"{separador}\n    {json.dumps(clave, ensure_ascii=False)}: {sufijo}".encode("utf-8")) # Clave.
+        self._primera_clave = False # Ya hay una clave.
+
+    def escribir(self, clave, valor, es_elemento):
+        """Escribe un elemento de la lista de "clave" o, con es_elemento False, un valor suelto.""" # Docstring que describe el método.
+        if not es_elemento: # Valor suelto.
+            self._abrir_clave(clave, json.dumps(valor, ensure_ascii=False)) # Clave y valor.
+            return # Listo.
+        if clave != self.clave or self._primera_clave: # Empieza la lista de otra clave.
+            self._abrir_clave(clave, "[") # La abre.
+            self.clave, self._primer_elemento = clave, True # Lista abierta, aún sin elementos.
+        separador = "" if self._primer_elemento else "," # Comas entre elementos.
+        self._f.write(f"{separador}\n        {json.dumps(valor, ensure_ascii=False)}".encode("utf-8")) # Un elemento por línea.
+        self._primer_elemento = False # La lista ya tiene elementos.
+
+    def cerrar(self):
+        """Cierra la lista abierta y el objeto.""" # Docstring que describe el método.
+        if self.clave is not None: # Hay una lista abierta.
+            self._f.write(b"\n    ]") # La cierra.
+            self.clave = None # Ninguna abierta.
+        self._f.write(b"\n}\n") # Cierra el objeto.
+
+
+# --- Pasos de migración ---
+def _fecha_valida(texto):
+    """Indica si el texto es "" o una fecha "aaaa-mm-dd" real.""" # Docstring que describe la función.
+    if texto == "": # Tarea sin fecha.
+        return True # Se admite.
+    try: # Comprueba la fecha.
+        return datetime.date.fromisoformat(texto).isoformat() == texto # Solo el formato extendido que usa la aplicación.
+    except (TypeError, ValueError): # No es texto, o no es una fecha.
+        return False # No válida.
+
+
+def _explorar_ids(usuario, registro, estado):
+    """Primera pasada del paso de ids: anota el mayor id de cada usuario.""" # Docstring que describe la función.
+    if isinstance(registro, dict) and type(registro.get("id")) is int: # Registro con id entero.
+        mayores = estado.setdefault("mayor_id", {}) # Mayor id por usuario.
+        mayores[usuario] = max(mayores.get(usuario, 0), registro["id"]) # Lo actualiza.
+
+
+def _validar_con_id(usuario, registro, estado):
+    """Versión 1 de tareas y notas: registros con título de texto y un id entero estable.""" # Docstring que describe la función.
+    if not isinstance(registro, dict): # Basura en la lista.
+        raise RegistroInvalido("no es un objeto") # A la cuarentena.
+    if not isinstance(registro.get("titulo"), str): # Sin título de texto.
+        raise RegistroInvalido("sin título") # A la cuarentena.
+    if type(registro.get("id")) is not int: # Registro antiguo sin id (o con uno que no es entero).
+        mayores = estado.setdefault("mayor_id", {}) # Mayor id por usuario, de la primera pasada.
+        mayores[usuario] = mayores.get(usuario, 0) + 1 # Siguiente id libre, como hace almacenamiento al cargar.
+        registro["id"] = mayores[usuario] # Se lo asigna.
+    return registro # Registro migrado.
+
+
+def _validar_fecha(usuario, tarea, estado):
+    """Versión 2 de tareas: la fecha de entrega es "" o una fecha real.""" # Docstring que describe la función.
+    tarea.setdefault("fecha", "") # Las tareas sin el campo pasan a no tener fecha.
+    tarea.setdefault("contenido", "") # Igual con el contenido.
+    if not _fecha_valida(tarea["fecha"]): # Fecha imposible o en otro formato.
+        raise RegistroInvalido(f"fecha no válida: {tarea['fecha']!r}") # A la cuarentena (no se puede adivinar la buena).
+    return tarea # Tarea migrada.
+
+
+def _clasificacion(usuario, tarea, estado):
+    """Versión 3 de tareas: etiquetas como lista normalizada y prioridad conocida.""" # Docstring que describe la función.
+    etiquetas = tarea.get("etiquetas", []) # Etiquetas actuales.
+    if isinstance(etiquetas, str): # Escritas como texto ("a, b").
+        etiquetas = [etiquetas] # Se separan abajo.
+    if not isinstance(etiquetas, list): # Tipo inesperado.
+        raise RegistroInvalido("etiquetas no válidas") # A la cuarentena.
+    tarea["etiquetas"] = separar_etiquetas(",".join(str(e) for e in etiquetas)) # Sin vacías, espacios sobrantes ni repetidas.
+    if tarea.get("prioridad") not in PRIORIDADES: # Ausente o desconocida.
+        tarea["prioridad"] = PRIORIDAD_POR_DEFECTO # La de por defecto.
+    return tarea # Tarea migrada.
+
+
+def _estado_completada(usuario, tarea, estado):
+    """Versión 4 de tareas: marca de completada booleana y momento de compleción solo si está completada.""" # Docstring que describe la función.
+    tarea["completada"] = bool(tarea.get("completada", False)) # Siempre presente y booleana.
+    if not tarea["completada"]: # Abierta.
+        tarea.pop("completada_en", None) # No tiene momento de compleción.
+    return tarea # Tarea migrada.
+
+
+def _usuario_valido(usuario, contrasena, estado):
+    """Versión 1 de usuarios: sin nombres vacíos ni contraseñas que no sean texto.""" # Docstring que describe la función.
+    if not usuario.strip(): # Nombre vacío (no se puede registrar desde la aplicación).
+        raise RegistroInvalido("usuario vacío") # A la cuarentena.
+    if not isinstance(contrasena, str) or not contrasena: # Contraseña vacía o de otro tipo.
+        raise RegistroInvalido("contraseña no válida") # A la cuarentena.
+    return contrasena # Entrada migrada.
+
+
+MIGRACIONES = { # Pasos de cada archivo, en orden de versión. "explorar" es una primera pasada opcional.
+    "tareas.json": [
+        {"version": 1, "descripcion": "registros válidos con id estable", "transformar": _validar_con_id, "explorar": _explorar_ids},
+        {"version": 2, "descripcion": "fechas de entrega válidas", "transformar": _validar_fecha},
+        {"version": 3, "descripcion": "etiquetas y prioridad", "transformar": _clasificacion},
+        {"version": 4, "descripcion": "estado de compleción", "transformar": _estado_completada},
+    ],
+    "notas.json": [
+        {"version": 1, "descripcion": "registros válidos con id estable", "transformar": _validar_con_id, "explorar": _explorar_ids},
+    ],
+    "usuarios.json": [
+        {"version": 1, "descripcion": "sin usuarios vacíos", "transformar": _usuario_valido},
+    ],
+}
+
+
+# --- Versiones aplicadas ---
+def versiones(carpeta):
+    """Devuelve {archivo: versión aplicada} de la carpeta de datos (0 si nunca se migró).""" # Docstring que describe la función.
+    try: # Puede no existir.
+        with open(os.path.join(carpeta, ESQUEMA_FILE), 'r', encoding="utf-8") as f: # Abre el registro de versiones.
+            aplicadas = json.load(f) # Versiones apuntadas.
+    except FileNotFoundError: # Datos anteriores a las migraciones.
+        aplicadas = {} # Ninguna aplicada.
+    return {archivo: aplicadas.get(archivo, 0) for archivo in MIGRACIONES} # Todas las conocidas.
+
+
+def _apuntar_version(carpeta, archivo, version):
+    """Apunta en el registro de versiones la versión aplicada de un archivo.""" # Docstring que describe la función.
+    ruta = os.path.join(carpeta, ESQUEMA_FILE) # Registro de versiones.
+    with bloqueo_archivo(ruta): # Otra instancia podría migrar otro archivo a la vez.
+        aplicadas = versiones(carpeta) # Versión más reciente, ya con el bloqueo tomado.
+        aplicadas[archivo] = version # Apunta la nueva.
+        escribir_atomico(ruta, json.dumps(aplicadas, indent=4).encode("utf-8")) # Escritura atómica.
+
+
+def pendientes(carpeta):
+    """Devuelve {archivo: (versión aplicada, versión final)} de los archivos con pasos pendientes.""" # Docstring que describe la función.
+    return {archivo: (version, MIGRACIONES[archivo][-1]["version"]) # Versión actual y final.
+            for archivo, version in versiones(carpeta).items() if version < MIGRACIONES[archivo][-1]["version"]} # Solo las que faltan.
+
+
+# --- Motor ---
+def _sincronizar(*archivos):
+    """Lleva al disco lo escrito en los archivos abiertos.""" # Docstring que describe la función.
+    for f in archivos: # Recorre los archivos.
+        f.flush() # Vacía el búfer de Python.
+        os.fsync(f.fileno()) # Espera al disco.
+
+
+def migrar(carpeta, archivo, al_progreso=None, tamano_tanda=TAMANO_TANDA):
+    """
+    Aplica a un archivo de datos todos sus pasos pendientes en una sola pasada en flujo.
+    Se reanuda desde el último punto de control si una ejecución anterior se interrumpió.
+    al_progreso(archivo, fase, bytes leídos, bytes totales, registros, apartados) se llama en cada tanda.
+    Devuelve {"version", "registros", "apartados"}, o None si no había nada pendiente.
+    """ # Docstring que describe la función.
+    aplicada = versiones(carpeta)[archivo] # Versión actual.
+    pasos = [p for p in MIGRACIONES[archivo] if p["version"] > aplicada] # Pasos pendientes.
+    if not pasos: # Ya está al día.
+        return None # Nada que hacer.
+    destino = pasos[-1]["version"] # Versión final.
+    ruta = os.path.join(carpeta, archivo) # Archivo de datos.
+    temporal, ruta_punto = ruta + ".migrando", ruta + ".migrando.json" # Salida y punto de control.
+    ruta_cuarentena = os.path.join(carpeta, "cuarentena", f"{archivo}.v{destino}.jsonl") # Registros apartados.
+
+    with bloqueo_archivo(ruta): # La aplicación no escribe el archivo mientras se migra.
+        punto = None # Punto de control de una ejecución anterior.
+        if os.path.exists(ruta_punto): # Hubo una ejecución interrumpida.
+            with open(ruta_punto, 'r', encoding="utf-8") as f: # Lo lee.
+                punto = json.load(f) # Punto de control.
+            if punto["version"] != destino or (punto["fase"] != "reemplazar" and punto["firma"] != list(_firma_archivo(ruta) or ())): # Otros pasos, o el origen cambió.
+                punto = None # Se empieza de cero.
+        if punto is None and not os.path.exists(ruta): # Nada que migrar: el archivo se creará ya en el formato actual.
+            _apuntar_version(carpeta, archivo, destino) # Versión al día.
+            return {"version": destino, "registros": 0, "apartados": 0} # Resumen.
+        total = os.path.getsize(temporal if punto and punto["fase"] == "reemplazar" else ruta) # Tamaño para el progreso.
+
+        if punto is None: # Ejecución nueva.
+            estado = {} # Estado compartido por los pasos (p. ej. el mayor id de cada usuario).
+            exploradores = [p["explorar"] for p in pasos if "explorar" in p] # Pasos que necesitan una primera pasada.
+            if exploradores: # Primera pasada, solo de lectura.
+                with open(ruta, 'rb') as f: # Abre el origen.
+                    lector = LectorJSON(f) # Lector en flujo.
+                    for n, (clave, valor, _) in enumerate(lector, 1): # Recorre los registros.
+                        for explorar in exploradores: # Cada paso anota lo que necesita.
+                            explorar(clave, valor, estado) # Anota.
+                        if al_progreso and n % tamano_tanda == 0: # Cada tanda.
+                            al_progreso(archivo, "explorando", lector.posicion, total, n, 0) # Informa.
+            punto = {"version": destino, "fase": "copiar", "firma": list(_firma_archivo(ruta)), "estado": estado, # Punto de control inicial.
+                     "lector": {"posicion": 0}, "escritor": {}, "bytes_salida": 0, "bytes_cuarentena": 0, "registros": 0, "apartados": 0}
+
+        if punto["fase"] == "copiar": # Falta copiar (todo o parte).
+            os.makedirs(os.path.dirname(ruta_cuarentena), exist_ok=True) # Carpeta de la cuarentena.
+            with open(ruta, 'rb') as origen, \
+                    open(temporal, 'r+b' if punto["bytes_salida"] else 'wb') as salida, \
+                    open(ruta_cuarentena, 'ab') as cuarentena: # Origen, salida y cuarentena.
+                salida.truncate(punto["bytes_salida"]) # Descarta lo escrito después del último punto de control.
+                salida.seek(punto["bytes_salida"]) # Continúa desde ahí.
+                if punto["registros"]: # Al reanudar, igual con la cuarentena (al empezar se conserva la de otras ejecuciones).
+                    cuarentena.truncate(punto["bytes_cuarentena"]) # Descarta lo apartado después del último punto de control.
+                lector = LectorJSON(origen, **punto["lector"]) # Lector colocado en el punto de control.
+                escritor = EscritorJSON(salida, **punto["escritor"]) # Escritor colocado en el punto de control.
+                estado = punto["estado"] # Estado de los pasos en el punto de control.
+
+                def _guardar_punto(): # Sincroniza la salida y apunta hasta dónde se llegó.
+                    _sincronizar(salida, cuarentena) # Lo escrito llega al disco antes que el punto de control.
+                    punto.update(lector=lector.estado(), escritor=escritor.estado(), bytes_salida=salida.tell(), bytes_cuarentena=cuarentena.tell()) # Posiciones.
+                    escribir_atomico(ruta_punto, json.dumps(punto).encode("utf-8")) # Punto de control.
+
+                for clave, valor, es_elemento in lector: # Recorre los registros.
+                    try: # Un registro inválido no detiene la migración.
+                        for paso in pasos: # Aplica los pasos pendientes en orden.
+                            valor = paso["transformar"](clave, valor, estado) # Registro migrado.
+                        escritor.escribir(clave, valor, es_elemento) # Lo escribe.
+                    except RegistroInvalido as e: # No supera la validación.
+                        apartado = {"clave": clave, "registro": None if archivo in SENSIBLES else valor, "motivo": str(e)} # Registro y motivo.
+                        cuarentena.write((json.dumps(apartado, ensure_ascii=False) + "\n").encode("utf-8")) # Lo aparta.
+                        punto["apartados"] += 1 # Lo cuenta.
+                    punto["registros"] += 1 # Registro procesado.
+                    if punto["registros"] % tamano_tanda == 0: # Fin de tanda.
+                        _guardar_punto() # Punto de control.
+                        if al_progreso: # Si se quiere informar.
+                            al_progreso(archivo, "migrando", lector.posicion, total, punto["registros"], punto["apartados"]) # Informa.
+                escritor.cerrar() # Cierra el objeto.
+                _sincronizar(salida, cuarentena) # Todo en disco.
+            punto["fase"] = "reemplazar" # Solo queda sustituir el archivo.
+            escribir_atomico(ruta_punto, json.dumps(punto).encode("utf-8")) # Punto de control.
+
+        if os.path.exists(ruta_cuarentena) and not os.path.getsize(ruta_cuarentena): # Nada apartado.
+            os.remove(ruta_cuarentena) # No deja archivos vacíos en la cuarentena.
+        if os.path.exists(temporal): # Si la sustitución no llegó a hacerse.
+            os.replace(temporal, ruta) # Sustituye el archivo de golpe.
+        _apuntar_version(carpeta, archivo, destino) # Versión aplicada.
+        os.remove(ruta_punto) # La migración terminó.
+        if al_progreso: # Si se quiere informar.
+            al_progreso(archivo, "terminado", total, total, punto["registros"], punto["apartados"]) # Informe final.
+        return {"version": destino, "registros": punto["registros"], "apartados": punto["apartados"]} # Resumen.
+
+
+def migrar_todo(carpeta, al_progreso=None, tamano_tanda=TAMANO_TANDA):
+    """Migra todos los archivos con pasos pendientes. Devuelve {archivo: resumen}.""" # Docstring que describe la función.
+    return {archivo: migrar(carpeta, archivo, al_progreso, tamano_tanda) for archivo in pendientes(carpeta)} # Uno tras otro.
@@ -0,0 +1,133 @@
+import tkinter as tk # Importa el módulo tkinter, que es la biblioteca estándar de Python para crear interfaces gráficas de usuario (GUI).
+
+from estilos import tema # Importa el tema compartido (fuentes con nombre).
+
+COLOR_AVISO = "#2C3E50" # Fondo oscuro de los avisos emergentes.
+COLOR_AVISO_TEXTO = "#ECF0F1" # Texto claro de los avisos.
+
+
+class CentroNotificaciones: # Pila de avisos emergentes dentro de la ventana principal, sin diálogos modales.
+    """
+    Los avisos esperan en una cola acotada y se muestran de uno en uno como mucho cada intervalo_ms,
+    sin superar max_visibles a la vez. Los avisos pendientes del mismo grupo se funden en uno solo
+    ("5 tareas vencen mañana"). Nada bloquea el bucle de eventos de Tk.
+    """ # Docstring que describe la clase.
+    def __init__(self, root, max_visibles=3, capacidad=50, intervalo_ms=800, duracion_ms=8000, lineas_resumen=3):
+        """
+        Inicializa el centro de notificaciones.
+
+        Args:
+            root (tk.Tk): Ventana principal donde aparecen los avisos.
+            max_visibles (int): Número máximo de avisos en pantalla a la vez.
+            capacidad (int): Tamaño máximo de la cola; si se llena se descartan los avisos más antiguos.
+            intervalo_ms (int): Tiempo mínimo entre la aparición de dos avisos.
+            duracion_ms (int): Tiempo que un aviso permanece en pantalla.
+            lineas_resumen (int): Líneas de detalle que muestra un aviso agrupado.
+        """ # Docstring que describe el método y sus argumentos.
+        self.root = root # Ventana principal.
+        self.max_visibles = max_visibles # Avisos simultáneos permitidos.
+        self.capacidad = capacidad # Tamaño máximo de la cola.
+        self.intervalo_ms = intervalo_ms # Limitación de ritmo.
+        self.duracion_ms = duracion_ms # Duración de cada aviso.
+        self.lineas_resumen = lineas_resumen # Detalle de los avisos agrupados.
+        self._cola = [] # Avisos pendientes: diccionarios {"grupo", "titulo", "mensajes", "resumen"}.
+        self._por_grupo = {} # Diccionario grupo -> aviso pendiente, para fundir los del mismo grupo.
+        self._visibles = [] # Frames de los avisos en pantalla.
+        self._contenedor = None # Frame donde se apilan los avisos (se crea al mostrar el primero).
+        self._programado = None # Identificador del after() del próximo aviso, si hay uno programado.
+        self._activo = True # False cuando el centro se cierra (p. ej. al cerrar sesión).
+
+    def avisar(self, titulo, mensaje, grupo=None, resumen=None):
+        """
+        Encola un aviso. Si ya hay uno pendiente del mismo grupo, se funden en uno.
+
+        Args:
+            titulo (str): Título del aviso.
+            mensaje (str): Texto del aviso.
+            grupo (str): Clave para fundir avisos parecidos (None para no fundirlo).
+            resumen (str): Plantilla del título cuando se funden varios; "{n}" es el número de avisos.
+        """ # Docstring que describe el método y sus argumentos.
+        pendiente = self._por_grupo.get(grupo) if grupo is not None else None # Aviso del mismo grupo aún sin mostrar.
+        if pendiente is not None: # Si existe.
+            pendiente["mensajes"].append(mensaje) # Se suma a él en lugar de ocupar otro hueco.
+            return # No hace falta programar nada: ya está en la cola.
+        aviso = {"grupo": grupo, "titulo": titulo, "mensajes": [mensaje], "resumen": resumen} # Aviso nuevo.
+        if len(self._cola) >= self.capacidad: # Si la cola está llena.
+            descartado = self._cola.pop(0) # Descarta el aviso más antiguo.
+            self._por_grupo.pop(descartado["grupo"], None) # Y su entrada de grupo.
+        self._cola.append(aviso) # Encola el aviso.
+        if grupo is not None: # Si pertenece a un grupo.
+            self._por_grupo[grupo] = aviso # Los siguientes del grupo se funden con él.
+        self._programar(0) # Intenta mostrarlo cuanto antes.
+
+    def cerrar(self):
+        """Detiene el centro: vacía la cola, cancela lo programado y quita los avisos visibles.""" # Docstring que describe el método.
+        self._activo = False # Los after() pendientes ya no harán nada.
+        self._cola.clear() # Vacía la cola.
+        self._por_grupo.clear() # Olvida los grupos.
+        if self._programado is not None and self.root.winfo_exists(): # Si había un aviso programado.
+            self.root.after_cancel(self._programado) # Lo cancela.
+        self._programado = None # Ya no hay nada programado.
+        for toast in self._visibles: # Recorre los avisos visibles.
+            if toast.winfo_exists(): # Si siguen existiendo.
+                toast.destroy() # Los quita.
+        self._visibles.clear() # Vacía la lista.
+
+    def _programar(self, retardo_ms):
+        """Programa la aparición del siguiente aviso si no hay ya una programada.""" # Docstring que describe el método.
+        if self._programado is None and self._activo and self.root.winfo_exists(): # Solo una programación a la vez.
+            self._programado = self.root.after(retardo_ms, self._mostrar_siguiente) # Se ejecutará en el hilo de Tk.
+
+    def _mostrar_siguiente(self):
+        """Muestra el siguiente aviso de la cola respetando el ritmo y el máximo de visibles.""" # Docstring que describe el método.
+        self._programado = None # La programación actual ya se está ejecutando.
+        if not self._activo or not self.root.winfo_exists() or not self._cola: # Centro cerrado, ventana destruida o cola vacía.
+            return # No hay nada que mostrar.
+        self._visibles = [t for t in self._visibles if t.winfo_exists()] # Olvida los avisos que ya se cerraron.
+        if len(self._visibles) >= self.max_visibles: # Si la pila está llena.
+            self._programar(self.intervalo_ms) # Vuelve a intentarlo más tarde.
+            return # Sale del método.
+        aviso = self._cola.pop(0) # Toma el aviso más antiguo.
+        self._por_grupo.pop(aviso["grupo"], None) # A partir de ahora los avisos del grupo irán en otro aviso.
+        self._crear_toast(aviso) # Lo muestra.
+        if self._cola: # Si quedan avisos.
+            self._programar(self.intervalo_ms) # El siguiente aparecerá tras el intervalo.
+
+    def _crear_toast(self, aviso):
+        """Crea el Frame de un aviso en la pila de la esquina inferior derecha.""" # Docstring que describe el método.
+        if self._contenedor is None or not self._contenedor.winfo_exists(): # La primera vez, o si se destruyó (p. ej. al cambiar de pantalla).
+            self._contenedor = tk.Frame(self.root, bg=self.root["bg"]) # Contenedor de la pila.
+        self._contenedor.place(relx=1.0, rely=1.0, x=-20, y=-20, anchor="se") # Esquina inferior derecha.
+        self._contenedor.lift() # Por encima del resto de widgets de la ventana.
+
+        mensajes = aviso["mensajes"] # Mensajes fundidos en este aviso.
+        if len(mensajes) > 1 and aviso["resumen"]: # Si se fundieron varios.
+            titulo = aviso["resumen"].format(n=len(mensajes)) # Título de resumen ("5 tareas vencen mañana").
+            detalle = mensajes[:self.lineas_resumen] # Solo las primeras líneas.
+            if len(mensajes) > self.lineas_resumen: # Si hay más.
+                detalle.append(f"… y {len(mensajes) - self.lineas_resumen} más") # Indica cuántas faltan.
+        else: # Aviso simple.
+            titulo = aviso["titulo"] # Título original.
+            detalle = mensajes # Todos sus mensajes.
+
+        toast = tk.Frame(self._contenedor, bg=COLOR_AVISO, padx=12, pady=8) # Marco del aviso.
+        toast.pack(side="top", fill="x", pady=4) # Se apila debajo de los anteriores.
+        cabecera = tk.Frame(toast, bg=COLOR_AVISO) # Fila del título y el botón de cerrar.
+        cabecera.pack(fill="x") # Ocupa todo el ancho.
+        tk.Label(cabecera, text=f"🔔 {titulo}", font=tema.fuente("etiqueta"), bg=COLOR_AVISO, fg=COLOR_AVISO_TEXTO).pack(side="left") # Título.
+        cerrar = tk.Label(cabecera, text="✕", font=tema.fuente("etiqueta"), bg=COLOR_AVISO, fg=COLOR_AVISO_TEXTO, cursor="hand2") # Botón de cerrar.
+        cerrar.pack(side="right", padx=(10, 0)) # A la derecha.
+        cerrar.bind("<Button-1>", lambda e: self._quitar(toast)) # Cierra el aviso al hacer clic.
+        tk.Label(toast, text="\n".join(detalle), font=tema.fuente("campo"), bg=COLOR_AVISO, fg=COLOR_AVISO_TEXTO, # Texto del aviso.
+                 justify="left", anchor="w", wraplength=320).pack(fill="x") # Ajusta las líneas largas.
+        self._visibles.append(toast) # Lo cuenta como visible.
+        toast.after(self.duracion_ms, lambda: self._quitar(toast)) # Se cierra solo pasado un tiempo.
+
+    def _quitar(self, toast):
+        """Quita un aviso de la pila y oculta el contenedor si queda vacío.""" # Docstring que describe el método.
+        if toast.winfo_exists(): # Si no se había cerrado ya.
+            toast.destroy() # Lo quita.
+        if self._contenedor is not None and self._contenedor.winfo_exists() and not self._contenedor.winfo_children(): # Si la pila quedó vacía.
+            self._contenedor.place_forget() # Oculta el contenedor para que no tape nada.
+        if self._cola: # Si había avisos esperando hueco.
+            self._programar(0) # Muestra el siguiente.
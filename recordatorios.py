@@ -0,0 +1,213 @@
+"""
+Recordatorios de tareas: qué hay que avisar y un registro persistente de lo que ya se avisó.
+
+Cada tarea tiene un recordatorio por antelación (ANTELACIONES: 1 = "vence mañana", 0 = "vence hoy").
+El registro de cada usuario es un mapa de bits en data/recordatorios/<usuario>.bits: el bit
+id * len(ANTELACIONES) + posición de la antelación indica que ese recordatorio ya se entregó
+(10 000 tareas caben en 2,5 KB). La primera línea del archivo es una cabecera JSON con las antelaciones
+(si cambian, los bits antiguos no valen) y la fecha del último barrido. Los ids de tarea no se reutilizan
+(almacenamiento reserva siempre ids nuevos), así que una tarea nueva nunca hereda los bits de una borrada.
+
+Al iniciar sesión, barrer(..., recuperar=True) recorre solo la porción del índice de fechas que va desde el
+último barrido hasta el final de la ventana de avisos, y entrega los recordatorios que se perdieron con la
+aplicación cerrada. Después se depuran los bits de tareas vencidas, borradas o reprogramadas, así que el
+mapa solo contiene las tareas de los próximos días.
+"""
+import datetime # Importa el módulo datetime para calcular las ventanas de aviso.
+import json # Importa el módulo json, que permite trabajar con datos en formato JSON (serializar y deserializar).
+import os # Importa el módulo os, que proporciona funciones para interactuar con el sistema operativo, como la gestión de rutas de archivos y directorios.
+from urllib.parse import quote # Importa quote para convertir el nombre de usuario en un nombre de archivo seguro.
+
+from almacenamiento import almacen_tareas # Importa la colección de tareas.
+from archivos import escribir_atomico, bloqueo_archivo # Importa la escritura atómica y el bloqueo entre procesos.
+from consultas import Consulta # Importa las consultas compiladas, que toman la ventana de avisos del índice de fechas.
+from eventos import bus, TAREA_ACTUALIZADA, TAREA_ELIMINADA # Importa el bus de cambios para depurar los bits de las tareas reprogramadas o borradas.
+from indices import ids_de_mascara # Importa la conversión de mapa de bits a posiciones.
+
+ANTELACIONES = (1, 0) # Días de antelación de cada recordatorio: el día antes y el mismo día.
+DIAS_RECUPERACION = 14 # Al iniciar sesión se recuperan como mucho los recordatorios perdidos de estos últimos días.
+AVISOS_ANTIGUOS = "avisos.json" # Registro anterior ({usuario: {"id@fecha": fecha}}), que se convierte a mapas de bits y se elimina.
+
+
+class RegistroRecordatorios: # Recordatorios entregados, como un mapa de bits por usuario.
+    def __init__(self, coleccion=almacen_tareas, antelaciones=ANTELACIONES):
+        """Inicializa el registro de una colección de tareas; cada usuario se lee la primera vez que se consulta.""" # Docstring que describe el método.
+        self.coleccion = coleccion # Colección de las tareas avisadas.
+        self.antelaciones = tuple(antelaciones) # Antelaciones, en el orden de sus bits.
+        self._usuarios = {} # Diccionario usuario -> {"bits", "ultimo", "nuevos", "borrados"}.
+        bus.suscribir(self._on_cambio, tipos=(TAREA_ACTUALIZADA, TAREA_ELIMINADA)) # Una tarea reprogramada debe volver a avisar.
+
+    def _ruta(self, usuario):
+        """Devuelve la ruta del mapa de bits del usuario (se calcula cada vez: la carpeta de datos puede cambiar).""" # Docstring que describe el método.
+        carpeta = os.path.join(os.path.dirname(self.coleccion.ruta) or ".", "recordatorios") # Carpeta del registro.
+        return os.path.join(carpeta, quote(usuario, safe="") + ".bits") # Un archivo por usuario.
+
+    def _leer(self, usuario, migrar=True):
+        """Lee del disco (cabecera, bits) del usuario; sin archivo, migra antes el registro antiguo si aún existe.""" # Docstring que describe el método.
+        try: # El archivo puede no existir todavía.
+            with open(self._ruta(usuario), 'rb') as f: # Abre el mapa de bits.
+                cabecera = json.loads(f.readline()) # Primera línea: cabecera JSON.
+                bits = int.from_bytes(f.read(), "little") # Resto: los bits.
+        except FileNotFoundError: # Primera vez para este usuario.
+            if migrar and self._migrar_antiguos(): # Había registro antiguo: ya está convertido.
+                return self._leer(usuario, migrar=False) # Lee el mapa que se acaba de escribir (si el usuario tenía avisos).
+            return {}, 0 # Registro vacío.
+        if tuple(cabecera.get("antelaciones", ())) != self.antelaciones: # Cambiaron las antelaciones: los bits significan otra cosa.
+            bits = 0 # Se empieza de cero.
+        return cabecera, bits # Devuelve la cabecera y los bits.
+
+    def _escribir(self, ruta, bits, ultimo_barrido):
+        """Escribe de forma atómica la cabecera y los bits de un usuario.""" # Docstring que describe el método.
+        cabecera = {"version": 1, "antelaciones": list(self.antelaciones), "ultimo_barrido": ultimo_barrido} # Cabecera nueva.
+        datos = bits.to_bytes((bits.bit_length() + 7) // 8, "little") # Bits en bytes.
+        os.makedirs(os.path.dirname(ruta), exist_ok=True) # Crea la carpeta si no existe.
+        escribir_atomico(ruta, json.dumps(cabecera).encode("utf-8") + b"\n" + datos) # Una única escritura atómica.
+
+    def _migrar_antiguos(self):
+        """
+        Convierte el registro antiguo de todos los usuarios en mapas de bits (los avisos "vence mañana" de tareas aún
+        no vencidas) y lo elimina. Se hace una sola vez; devuelve True si había algo que migrar.
+        """ # Docstring que describe el método.
+        ruta = os.path.join(os.path.dirname(self.coleccion.ruta) or ".", AVISOS_ANTIGUOS) # Registro anterior.
+        if not os.path.exists(ruta): # Instalación nueva o ya migrada (el caso habitual: no se bloquea nada).
+            return False # Nada que migrar.
+        with bloqueo_archivo(ruta): # Otra instancia podría estar migrándolo a la vez.
+            try: # Puede haber desaparecido mientras se esperaba el bloqueo.
+                with open(ruta, 'r') as f: # Abre el registro anterior.
+                    avisos = json.load(f) # Avisos de todos los usuarios.
+            except FileNotFoundError: # Otra instancia ya lo migró.
+                return True # Sus mapas ya están escritos.
+            except ValueError: # Dañado: no hay nada aprovechable.
+                avisos = {} # Se elimina igualmente.
+            hoy = datetime.date.today().isoformat() # Fecha de hoy.
+            for usuario, avisos_usuario in avisos.items(): # Usuarios del registro anterior.
+                destino = self._ruta(usuario) # Mapa de bits del usuario.
+                if os.path.exists(destino): # Ya tiene registro nuevo: manda sobre el antiguo.
+                    continue # Siguiente usuario.
+                bits = 0 # Bits convertidos.
+                for clave, fecha in avisos_usuario.items(): # Claves "id@fecha".
+                    if fecha >= hoy: # Solo los de tareas aún no vencidas.
+                        bits |= self._mascara(int(clave.split("@")[0]), [a for a in self.antelaciones if a >= 1]) # Se entregó el aviso del día antes.
+                if bits: # Hay algo que conservar.
+                    self._escribir(destino, bits, None) # Su mapa de bits.
+            os.remove(ruta) # El registro antiguo ya no se vuelve a leer.
+        return True # Migrado.
+
+    def _estado(self, usuario):
+        """Devuelve el estado en memoria del usuario, leyéndolo la primera vez.""" # Docstring que describe el método.
+        estado = self._usuarios.get(usuario) # Estado ya leído.
+        if estado is None: # Primera vez.
+            cabecera, bits = self._leer(usuario) # Lo lee del disco.
+            estado = {"bits": bits, "ultimo": cabecera.get("ultimo_barrido"), "nuevos": 0, "borrados": 0} # Bits y cambios sin escribir.
+            self._usuarios[usuario] = estado # Lo guarda.
+        return estado # Devuelve el estado.
+
+    def _mascara(self, tarea_id, antelaciones):
+        """Devuelve el mapa de bits de los recordatorios de una tarea para esas antelaciones.""" # Docstring que describe el método.
+        base = tarea_id * len(self.antelaciones) # Primer bit de la tarea.
+        return sum(1 << (base + self.antelaciones.index(a)) for a in antelaciones) # Un bit por antelación.
+
+    # --- Consulta y anotación ---
+    def entregado(self, usuario, tarea_id, antelacion):
+        """Indica si el recordatorio de la tarea con esa antelación ya se entregó.""" # Docstring que describe el método.
+        return bool(self._estado(usuario)["bits"] & self._mascara(tarea_id, [antelacion])) # Consulta el bit.
+
+    def marcar(self, usuario, tarea_id, antelaciones):
+        """Anota como entregados los recordatorios de la tarea con esas antelaciones (se escriben con guardar()).""" # Docstring que describe el método.
+        estado = self._estado(usuario) # Estado del usuario.
+        mascara = self._mascara(tarea_id, antelaciones) # Bits a encender.
+        estado["bits"] |= mascara # Los enciende.
+        estado["nuevos"] |= mascara # Cambio pendiente de escribir.
+        estado["borrados"] &= ~mascara # Ya no está pendiente de apagar.
+
+    def _olvidar(self, usuario, tarea_id, antelaciones):
+        """Apaga los bits de la tarea con esas antelaciones (se escriben con guardar()).""" # Docstring que describe el método.
+        estado = self._estado(usuario) # Estado del usuario.
+        mascara = self._mascara(tarea_id, antelaciones) & estado["bits"] # Solo los que estaban encendidos.
+        if mascara: # Si hay algo que apagar.
+            estado["bits"] &= ~mascara # Los apaga.
+            estado["borrados"] |= mascara # Cambio pendiente de escribir.
+            estado["nuevos"] &= ~mascara # Ya no está pendiente de encender.
+
+    def ultimo_barrido(self, usuario):
+        """Devuelve la fecha "aaaa-mm-dd" del último barrido guardado del usuario, o None.""" # Docstring que describe el método.
+        return self._estado(usuario)["ultimo"] # Fecha de la cabecera.
+
+    def _caducados(self, tarea, hoy):
+        """Devuelve las antelaciones cuyos bits ya no valen para la tarea: vencida, completada, o con la ventana aún por llegar (reprogramada).""" # Docstring que describe el método.
+        if tarea is None or tarea.get("completada") or not tarea.get("fecha") or tarea["fecha"] < hoy.isoformat(): # Sin avisos pendientes.
+            return self.antelaciones # Todos sus bits sobran.
+        dias = (datetime.date.fromisoformat(tarea["fecha"]) - hoy).days # Días hasta la entrega.
+        return [a for a in self.antelaciones if a < dias] # Ventanas que aún no se abrieron: no se pueden haber entregado para esta fecha.
+
+    def _on_cambio(self, evento):
+        """Apaga los bits de una tarea borrada o reprogramada, para que vuelva a avisar en su nueva fecha.""" # Docstring que describe el método.
+        estado = self._usuarios.get(evento.usuario) # Los cambios solo afectan a usuarios ya leídos...
+        if estado is None and evento.tipo == TAREA_ELIMINADA: # ...salvo las bajas, que se depuran siempre.
+            estado = self._estado(evento.usuario) # Lee su registro (un archivo pequeño).
+        if estado is None or not estado["bits"] & self._mascara(evento.id, self.antelaciones): # La tarea no tenía avisos entregados.
+            return # Nada que depurar (el caso habitual: no se lee nada).
+        registro = None if evento.tipo == TAREA_ELIMINADA else evento.registro # Tarea actual.
+        self._olvidar(evento.usuario, evento.id, self._caducados(registro, datetime.date.today())) # Apaga los bits que ya no valen.
+
+    def depurar(self, usuario, hoy):
+        """Apaga los bits de tareas vencidas, completadas, borradas o reprogramadas. Recorre solo los bits encendidos.""" # Docstring que describe el método.
+        for tarea_id in sorted({p // len(self.antelaciones) for p in ids_de_mascara(self._estado(usuario)["bits"])}): # Tareas con avisos entregados.
+            self._olvidar(usuario, tarea_id, self._caducados(self.coleccion.obtener(usuario, tarea_id), hoy)) # Apaga los que sobran.
+
+    def guardar(self, usuario, ultimo_barrido=None):
+        """Escribe los cambios del usuario fusionándolos con el disco (otra instancia pudo anotar a la vez).""" # Docstring que describe el método.
+        estado = self._estado(usuario) # Estado del usuario.
+        if not (estado["nuevos"] or estado["borrados"]) and (ultimo_barrido is None or ultimo_barrido == estado["ultimo"]): # Nada que escribir.
+            return # Sin escritura.
+        ruta = self._ruta(usuario) # Archivo del usuario.
+        os.makedirs(os.path.dirname(ruta), exist_ok=True) # Crea la carpeta si no existe (también la del bloqueo).
+        with bloqueo_archivo(ruta): # Sección corta leer-fusionar-escribir.
+            cabecera, bits = self._leer(usuario) # Versión más reciente del disco.
+            estado["bits"] = (bits | estado["nuevos"]) & ~estado["borrados"] # Aplica los cambios propios sobre ella.
+            estado["ultimo"] = max(filter(None, (cabecera.get("ultimo_barrido"), ultimo_barrido, estado["ultimo"])), default=None) # El barrido más reciente.
+            self._escribir(ruta, estado["bits"], estado["ultimo"]) # Una única escritura atómica.
+            estado["nuevos"] = estado["borrados"] = 0 # Ya no hay cambios pendientes.
+
+
+def barrer(registro, usuario, hoy=None, recuperar=False, anotar=True):
+    """
+    Devuelve los recordatorios que toca entregar como lista de (tarea, antelación), ordenada por fecha, y los anota.
+    La antelación es None para las tareas que vencieron sin que llegara su último aviso (solo con recuperar=True,
+    que empieza en el último barrido guardado, como mucho DIAS_RECUPERACION días atrás, en lugar de hoy).
+    """ # Docstring que describe la función.
+    hoy = hoy or datetime.date.today() # Fecha de referencia.
+    desde = hoy # Sin recuperar: solo las tareas que aún no vencieron.
+    if recuperar: # Al iniciar sesión.
+        ultimo = registro.ultimo_barrido(usuario) # Último barrido guardado.
+        limite = hoy - datetime.timedelta(days=DIAS_RECUPERACION) # Hasta dónde se recupera.
+        desde = max(datetime.date.fromisoformat(ultimo), limite) if ultimo else hoy # La primera vez no se recupera nada.
+    fin = hoy + datetime.timedelta(days=max(registro.antelaciones) + 1) # Primer día sin avisos abiertos.
+    entregas = [] # Recordatorios a entregar.
+    consulta = Consulta(registro.coleccion, usuario).donde(fecha__gte=desde.isoformat(), fecha__lt=fin.isoformat(), completada=False) # Porción del índice de fechas.
+    for tarea in consulta.ordenar_por("fecha"): # Recorre solo la ventana de avisos.
+        dias = (datetime.date.fromisoformat(tarea["fecha"]) - hoy).days # Días hasta la entrega (negativo si venció).
+        abiertas = [a for a in registro.antelaciones if a >= dias] # Antelaciones cuya ventana ya se abrió.
+        antelacion = min(abiertas) if dias >= 0 else None # El aviso más reciente; None si la tarea ya venció.
+        comprobar = antelacion if antelacion is not None else min(registro.antelaciones) # Bit que dice si ya se avisó lo último.
+        if not registro.entregado(usuario, tarea["id"], comprobar): # No se entregó.
+            entregas.append((tarea, antelacion)) # Toca avisar.
+            if anotar: # Se anota como entregado.
+                registro.marcar(usuario, tarea["id"], abiertas) # También los avisos anteriores, que ya no tiene sentido dar.
+    if anotar: # Se guarda el registro.
+        if recuperar: # Al iniciar sesión también se depura.
+            registro.depurar(usuario, hoy) # Quita las tareas que ya no pueden avisar.
+        registro.guardar(usuario, hoy.isoformat() if recuperar else None) # Una escritura, solo si algo cambió.
+    return entregas # Devuelve los recordatorios.
+
+
+def texto_recordatorio(tarea, antelacion):
+    """Devuelve (mensaje, grupo, resumen) del aviso de un recordatorio, para el centro de notificaciones.""" # Docstring que describe la función.
+    titulo, fecha = tarea.get("titulo", "Tarea sin título"), tarea["fecha"] # Título y fecha de la tarea.
+    if antelacion is None: # Venció sin avisar.
+        return f"'{titulo}' venció el {fecha}.", "vencidas", "{n} tareas vencieron sin aviso" # Aviso de recuperación.
+    cuando = {0: "hoy", 1: "mañana"}.get(antelacion, f"en {antelacion} días") # Texto de la antelación.
+    return f"'{titulo}' vence {cuando}, {fecha}.", f"{antelacion}:{fecha}", f"{{n}} tareas vencen {cuando}" # Aviso normal.
+
+
+registro_recordatorios = RegistroRecordatorios() # Registro único compartido por la aplicación y la línea de comandos.
@@ -0,0 +1,262 @@
+"""
+Puerta de rendimiento de extremo a extremo, sin interfaz.
+
+Repite sesiones realistas completas sobre la capa de almacenamiento y de servicio que usan las ventanas de Tk
+(inicio de sesión, lista de tareas, 50 altas, 12 meses de calendario, 20 notas editadas, barrido de
+recordatorios y guardado), sobre una carpeta temporal con datos sembrados de forma reproducible (misma
+semilla, misma fecha de referencia). Mide la latencia de cada paso (p50, p95, máximo y rango intercuartílico)
+y el pico de memoria de una sesión, y lo compara con una base guardada en JSON: un paso empeora si su mediana
+supera la de la base en más del umbral, más una holgura que crece con el ruido que tuvo ese paso en la base.
+Si algo empeora se repite la medida, y solo falla lo que vuelve a empeorar. Con --update (o si aún no hay
+base) guarda la ejecución como nueva base.
+
+    python rendimiento.py [ruta de la base] [--update]
+    python eduplanner.py diag perf --sessions 30 --threshold 0.25
+"""
+import datetime # Importa el módulo datetime para la fecha de referencia fija de las sesiones.
+import gc # Importa gc para recoger la basura entre sesiones, fuera de lo medido.
+import json # Importa el módulo json, que permite trabajar con datos en formato JSON (serializar y deserializar).
+import math # Importa math para calcular los percentiles por rango.
+import os # Importa el módulo os, que proporciona funciones para interactuar con el sistema operativo, como la gestión de rutas de archivos y directorios.
+import platform # Importa platform para anotar en la base la máquina en la que se midió.
+import random # Importa random para sembrar datos reproducibles con una semilla.
+import sys # Importa sys para la versión de Python y el código de salida.
+import time # Importa time para medir la latencia de cada paso.
+import tracemalloc # Importa tracemalloc para medir el pico de memoria de una sesión.
+
+RUTA_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rendimiento_base.json") # Base por defecto, junto al módulo (depende de la máquina: no se versiona).
+HOY = datetime.date(2025, 6, 2) # Fecha de referencia fija: las sesiones no dependen del día en que se ejecutan.
+CARGA_POR_DEFECTO = {"sesiones": 30, "tareas": 5000, "notas": 200, "semilla": 1} # Sesiones medidas (una muestra por sesión de los pasos únicos: con 10, el p95 era el máximo) y datos sembrados por usuario.
+ALTAS, MESES, EDICIONES = 50, 12, 20 # Tareas añadidas, meses recorridos y notas editadas en cada sesión.
+CALENTAMIENTO = 2 # Sesiones sin medir al principio: importan módulos y llenan las cachés del sistema de archivos.
+UMBRAL = 0.25 # Empeoramiento relativo máximo de la mediana de cada paso.
+UMBRAL_MEMORIA = 0.20 # Empeoramiento relativo máximo del pico de memoria.
+HOLGURA_MS = 1.0 # Margen absoluto mínimo de cada paso: en los de décimas de milisegundo el ruido pesa más que el umbral (si el rango intercuartílico de la base es mayor, se usa ese).
+CONTRASENA = "rendimiento" # Contraseña de los usuarios sembrados.
+COSTE_PRUEBA = {"kdf": "pbkdf2_sha256", "iteraciones": 1000} # Derivación barata y fija: se mide la búsqueda, no el coste calibrado de la máquina.
+ETIQUETAS = ("examen", "lectura", "proyecto", "grupo", "laboratorio", "repaso") # Etiquetas de los datos sembrados.
+PRIORIDADES = ("alta", "media", "baja") # Prioridades de los datos sembrados.
+
+
+# --- Datos sembrados ---
+def _fecha(rng, desde, hasta):
+    """Devuelve una fecha "aaaa-mm-dd" al azar entre HOY + desde y HOY + hasta días.""" # Docstring que describe la función.
+    return (HOY + datetime.timedelta(days=rng.randint(desde, hasta))).isoformat() # Fecha relativa a la referencia.
+
+
+def _tarea(rng, numero, desde=-400, hasta=200):
+    """Devuelve una tarea al azar (sin id), con fecha entre HOY + desde y HOY + hasta días.""" # Docstring que describe la función.
+    return {"titulo": f"Tarea {numero} de {rng.choice(ETIQUETAS)}", "contenido": "x" * rng.randint(20, 300), # Título y descripción.
+            "fecha": _fecha(rng, desde, hasta), "etiquetas": rng.sample(ETIQUETAS, rng.randint(0, 2)), # Fecha y etiquetas.
+            "prioridad": rng.choice(PRIORIDADES), "completada": rng.random() < 0.3} # Prioridad y estado.
+
+
+def _sembrar(usuario, rng, tareas, notas):
+    """Registra al usuario y le crea sus tareas y notas; archiva las antiguas y deja un barrido de hace una semana.""" # Docstring que describe la función.
+    from almacenamiento import almacen_tareas, almacen_notas, vaciar_todo # Colecciones compartidas.
+    from credenciales import directorio_usuarios # Directorio de usuarios.
+    from historico import historico_tareas # Histórico de tareas archivadas.
+    from recordatorios import registro_recordatorios, barrer # Registro de recordatorios entregados.
+    directorio_usuarios.registrar(usuario, CONTRASENA) # Usuario registrado, como después de crear la cuenta.
+    almacen_tareas.agregar_varios(usuario, [_tarea(rng, i) for i in range(tareas)]) # Tareas de un curso largo.
+    almacen_notas.agregar_varios(usuario, [{"titulo": f"Nota {i}", "contenido": "y" * rng.randint(200, 4000)} for i in range(notas)]) # Notas con cuerpos de tamaño variable.
+    vaciar_todo() # Todo en disco: las notas sacan su cuerpo a su archivo.
+    historico_tareas.archivar(usuario, hoy=HOY) # Las tareas de hace más de medio año pasan al histórico.
+    barrer(registro_recordatorios, usuario, HOY - datetime.timedelta(days=7), recuperar=True) # El último inicio de sesión fue hace una semana.
+
+
+# --- Sesión ---
+def _medir(tiempos, paso, funcion, *args, **kwargs):
+    """Ejecuta una operación, añade su duración en milisegundos al paso y devuelve su resultado.""" # Docstring que describe la función.
+    inicio = time.perf_counter() # Instante de inicio.
+    resultado = funcion(*args, **kwargs) # La operación.
+    tiempos.setdefault(paso, []).append((time.perf_counter() - inicio) * 1000) # Duración del paso.
+    return resultado # Devuelve el resultado.
+
+
+def _lista_de_tareas(usuario):
+    """Lo que hace la ventana de tareas al abrirse: abiertas por fecha con los mapas de bits y el texto de cada fila.""" # Docstring que describe la función.
+    from almacenamiento import almacen_tareas # Colección de tareas.
+    from indices import filtrar # Filtro por etiquetas, prioridad y estado.
+    tareas = [almacen_tareas.obtener(usuario, i) for i in filtrar(almacen_tareas, usuario)] # Abiertas, buscadas por id.
+    return [f"{t['titulo']} - {t['fecha']} {' '.join('#' + e for e in t.get('etiquetas', []))}" for t in tareas] # Filas de la lista.
+
+
+def _mes_de_calendario(usuario, anio, mes):
+    """Lo que hace el calendario al recorrer un mes: las tareas abiertas y las archivadas de cada día.""" # Docstring que describe la función.
+    from almacenamiento import almacen_tareas # Colección de tareas.
+    from consultas import Consulta # Consultas del calendario.
+    from historico import historico_tareas # Histórico de tareas archivadas.
+    dia = datetime.date(anio, mes, 1) # Primer día del mes.
+    filas = 0 # Filas mostradas en todo el mes.
+    while dia.month == mes: # Recorre los días del mes.
+        fecha = dia.isoformat() # Día seleccionado.
+        filas += len(Consulta(almacen_tareas, usuario).donde(fecha=fecha, completada=False).registros()) # Tareas abiertas del día.
+        filas += len(historico_tareas.tareas_de_fecha(usuario, fecha)) # Tareas archivadas del día.
+        dia += datetime.timedelta(days=1) # Día siguiente.
+    return filas # Devuelve el número de filas.
+
+
+def _editar_nota(usuario, nota_id, vuelta):
+    """Lo que hace el editor de notas: lee el cuerpo y guarda el texto modificado.""" # Docstring que describe la función.
+    from almacenamiento import almacen_notas # Colección de notas.
+    texto = almacen_notas.contenido(usuario, nota_id) # Abre la nota.
+    return almacen_notas.actualizar(usuario, nota_id, contenido=f"{texto}\nEditada en la vuelta {vuelta}.") # Guarda la edición.
+
+
+def _sesion(usuario, rng, tiempos):
+    """Repite una sesión completa del usuario y añade la duración de cada paso a tiempos.""" # Docstring que describe la función.
+    from almacenamiento import almacen_tareas, almacen_notas, vaciar_todo # Colecciones compartidas.
+    from credenciales import directorio_usuarios # Directorio de usuarios.
+    from recordatorios import registro_recordatorios, barrer # Barrido de recordatorios.
+    if not _medir(tiempos, "inicio de sesión", directorio_usuarios.verificar, usuario, CONTRASENA): # Búsqueda y comprobación del usuario.
+        raise RuntimeError(f"No se pudo iniciar sesión como {usuario}") # Los datos sembrados no son válidos.
+    _medir(tiempos, "lista de tareas", _lista_de_tareas, usuario) # Abre la lista de tareas (construye los índices del usuario).
+    for i in range(ALTAS): # Altas de tareas.
+        _medir(tiempos, "alta de tarea", almacen_tareas.agregar, usuario, _tarea(rng, f"nueva {i}", -10, 30)) # Una tarea próxima.
+    primero = HOY.year * 12 + HOY.month - 1 - MESES * 2 // 3 # Primer mes recorrido: ocho meses atrás (los primeros, ya archivados).
+    for n in range(primero, primero + MESES): # Meses del calendario.
+        _medir(tiempos, "mes de calendario", _mes_de_calendario, usuario, n // 12, n % 12 + 1) # Un mes completo.
+    notas = [n["id"] for n in almacen_notas.del_usuario(usuario)] # Notas del usuario.
+    for vuelta, nota_id in enumerate(rng.sample(notas, min(EDICIONES, len(notas)))): # Notas editadas.
+        _medir(tiempos, "edición de nota", _editar_nota, usuario, nota_id, vuelta) # Una edición.
+    _medir(tiempos, "barrido de recordatorios", barrer, registro_recordatorios, usuario, HOY, recuperar=True) # Recordatorios al iniciar sesión.
+    _medir(tiempos, "guardado", vaciar_todo) # El guardado agrupado escribe todo lo de la sesión.
+
+
+def _percentil(valores, p):
+    """Devuelve el percentil p (0-100) de los valores por rango más cercano.""" # Docstring que describe la función.
+    ordenados = sorted(valores) # Valores en orden.
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)] # Valor en la posición del percentil.
+
+
+def ejecutar_carga(sesiones=30, tareas=5000, notas=200, semilla=1):
+    """
+    Siembra los datos en una carpeta temporal y repite las sesiones: CALENTAMIENTO sin medir, las medidas (cada
+    una con su usuario y su carpeta de datos, como un inicio de sesión en frío) y una más con tracemalloc para
+    el pico de memoria.
+    Devuelve el resultado {"carga", "entorno", "pasos": {paso: {n, p50_ms, p95_ms, max_ms, ric_ms}}, "memoria_pico_kb"}.
+    """ # Docstring que describe la función.
+    import tempfile # Carpeta temporal para no tocar los datos reales.
+    import almacenamiento # Capa de almacenamiento compartida.
+    from credenciales import directorio_usuarios # Directorio de usuarios.
+    from indices import olvidar_usuario # Descarta los índices de cada usuario al terminar su sesión.
+    carga = {"sesiones": sesiones, "tareas": tareas, "notas": notas, "semilla": semilla} # Parámetros de la carga.
+    ruta_anterior = os.path.dirname(almacenamiento.almacen_tareas.ruta) # Carpeta de datos en uso.
+    carpeta_usuarios = directorio_usuarios.carpeta_datos # Carpeta de usuarios en uso.
+    tiempos = {} # Duraciones por paso.
+    with tempfile.TemporaryDirectory() as carpeta: # Carpeta que se borra al terminar.
+        try: # Siempre se restauran las carpetas.
+            sesiones_carga = [] # (carpeta, usuario, generador) de cada sesión.
+            for numero in range(CALENTAMIENTO + sesiones + 1): # Calentamiento, sesiones medidas y sesión de memoria.
+                datos = os.path.join(carpeta, str(numero)) # Carpeta de datos propia: cada sesión ve archivos del mismo tamaño.
+                usuario = f"rendimiento{numero}-{os.getpid()}" # Usuario propio: sus índices y su registro de recordatorios empiezan vacíos.
+                rng = random.Random(semilla * 1000 + numero) # Mismos datos y operaciones en cada ejecución.
+                almacenamiento.usar_carpeta_datos(datos) # Las colecciones trabajan en la carpeta de la sesión.
+                directorio_usuarios.carpeta_datos = datos # Y los usuarios también.
+                directorio_usuarios.fijar_coste(COSTE_PRUEBA) # Coste fijo de la derivación.
+                _sembrar(usuario, rng, tareas, notas) # Datos del usuario (se siembra todo antes de medir).
+                sesiones_carga.append((datos, usuario, rng)) # Lista para medir.
+            for numero, (datos, usuario, rng) in enumerate(sesiones_carga): # Sesiones.
+                almacenamiento.usar_carpeta_datos(datos) # Se leerá del disco en el primer uso, como al abrir la aplicación.
+                directorio_usuarios.carpeta_datos = datos # Usuarios de la sesión.
+                gc.collect() # La basura anterior no cuenta.
+                if numero == CALENTAMIENTO + sesiones: # Última: memoria.
+                    tracemalloc.start(1) # Basta la línea de cada asignación.
+                    try: # Siempre se detiene tracemalloc.
+                        _sesion(usuario, rng, {}) # Sesión sin medir tiempos (tracemalloc los distorsiona).
+                        pico = tracemalloc.get_traced_memory()[1] # Pico de memoria de la sesión.
+                    finally: # Limpieza.
+                        tracemalloc.stop() # Deja de registrar.
+                else: # Calentamiento o sesión medida.
+                    _sesion(usuario, rng, tiempos if numero >= CALENTAMIENTO else {}) # Las primeras solo llenan cachés e importan módulos.
+                olvidar_usuario(usuario) # Sus índices no pesan en las sesiones siguientes.
+        finally: # Limpieza.
+            almacenamiento.usar_carpeta_datos(ruta_anterior) # Vuelve a la carpeta de datos anterior.
+            directorio_usuarios.carpeta_datos = carpeta_usuarios # Y a la de usuarios.
+    pasos = {paso: {"n": len(valores), "p50_ms": round(_percentil(valores, 50), 3), "p95_ms": round(_percentil(valores, 95), 3), # Percentiles del paso.
+                    "max_ms": round(max(valores), 3), "ric_ms": round(_percentil(valores, 75) - _percentil(valores, 25), 3)} # El peor caso y la dispersión.
+             for paso, valores in tiempos.items()} # Un resumen por paso.
+    entorno = {"python": platform.python_version(), "sistema": platform.platform(), "procesador": platform.machine()} # Dónde se midió.
+    return {"carga": carga, "entorno": entorno, "pasos": pasos, "memoria_pico_kb": round(pico / 1024, 1)} # Devuelve el resultado.
+
+
+# --- Comparación con la base ---
+def comparar(resultado, base, umbral=UMBRAL, umbral_memoria=UMBRAL_MEMORIA, holgura_ms=HOLGURA_MS):
+    """
+    Compara un resultado con la base y devuelve los fallos como {paso: detalle} (vacío si se cumple todo). Un paso
+    falla si su mediana supera la de la base por más del umbral relativo más una holgura absoluta: holgura_ms o, si
+    es mayor, el rango intercuartílico del paso en la base (su ruido). La memoria falla si su pico supera el umbral
+    de memoria.
+    """ # Docstring que describe la función.
+    if resultado["carga"] != base["carga"]: # Otra carga no es comparable.
+        return {"carga": f"{resultado['carga']} no coincide con la de la base {base['carga']}; usa los mismos parámetros o --update"} # Fallo de configuración.
+    fallos = {} # Pasos que empeoraron.
+    for paso, medida in base["pasos"].items(): # Recorre los pasos de la base.
+        actual = resultado["pasos"].get(paso) # Mismo paso en esta ejecución.
+        if actual is None: # El paso desapareció.
+            fallos[paso] = "no se ha medido" # La sesión ya no es la misma.
+            continue # Siguiente paso.
+        limite = medida["p50_ms"] * (1 + umbral) + max(holgura_ms, medida.get("ric_ms", 0)) # Máximo permitido (las bases antiguas no guardan el rango).
+        if actual["p50_ms"] > limite: # Más lento de lo permitido.
+            fallos[paso] = f"p50 {actual['p50_ms']:.2f} ms > {limite:.2f} ms (base {medida['p50_ms']:.2f} ms)" # Detalle del fallo.
+    limite = base["memoria_pico_kb"] * (1 + umbral_memoria) # Pico de memoria permitido.
+    if resultado["memoria_pico_kb"] > limite: # Más memoria de la permitida.
+        fallos["memoria"] = f"pico {resultado['memoria_pico_kb']:.0f} KiB > {limite:.0f} KiB (base {base['memoria_pico_kb']:.0f} KiB)" # Detalle del fallo.
+    return fallos # Devuelve los fallos.
+
+
+def formatear_resultado(resultado, base=None):
+    """Devuelve la tabla de pasos con sus percentiles (y la mediana de la base, si la hay) y el pico de memoria.""" # Docstring que describe la función.
+    lineas = [f"{'paso':<26}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'máx ms':>10}" + (f"{'base p50':>11}" if base else "")] # Cabecera.
+    for paso, medida in resultado["pasos"].items(): # Una fila por paso, en el orden de la sesión.
+        linea = f"{paso:<26}{medida['n']:>5}{medida['p50_ms']:>10.2f}{medida['p95_ms']:>10.2f}{medida['max_ms']:>10.2f}" # Percentiles.
+        if base and paso in base["pasos"]: # Con base.
+            linea += f"{base['pasos'][paso]['p50_ms']:>11.2f}" # Mediana de referencia.
+        lineas.append(linea) # Añade la fila.
+    memoria = f"Pico de memoria de una sesión: {resultado['memoria_pico_kb'] / 1024:.2f} MiB" # Memoria.
+    if base: # Con base.
+        memoria += f" (base {base['memoria_pico_kb'] / 1024:.2f} MiB)" # Memoria de referencia.
+    lineas.append(memoria) # Añade la memoria.
+    return "\n".join(lineas) # Devuelve la tabla.
+
+
+def puerta_rendimiento(ruta_base=RUTA_BASE, actualizar=False, umbral=UMBRAL, umbral_memoria=UMBRAL_MEMORIA, holgura_ms=HOLGURA_MS, **carga):
+    """
+    Ejecuta la carga y la compara con la base guardada. Si se pide actualizar o aún no hay base, guarda esta
+    ejecución como base y pasa. Si algo empeora, repite la carga y solo cuenta lo que empeora en las dos
+    ejecuciones. Devuelve True si no se ha superado ningún umbral.
+    """ # Docstring que describe la función.
+    from archivos import escribir_atomico # Escritura atómica de la base.
+    carga = {**CARGA_POR_DEFECTO, **carga} # Parámetros de la carga.
+    resultado = ejecutar_carga(**carga) # Mide las sesiones.
+    base = None # Base guardada.
+    if not actualizar: # Solo se lee si se va a comparar.
+        try: # Puede no existir.
+            with open(ruta_base, 'r', encoding="utf-8") as f: # Abre la base.
+                base = json.load(f) # La carga.
+        except FileNotFoundError: # Primera ejecución.
+            print(f"No hay base en {ruta_base}: se guarda esta ejecución como base.") # Aviso.
+    print(formatear_resultado(resultado, base)) # Tabla de resultados.
+    if base is None: # Nueva base.
+        escribir_atomico(ruta_base, json.dumps(resultado, ensure_ascii=False, indent=2).encode("utf-8")) # La guarda.
+        print(f"Base guardada en {ruta_base}") # Informe.
+        return True # Sin nada con qué comparar, pasa.
+    if base.get("entorno") != resultado["entorno"]: # Otra máquina o versión de Python.
+        print(f"Aviso: la base se midió en {base.get('entorno')}; los tiempos pueden no ser comparables.") # Aviso, no fallo.
+    fallos = comparar(resultado, base, umbral, umbral_memoria, holgura_ms) # Comparación.
+    if fallos and "carga" not in fallos: # Un empeoramiento aislado puede ser ruido de la máquina.
+        print(f"Posible regresión en {', '.join(fallos)}: se repite la medida.") # Aviso.
+        resultado = ejecutar_carga(**carga) # Segunda ejecución completa.
+        print(formatear_resultado(resultado, base)) # Tabla de la repetición.
+        repetidos = comparar(resultado, base, umbral, umbral_memoria, holgura_ms) # Comparación de la repetición.
+        fallos = {paso: detalle for paso, detalle in repetidos.items() if paso in fallos} # Solo lo que empeora las dos veces.
+    for paso, detalle in fallos.items(): # Detalle de los fallos.
+        print(f"REGRESIÓN {paso}: {detalle}") # Uno por línea.
+    print(f"Umbral: +{umbral:.0%} en la mediana de cada paso (+{holgura_ms} ms o su rango intercuartílico), +{umbral_memoria:.0%} en la memoria: {'FALLA' if fallos else 'pasa'}") # Resultado global.
+    return not fallos # True si no hay regresiones.
+
+
+if __name__ == "__main__": # Solo al ejecutar el módulo directamente.
+    argumentos = [a for a in sys.argv[1:] if a != "--update"] # Ruta de la base (opcional).
+    sys.exit(0 if puerta_rendimiento(*argumentos[:1], actualizar="--update" in sys.argv) else 1) # Código 0 si la puerta pasa.
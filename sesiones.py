@@ -0,0 +1,199 @@
+"""
+Sesiones recientes de varios usuarios en la misma ventana (equipos compartidos del aula).
+
+Al cerrar sesión, el menú del usuario no se destruye: se oculta junto con sus índices (títulos, fechas,
+etiquetas, estado), que siguen al día con los eventos del bus. Si el mismo usuario vuelve a entrar, su
+menú se muestra de nuevo sin reconstruir widgets ni índices. Las sesiones se guardan en orden LRU y se
+expulsa la menos usada cuando hay más de "capacidad" o cuando su tamaño estimado supera el presupuesto.
+
+prueba_cambio_usuarios() mide sin interfaz lo que cuesta volver a un usuario con y sin su sesión en caché.
+"""
+import collections # Importa collections, que ofrece OrderedDict para el orden LRU de las sesiones.
+import sys # Importa sys para medir el tamaño de los objetos y leer los argumentos de la prueba.
+import time # Importa time para medir los cambios de usuario en la prueba.
+
+from almacenamiento import almacen_tareas, almacen_notas # Importa las colecciones cuyos índices se mantienen por sesión.
+from indices import indice_titulos, indice_fechas, indice_etiquetas, indice_estado, indices_de_usuario, olvidar_usuario # Importa los índices por usuario.
+
+CAPACIDAD = 4 # Sesiones ocultas que se conservan, además de la activa.
+PRESUPUESTO_MB = 64 # Tamaño estimado máximo de las sesiones ocultas, en MiB.
+BYTES_POR_WIDGET = 4096 # Estimación de lo que ocupa cada widget (Tcl y Python); su memoria real no se puede medir desde Python.
+INDICES_DE_SESION = ( # Índices que se preparan al abrir una sesión: (colección, función que lo construye o reutiliza).
+    (almacen_tareas, indice_titulos), (almacen_tareas, indice_fechas), (almacen_tareas, indice_etiquetas), (almacen_tareas, indice_estado), # Tareas.
+    (almacen_notas, indice_titulos), # Notas.
+)
+
+
+def tamano_aproximado(objeto):
+    """Suma sys.getsizeof del objeto y de todo lo que contiene (listas, tuplas, diccionarios, conjuntos y atributos), sin contar dos veces lo compartido.""" # Docstring que describe la función.
+    vistos = set() # Ids de los objetos ya contados.
+    pendientes = [objeto] # Pila de objetos por recorrer (sin recursión: los índices tienen listas muy largas).
+    total = 0 # Bytes acumulados.
+    while pendientes: # Mientras queden objetos.
+        actual = pendientes.pop() # Siguiente objeto.
+        if id(actual) in vistos: # Ya contado.
+            continue # Lo salta.
+        vistos.add(id(actual)) # Lo marca.
+        total += sys.getsizeof(actual) # Su propio tamaño.
+        if isinstance(actual, dict): # Diccionario: claves y valores.
+            pendientes.extend(actual.keys()) # Claves.
+            pendientes.extend(actual.values()) # Valores.
+        elif isinstance(actual, (list, tuple, set, frozenset)): # Contenedores.
+            pendientes.extend(actual) # Elementos.
+        elif hasattr(actual, "__dict__") and not isinstance(actual, type): # Objeto con atributos (los índices).
+            pendientes.append(vars(actual)) # Sus atributos.
+    return total # Devuelve el tamaño estimado.
+
+
+def contar_widgets(widget):
+    """Devuelve el número de widgets del árbol que cuelga del widget (incluido él mismo).""" # Docstring que describe la función.
+    pendientes, total = [widget], 0 # Pila de widgets y contador.
+    while pendientes: # Mientras queden widgets.
+        total += 1 # Cuenta el actual.
+        pendientes.extend(pendientes.pop().winfo_children()) # Añade sus hijos.
+    return total # Devuelve el número de widgets.
+
+
+class Sesion: # Vista preparada de un usuario: su marco de menú (si hay interfaz) y sus índices.
+    def __init__(self, usuario, marco=None):
+        """Crea la sesión del usuario; marco es el Frame que contiene su menú, o None sin interfaz.""" # Docstring que describe el método.
+        self.usuario = usuario # Usuario de la sesión.
+        self.marco = marco # Frame del menú del usuario.
+        self.tamano = 0 # Tamaño estimado en bytes (se calcula al ocultarla).
+        self._registros = 0 # Número de tareas y notas cuando se estimó el tamaño.
+
+    def estimar_tamano(self):
+        """Estima los bytes que ocupa la sesión: sus índices más sus widgets. Solo se vuelve a medir si sus registros cambiaron más de un 10 %.""" # Docstring que describe el método.
+        registros = len(almacen_tareas.del_usuario(self.usuario)) + len(almacen_notas.del_usuario(self.usuario)) # Tareas y notas actuales.
+        if self.tamano and abs(registros - self._registros) <= self._registros // 10: # Casi igual que en la última medida.
+            return self.tamano # Recorrer los índices otra vez no cambiaría la decisión.
+        self._registros = registros # Registros de esta medida.
+        widgets = contar_widgets(self.marco) if self.marco is not None and self.marco.winfo_exists() else 0 # Widgets del menú.
+        self.tamano = tamano_aproximado(list(indices_de_usuario(self.usuario).values())) + widgets * BYTES_POR_WIDGET # Índices y widgets.
+        return self.tamano # Devuelve el tamaño.
+
+    def mostrar(self):
+        """Muestra el menú de la sesión ocupando toda la ventana.""" # Docstring que describe el método.
+        if self.marco is not None: # Solo con interfaz.
+            self.marco.place(x=0, y=0, relwidth=1, relheight=1) # Ocupa toda la ventana.
+            self.marco.tkraise() # Por encima del login y de los menús ocultos.
+
+    def ocultar(self):
+        """Oculta el menú sin destruirlo.""" # Docstring que describe el método.
+        if self.marco is not None and self.marco.winfo_exists(): # Solo con interfaz.
+            self.marco.place_forget() # Deja de mostrarse (los widgets y sus suscripciones siguen vivos).
+
+    def cerrar(self):
+        """Destruye el menú (sus widgets cancelan sus suscripciones al bus) y descarta los índices del usuario.""" # Docstring que describe el método.
+        if self.marco is not None and self.marco.winfo_exists(): # Solo con interfaz.
+            self.marco.destroy() # Destruye los widgets.
+        olvidar_usuario(self.usuario) # Libera los índices.
+
+
+class GestorSesiones: # Sesiones recientes en orden LRU, acotadas por número y por tamaño estimado.
+    def __init__(self, capacidad=CAPACIDAD, presupuesto_mb=PRESUPUESTO_MB):
+        """Inicializa el gestor sin sesiones.""" # Docstring que describe el método.
+        self.capacidad = capacidad # Sesiones ocultas que se conservan.
+        self.presupuesto = presupuesto_mb * 1024 * 1024 # Bytes estimados que pueden ocupar las sesiones ocultas.
+        self._sesiones = collections.OrderedDict() # Diccionario usuario -> Sesion, de la menos a la más usada.
+        self.activa = None # Sesión que se está mostrando.
+
+    def __contains__(self, usuario):
+        """Indica si el usuario tiene su sesión preparada.""" # Docstring que describe el método.
+        return usuario in self._sesiones # Consulta en el diccionario.
+
+    def abrir(self, usuario, construir=None):
+        """
+        Muestra la sesión del usuario. Si no está en caché, construir() crea su marco de menú (o None sin interfaz)
+        y se preparan sus índices. Devuelve True si la sesión ya estaba preparada.
+        """ # Docstring que describe el método.
+        self.ocultar() # Oculta la sesión anterior, si la hay.
+        sesion = self._sesiones.get(usuario) # Busca la sesión preparada.
+        recuperada = sesion is not None and (sesion.marco is None or sesion.marco.winfo_exists()) # Su menú sigue vivo.
+        if not recuperada: # Primera vez, o su menú se destruyó.
+            sesion = Sesion(usuario, construir() if construir else None) # Construye el menú.
+            for coleccion, indice in INDICES_DE_SESION: # Prepara los índices que no construyó el propio menú.
+                indice(coleccion, usuario) # Construye o reutiliza.
+            self._sesiones[usuario] = sesion # La guarda.
+        self._sesiones.move_to_end(usuario) # Es la más reciente.
+        self.activa = sesion # Pasa a ser la activa.
+        sesion.mostrar() # La muestra.
+        self._expulsar() # Respeta la capacidad y el presupuesto.
+        return recuperada # Indica si fue un cambio rápido.
+
+    def ocultar(self):
+        """Oculta la sesión activa (al cerrar sesión) y estima su tamaño para el presupuesto.""" # Docstring que describe el método.
+        if self.activa is not None: # Si hay una sesión activa.
+            self.activa.ocultar() # Oculta su menú.
+            self.activa.estimar_tamano() # Se estima ahora, mientras el siguiente usuario escribe su contraseña.
+            self.activa = None # Ya no hay sesión activa.
+
+    def olvidar(self, usuario):
+        """Cierra y descarta la sesión del usuario, si la hay.""" # Docstring que describe el método.
+        sesion = self._sesiones.pop(usuario, None) # La retira.
+        if sesion is not None: # Si existía.
+            if sesion is self.activa: # Era la activa.
+                self.activa = None # Ya no hay sesión activa.
+            sesion.cerrar() # Libera su menú y sus índices.
+
+    def tamano(self):
+        """Devuelve el tamaño estimado de las sesiones ocultas, en bytes.""" # Docstring que describe el método.
+        return sum(s.tamano for s in self._sesiones.values() if s is not self.activa) # Suma de las ocultas.
+
+    def _expulsar(self):
+        """Expulsa las sesiones ocultas menos usadas mientras haya demasiadas u ocupen más que el presupuesto.""" # Docstring que describe el método.
+        ocultas = [u for u, s in self._sesiones.items() if s is not self.activa] # De la menos a la más usada.
+        total = self.tamano() # Tamaño de las ocultas.
+        while ocultas and (len(ocultas) > self.capacidad or total > self.presupuesto): # Sobra alguna.
+            usuario = ocultas.pop(0) # La menos usada.
+            total -= self._sesiones[usuario].tamano # Descuenta su tamaño.
+            self.olvidar(usuario) # La cierra.
+
+    def usuarios(self):
+        """Devuelve los usuarios con sesión preparada, del menos al más usado.""" # Docstring que describe el método.
+        return list(self._sesiones) # Orden LRU.
+
+
+def prueba_cambio_usuarios(usuarios=6, tareas=20000, vueltas=3, capacidad=CAPACIDAD):
+    """
+    Crea en una carpeta temporal "usuarios" usuarios con "tareas" tareas cada uno y alterna entre ellos,
+    midiendo el cambio de usuario con la sesión en caché (índices preparados) y sin ella (índices desde cero).
+    Devuelve True si volver a un usuario reciente es más rápido que abrirlo en frío.
+    """ # Docstring que describe la función.
+    import datetime # Fechas de las tareas.
+    import os # Carpeta de datos anterior.
+    import tempfile # Carpeta temporal para no tocar los datos reales.
+    import almacenamiento # Capa de almacenamiento compartida.
+    ruta_anterior = os.path.dirname(almacen_tareas.ruta) # Carpeta de datos en uso.
+    frio, caliente = [], [] # Tiempos (ms) de los cambios sin y con sesión en caché.
+    with tempfile.TemporaryDirectory() as carpeta: # Carpeta que se borra al terminar.
+        almacenamiento.usar_carpeta_datos(carpeta) # Las colecciones trabajan en la carpeta temporal.
+        try: # Siempre se restaura la carpeta.
+            hoy = datetime.date.today() # Fecha de referencia.
+            nombres = [f"alumno{n}" for n in range(usuarios)] # Usuarios de la prueba.
+            for nombre in nombres: # Tareas de cada usuario.
+                almacen_tareas.agregar_varios(nombre, [{"titulo": f"Tarea {i} de {nombre}", "contenido": "", # Título y contenido.
+                                                        "fecha": (hoy + datetime.timedelta(days=i % 400)).isoformat(), # Fecha.
+                                                        "etiquetas": [f"materia{i % 7}"], "completada": i % 3 == 0} for i in range(tareas)]) # Etiquetas y estado.
+            gestor = GestorSesiones(capacidad) # Gestor sin interfaz.
+            for vuelta in range(vueltas): # Varias rondas por todos los usuarios.
+                for nombre in nombres: # Cambia de usuario.
+                    inicio = time.perf_counter() # Inicio del cambio.
+                    recuperada = gestor.abrir(nombre) # Abre su sesión.
+                    (caliente if recuperada else frio).append((time.perf_counter() - inicio) * 1000) # Anota el tiempo.
+                    gestor.ocultar() # Cierra sesión.
+                nombres.reverse() # La siguiente ronda empieza por los más recientes, como en el aula.
+        finally: # Limpieza.
+            for nombre in [f"alumno{n}" for n in range(usuarios)]: # Índices de la prueba.
+                olvidar_usuario(nombre) # Los libera.
+            almacenamiento.usar_carpeta_datos(ruta_anterior) # Vuelve a la carpeta de datos anterior.
+    media = lambda tiempos: sum(tiempos) / len(tiempos) if tiempos else float("nan") # Media de una lista.
+    print(f"Usuarios: {usuarios} con {tareas} tareas; capacidad {capacidad} sesiones ocultas") # Parámetros.
+    print(f"Cambio en frío: {len(frio)} veces, {media(frio):.2f} ms de media") # Sin sesión.
+    print(f"Cambio con sesión en caché: {len(caliente)} veces, {media(caliente):.3f} ms de media") # Con sesión.
+    return bool(caliente) and media(caliente) < media(frio) # Resultado global.
+
+
+if __name__ == "__main__": # Solo al ejecutar el módulo directamente.
+    argumentos = [int(a) for a in sys.argv[1:4]] # Usuarios, tareas y vueltas (opcionales).
+    sys.exit(0 if prueba_cambio_usuarios(*argumentos) else 1) # Código 0 si la prueba pasa.
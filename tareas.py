@@ -1,131 +1,61 @@
+import datetime # Importa el módulo datetime para mover las fechas de entrega de varias tareas a la vez.
 import tkinter as tk # Importa el módulo tkinter, que es la biblioteca estándar de Python para crear interfaces gráficas de usuario (GUI).
-from tkinter import messagebox # Importa el submódulo messagebox de tkinter, utilizado para mostrar cuadros de diálogo de mensajes (información, advertencia, error).
-import json # Importa el módulo json, que permite trabajar con datos en formato JSON (serializar y deserializar).
-import os # Importa el módulo os, que proporciona funciones para interactuar con el sistema operativo, como la gestión de rutas de archivos y directorios.
+from tkinter import messagebox, simpledialog # Importa simpledialog para pedir cuántos días mover las tareas seleccionadas, además del submódulo messagebox de tkinter, utilizado para mostrar cuadros de diálogo de mensajes (información, advertencia, error).
 from tkcalendar import DateEntry # Importa la clase DateEntry del módulo tkcalendar, que proporciona un widget de calendario para seleccionar fechas.
 
-TAREAS_FILE = "data/tareas.json" # Define una constante con la ruta al archivo JSON donde se almacenarán las tareas.
-
-def cargar_tareas():
-    """Carga las tareas desde el archivo JSON.""" # Docstring que describe la función.
-    if not os.path.exists(TAREAS_FILE): # Comprueba si el archivo de tareas no existe en la ruta especificada.
-        return {} # Si el archivo no existe, devuelve un diccionario vacío, indicando que no hay tareas.
-    with open(TAREAS_FILE, 'r') as f: # Abre el archivo de tareas en modo lectura ('r').
-        return json.load(f) # Carga (deserializa) el contenido JSON del archivo y lo devuelve como un diccionario de Python.
-
-def guardar_tareas(tareas):
-    """Guarda las tareas en el archivo JSON.""" # Docstring que describe la función.
-    os.makedirs(os.path.dirname(TAREAS_FILE), exist_ok=True) # Crea el directorio 'data' si no existe; 'exist_ok=True' evita un error si ya existe.
-    with open(TAREAS_FILE, 'w') as f: # Abre el archivo de tareas en modo escritura ('w'). Si no existe, lo crea; si existe, sobrescribe su contenido.
-        json.dump(tareas, f, indent=4) # Guarda (serializa) el diccionario de tareas en el archivo JSON, con una indentación de 4 espacios para legibilidad.
-
-# --- Funciones auxiliares para el estilo (copiadas de notas.py/tareas.py para consistencia) ---
-def _centrar_ventana(win, width, height):
-    """Centra una ventana Toplevel en la pantalla.""" # Docstring que describe la función.
-    win.update_idletasks() # Fuerza a Tkinter a procesar todos los eventos pendientes y actualizar la geometría de la ventana, asegurando que win.winfo_width() y win.winfo_height() devuelvan valores correctos.
-    
-    # Obtener las dimensiones de la pantalla
-    screen_width = win.winfo_screenwidth() # Obtiene el ancho de la pantalla del usuario en píxeles.
-    screen_height = win.winfo_screenheight() # Obtiene la altura de la pantalla del usuario en píxeles.
-
-    # Calcular la posición para centrar
-    x = (screen_width // 2) - (width // 2) # Calcula la coordenada X para que la ventana quede centrada horizontalmente.
-    y = (screen_height // 2) - (height // 2) # Calcula la coordenada Y para que la ventana quede centrada verticalmente.
-
-    win.geometry(f'{width}x{height}+{x}+{y}') # Establece el tamaño y la posición de la ventana usando el formato "Ancho x Alto + X + Y".
-    win.resizable(False, False) # Deshabilita la capacidad de la ventana para ser redimensionada por el usuario.
-
-def _crear_boton_estilizado(parent_frame, texto, comando, bg_color, fg_color, icon_char=None):
-    """
-    Crea un botón con un estilo plano y moderno, y un posible ícono de texto.
-    Simula un efecto de borde redondeado con el diseño.
-    """ # Docstring que describe la función.
-    button_frame = tk.Frame(parent_frame, bg=bg_color, relief="flat", bd=0) # Crea un Frame que actuará como contenedor del botón, con un color de fondo y sin relieve ni borde.
-    button_frame.pack(pady=5, padx=5) # Empaqueta el Frame del botón, añadiendo un padding vertical y horizontal alrededor.
-
-    # Usamos un Label dentro del Frame para el texto y el ícono
-    label_text = f"{icon_char} {texto}" if icon_char else texto # Construye el texto del Label: si hay un ícono, lo añade antes del texto; si no, solo usa el texto.
-    button_label = tk.Label( # Crea un widget Label que mostrará el texto y el ícono del botón.
-        button_frame, # El Label se coloca dentro del button_frame.
-        text=label_text, # El texto a mostrar en el Label.
-        font=("Helvetica", 12, "bold"), # Define la fuente del texto (familia, tamaño, estilo).
-        bg=bg_color, # Establece el color de fondo del Label igual al del Frame padre.
-        fg=fg_color, # Establece el color del texto.
-        padx=15, # Añade padding horizontal dentro del Label.
-        pady=8 # Añade padding vertical dentro del Label.
-    )
-    button_label.pack(expand=True, fill="both") # Empaqueta el Label para que se expanda y rellene todo el espacio disponible dentro de button_frame.
-
-    # Efecto hover
-    def _on_enter(event): # Define una función interna que se ejecuta cuando el cursor entra en el área del botón.
-        button_frame.config(bg=_darken_color(bg_color, 20)) # Oscurece el color de fondo del Frame del botón.
-        button_label.config(bg=_darken_color(bg_color, 20)) # Oscurece el color de fondo del Label del botón.
-        button_frame.config(cursor="hand2") # Cambia el cursor a una mano, indicando que es un elemento interactivo.
-
-    def _on_leave(event): # Define una función interna que se ejecuta cuando el cursor sale del área del botón.
-        button_frame.config(bg=bg_color) # Restaura el color de fondo original del Frame del botón.
-        button_label.config(bg=bg_color) # Restaura el color de fondo original del Label del botón.
-        button_frame.config(cursor="") # Restaura el cursor por defecto.
-
-    button_frame.bind("<Enter>", _on_enter) # Vincula el evento de entrada del cursor al Frame del botón con la función _on_enter.
-    button_frame.bind("<Leave>", _on_leave) # Vincula el evento de salida del cursor del Frame del botón con la función _on_leave.
-    button_label.bind("<Enter>", _on_enter) # Vincula el evento de entrada del cursor al Label del botón con la función _on_enter.
-    button_label.bind("<Leave>", _on_leave) # Vincula el evento de salida del cursor del Label del botón con la función _on_leave.
-
-    # Vincula el comando al clic en el label y el frame
-    button_frame.bind("<Button-1>", lambda e: comando()) # Vincula el clic izquierdo del ratón en el Frame del botón con la ejecución del comando.
-    button_label.bind("<Button-1>", lambda e: comando()) # Vincula el clic izquierdo del ratón en el Label del botón con la ejecución del comando.
-
-    return button_frame # Devuelve el Frame que contiene el botón estilizado.
-
-def _darken_color(hex_color, amount):
-    """Oscurece un color hexadecimal por un porcentaje dado.""" # Docstring que describe la función.
-    hex_color = hex_color.lstrip('#') # Elimina el carácter '#' del inicio del string hexadecimal si está presente.
-    rgb = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4)) # Convierte el color hexadecimal a una tupla de valores RGB (rojo, verde, azul).
-    darkened_rgb = tuple(max(0, c - amount) for c in rgb) # Resta la cantidad especificada a cada componente RGB, asegurándose de que el valor no sea menor que 0.
-    return f'#{darkened_rgb[0]:02x}{darkened_rgb[1]:02x}{darkened_rgb[2]:02x}' # Convierte los valores RGB oscurecidos de nuevo a formato hexadecimal y los devuelve.
-# --- Fin de funciones auxiliares ---
+from almacenamiento import almacen_tareas, vaciar_al_cerrar, separar_etiquetas, cambios_completada, completar_tareas, PRIORIDADES, PRIORIDAD_POR_DEFECTO # Importa las etiquetas, prioridades y el estado de las tareas y la colección de tareas de la capa de almacenamiento, que guarda los cambios y publica los eventos.
+from eventos import EVENTOS_TAREAS, TAREA_ELIMINADA, suscribir_widget # Importa los tipos de evento de tareas y el ayudante para suscribir ventanas al bus de cambios.
+from indices import indice_titulos, indice_estado, filtrar as filtrar_indices # Importa el índice de títulos, el de estado y el filtro por etiquetas, prioridad y estado, que responden sin recorrer todas las tareas.
+from estilos import tema, crear_ventana_modal, crear_boton_estilizado, crear_campo, crear_area_texto, crear_etiqueta, crear_lista, crear_selector, crear_casilla, crear_filtro, crear_barra_acciones, sincronizar_lista, AZUL, VERDE, ROJO # Importa el kit de interfaz compartido.
+
+
+def crear_campo_fecha(parent, texto, fecha=None):
+    """Crea una etiqueta y un DateEntry empaquetados; devuelve el DateEntry.""" # Docstring que describe la función.
+    crear_etiqueta(parent, texto) # Etiqueta del campo de fecha.
+    fecha_entry = DateEntry(parent, width=12, background='darkblue', foreground='white', borderwidth=2, date_pattern='yyyy-mm-dd', # Widget DateEntry para seleccionar la fecha.
+                            font=tema.fuente("campo")) # Usa la fuente compartida del tema.
+    if fecha: # Si se indicó una fecha inicial.
+        fecha_entry.set_date(fecha) # La establece en el widget.
+    fecha_entry.pack(padx=5, pady=(0, 15)) # Empaqueta el campo de fecha con padding.
+    return fecha_entry # Devuelve el DateEntry.
+
+
+def crear_campos_clasificacion(parent, tarea=None):
+    """Crea los campos de etiquetas y prioridad de una tarea; devuelve (Entry de etiquetas, StringVar de prioridad).""" # Docstring que describe la función.
+    tarea = tarea or {} # Tarea nueva: campos vacíos.
+    etiquetas_entry = crear_campo(parent, "Etiquetas (separadas por comas):", ", ".join(tarea.get("etiquetas", []))) # Etiquetas actuales.
+    prioridad_var = crear_selector(parent, "Prioridad:", PRIORIDADES, tarea.get("prioridad") or PRIORIDAD_POR_DEFECTO) # Prioridad actual.
+    return etiquetas_entry, prioridad_var # Devuelve los dos campos.
+
+
+def texto_tarea(tarea):
+    """Devuelve el texto de la fila de una tarea: estado, prioridad alta destacada, título, fecha y etiquetas.""" # Docstring que describe la función.
+    marca = "✔ " if tarea.get("completada") else "❗ " if tarea.get("prioridad") == "alta" else "" # Marca las completadas y destaca las de prioridad alta.
+    etiquetas = "".join(f"  #{e}" for e in tarea.get("etiquetas", [])) # Etiquetas al final de la fila.
+    return f"{marca}{tarea['titulo']} - {tarea['fecha']}{etiquetas}" # Texto de la fila.
+
+
+def interpretar_filtro(texto):
+    """Separa un filtro como "examen #matemáticas !alta" en (texto del título, [etiquetas], prioridad o None).""" # Docstring que describe la función.
+    palabras, etiquetas, prioridad = [], [], None # Partes del filtro.
+    for palabra in texto.split(): # Recorre las palabras.
+        if palabra.startswith("#") and len(palabra) > 1: # Etiqueta.
+            etiquetas.append(palabra[1:]) # Sin la almohadilla.
+        elif palabra.startswith("!") and palabra[1:].lower() in PRIORIDADES: # Prioridad.
+            prioridad = palabra[1:].lower() # Sin la exclamación.
+        else: # Parte del título.
+            palabras.append(palabra) # Se busca en el índice de títulos.
+    return " ".join(palabras), etiquetas, prioridad # Devuelve las partes.
 
 
 def agregar_tarea(usuario):
     """Crea una nueva ventana para añadir una tarea.""" # Docstring que describe la función.
-    win = tk.Toplevel() # Crea una nueva ventana de nivel superior (Toplevel), que es una ventana independiente.
-    win.title("Nueva Tarea") # Establece el título de la ventana.
-    win.configure(bg="#F8F8F8") # Configura el color de fondo de la ventana a un gris muy claro.
-    win.transient(win.master) # Hace que la ventana sea transitoria con respecto a su ventana maestra (el menú principal), lo que significa que se minimizará y cerrará con ella.
-    win.grab_set() # Captura todos los eventos de entrada del usuario para esta ventana, haciéndola modal (el usuario no puede interactuar con otras ventanas de la aplicación hasta que esta se cierre).
-
-    # Dimensiones para centrar
-    window_width = 450 # Define el ancho deseado para la ventana.
-    window_height = 500 # Define la altura deseada para la ventana (un poco más alta para la fecha).
-    _centrar_ventana(win, window_width, window_height) # Llama a la función auxiliar para centrar la ventana en la pantalla.
-
-    # Encabezado destacado
-    header_frame = tk.Frame(win, bg="#E0E0E0", padx=15, pady=10) # Crea un Frame para el encabezado, con un fondo gris claro y padding.
-    header_frame.pack(fill="x", pady=(0, 15)) # Empaqueta el Frame del encabezado para que se expanda horizontalmente y añada padding inferior.
-    tk.Label(header_frame, text="➕ Agregar Tarea", font=("Helvetica", 16, "bold"), fg="#333333", bg="#E0E0E0").pack(anchor="w") # Crea una etiqueta para el título del encabezado con un ícono y estilo.
-
-    # Frame principal para el contenido (campos y botón)
-    content_frame = tk.Frame(win, bg="#F8F8F8", padx=20, pady=10) # Crea un Frame para el contenido principal (campos de entrada y botones), con un fondo claro y padding.
-    content_frame.pack(expand=True, fill="both") # Empaqueta el Frame del contenido para que se expanda y rellene todo el espacio disponible.
-
-    # Título de la tarea
-    tk.Label(content_frame, text="Título:", font=("Helvetica", 12, "bold"), bg="#F8F8F8", fg="#555555").pack(anchor="w", pady=(5, 2)) # Crea una etiqueta para el campo de título, alineada a la izquierda.
-    titulo_entry = tk.Entry(content_frame, font=("Helvetica", 12), bd=1, relief="solid", # Crea un campo de entrada (Entry) para el título de la tarea.
-                            highlightbackground="#CCCCCC", highlightthickness=1, width=40) # Añade un borde sutil y un ancho fijo para visibilidad.
-    titulo_entry.pack(fill="x", padx=5, pady=(0, 10)) # Empaqueta el campo de título, permitiendo que se expanda horizontalmente y con padding.
-
-    # Contenido de la tarea
-    tk.Label(content_frame, text="Contenido:", font=("Helvetica", 12, "bold"), bg="#F8F8F8", fg="#555555").pack(anchor="w", pady=(5, 2)) # Crea una etiqueta para el campo de contenido.
-    contenido_text = tk.Text(content_frame, height=10, width=40, bd=1, relief="solid", # Crea un campo de texto multi-línea (Text) para el contenido.
-                             highlightbackground="#CCCCCC", highlightthickness=1) # Añade un borde sutil y dimensiones iniciales.
-    contenido_text.pack(fill="both", expand=True, padx=5, pady=(0, 15)) # Empaqueta el campo de contenido, permitiendo que se expanda y rellene.
-
-    # Fecha de entrega
-    tk.Label(content_frame, text="Fecha de entrega:", font=("Helvetica", 12, "bold"), bg="#F8F8F8", fg="#555555").pack(anchor="w", pady=(5, 2)) # Crea una etiqueta para la fecha de entrega.
-    fecha_entry = DateEntry(content_frame, width=12, background='darkblue', foreground='white', borderwidth=2, date_pattern='yyyy-mm-dd', # Crea un widget DateEntry para seleccionar la fecha.
-                            font=("Helvetica", 12)) # Establece la fuente para el widget de fecha.
-    fecha_entry.pack(padx=5, pady=(0, 15)) # Empaqueta el campo de fecha con padding.
+    win, content_frame = crear_ventana_modal("Nueva Tarea", "➕ Agregar Tarea", 450, 640) # Crea la ventana modal centrada con su encabezado (más alta para la fecha, las etiquetas y la prioridad).
+
+    titulo_entry = crear_campo(content_frame, "Título:") # Campo para el título de la tarea.
+    contenido_text = crear_area_texto(content_frame, "Contenido:") # Área de texto para el contenido de la tarea.
+    fecha_entry = crear_campo_fecha(content_frame, "Fecha de entrega:") # Selector de la fecha de entrega.
+    etiquetas_entry, prioridad_var = crear_campos_clasificacion(content_frame) # Etiquetas y prioridad.
 
     def guardar():
         """Guarda la nueva tarea.""" # Docstring que describe la función interna.
@@ -137,52 +67,81 @@ def agregar_tarea(usuario):
             messagebox.showwarning("Advertencia", "El título no puede estar vacío") # Muestra una advertencia.
             return # Sale de la función si el título está vacío.
 
-        tareas = cargar_tareas() # Carga las tareas existentes.
-        if usuario not in tareas: # Comprueba si el usuario actual no tiene tareas registradas.
-            tareas[usuario] = [] # Si no tiene, inicializa una lista vacía para sus tareas.
-        tareas[usuario].append({"titulo": titulo, "contenido": contenido, "fecha": fecha}) # Añade la nueva tarea (como un diccionario) a la lista de tareas del usuario.
-        guardar_tareas(tareas) # Guarda la lista actualizada de tareas en el archivo.
+        almacen_tareas.agregar(usuario, {"titulo": titulo, "contenido": contenido, "fecha": fecha, # Datos de la tarea.
+                                         "etiquetas": separar_etiquetas(etiquetas_entry.get()), "prioridad": prioridad_var.get()}) # Añade la nueva tarea al usuario; el almacén la guarda y avisa a las ventanas abiertas.
         messagebox.showinfo("Éxito", "Tarea guardada con éxito") # Muestra un mensaje de éxito.
         win.destroy() # Cierra la ventana actual de "Nueva Tarea".
         win.grab_release() # Libera el "grab" de la ventana, permitiendo la interacción con otras ventanas.
 
-    # Botón "Guardar tarea" estilizado
-    _crear_boton_estilizado(content_frame, "Guardar tarea", guardar, "#4CAF50", "white", icon_char="💾") # Crea el botón "Guardar tarea" con estilo y su comando asociado.
-    
-    # Protocolo para liberar el grab si la ventana se cierra con la "X"
-    win.protocol("WM_DELETE_WINDOW", lambda: [win.grab_release(), win.destroy()]) # Configura un protocolo para que al cerrar la ventana con la "X", se libere el grab y se destruya la ventana.
+    crear_boton_estilizado(content_frame, "Guardar tarea", guardar, VERDE, "white", icon_char="💾") # Crea el botón "Guardar tarea" con estilo y su comando asociado.
 
 
 def ver_tareas(usuario):
     """Muestra una lista de tareas del usuario y permite ver/editar/eliminar.""" # Docstring que describe la función.
-    tareas = cargar_tareas().get(usuario, []) # Carga las tareas del usuario actual; si no hay, devuelve una lista vacía.
-
-    win = tk.Toplevel() # Crea una nueva ventana de nivel superior.
-    win.title("Mis Tareas") # Establece el título de la ventana.
-    win.configure(bg="#F8F8F8") # Configura el color de fondo.
-    win.transient(win.master) # Hace la ventana transitoria.
-    win.grab_set() # Hace la ventana modal.
-
-    window_width = 550 # Define el ancho de la ventana.
-    window_height = 550 # Define la altura de la ventana (un poco más alta para la lista y botones).
-    _centrar_ventana(win, window_width, window_height) # Centra la ventana.
-
-    # Encabezado destacado
-    header_frame = tk.Frame(win, bg="#E0E0E0", padx=15, pady=10) # Crea un Frame para el encabezado.
-    header_frame.pack(fill="x", pady=(0, 15)) # Empaqueta el encabezado.
-    tk.Label(header_frame, text="✅ Mis Tareas", font=("Helvetica", 16, "bold"), fg="#333333", bg="#E0E0E0").pack(anchor="w") # Crea la etiqueta del título del encabezado.
-
-    content_frame = tk.Frame(win, bg="#F8F8F8", padx=20, pady=10) # Crea un Frame para el contenido principal.
-    content_frame.pack(expand=True, fill="both") # Empaqueta el contenido.
-
-    # Lista de tareas
-    tk.Label(content_frame, text="Selecciona una tarea:", font=("Helvetica", 12, "bold"), bg="#F8F8F8", fg="#555555").pack(anchor="w", pady=(5, 2)) # Crea una etiqueta para la lista.
-    lista = tk.Listbox(content_frame, width=60, height=15, font=("Helvetica", 11), bd=1, relief="solid", # Crea un widget Listbox para mostrar las tareas.
-                       highlightbackground="#CCCCCC", highlightthickness=1, selectbackground="#B0E0E6", selectforeground="black") # Estilo para la Listbox.
-    lista.pack(fill="both", expand=True, padx=5, pady=(0, 10)) # Empaqueta la Listbox.
-
-    for tarea in tareas: # Itera sobre cada tarea del usuario.
-        lista.insert(tk.END, f"{tarea['titulo']} - {tarea['fecha']}") # Inserta el título y la fecha de la tarea en la Listbox.
+    tareas = list(almacen_tareas.del_usuario(usuario)) # Copia las tareas del usuario actual (desde la caché en memoria); esta lista refleja las filas de la Listbox.
+    indice = indice_titulos(almacen_tareas, usuario) # Índice ordenado de títulos para filtrar sin recorrer todas las tareas.
+    estado = indice_estado(almacen_tareas, usuario) # Índice de completadas para descartarlas de una en una.
+
+    win, content_frame = crear_ventana_modal("Mis Tareas", "✅ Mis Tareas", 620, 700) # Crea la ventana modal centrada con su encabezado (más alta para el filtro y las acciones).
+
+    fila = texto_tarea # Texto de cada fila.
+
+    def hay_filtro():
+        """Indica si hay texto de filtro (las completadas ocultas no cuentan: se descartan evento a evento).""" # Docstring que describe la función interna.
+        return bool(filtro_entry.get().strip()) # Título, etiquetas o prioridad.
+
+    def filtrar(texto=None):
+        """
+        Muestra solo las tareas que cumplen el filtro: palabras del título, #etiquetas, !prioridad y, salvo que
+        se marque la casilla, solo las abiertas. Etiquetas, prioridad y estado se resuelven con los mapas de bits;
+        el título, con el índice de títulos.
+        """ # Docstring que describe la función interna.
+        titulo, etiquetas, prioridad = interpretar_filtro(filtro_entry.get() if texto is None else texto) # Partes del filtro.
+        incluir = mostrar_completadas.get() # Si se muestran las completadas.
+        if titulo or etiquetas or prioridad or not incluir: # Si hay algún filtro.
+            por_fecha = None # Ids que cumplen etiquetas, prioridad y estado, por fecha (None si no se filtra por ellos).
+            if etiquetas or prioridad or not (incluir or titulo): # Filtro por clasificación, o solo por estado sin título.
+                por_fecha = filtrar_indices(almacen_tareas, usuario, etiquetas, prioridad, incluir_completadas=incluir) # Intersección de mapas de bits.
+            if titulo: # Filtro por título: en orden alfabético.
+                seleccion = None if por_fecha is None else set(por_fecha) # Conjunto para comprobar la pertenencia.
+                ids = [i for i in indice.buscar(titulo) if (seleccion is None or i in seleccion) # Coincidencias del título que cumplen el resto...
+                       and (incluir or not estado.esta_completada(i))] # ...y, si se ocultan, abiertas (sin construir el conjunto de todas las abiertas).
+            else: # Sin título: por fecha.
+                ids = por_fecha # Ya ordenadas por fecha.
+            tareas[:] = [almacen_tareas.obtener(usuario, i) for i in ids] # Solo las coincidencias, buscadas por id.
+        else: # Sin filtro.
+            tareas[:] = almacen_tareas.del_usuario(usuario) # Vuelve a mostrar todas las tareas.
+        lista.delete(0, tk.END) # Vacía la Listbox.
+        lista.insert(tk.END, *[fila(t) for t in tareas]) # Inserta todas las filas en una sola llamada a Tk.
+
+    filtro_entry = crear_filtro(content_frame, "Filtrar (título, #etiqueta, !alta/!media/!baja):", filtrar) # Campo de filtro con espera entre pulsaciones.
+    mostrar_completadas = crear_casilla(content_frame, "Mostrar también las completadas", False, lambda: filtrar()) # Las completadas se ocultan por defecto.
+    lista = crear_lista(content_frame, "Selecciona una o varias tareas (Ctrl/Mayús + clic):", selectmode=tk.EXTENDED, exportselection=False) # Lista de tareas con selección múltiple (que no se pierde al escribir en el filtro).
+    filtrar() # Muestra las tareas abiertas (las completadas se descartan con el índice, sin recorrerlas).
+
+    pendientes = [] # Eventos recibidos y aún no aplicados a la lista.
+
+    def on_cambio_tarea(evento):
+        """Acumula los cambios de tareas del usuario para aplicarlos juntos cuando Tk quede libre.""" # Docstring que describe la función interna.
+        pendientes.append(evento) # Guarda el evento.
+        if len(pendientes) == 1: # Si es el primero del lote.
+            win.after_idle(aplicar_cambios) # Programa una única actualización para todo el lote.
+
+    def aplicar_cambios():
+        """Actualiza solo las filas afectadas por el lote de cambios.""" # Docstring que describe la función interna.
+        eventos = pendientes[:] # Toma el lote.
+        pendientes.clear() # Vacía la cola para el próximo lote.
+        if not lista.winfo_exists(): # Si la ventana se cerró mientras tanto.
+            return # No hay nada que actualizar.
+        if hay_filtro(): # Con texto de filtro, las tareas pueden entrar o salir del resultado (p. ej. al cambiar sus etiquetas).
+            filtrar() # Repite la búsqueda (los índices ya están actualizados); cuesta lo que las coincidencias.
+            return # La lista ya está al día.
+        if not mostrar_completadas.get(): # Completadas ocultas: una tarea completada sale de la lista como si se eliminara.
+            eventos = [e._replace(tipo=TAREA_ELIMINADA) if e.tipo != TAREA_ELIMINADA and estado.esta_completada(e.id) else e for e in eventos] # Consulta el índice por evento.
+        sincronizar_lista(lista, tareas, eventos, fila, TAREA_ELIMINADA) # Actualiza, borra y añade solo las filas afectadas (una reabierta vuelve al final).
+
+    suscribir_widget(win, on_cambio_tarea, tipos=EVENTOS_TAREAS, usuario=usuario) # Escucha los cambios de tareas del usuario mientras la ventana esté abierta.
+    vaciar_al_cerrar(win) # Al cerrar la ventana se escriben de una vez los cambios hechos desde ella.
 
     def ver_tarea():
         """Abre una nueva ventana para ver/editar una tarea seleccionada.""" # Docstring que describe la función interna.
@@ -190,75 +149,160 @@ def ver_tareas(usuario):
         if not index: # Comprueba si no se ha seleccionado ninguna tarea.
             messagebox.showwarning("Advertencia", "Por favor, selecciona una tarea para ver.") # Muestra una advertencia.
             return # Sale de la función.
-        i = index[0] # Obtiene el primer índice seleccionado.
-        tarea = tareas[i] # Obtiene el diccionario de la tarea seleccionada de la lista de tareas.
-
-        ver_win = tk.Toplevel() # Crea una nueva ventana para ver/editar la tarea.
-        ver_win.title("Ver / Editar Tarea") # Establece el título.
-        ver_win.configure(bg="#F8F8F8") # Configura el color de fondo.
-        ver_win.transient(ver_win.master) # Hace la ventana transitoria.
-        ver_win.grab_set() # Hace la ventana modal.
-
-        ver_window_width = 450 # Define el ancho.
-        ver_window_height = 550 # Define la altura.
-        _centrar_ventana(ver_win, ver_window_width, ver_window_height) # Centra la ventana.
-
-        # Encabezado destacado
-        ver_header_frame = tk.Frame(ver_win, bg="#E0E0E0", padx=15, pady=10) # Crea un Frame para el encabezado.
-        ver_header_frame.pack(fill="x", pady=(0, 15)) # Empaqueta el encabezado.
-        tk.Label(ver_header_frame, text="✏️ Editar Tarea", font=("Helvetica", 16, "bold"), fg="#333333", bg="#E0E0E0").pack(anchor="w") # Crea la etiqueta del título del encabezado.
-
-        ver_content_frame = tk.Frame(ver_win, bg="#F8F8F8", padx=20, pady=10) # Crea un Frame para el contenido.
-        ver_content_frame.pack(expand=True, fill="both") # Empaqueta el contenido.
-
-        tk.Label(ver_content_frame, text="Título:", font=("Helvetica", 12, "bold"), bg="#F8F8F8", fg="#555555").pack(anchor="w", pady=(5, 2)) # Etiqueta para el título.
-        titulo_entry = tk.Entry(ver_content_frame, font=("Helvetica", 12), bd=1, relief="solid", # Campo de entrada para el título.
-                                highlightbackground="#CCCCCC", highlightthickness=1, width=40)
-        titulo_entry.insert(0, tarea["titulo"]) # Inserta el título actual de la tarea en el campo.
-        titulo_entry.pack(fill="x", padx=5, pady=(0, 10)) # Empaqueta el campo de título.
-
-        tk.Label(ver_content_frame, text="Contenido:", font=("Helvetica", 12, "bold"), bg="#F8F8F8", fg="#555555").pack(anchor="w", pady=(5, 2)) # Etiqueta para el contenido.
-        contenido_text = tk.Text(ver_content_frame, height=10, width=40, bd=1, relief="solid", # Campo de texto para el contenido.
-                                 highlightbackground="#CCCCCC", highlightthickness=1)
-        contenido_text.insert("1.0", tarea["contenido"]) # Inserta el contenido actual de la tarea en el campo.
-        contenido_text.pack(fill="both", expand=True, padx=5, pady=(0, 15)) # Empaqueta el campo de contenido.
-
-        tk.Label(ver_content_frame, text="Fecha de entrega:", font=("Helvetica", 12, "bold"), bg="#F8F8F8", fg="#555555").pack(anchor="w", pady=(5, 2)) # Etiqueta para la fecha de entrega.
-        fecha_entry = DateEntry(ver_content_frame, width=12, background='darkblue', foreground='white', borderwidth=2, date_pattern='yyyy-mm-dd', # Widget DateEntry para la fecha.
-                                font=("Helvetica", 12))
-        fecha_entry.set_date(tarea["fecha"]) # Establece la fecha actual de la tarea en el widget.
-        fecha_entry.pack(padx=5, pady=(0, 15)) # Empaqueta el campo de fecha.
-
-        def guardar_cambios():
-            """Guarda los cambios en una tarea existente.""" # Docstring que describe la función interna.
-            tarea["titulo"] = titulo_entry.get().strip() # Actualiza el título de la tarea con el valor del campo.
-            tarea["contenido"] = contenido_text.get("1.0", tk.END).strip() # Actualiza el contenido de la tarea.
-            tarea["fecha"] = fecha_entry.get() # Actualiza la fecha de la tarea.
-            todas = cargar_tareas() # Carga todas las tareas de todos los usuarios.
-            todas[usuario] = tareas # Actualiza la lista de tareas del usuario actual con los cambios.
-            guardar_tareas(todas) # Guarda todas las tareas de nuevo en el archivo.
-            messagebox.showinfo("Éxito", "Tarea actualizada") # Muestra un mensaje de éxito.
-            ver_win.destroy() # Cierra la ventana de ver/editar tarea.
-
-        def eliminar_tarea():
-            """Elimina la tarea seleccionada.""" # Docstring que describe la función interna.
-            if messagebox.askyesno("Confirmar", "¿Eliminar esta tarea?"): # Pide confirmación al usuario antes de eliminar.
-                tareas.pop(i) # Elimina la tarea de la lista de tareas del usuario.
-                todas = cargar_tareas() # Carga todas las tareas de todos los usuarios.
-                todas[usuario] = tareas # Actualiza la lista de tareas del usuario actual.
-                guardar_tareas(todas) # Guarda todas las tareas de nuevo en el archivo.
-                messagebox.showinfo("Éxito", "Tarea eliminada") # Muestra un mensaje de éxito.
-                ver_win.destroy() # Cierra la ventana de ver/editar tarea.
-                win.destroy() # Cierra la ventana de la lista de tareas (para forzar una actualización).
-                ver_tareas(usuario) # Vuelve a abrir la ventana de la lista de tareas para mostrar los cambios.
-
-        # Botones de guardar cambios y eliminar tarea estilizados
-        _crear_boton_estilizado(ver_content_frame, "Guardar cambios", guardar_cambios, "#3498DB", "white", icon_char="💾") # Botón "Guardar cambios" con estilo.
-        _crear_boton_estilizado(ver_content_frame, "Eliminar tarea", eliminar_tarea, "#E74C3C", "white", icon_char="🗑️") # Botón "Eliminar tarea" con estilo.
-
-        ver_win.protocol("WM_DELETE_WINDOW", lambda: [ver_win.grab_release(), ver_win.destroy()]) # Configura el protocolo de cierre para liberar el grab.
-
+        i = index[0] # Obtiene el primer índice seleccionado (con varias seleccionadas, se abre la primera).
+        editar_tarea(usuario, tareas[i], win) # Muestra la tarea en el editor reutilizable de esta ventana.
+
+    def seleccionadas():
+        """Devuelve las tareas seleccionadas, avisando si no hay ninguna.""" # Docstring que describe la función interna.
+        elegidas = [tareas[i] for i in lista.curselection()] # Tareas de las filas seleccionadas.
+        if not elegidas: # Si no hay selección.
+            messagebox.showwarning("Advertencia", "Por favor, selecciona al menos una tarea.", parent=win) # Muestra una advertencia.
+        return elegidas # Devuelve las tareas.
+
+    def eliminar_seleccionadas():
+        """Elimina todas las tareas seleccionadas con una sola escritura.""" # Docstring que describe la función interna.
+        elegidas = seleccionadas() # Tareas seleccionadas.
+        if elegidas and messagebox.askyesno("Confirmar", f"¿Eliminar {len(elegidas)} tarea(s)?", parent=win): # Pide confirmación.
+            almacen_tareas.eliminar_varios(usuario, [t["id"] for t in elegidas]) # Una transacción: una escritura y un lote de eventos.
+
+    def mover_fechas():
+        """Mueve la fecha de entrega de las tareas seleccionadas un número de días.""" # Docstring que describe la función interna.
+        elegidas = seleccionadas() # Tareas seleccionadas.
+        if not elegidas: # Si no hay selección.
+            return # Sale de la función.
+        dias = simpledialog.askinteger("Mover fecha", "Días a mover (negativo para adelantar):", parent=win) # Pide el número de días.
+        if not dias: # Si se canceló o se indicó 0.
+            return # No hay nada que mover.
+        with almacen_tareas.transaccion(): # Todas las modificaciones en una sola escritura.
+            for tarea in elegidas: # Recorre las tareas seleccionadas.
+                try: # Las tareas antiguas pueden tener una fecha vacía o con otro formato.
+                    fecha = datetime.date.fromisoformat(tarea["fecha"]) + datetime.timedelta(days=dias) # Nueva fecha.
+                except ValueError: # Fecha no interpretable.
+                    continue # Se deja como está.
+                almacen_tareas.actualizar(usuario, tarea["id"], fecha=fecha.isoformat()) # Cambia la fecha (se escribe al cerrar la transacción).
+
+    def completar_seleccionadas():
+        """Marca como completadas las tareas seleccionadas; si ya lo estaban todas, las reabre.""" # Docstring que describe la función interna.
+        elegidas = seleccionadas() # Tareas seleccionadas.
+        if elegidas: # Si hay selección.
+            completar_tareas(usuario, [t["id"] for t in elegidas], not all(t.get("completada") for t in elegidas)) # Una sola escritura.
+
+    def duplicar_seleccionadas():
+        """Crea una copia de cada tarea seleccionada.""" # Docstring que describe la función interna.
+        elegidas = seleccionadas() # Tareas seleccionadas.
+        with almacen_tareas.transaccion(): # Todas las altas en una sola escritura.
+            for tarea in elegidas: # Recorre las tareas seleccionadas.
+                copia = {k: v for k, v in tarea.items() if k not in ("id", "completada", "completada_en")} # Copia todos los campos salvo el id y el estado (la copia empieza abierta).
+                copia["titulo"] = f"{tarea['titulo']} (copia)" # Marca la copia en el título.
+                almacen_tareas.agregar(usuario, copia) # Añade la copia (recibe un id nuevo).
+
+    crear_barra_acciones(content_frame, [ # Barra de acciones sobre la selección.
+        ("Eliminar", eliminar_seleccionadas, ROJO, "🗑️"), # Elimina las seleccionadas.
+        ("Mover fecha", mover_fechas, AZUL, "📅"), # Mueve sus fechas.
+        ("Completar", completar_seleccionadas, VERDE, "✔"), # Las completa (o las reabre).
+        ("Duplicar", duplicar_seleccionadas, AZUL, "📄"), # Las duplica.
+    ])
     # Botón "Ver tarea seleccionada" estilizado
-    _crear_boton_estilizado(content_frame, "Ver tarea seleccionada", ver_tarea, "#3498DB", "white", icon_char="👁️") # Botón "Ver tarea seleccionada" con estilo.
+    crear_boton_estilizado(content_frame, "Ver tarea seleccionada", ver_tarea, AZUL, "white", icon_char="👁️") # Botón "Ver tarea seleccionada" con estilo.
 
-    win.protocol("WM_DELETE_WINDOW", lambda: [win.grab_release(), win.destroy()]) # Configura el protocolo de cierre para la ventana principal de tareas.
+
+class EditorTarea: # Ventana de ver/editar/eliminar tareas que se construye una vez y se rellena con cada tarea seleccionada.
+    """
+    Construir el editor (Entry, Text, un DateEntry con su calendario oculto, selectores y botones) cuesta mucho
+    más que cambiar sus valores. Al cerrarlo se oculta en lugar de destruirse y el siguiente clic solo lo rellena
+    con la nueva tarea: abrirlo tarda milisegundos y los clics repetidos no apilan ventanas.
+    """ # Docstring que describe la clase.
+    def __init__(self, master=None):
+        """Construye el editor oculto, transitorio respecto a la ventana master.""" # Docstring que describe el método.
+        self.master = master # Ventana desde la que se abre (None: la ventana principal).
+        self.usuario = None # Usuario de la tarea mostrada.
+        self.tarea = None # Tarea mostrada (None mientras está oculto).
+        self.win, contenido = crear_ventana_modal("Ver / Editar Tarea", "✏️ Editar Tarea", 450, 730, master=master) # Ventana modal de edición (con etiquetas, prioridad y estado).
+        self.win.withdraw() # Se oculta antes de dibujarse: se muestra al elegir una tarea.
+        self.win.grab_release() # Oculto no debe bloquear las demás ventanas.
+        self.titulo_entry = crear_campo(contenido, "Título:") # Campo del título.
+        self.contenido_text = crear_area_texto(contenido, "Contenido:") # Área de texto del contenido.
+        self.fecha_entry = crear_campo_fecha(contenido, "Fecha de entrega:") # Selector de fecha (su calendario desplegable se crea una sola vez).
+        self.etiquetas_entry, self.prioridad_var = crear_campos_clasificacion(contenido) # Etiquetas y prioridad.
+        self.completada_var = crear_casilla(contenido, "Completada") # Estado.
+        crear_boton_estilizado(contenido, "Guardar cambios", self.guardar, AZUL, "white", icon_char="💾") # Botón "Guardar cambios" con estilo.
+        crear_boton_estilizado(contenido, "Eliminar tarea", self.eliminar, ROJO, "white", icon_char="🗑️") # Botón "Eliminar tarea" con estilo.
+        self.win.protocol("WM_DELETE_WINDOW", self.ocultar) # La "X" oculta el editor para reutilizarlo.
+        suscribir_widget(self.win, self._on_tarea_eliminada, tipos=(TAREA_ELIMINADA,)) # Si otra ventana borra la tarea mostrada, el editor se cierra.
+
+    def mostrar(self, usuario, tarea):
+        """Rellena el editor con la tarea y lo muestra (modal).""" # Docstring que describe el método.
+        self.usuario, self.tarea = usuario, tarea # Tarea que se edita.
+        self.titulo_entry.delete(0, tk.END) # Vacía el título anterior.
+        self.titulo_entry.insert(0, tarea["titulo"]) # Título actual.
+        self.contenido_text.delete("1.0", tk.END) # Vacía el contenido anterior.
+        self.contenido_text.insert("1.0", tarea["contenido"]) # Contenido actual.
+        self.fecha_entry.set_date(tarea["fecha"] or datetime.date.today()) # Fecha actual (hoy si no tiene).
+        self.etiquetas_entry.delete(0, tk.END) # Vacía las etiquetas anteriores.
+        self.etiquetas_entry.insert(0, ", ".join(tarea.get("etiquetas", []))) # Etiquetas actuales.
+        self.prioridad_var.set(tarea.get("prioridad") or PRIORIDAD_POR_DEFECTO) # Prioridad actual.
+        self.completada_var.set(bool(tarea.get("completada"))) # Estado actual.
+        self.win.deiconify() # Muestra la ventana.
+        self.win.lift() # Por encima de la ventana que lo abrió.
+        self.win.grab_set() # Modal mientras se edita.
+        self.titulo_entry.focus_set() # Listo para escribir.
+
+    def ocultar(self):
+        """Oculta el editor y devuelve el control a la ventana que lo abrió.""" # Docstring que describe el método.
+        self.tarea = None # Ya no se edita ninguna tarea.
+        self.win.grab_release() # Libera el grab.
+        self.win.withdraw() # Oculta la ventana sin destruirla.
+        if self.master is not None and self.master.winfo_exists(): # La ventana que lo abrió era modal.
+            self.master.grab_set() # Vuelve a serlo.
+
+    def guardar(self):
+        """Guarda los cambios en la tarea mostrada.""" # Docstring que describe el método.
+        actualizada = almacen_tareas.actualizar( # Actualiza la tarea en el almacén; el evento refresca las listas que la muestran.
+            self.usuario, self.tarea["id"], # Identifica la tarea por su id, no por su posición.
+            titulo=self.titulo_entry.get().strip(), # Nuevo título de la tarea.
+            contenido=self.contenido_text.get("1.0", tk.END).strip(), # Nuevo contenido de la tarea.
+            fecha=self.fecha_entry.get(), # Nueva fecha de la tarea.
+            etiquetas=separar_etiquetas(self.etiquetas_entry.get()), # Nuevas etiquetas.
+            prioridad=self.prioridad_var.get(), # Nueva prioridad.
+            **cambios_completada(self.tarea, self.completada_var.get()) # Estado y momento de la compleción, si cambió.
+        )
+        if actualizada is not None: # Si la tarea seguía existiendo.
+            messagebox.showinfo("Éxito", "Tarea actualizada", parent=self.win) # Muestra un mensaje de éxito.
+            self.ocultar() # Cierra el editor.
+        else: # La borró otra ventana o proceso.
+            messagebox.showerror("Error", "No se pudo encontrar la tarea original para actualizar.", parent=self.win) # Muestra un mensaje de error.
+
+    def eliminar(self):
+        """Elimina la tarea mostrada.""" # Docstring que describe el método.
+        if messagebox.askyesno("Confirmar", "¿Eliminar esta tarea?", parent=self.win): # Pide confirmación al usuario antes de eliminar.
+            tarea = self.tarea # El evento de baja oculta el editor y olvida la tarea.
+            if almacen_tareas.eliminar(self.usuario, tarea["id"]) is not None: # Elimina la tarea del almacén; el evento quita su fila de las listas.
+                if self.tarea is not None: # Si el evento aún no lo cerró (se entrega al terminar una transacción).
+                    self.ocultar() # Cierra el editor.
+                messagebox.showinfo("Éxito", "Tarea eliminada", parent=self.master) # Muestra un mensaje de éxito.
+            else: # La borró otra ventana o proceso.
+                messagebox.showerror("Error", "No se pudo encontrar la tarea original para eliminar.", parent=self.win) # Muestra un mensaje de error.
+
+    def _on_tarea_eliminada(self, evento):
+        """Oculta el editor si se elimina la tarea que muestra.""" # Docstring que describe el método.
+        if self.tarea is not None and evento.usuario == self.usuario and evento.id == self.tarea["id"]: # Es la tarea mostrada.
+            self.ocultar() # Ya no hay nada que editar.
+
+
+_editores = {} # Diccionario ventana que abre el editor -> EditorTarea ya construido (uno por ventana).
+
+
+def editor_tarea(master=None):
+    """Devuelve el editor de la ventana master, construyéndolo la primera vez; se olvida al destruirse la ventana.""" # Docstring que describe la función.
+    clave = str(master) if master is not None else "." # Ruta Tk de la ventana (la principal si no se indica).
+    editor = _editores.get(clave) # Editor ya construido.
+    if editor is None or not editor.win.winfo_exists(): # Primera vez (o se destruyó con su ventana).
+        editor = _editores[clave] = EditorTarea(master) # Lo construye.
+        if master is not None: # Se libera junto con la ventana que lo usa.
+            master.bind("<Destroy>", lambda e: e.widget is master and _editores.pop(clave, None), add="+") # Sin reemplazar otros bindings.
+    return editor # Devuelve el editor.
+
+
+def editar_tarea(usuario, tarea, master=None):
+    """Muestra la tarea en el editor reutilizable de la ventana master; lo usan la lista de tareas, la agenda y el calendario.""" # Docstring que describe la función.
+    editor_tarea(master).mostrar(usuario, tarea) # Rellena y muestra el editor.
@@ -0,0 +1,47 @@
+import os # Importa el módulo os, que proporciona funciones para interactuar con el sistema operativo, como la gestión de rutas de archivos y directorios.
+import webbrowser # Importa webbrowser para abrir el informe generado con el visor del sistema.
+from concurrent.futures import ThreadPoolExecutor # Importa el grupo de hilos que genera el informe fuera del hilo de Tk.
+from tkinter import messagebox # Importa el submódulo messagebox de tkinter, utilizado para mostrar cuadros de diálogo de mensajes.
+
+from informes import semana, generar_informe, conversor_pdf # Importa el generador de informes, que no depende de tkinter.
+from tareas import crear_campo_fecha # Importa el selector de fechas de las ventanas de tareas.
+from estilos import crear_ventana_modal, crear_boton_estilizado, crear_casilla, crear_etiqueta, esperar_futuro, VERDE # Importa el kit de interfaz compartido.
+
+_grupo = ThreadPoolExecutor(max_workers=1, thread_name_prefix="informes") # Un hilo basta: los informes se piden de uno en uno.
+
+
+def mostrar_informe(usuario):
+    """Muestra la ventana para generar el informe semanal imprimible del usuario y lo abre al terminar.""" # Docstring que describe la función.
+    win, content_frame = crear_ventana_modal("Informe semanal", "🖨️ Informe semanal", 420, 420) # Crea la ventana modal centrada con su encabezado.
+    fecha_entry = crear_campo_fecha(content_frame, "Cualquier día de la semana:") # Semana del informe (la actual por defecto).
+    incluir_notas = crear_casilla(content_frame, "Incluir las notas", True) # Notas al final del informe.
+    hay_conversor = conversor_pdf() is not None # Solo se ofrece el PDF si hay un conversor instalado.
+    pdf = crear_casilla(content_frame, "Generar también el PDF" if hay_conversor else "PDF no disponible (instala wkhtmltopdf o Chromium)", hay_conversor) # Casilla del PDF.
+    estado = crear_etiqueta(content_frame, "", pady=(5, 10)) # Texto de progreso.
+    en_curso = [False] # Si hay un informe generándose (el botón estilizado no se puede deshabilitar).
+
+    def generar():
+        """Genera el informe en segundo plano; la ventana sigue respondiendo mientras se escribe.""" # Docstring que describe la función interna.
+        if en_curso[0]: # Ya se está generando uno.
+            return # Evita pedir dos informes a la vez.
+        desde, hasta = semana(fecha_entry.get()) # Lunes a lunes siguiente.
+        estado.config(text="Generando informe...") # Aviso de progreso.
+        en_curso[0] = True # Marca el informe en curso.
+
+        def _terminado(rutas): # Se llama en el hilo de Tk con (HTML, PDF o None).
+            ruta_html, ruta_pdf = rutas # Rutas generadas.
+            estado.config(text=f"Guardado en {ruta_pdf or ruta_html}") # Dónde quedó.
+            en_curso[0] = False # Permite generar otro.
+            if pdf.get() and hay_conversor and not ruta_pdf: # Se pidió el PDF pero la conversión falló.
+                messagebox.showwarning("Informe", "No se pudo generar el PDF; se abrirá el HTML, que también se puede imprimir.", parent=win) # Aviso.
+            webbrowser.open("file://" + os.path.abspath(ruta_pdf or ruta_html)) # Lo abre con el visor del sistema.
+
+        def _fallido(error): # Se llama en el hilo de Tk si la generación falló.
+            estado.config(text="") # Borra el progreso.
+            en_curso[0] = False # Permite reintentar.
+            messagebox.showerror("Error", f"No se pudo generar el informe: {error}", parent=win) # Muestra el error.
+
+        futuro = _grupo.submit(generar_informe, usuario, desde, hasta, None, incluir_notas.get(), pdf.get() and hay_conversor) # Escribe el informe fuera del hilo de Tk.
+        esperar_futuro(win, futuro, _terminado, _fallido) # Espera el resultado sin bloquear.
+
+    crear_boton_estilizado(content_frame, "Generar informe", generar, VERDE, "white", icon_char="🖨️") # Botón para generar el informe.